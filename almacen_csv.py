@@ -0,0 +1,1143 @@
+"""
+Motor de almacenamiento en CSV
+Mantiene el ledger en un archivo CSV plano con una tabla columnar en memoria,
+agregados incrementales y eliminaciones por lápidas de solo anexado
+"""
+
+import csv
+import heapq
+import io
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from bloqueo import obtener_bloqueo
+from diario import DiarioEscritura, leer_registros, tomar_diario
+from instantanea import (cargar_instantanea, conviene_guardar, descartar_instantanea,
+                         guardar_instantanea)
+from lector_csv import anexar_por_bloques, lineas_hasta
+from almacenamiento import (AlmacenamientoBase, AvanceCarga, Gasto, a_centavos,
+                            clave_periodo, coincide_filtro, limites_fecha)
+from tabla_columnar import ColumnasGastos, TablaGastos, fecha_a_epoch, texto_a_centavos
+
+# Tamaño del buffer de escritura usado por las importaciones por lotes
+TAMANO_BUFFER_LOTE = 1024 * 1024
+
+# Tamaño del diario a partir del cual se sincroniza el CSV y se vacía el diario
+LIMITE_DIARIO = 8 * 1024 * 1024
+
+
+def ultimo_id(ruta: str) -> int:
+    """
+    Obtiene el id de la última fila de un CSV del ledger leyendo solo su final.
+
+    Los ids se asignan de forma creciente al anexar, por lo que la
+    última fila con id tiene el mayor de ellos.
+
+    Returns:
+        Último id registrado (0 si el archivo no tiene filas)
+    """
+    with open(ruta, 'rb') as archivo:
+        posicion = archivo.seek(0, os.SEEK_END)
+        datos = b''
+        while posicion > 0:
+            leer = min(4096, posicion)
+            posicion -= leer
+            archivo.seek(posicion)
+            datos = archivo.read(leer) + datos
+            lineas = datos.split(b'\n')
+            # La primera línea puede estar cortada si no se llegó al inicio
+            for linea in reversed(lineas[1:] if posicion > 0 else lineas):
+                campo = linea.split(b',', 1)[0].strip()
+                if campo.isdigit():
+                    return int(campo)
+            datos = lineas[0] if posicion > 0 else b''
+    return 0
+
+
+def leer_id_maximo(ruta: str) -> int:
+    """
+    Lee el mayor id asignado que se guardó en ``ruta`` (ver ``guardar_id_maximo``).
+
+    Returns:
+        El id, o 0 si el archivo no existe o no es válido
+    """
+    try:
+        with open(ruta, 'r', encoding='utf-8') as archivo:
+            texto = archivo.read().strip()
+    except OSError:
+        return 0
+    return int(texto) if texto.isdigit() else 0
+
+
+def guardar_id_maximo(ruta: str, id_maximo: int) -> None:
+    """
+    Guarda el mayor id asignado antes de compactar: la compactación puede
+    quitar la fila con ese id y, sin este registro, el id se volvería a
+    asignar a otro gasto. La escritura es atómica y el valor no disminuye.
+    """
+    id_maximo = max(id_maximo, leer_id_maximo(ruta))
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        archivo.write(f"{id_maximo}\n")
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+
+
+class AgregadosGastos:
+    """
+    Agregados de los gastos mantenidos de forma incremental.
+
+    Guarda cantidad, suma total, sumas por categoría y mínimo/máximo.
+    Los montos se acumulan en centavos enteros para evitar deriva de
+    redondeo. El mínimo y el máximo usan montículos con borrado perezoso,
+    de modo que siguen siendo correctos al eliminar gastos.
+    """
+
+    def __init__(self, gastos=()):
+        """
+        Inicializa los agregados a partir de una colección de gastos.
+
+        Args:
+            gastos: Gastos tipados con los que se construyen los agregados
+        """
+        self.cantidad = 0
+        self.total_centavos = 0
+        self.por_categoria: Dict[str, int] = {}
+        self._cantidad_por_categoria: Dict[str, int] = {}
+        # Multiconjunto de montos vivos y montículos (mínimos y máximos negados)
+        self._montos: Dict[int, int] = {}
+        self._minimos: List[int] = []
+        self._maximos: List[int] = []
+
+        for gasto in gastos:
+            self.agregar(gasto)
+
+    @classmethod
+    def desde_tabla(cls, tabla: TablaGastos) -> "AgregadosGastos":
+        """
+        Construye los agregados recorriendo directamente las columnas de una tabla.
+        """
+        agregados = cls()
+        nombres = tabla.nombres_categoria
+        categorias, centavos = tabla.categorias, tabla.centavos
+        for indice in tabla.indices_vivos():
+            agregados.agregar_centavos(nombres[categorias[indice]], centavos[indice])
+        return agregados
+
+    def agregar(self, gasto: Gasto) -> None:
+        """
+        Incorpora un gasto a los agregados en O(log n).
+        """
+        self.agregar_centavos(gasto.categoria, a_centavos(gasto.monto))
+
+    def quitar(self, gasto: Gasto) -> None:
+        """
+        Descuenta un gasto de los agregados en O(log n) amortizado.
+        """
+        self.quitar_centavos(gasto.categoria, a_centavos(gasto.monto))
+
+    def agregar_centavos(self, categoria: str, centavos: int) -> None:
+        """
+        Incorpora un monto en centavos de la categoría indicada.
+        """
+        self.cantidad += 1
+        self.total_centavos += centavos
+        self.por_categoria[categoria] = self.por_categoria.get(categoria, 0) + centavos
+        self._cantidad_por_categoria[categoria] = self._cantidad_por_categoria.get(categoria, 0) + 1
+
+        if self._montos.get(centavos, 0) == 0:
+            heapq.heappush(self._minimos, centavos)
+            heapq.heappush(self._maximos, -centavos)
+        self._montos[centavos] = self._montos.get(centavos, 0) + 1
+
+    def quitar_centavos(self, categoria: str, centavos: int) -> None:
+        """
+        Descuenta un monto en centavos de la categoría indicada.
+        """
+        self.cantidad -= 1
+        self.total_centavos -= centavos
+
+        restantes = self._cantidad_por_categoria.get(categoria, 0) - 1
+        if restantes > 0:
+            self._cantidad_por_categoria[categoria] = restantes
+            self.por_categoria[categoria] -= centavos
+        else:
+            self._cantidad_por_categoria.pop(categoria, None)
+            self.por_categoria.pop(categoria, None)
+
+        restantes = self._montos.get(centavos, 0) - 1
+        if restantes > 0:
+            self._montos[centavos] = restantes
+        else:
+            # Las entradas de los montículos se descartan al llegar a la cima
+            self._montos.pop(centavos, None)
+
+    def minimo_centavos(self) -> int:
+        """
+        Retorna el monto mínimo vivo en centavos (0 si no hay gastos).
+        """
+        while self._minimos and self._minimos[0] not in self._montos:
+            heapq.heappop(self._minimos)
+        return self._minimos[0] if self._minimos else 0
+
+    def maximo_centavos(self) -> int:
+        """
+        Retorna el monto máximo vivo en centavos (0 si no hay gastos).
+        """
+        while self._maximos and -self._maximos[0] not in self._montos:
+            heapq.heappop(self._maximos)
+        return -self._maximos[0] if self._maximos else 0
+
+
+class AlmacenamientoCSV(AlmacenamientoBase):
+    """
+    Almacenamiento en un archivo CSV plano.
+
+    Cada gasto tiene un identificador estable (columna ``id``). Las
+    eliminaciones no reescriben el CSV: se registran como lápidas en un
+    archivo auxiliar de solo anexado (``<archivo>.borrados``) y se aplican
+    físicamente al compactar.
+
+    Con ``en_memoria=True`` el ledger se mantiene en memoria y solo se
+    relee cuando cambia la firma (mtime, tamaño) de los archivos. Con
+    ``en_memoria=False`` cada consulta recorre el archivo en streaming y la
+    memoria usada no depende del tamaño del ledger.
+
+    En memoria, las consultas filtradas usan los índices por fecha y por
+    categoría de la tabla; el resultado del último filtro se conserva para
+    que la paginación no repita la búsqueda.
+
+    Varios procesos pueden compartir el mismo archivo: las escrituras
+    (altas, lápidas, compactación) toman un bloqueo exclusivo sobre
+    ``<archivo>.lock`` y las lecturas del archivo uno compartido.
+
+    Con ``durable=True`` las altas se registran primero en un diario de
+    escritura anticipada (``<archivo>.wal``) con confirmación por grupos
+    y se anexan al CSV al confirmarse cada grupo, sin abrir el archivo por
+    cada gasto. Solo un proceso puede escribir el ledger en modo durable y
+    no debe haber otros escritores; los demás procesos pueden leerlo y ven
+    las altas con el retraso de un grupo. Si el proceso se interrumpe, el
+    diario se reproduce al volver a abrir el ledger.
+    """
+
+    def __init__(self, archivo_csv: str, umbral_compactacion: int = 500,
+                 en_memoria: bool = True, durable: bool = False,
+                 politica_fsync: str = "grupo", registros_por_grupo: int = 1000,
+                 espera_grupo_ms: float = 10.0, usar_instantanea: bool = True,
+                 confirmacion_diferida: bool = False):
+        """
+        Inicializa el almacenamiento CSV.
+
+        Args:
+            archivo_csv: Ruta del archivo CSV
+            umbral_compactacion: Cantidad de lápidas pendientes a partir de la
+                cual se compacta el archivo automáticamente
+            en_memoria: Mantener el ledger en memoria (True) o leerlo en
+                streaming en cada consulta (False)
+            durable: Registrar las altas en el diario con confirmación por
+                grupos (requiere ``en_memoria``)
+            politica_fsync: Sincronización del diario: "grupo", "siempre" o "nunca"
+            registros_por_grupo: Altas que disparan la confirmación de un grupo
+            espera_grupo_ms: Tiempo máximo que un alta espera a su grupo
+            usar_instantanea: Mantener la instantánea binaria del ledger
+                (``<archivo>.instantanea``) para no reanalizar todo el CSV al
+                abrirlo (solo con ``en_memoria``)
+            confirmacion_diferida: Con la política "siempre", las altas
+                retornan sin esperar su fsync; quien las registra llama
+                después a ``esperar_confirmacion``
+
+        Raises:
+            ValueError: Si se pide el modo durable sin ledger en memoria
+            RuntimeError: Si otro proceso ya escribe el ledger en modo durable
+        """
+        if durable and not en_memoria:
+            raise ValueError("El modo durable requiere el ledger en memoria")
+        self.archivo_csv = archivo_csv
+        self.archivo_borrados = archivo_csv + ".borrados"
+        self.archivo_diario = archivo_csv + ".wal"
+        self.archivo_instantanea = archivo_csv + ".instantanea"
+        # Mayor id asignado, por si la compactación quitó su fila
+        self.archivo_ids = archivo_csv + ".ultimo_id"
+        self.usar_instantanea = usar_instantanea and en_memoria
+        self.columnas = ["id", "fecha", "categoria", "descripcion", "monto"]
+        self.umbral_compactacion = umbral_compactacion
+        self.en_memoria = en_memoria
+        # Ledger en memoria (tabla columnar) y firma de los archivos con la que se cargó
+        self._cache: Optional[TablaGastos] = None
+        self._firma: Optional[Tuple] = None
+        self._agregados = AgregadosGastos()
+        self._lapidas_pendientes = 0
+        self._siguiente_id = 1
+        # Última consulta filtrada: (filtros, tabla, versión de la tabla, índices)
+        self._ultima_consulta: Optional[Tuple] = None
+        # Carga por bloques en curso y la tabla que va llenando
+        self._carga: Optional[Iterator[AvanceCarga]] = None
+        self._tabla_parcial: Optional[TablaGastos] = None
+        self._bloqueo = obtener_bloqueo(archivo_csv)
+        # Modo durable: diario, serialización de las altas entre hilos y
+        # último id ya anexado al CSV
+        self._diario: Optional[DiarioEscritura] = None
+        self._escritura = threading.RLock()
+        self._ultimo_escrito = 0
+        self.confirmacion_diferida = confirmacion_diferida
+        # Número en el diario de la última alta anotada
+        self._ultimo_anotado = 0
+        with self._bloqueo.exclusivo():
+            self._inicializar_archivo()
+
+        if durable:
+            descriptor = tomar_diario(self.archivo_diario)
+            if descriptor is None:
+                raise RuntimeError(f"Otro proceso escribe '{archivo_csv}' en modo durable")
+            with self._bloqueo.exclusivo():
+                # Lo que otro proceso haya dejado entre la recuperación y la toma del diario
+                self._reproducir_diario(descriptor)
+                self._ultimo_escrito = self._ultimo_id()
+            self._diario = DiarioEscritura(descriptor, self._aplicar_grupo, politica_fsync,
+                                           registros_por_grupo, espera_grupo_ms)
+
+    @property
+    def agregados_en_memoria(self) -> bool:
+        return self.en_memoria
+
+    def _inicializar_archivo(self) -> None:
+        """
+        Crea el archivo CSV con encabezados si no existe.
+
+        Si el archivo existe con el formato anterior (sin columna ``id``),
+        se migra asignando identificadores correlativos. Si quedó un diario
+        de un escritor durable interrumpido, se reproduce sobre el CSV.
+        """
+        if not os.path.exists(self.archivo_csv):
+            try:
+                with open(self.archivo_csv, 'w', newline='', encoding='utf-8') as archivo:
+                    escritor = csv.DictWriter(archivo, fieldnames=self.columnas)
+                    escritor.writeheader()
+                # Una instantánea que sobrevivió a su ledger no le corresponde al nuevo
+                descartar_instantanea(self.archivo_instantanea)
+                if os.path.exists(self.archivo_ids):
+                    os.remove(self.archivo_ids)
+                print(f"✓ Archivo '{self.archivo_csv}' creado exitosamente")
+            except Exception as e:
+                raise Exception(f"Error al crear el archivo: {str(e)}")
+        else:
+            try:
+                with open(self.archivo_csv, 'r', newline='', encoding='utf-8') as archivo:
+                    encabezado = next(csv.reader(archivo), [])
+                if 'id' not in encabezado:
+                    self._migrar_sin_ids()
+            except Exception as e:
+                raise Exception(f"Error al migrar el archivo: {str(e)}")
+
+        if os.path.exists(self.archivo_diario):
+            # Si otro proceso tiene el diario, es un escritor durable activo
+            descriptor = tomar_diario(self.archivo_diario)
+            if descriptor is not None:
+                try:
+                    self._reproducir_diario(descriptor)
+                except Exception as e:
+                    raise Exception(f"Error al recuperar el diario: {str(e)}")
+                finally:
+                    os.close(descriptor)
+
+    def _reproducir_diario(self, descriptor: int) -> None:
+        """
+        Anexa al CSV los registros confirmados del diario que no llegaron a
+        él y vacía el diario. Debe llamarse con el bloqueo exclusivo y el
+        diario tomados.
+
+        Los ids crecen en el orden del diario, así que los registros con id
+        mayor que el último del CSV son exactamente los que faltan. Un mismo
+        id puede aparecer más de una vez (un grupo reescrito tras un fallo):
+        se reaplica una sola vez.
+        """
+        registros = leer_registros(self.archivo_diario)
+        if registros:
+            self._reparar_final(registros)
+            ultimo = self._ultimo_id()
+            por_id = {}
+            for registro in registros:
+                if int(registro[0]) > ultimo:
+                    por_id.setdefault(int(registro[0]), registro)
+            faltantes = [por_id[id_gasto] for id_gasto in sorted(por_id)]
+            if faltantes:
+                with open(self.archivo_csv, 'a', newline='', encoding='utf-8') as archivo:
+                    csv.writer(archivo).writerows(faltantes)
+                    archivo.flush()
+                    os.fsync(archivo.fileno())
+                print(f"✓ Diario recuperado: {len(faltantes)} gastos reaplicados")
+        os.ftruncate(descriptor, 0)
+        os.fsync(descriptor)
+
+    def _reparar_final(self, registros: List[List[str]]) -> None:
+        """
+        Descarta la última línea del CSV si es una fila del diario que quedó
+        cortada por una caída; cualquier otra línea sin salto final se
+        conserva y se le agrega el salto.
+        """
+        with open(self.archivo_csv, 'rb+') as archivo:
+            tamano = archivo.seek(0, os.SEEK_END)
+            if tamano == 0:
+                return
+            archivo.seek(max(0, tamano - 64 * 1024))
+            final = archivo.read()
+            if final.endswith(b"\n"):
+                return
+            cortada = final[final.rfind(b"\n") + 1:]
+            for registro in registros:
+                texto = io.StringIO()
+                csv.writer(texto).writerow(registro)
+                if texto.getvalue().encode('utf-8').startswith(cortada):
+                    archivo.truncate(tamano - len(cortada))
+                    return
+            archivo.write(b"\r\n")
+
+    def _migrar_sin_ids(self) -> None:
+        """
+        Reescribe un archivo del formato anterior añadiendo la columna ``id``.
+        """
+        with open(self.archivo_csv, 'r', newline='', encoding='utf-8') as archivo:
+            filas = list(csv.DictReader(archivo))
+        for numero, fila in enumerate(filas, 1):
+            fila['id'] = numero
+        self._reescribir(filas)
+        print(f"✓ Archivo '{self.archivo_csv}' migrado al formato con identificadores")
+
+    def _reescribir(self, filas) -> None:
+        """
+        Reemplaza atómicamente el contenido del CSV mediante un archivo temporal.
+
+        El temporal se sincroniza antes de ``os.replace``, de modo que ante
+        una caída queda el archivo anterior o el nuevo completo. Debe
+        llamarse con el bloqueo exclusivo tomado.
+
+        Args:
+            filas: Diccionarios con las filas a escribir
+        """
+        temporal = self.archivo_csv + ".tmp"
+        with open(temporal, 'w', newline='', encoding='utf-8') as archivo:
+            escritor = csv.DictWriter(archivo, fieldnames=self.columnas, extrasaction='ignore')
+            escritor.writeheader()
+            escritor.writerows(filas)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, self.archivo_csv)
+
+    def _firma_archivo(self) -> Optional[Tuple]:
+        """
+        Obtiene la firma (mtime en ns, tamaño) del CSV y del archivo de lápidas.
+
+        Returns:
+            Tupla con la firma o None si el CSV no existe
+        """
+        try:
+            info = os.stat(self.archivo_csv)
+        except OSError:
+            return None
+        try:
+            borrados = os.stat(self.archivo_borrados)
+            firma_borrados = (borrados.st_mtime_ns, borrados.st_size)
+        except OSError:
+            firma_borrados = None
+        return info.st_mtime_ns, info.st_size, firma_borrados
+
+    def _cache_vigente(self) -> bool:
+        """
+        Indica si el ledger en memoria corresponde al contenido actual del archivo.
+
+        En modo durable el ledger en memoria es la fuente de verdad: incluye
+        las altas del grupo en curso, que aún no están en el CSV.
+        """
+        if self._diario is not None:
+            return self._cache is not None
+        return self._cache is not None and self._firma == self._firma_archivo()
+
+    def _leer_lapidas(self) -> set:
+        """
+        Lee los identificadores registrados en el archivo de lápidas.
+
+        Returns:
+            Conjunto de ids eliminados
+        """
+        lapidas = set()
+        if os.path.exists(self.archivo_borrados):
+            with open(self.archivo_borrados, 'r', encoding='utf-8') as archivo:
+                for linea in archivo:
+                    linea = linea.strip()
+                    if linea.isdigit():
+                        lapidas.add(int(linea))
+        return lapidas
+
+    def _recorrer_filas(self, lineas: Optional[Iterable[str]] = None) -> Iterator[Gasto]:
+        """
+        Recorre el archivo CSV (o las líneas indicadas) fila a fila, sin
+        aplicar las lápidas.
+
+        Las filas sin id válido (editadas a mano) se entregan con id 0.
+
+        Yields:
+            Gastos tipados en orden de archivo
+        """
+        if lineas is None:
+            with open(self.archivo_csv, 'r', newline='', encoding='utf-8') as archivo:
+                yield from self._recorrer_filas(archivo)
+            return
+
+        lector = csv.reader(lineas)
+        encabezado = next(lector, [])
+        posiciones = [encabezado.index(c) if c in encabezado else None
+                      for c in self.columnas]
+        for fila in lector:
+            if not fila:
+                continue
+            id_gasto, fecha, categoria, descripcion, monto = (
+                fila[i] if i is not None and i < len(fila) else ''
+                for i in posiciones)
+            try:
+                # Igual que al cargar la tabla: un monto no finito o fuera de
+                # rango cuenta como 0
+                monto = texto_a_centavos(monto or '0') / 100
+            except ValueError:
+                monto = 0.0
+            yield Gasto(int(id_gasto) if id_gasto.isdigit() else 0,
+                        fecha, categoria or 'Sin categoría', descripcion, monto)
+
+    def _leer_por_bloques(self) -> Iterator[AvanceCarga]:
+        """
+        Lee el archivo CSV en una tabla columnar de a un bloque por paso,
+        marcando como eliminadas las filas con lápida, y al terminar la
+        instala como ledger en memoria. Mientras tanto la tabla parcial
+        queda en ``_tabla_parcial``.
+
+        Si hay una instantánea binaria vigente, solo se analizan las filas
+        anexadas al CSV después de guardarla; la instantánea se (re)escribe
+        cuando esa cola ya es una parte apreciable del ledger.
+
+        Cada paso toma el bloqueo compartido por separado, así que entre
+        pasos se puede escribir el ledger: las filas anexadas entretanto se
+        leen al llegar al final y, si el archivo se reemplazó (compactación
+        de otro proceso), la lectura vuelve a empezar.
+
+        Yields:
+            El progreso tras cada bloque
+        """
+        try:
+            while True:
+                with self._bloqueo.compartido():
+                    if self._firma_archivo() is None:
+                        self._cache, self._firma = TablaGastos(), None
+                        self._agregados = AgregadosGastos()
+                        return
+                    lapidas = self._leer_lapidas()
+                    tabla, inicio = None, 0
+                    if self.usar_instantanea:
+                        cargada = cargar_instantanea(self.archivo_instantanea, self.archivo_csv)
+                        if cargada is not None:
+                            tabla, inicio = cargada
+                    tabla = tabla if tabla is not None else TablaGastos()
+                    cubiertas = len(tabla.ids)
+                    archivo = open(self.archivo_csv, 'rb')
+                self._tabla_parcial = tabla
+                sin_id: List[Tuple] = []
+                with archivo:
+                    pasos = anexar_por_bloques(archivo, self.columnas, tabla, sin_id, inicio)
+                    while True:
+                        with self._bloqueo.compartido():
+                            leido = next(pasos, None)
+                            if leido is None and os.fstat(archivo.fileno()).st_size > archivo.tell():
+                                # Filas anexadas entre pasos (por ejemplo, altas de la interfaz)
+                                pasos = anexar_por_bloques(archivo, self.columnas, tabla, sin_id,
+                                                           archivo.tell())
+                                leido = next(pasos, None)
+                            if leido is None:
+                                reemplazado = (os.fstat(archivo.fileno()).st_ino
+                                               != os.stat(self.archivo_csv).st_ino)
+                                if not reemplazado:
+                                    self._completar_lectura(tabla, sin_id, cubiertas,
+                                                            archivo.tell())
+                                break
+                            total = os.fstat(archivo.fileno()).st_size
+                        # Las lápidas ya leídas se aplican a cada bloque para la vista parcial
+                        for id_gasto in [i for i in lapidas if tabla.posicion(i) is not None]:
+                            tabla.eliminar(tabla.posicion(id_gasto))
+                            lapidas.discard(id_gasto)
+                        yield AvanceCarga(len(tabla), leido, total)
+                if not reemplazado:
+                    return
+        finally:
+            self._carga = self._tabla_parcial = None
+
+    def _completar_lectura(self, tabla: TablaGastos, sin_id: List[Tuple], cubiertas: int,
+                           fin: int) -> None:
+        """
+        Termina una lectura del CSV (con el bloqueo compartido tomado) e
+        instala la tabla como ledger en memoria.
+
+        Args:
+            tabla: Tabla con todas las filas del archivo
+            sin_id: Filas sin id, como tuplas (fecha, categoria, descripcion, centavos)
+            cubiertas: Filas de la tabla que venían de la instantánea
+            fin: Bytes del CSV leídos
+        """
+        # Las filas sin id no están en la tabla: la instantánea no las tendría
+        if (self.usar_instantanea and not sin_id
+                and conviene_guardar(len(tabla.ids), len(tabla.ids) - cubiertas)):
+            guardar_instantanea(self.archivo_instantanea, tabla, self.archivo_csv, fin)
+        # Se releen: pudo haber bajas entre los pasos de la lectura
+        lapidas = self._leer_lapidas()
+        maximo_id = max(max(tabla.ids, default=0), leer_id_maximo(self.archivo_ids))
+        tabla.eliminar_ids(lapidas)
+
+        # Filas editadas a mano sin id: reciben uno provisional hasta compactar
+        for datos in sin_id:
+            maximo_id += 1
+            tabla.agregar(maximo_id, *datos)
+
+        self._siguiente_id = maximo_id + 1
+        self._lapidas_pendientes = len(lapidas)
+        self._cache, self._firma = tabla, self._firma_archivo()
+        self._agregados = AgregadosGastos.desde_tabla(tabla)
+
+    def cargar_por_bloques(self) -> Iterator[AvanceCarga]:
+        if self.en_memoria and self._diario is None and not self._cache_vigente():
+            # Una sola carga en curso: si otra consulta la completa, este recorrido termina
+            if self._carga is None:
+                self._carga = self._leer_por_bloques()
+            yield from self._carga
+        # Último paso con el total, ya con el ledger en memoria
+        yield from super().cargar_por_bloques()
+
+    def memoria_en_uso(self) -> int:
+        total = self._cache.memoria() if self._cache is not None else 0
+        if self._tabla_parcial is not None and self._tabla_parcial is not self._cache:
+            total += self._tabla_parcial.memoria()
+        return total
+
+    def pagina_cargada(self, inicio: int, cantidad: int) -> List[Gasto]:
+        if self._tabla_parcial is not None:
+            return self._tabla_parcial.pagina(inicio, cantidad)
+        return self.pagina(inicio, cantidad)
+
+    def _ultimo_id(self) -> int:
+        """
+        Obtiene el id de la última fila del archivo (ver ``ultimo_id``).
+        """
+        return ultimo_id(self.archivo_csv)
+
+    def _id_maximo(self) -> int:
+        """
+        Mayor id asignado hasta ahora, esté o no su fila en el CSV.
+        """
+        maximo = max(self._ultimo_id(), leer_id_maximo(self.archivo_ids))
+        if self.en_memoria and self._cache is not None:
+            maximo = max(maximo, self._siguiente_id - 1)
+        return maximo
+
+    def _obtener_ledger(self) -> TablaGastos:
+        """
+        Retorna el ledger en memoria, recargándolo solo si el archivo cambió.
+
+        Returns:
+            Tabla columnar con los gastos (no debe modificarse desde fuera)
+        """
+        if self._cache_vigente():
+            return self._cache
+
+        try:
+            # El bloqueo compartido evita leer una escritura a medias; una
+            # carga por bloques en curso se completa en lugar de empezar otra
+            with self._bloqueo.compartido():
+                for _ in self._carga or self._leer_por_bloques():
+                    pass
+        except Exception as e:
+            print(f"Error al leer gastos: {str(e)}")
+            self._cache, self._firma = None, None
+            self._agregados = AgregadosGastos()
+            return TablaGastos()
+
+        return self._cache
+
+    def invalidar_cache(self) -> None:
+        """
+        Descarta el ledger en memoria para forzar una relectura del archivo.
+        """
+        if self._diario is not None:
+            # Las altas pendientes deben estar en el CSV antes de releerlo
+            self._diario.sincronizar()
+        if self._carga is not None:
+            self._carga.close()
+        self._cache = None
+        self._firma = None
+        self._agregados = AgregadosGastos()
+        self._ultima_consulta = None
+
+    def _descartar_cache(self) -> None:
+        """
+        Descarta el ledger en memoria tras una escritura fallida. A diferencia
+        de ``invalidar_cache`` no sincroniza el diario, así que se puede llamar
+        con el bloqueo exclusivo tomado (el hilo del diario lo necesita).
+        """
+        self._cache = None
+        self._firma = None
+        self._agregados = AgregadosGastos()
+        self._ultima_consulta = None
+
+    def _registrar_en_memoria(self, tabla: TablaGastos, gasto: Gasto) -> Gasto:
+        """
+        Asigna el siguiente id a un gasto validado y lo incorpora al ledger.
+
+        Returns:
+            El gasto con su id definitivo
+        """
+        gasto = gasto._replace(id=self._siguiente_id)
+        centavos = a_centavos(gasto.monto)
+        tabla.agregar(gasto.id, gasto.fecha, gasto.categoria, gasto.descripcion, centavos)
+        self._agregados.agregar_centavos(gasto.categoria, centavos)
+        self._siguiente_id += 1
+        return gasto
+
+    def agregar(self, gasto: Gasto) -> Gasto:
+        if self._diario is not None:
+            return self._agregar_durable(gasto)
+
+        with self._bloqueo.exclusivo():
+            # Durante una carga por bloques el alta no la espera: va al final
+            # del archivo, donde la carga la leerá
+            if not self.en_memoria or self._carga is not None:
+                return self._anexar_sin_cache([gasto], sincronizar=False)[1]
+
+            # El ledger vigente (con las altas de otros procesos) da el siguiente
+            # id; se registra antes de escribir para que un monto que no se
+            # puede convertir a centavos falle sin dejar la fila en el CSV
+            gasto = self._registrar_en_memoria(self._obtener_ledger(), gasto)
+            try:
+                with open(self.archivo_csv, 'a', newline='', encoding='utf-8') as archivo:
+                    escritor = csv.DictWriter(archivo, fieldnames=self.columnas)
+                    escritor.writerow(gasto.a_diccionario())
+            except Exception:
+                self._descartar_cache()
+                raise
+
+            self._firma = self._firma_archivo()
+            return gasto
+
+    def _agregar_durable(self, gasto: Gasto) -> Gasto:
+        """
+        Registra el alta en memoria y en el diario; el CSV se actualiza al
+        confirmarse el grupo.
+        """
+        with self._escritura:
+            # Anotar dentro de la sección mantiene el diario en orden de id
+            gasto = self._registrar_en_memoria(self._obtener_ledger(), gasto)
+            numero = self._diario.anotar(list(gasto.a_diccionario().values()))
+            self._ultimo_anotado = numero
+        if self._diario.politica_fsync == "siempre" and not self.confirmacion_diferida:
+            self._diario.esperar(numero)
+        return gasto
+
+    def _aplicar_grupo(self, grupo: List[List[str]]) -> None:
+        """
+        Anexa al CSV un grupo confirmado en el diario (hilo del diario).
+
+        Los registros que ya están en el CSV (escritos por un lote o por una
+        compactación) se omiten. Cuando el diario crece demasiado, se
+        sincroniza el CSV y se vacía el diario.
+
+        Si la escritura falla, el CSV se recorta al tamaño que tenía: el
+        diario vuelve a entregar el mismo grupo y no debe quedar duplicado.
+        """
+        with self._bloqueo.exclusivo():
+            nuevos = [registro for registro in grupo if int(registro[0]) > self._ultimo_escrito]
+            if nuevos:
+                tamano = os.path.getsize(self.archivo_csv)
+                try:
+                    with open(self.archivo_csv, 'a', newline='', encoding='utf-8',
+                              buffering=TAMANO_BUFFER_LOTE) as archivo:
+                        csv.writer(archivo).writerows(nuevos)
+                        if self._diario.tamano() >= LIMITE_DIARIO:
+                            archivo.flush()
+                            if self._diario.politica_fsync != "nunca":
+                                os.fsync(archivo.fileno())
+                            self._diario.truncar()
+                except Exception:
+                    if self._diario.tamano() > 0:
+                        os.truncate(self.archivo_csv, tamano)
+                        raise
+                    # El diario ya se vació: las filas están sincronizadas en el CSV
+                self._ultimo_escrito = int(nuevos[-1][0])
+            self._firma = self._firma_archivo()
+
+    def sincronizar(self) -> None:
+        if self._diario is not None:
+            self._diario.sincronizar()
+
+    def esperar_confirmacion(self) -> None:
+        diario = self._diario
+        if diario is not None and diario.politica_fsync == "siempre":
+            diario.esperar(self._ultimo_anotado)
+
+    def cerrar(self) -> None:
+        if self._carga is not None:
+            self._carga.close()
+        with self._escritura:
+            if self._diario is None:
+                return
+            try:
+                # Si algo no llegó al CSV, el diario no se vacía y se
+                # reaplica en la próxima apertura
+                self._diario.detener()
+                with self._bloqueo.exclusivo():
+                    # Todo lo confirmado queda en el CSV: el diario ya no hace falta
+                    with open(self.archivo_csv, 'a', encoding='utf-8') as archivo:
+                        if self._diario.politica_fsync != "nunca":
+                            os.fsync(archivo.fileno())
+                    self._diario.truncar()
+            finally:
+                self._diario.cerrar()
+                self._diario = None
+
+    def _anexar_sin_cache(self, gastos: Iterable[Gasto],
+                          sincronizar: bool = True) -> Tuple[int, Optional[Gasto]]:
+        """
+        Anexa gastos al CSV sin ledger en memoria (modo streaming). Debe
+        llamarse con el bloqueo exclusivo tomado.
+
+        Returns:
+            Tupla (cantidad escrita, último gasto escrito o None)
+        """
+        siguiente_id = max(self._ultimo_id(), leer_id_maximo(self.archivo_ids)) + 1
+        cantidad = 0
+        ultimo = None
+        with open(self.archivo_csv, 'a', newline='', encoding='utf-8',
+                  buffering=TAMANO_BUFFER_LOTE) as archivo:
+            escritor = csv.writer(archivo)
+            for gasto in gastos:
+                gasto = gasto._replace(id=siguiente_id)
+                escritor.writerow(gasto.a_diccionario().values())
+                siguiente_id += 1
+                cantidad += 1
+                ultimo = gasto
+            if sincronizar:
+                archivo.flush()
+                os.fsync(archivo.fileno())
+        return cantidad, ultimo
+
+    def agregar_lote(self, gastos: Iterable[Gasto]) -> int:
+        with self._escritura:
+            if self._diario is not None:
+                # El lote se anexa directamente después de las altas ya confirmadas
+                self._diario.sincronizar()
+            return self._agregar_lote(gastos)
+
+    def _agregar_lote(self, gastos: Iterable[Gasto]) -> int:
+        with self._bloqueo.exclusivo():
+            if not self.en_memoria:
+                return self._anexar_sin_cache(gastos)[0]
+
+            tabla = self._obtener_ledger()
+            guardados = 0
+            try:
+                with open(self.archivo_csv, 'a', newline='', encoding='utf-8',
+                          buffering=TAMANO_BUFFER_LOTE) as archivo:
+                    escritor = csv.writer(archivo)
+                    for gasto in gastos:
+                        gasto = self._registrar_en_memoria(tabla, gasto)
+                        escritor.writerow(gasto.a_diccionario().values())
+                        guardados += 1
+
+                    archivo.flush()
+                    os.fsync(archivo.fileno())
+            except Exception:
+                # Parte del lote pudo quedar escrito: se relee el archivo
+                self._descartar_cache()
+                raise
+
+            self._ultimo_escrito = self._siguiente_id - 1
+            self._firma = self._firma_archivo()
+            return guardados
+
+    def eliminar(self, id_gasto: int) -> Optional[Gasto]:
+        with self._escritura:
+            if self._diario is not None:
+                # Con las altas confirmadas en el CSV, el ledger en memoria se
+                # puede descartar (y releer) si falla la lápida
+                self._diario.sincronizar()
+            eliminado = self._eliminar(id_gasto)
+            # Fuera del bloqueo: en modo durable compactar espera al hilo del diario
+            if eliminado is not None and self._lapidas_pendientes >= self.umbral_compactacion:
+                self.compactar()
+            return eliminado
+
+    def _eliminar(self, id_gasto: int) -> Optional[Gasto]:
+        with self._bloqueo.exclusivo():
+            if not self.en_memoria:
+                return self._eliminar_sin_cache(id_gasto)
+
+            tabla = self._obtener_ledger()
+            indice = tabla.posicion(id_gasto)
+            if indice is None:
+                return None
+
+            try:
+                self._escribir_lapida(id_gasto)
+            except Exception:
+                self._descartar_cache()
+                raise
+
+            fila = tabla.fila(indice)
+            eliminado = Gasto(fila.id, fila.fecha, fila.categoria, fila.descripcion, fila.monto)
+            tabla.eliminar(indice)
+            self._agregados.quitar_centavos(fila.categoria, fila.centavos)
+            self._lapidas_pendientes += 1
+            self._firma = self._firma_archivo()
+            return eliminado
+
+    def _escribir_lapida(self, id_gasto: int) -> None:
+        """
+        Anexa la lápida de un gasto al archivo de borrados.
+        """
+        with open(self.archivo_borrados, 'a', encoding='utf-8') as archivo:
+            archivo.write(f"{id_gasto}\n")
+
+    def _eliminar_sin_cache(self, id_gasto: int) -> Optional[Gasto]:
+        """
+        Elimina un gasto buscándolo en streaming (modo sin ledger en memoria).
+        """
+        if id_gasto in self._leer_lapidas():
+            return None
+        eliminado = next((g for g in self._recorrer_filas() if g.id == id_gasto), None)
+        if eliminado is None:
+            return None
+
+        self._escribir_lapida(id_gasto)
+        self._lapidas_pendientes = len(self._leer_lapidas())
+        return eliminado
+
+    def compactar(self) -> None:
+        """
+        Reescribe el CSV sin las filas eliminadas y descarta las lápidas.
+        """
+        with self._escritura:
+            if self._diario is not None:
+                self._diario.sincronizar()
+            self._compactar()
+
+    def _compactar(self) -> None:
+        with self._bloqueo.exclusivo():
+            gastos = self.iterar()
+            try:
+                # Antes de reescribir: la fila con el mayor id puede tener lápida
+                guardar_id_maximo(self.archivo_ids, self._id_maximo())
+                self._reescribir(gasto.a_diccionario() for gasto in gastos)
+                if os.path.exists(self.archivo_borrados):
+                    os.remove(self.archivo_borrados)
+                if self._diario is not None:
+                    # El CSV reescrito ya contiene todo lo confirmado; un gasto
+                    # del diario que se eliminó no debe reaparecer al recuperarlo
+                    self._ultimo_escrito = self._siguiente_id - 1
+                    self._diario.truncar()
+            except Exception:
+                self._descartar_cache()
+                raise
+
+            self._lapidas_pendientes = 0
+            if self.en_memoria and self._cache is not None:
+                self._cache = self._cache.compactada()
+                # El CSV reescrito es otro archivo: la instantánea anterior ya no vale
+                if self.usar_instantanea and conviene_guardar(len(self._cache.ids),
+                                                              len(self._cache.ids)):
+                    guardar_instantanea(self.archivo_instantanea, self._cache, self.archivo_csv,
+                                        os.path.getsize(self.archivo_csv))
+            self._firma = self._firma_archivo()
+
+    def _recorrer_vivos(self) -> Iterator[Gasto]:
+        """
+        Recorre en streaming los gastos sin lápida.
+
+        El bloqueo compartido solo se toma para fijar una instantánea: las
+        lápidas, el archivo abierto y su tamaño. El recorrido sigue sin
+        bloqueo, así que quien consume los gastos de a poco no frena a los
+        escritores: las altas posteriores no se ven y una compactación
+        reemplaza el archivo sin afectar al que ya está abierto.
+        """
+        with self._bloqueo.compartido():
+            lapidas = self._leer_lapidas()
+            archivo = open(self.archivo_csv, 'rb')
+            fin = os.fstat(archivo.fileno()).st_size
+        with archivo:
+            for gasto in self._recorrer_filas(lineas_hasta(archivo, fin)):
+                if gasto.id not in lapidas:
+                    yield gasto
+
+    def _indices_filtrados(self, desde: Optional[str], hasta: Optional[str],
+                           categoria: Optional[str]) -> Optional[List[int]]:
+        """
+        Resuelve los filtros con los índices de la tabla en memoria.
+
+        Returns:
+            Índices físicos de las filas que cumplen los filtros, o None si
+            los filtros de fecha no tienen un formato reconocible (en ese
+            caso se usa el recorrido genérico)
+        """
+        try:
+            inicio, fin = limites_fecha(desde, hasta)
+        except ValueError:
+            return None
+
+        tabla = self._obtener_ledger()
+        filtros = (desde, hasta, categoria)
+        ultima = self._ultima_consulta
+        if ultima is not None and ultima[0] == filtros and ultima[1] is tabla \
+                and ultima[2] == tabla.version:
+            return ultima[3]
+
+        if categoria is not None and categoria not in tabla.codigos_categoria:
+            indices = []
+        else:
+            indices = tabla.indices_filtrados(
+                fecha_a_epoch(inicio) if inicio is not None else None,
+                fecha_a_epoch(fin) if fin is not None else None,
+                tabla.codigos_categoria[categoria] if categoria is not None else None)
+        self._ultima_consulta = (filtros, tabla, tabla.version, indices)
+        return indices
+
+    def iterar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+               categoria: Optional[str] = None) -> Iterator[Gasto]:
+        sin_filtros = desde is None and hasta is None and categoria is None
+        if self.en_memoria:
+            tabla = self._obtener_ledger()
+            if sin_filtros:
+                return tabla.iterar()
+            indices = self._indices_filtrados(desde, hasta, categoria)
+            if indices is not None:
+                return (tabla.fila(indice) for indice in indices)
+            gastos = tabla.iterar()
+        else:
+            gastos = self._recorrer_vivos()
+
+        if sin_filtros:
+            return gastos
+        return (g for g in gastos if coincide_filtro(g, desde, hasta, categoria))
+
+    def recorrer(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                 categoria: Optional[str] = None) -> Iterator[Gasto]:
+        if self.en_memoria and self._cache_vigente():
+            return self.iterar(desde, hasta, categoria)
+        # Sin el ledger en memoria se lee el archivo en streaming, sin cargarlo
+        gastos = self._recorrer_vivos()
+        if desde is None and hasta is None and categoria is None:
+            return gastos
+        return (g for g in gastos if coincide_filtro(g, desde, hasta, categoria))
+
+    # En modo streaming (o con filtros de fecha no reconocibles) las
+    # consultas usan el recorrido genérico de una pasada
+
+    def pagina(self, inicio: int, cantidad: int, desde: Optional[str] = None,
+               hasta: Optional[str] = None, categoria: Optional[str] = None) -> List[Gasto]:
+        if self.en_memoria:
+            if desde is None and hasta is None and categoria is None:
+                return self._obtener_ledger().pagina(inicio, cantidad)
+            indices = self._indices_filtrados(desde, hasta, categoria)
+            if indices is not None:
+                tabla = self._obtener_ledger()
+                inicio = max(inicio, 0)
+                return [tabla.fila(i) for i in indices[inicio:inicio + max(cantidad, 0)]]
+        return super().pagina(inicio, cantidad, desde, hasta, categoria)
+
+    def extraer_columnas(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                         categoria: Optional[str] = None) -> ColumnasGastos:
+        if self.en_memoria:
+            if desde is None and hasta is None and categoria is None:
+                return self._obtener_ledger().columnas()
+            indices = self._indices_filtrados(desde, hasta, categoria)
+            if indices is not None:
+                return self._obtener_ledger().columnas(indices)
+        return super().extraer_columnas(desde, hasta, categoria)
+
+    def obtener(self, ids: Sequence[int]) -> List[Gasto]:
+        if not self.en_memoria:
+            return super().obtener(ids)
+        tabla = self._obtener_ledger()
+        indices = (tabla.posicion(id_gasto) for id_gasto in ids)
+        return [tabla.fila(indice) for indice in indices if indice is not None]
+
+    def contar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+               categoria: Optional[str] = None) -> int:
+        if self.en_memoria:
+            if desde is None and hasta is None and categoria is None:
+                self._obtener_ledger()
+                return self._agregados.cantidad
+            indices = self._indices_filtrados(desde, hasta, categoria)
+            if indices is not None:
+                return len(indices)
+        return super().contar(desde, hasta, categoria)
+
+    def total_centavos(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                       categoria: Optional[str] = None) -> int:
+        if self.en_memoria:
+            if desde is None and hasta is None and categoria is None:
+                self._obtener_ledger()
+                return self._agregados.total_centavos
+            indices = self._indices_filtrados(desde, hasta, categoria)
+            if indices is not None:
+                centavos = self._obtener_ledger().centavos
+                return sum(centavos[i] for i in indices)
+        return super().total_centavos(desde, hasta, categoria)
+
+    def totales_por_categoria(self, desde: Optional[str] = None,
+                              hasta: Optional[str] = None) -> Dict[str, int]:
+        if self.en_memoria:
+            if desde is None and hasta is None:
+                self._obtener_ledger()
+                return dict(self._agregados.por_categoria)
+            indices = self._indices_filtrados(desde, hasta, None)
+            if indices is not None:
+                tabla = self._obtener_ledger()
+                nombres, categorias, centavos = (tabla.nombres_categoria, tabla.categorias,
+                                                 tabla.centavos)
+                totales = {}
+                for i in indices:
+                    nombre = nombres[categorias[i]]
+                    totales[nombre] = totales.get(nombre, 0) + centavos[i]
+                return totales
+        return super().totales_por_categoria(desde, hasta)
+
+    def totales_por_periodo(self, periodo: str, desde: Optional[str] = None,
+                            hasta: Optional[str] = None,
+                            categoria: Optional[str] = None) -> Dict[str, int]:
+        indices = self._indices_filtrados(desde, hasta, categoria) if self.en_memoria else None
+        if indices is None:
+            return super().totales_por_periodo(periodo, desde, hasta, categoria)
+
+        tabla = self._obtener_ledger()
+        fechas, centavos = tabla.fechas, tabla.centavos
+        # La clave se calcula una vez por día, no por fila
+        claves_por_dia: Dict[int, str] = {}
+        totales = {}
+        for i in indices:
+            dia = fechas[i] // 86400
+            clave = claves_por_dia.get(dia)
+            if clave is None:
+                clave = clave_periodo(tabla.fecha_texto(i), periodo)
+                claves_por_dia[dia] = clave
+            totales[clave] = totales.get(clave, 0) + centavos[i]
+        return totales
+
+    def estadisticas(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                     categoria: Optional[str] = None) -> Tuple[int, int, int, int]:
+        if self.en_memoria:
+            if desde is None and hasta is None and categoria is None:
+                self._obtener_ledger()
+                agregados = self._agregados
+                return (agregados.cantidad, agregados.total_centavos,
+                        agregados.minimo_centavos(), agregados.maximo_centavos())
+            indices = self._indices_filtrados(desde, hasta, categoria)
+            if indices is not None:
+                if not indices:
+                    return 0, 0, 0, 0
+                montos = [self._obtener_ledger().centavos[i] for i in indices]
+                return len(montos), sum(montos), min(montos), max(montos)
+        return super().estadisticas(desde, hasta, categoria)
+
@@ -0,0 +1,690 @@
+"""
+Motor CSV particionado por mes
+Guarda el ledger en un directorio con un CSV por mes (``AAAA-MM.csv``, y
+``sin-fecha.csv`` para las fechas no reconocibles). Las agregaciones se
+reparten entre procesos: cada uno lee sus segmentos y calcula cantidad,
+suma, mínimo y máximo por grupo, y el proceso principal combina los
+resultados parciales
+"""
+
+import csv
+import heapq
+import multiprocessing
+import os
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from almacen_csv import TAMANO_BUFFER_LOTE, guardar_id_maximo, leer_id_maximo, ultimo_id
+from almacenamiento import (AlmacenamientoBase, Gasto, a_centavos, clave_periodo,
+                            coincide_filtro, limites_fecha)
+from bloqueo import obtener_bloqueo
+from instantanea import cargar_instantanea, conviene_guardar, guardar_instantanea
+from lector_csv import cargar_tabla
+from resumenes import SIN_FECHA, Acumulado, sumar_acumulado
+from tabla_columnar import ColumnasGastos, TablaGastos, fecha_a_epoch
+
+COLUMNAS = ["id", "fecha", "categoria", "descripcion", "monto"]
+
+# Segmento de los gastos cuya fecha no se pudo interpretar
+SEGMENTO_SIN_FECHA = "sin-fecha"
+
+# Resultados parciales que se conservan, por segmento, filtros y agrupación
+PARCIALES_EN_CACHE = 4096
+
+# Filas por segmento que se acumulan en memoria antes de escribirlas en un lote
+FILAS_POR_ESCRITURA = 10_000
+
+# Filtros de fecha ya convertidos: (inicio epoch, fin epoch, primer mes, último mes)
+Filtros = Tuple[Optional[int], Optional[int], Optional[str], Optional[str]]
+
+
+def segmento_de(fecha: str) -> str:
+    """
+    Retorna el segmento ("AAAA-MM" o "sin-fecha") al que pertenece una fecha.
+    """
+    mes = clave_periodo(fecha, "mes")
+    return SEGMENTO_SIN_FECHA if mes == SIN_FECHA else mes
+
+
+def _leer_lapidas(ruta: str) -> set:
+    """
+    Lee los ids de un archivo de lápidas (vacío si no existe).
+    """
+    lapidas = set()
+    if os.path.exists(ruta):
+        with open(ruta, 'r', encoding='utf-8') as archivo:
+            for linea in archivo:
+                linea = linea.strip()
+                if linea.isdigit():
+                    lapidas.add(int(linea))
+    return lapidas
+
+
+def leer_segmento(ruta: str) -> TablaGastos:
+    """
+    Lee un segmento con sus lápidas aplicadas, a partir de su instantánea
+    binaria si la tiene. Debe llamarse con el bloqueo del ledger tomado.
+    """
+    cargada = cargar_instantanea(ruta + ".instantanea", ruta)
+    tabla, inicio = cargada if cargada is not None else (None, 0)
+    cubiertas = len(tabla.ids) if tabla is not None else 0
+    # Las filas sin id solo aparecen si el segmento se editó a mano: se ignoran
+    tabla, sin_id, fin = cargar_tabla(ruta, COLUMNAS, tabla, inicio)
+    if not sin_id and conviene_guardar(len(tabla.ids), len(tabla.ids) - cubiertas):
+        guardar_instantanea(ruta + ".instantanea", tabla, ruta, fin)
+    tabla.eliminar_ids(_leer_lapidas(ruta + ".borrados"))
+    return tabla
+
+
+def acumular_tabla(tabla: TablaGastos, nombre: str, inicio: Optional[int],
+                   fin: Optional[int], categoria: Optional[str],
+                   agrupar: str) -> Dict[str, Acumulado]:
+    """
+    Calcula [cantidad, total, mínimo, máximo] en centavos de las filas de un
+    segmento que cumplen los filtros.
+
+    Args:
+        tabla: Filas del segmento
+        nombre: Nombre del segmento
+        inicio: Segundos epoch mínimos (inclusivo) o None
+        fin: Segundos epoch máximos (exclusivo) o None
+        categoria: Categoría a incluir o None para todas
+        agrupar: "categoria", "segmento" (una sola clave, ``nombre``) o
+            "semana" (semanas ISO "AAAA-Wss")
+
+    Returns:
+        Diccionario clave de grupo -> acumulado
+    """
+    if categoria is not None:
+        if categoria not in tabla.codigos_categoria:
+            return {}
+        codigos = [tabla.codigos_categoria[categoria]]
+    else:
+        codigos = range(len(tabla.nombres_categoria))
+
+    centavos = tabla.centavos
+    parciales: Dict[str, Acumulado] = {}
+    for codigo in codigos:
+        indices = tabla.indices_filtrados(inicio, fin, codigo)
+        if not indices:
+            continue
+        if agrupar == "semana":
+            # La clave se calcula una vez por día, no por fila
+            fechas, claves_por_dia = tabla.fechas, {}
+            grupos: Dict[str, List[int]] = {}
+            for i in indices:
+                dia = fechas[i] // 86400
+                clave = claves_por_dia.get(dia)
+                if clave is None:
+                    clave = claves_por_dia[dia] = clave_periodo(tabla.fecha_texto(i), "semana")
+                grupos.setdefault(clave, []).append(centavos[i])
+        else:
+            clave = tabla.nombres_categoria[codigo] if agrupar == "categoria" else nombre
+            grupos = {clave: list(map(centavos.__getitem__, indices))}
+        for clave, montos in grupos.items():
+            sumar_acumulado(parciales, clave, [len(montos), sum(montos), min(montos), max(montos)])
+    return parciales
+
+
+def acumular_segmento(directorio: str, nombre: str, inicio: Optional[int], fin: Optional[int],
+                      categoria: Optional[str], agrupar: str) -> Dict[str, Acumulado]:
+    """
+    Lee un segmento del disco y calcula sus acumulados (ver ``acumular_tabla``).
+
+    Es la tarea que ejecuta cada proceso del grupo de trabajo.
+    """
+    ruta = os.path.join(directorio, nombre + ".csv")
+    with obtener_bloqueo(directorio).compartido():
+        if not os.path.exists(ruta):
+            return {}
+        tabla = leer_segmento(ruta)
+    return acumular_tabla(tabla, nombre, inicio, fin, categoria, agrupar)
+
+
+def particionar(archivo_csv: str, directorio: str) -> int:
+    """
+    Copia un ledger CSV plano (sin sus filas con lápida) a un directorio
+    particionado por mes, conservando los ids.
+
+    Returns:
+        Cantidad de gastos copiados
+    """
+    almacen = AlmacenamientoParticionado(directorio, procesos=1)
+    try:
+        if almacen.segmentos():
+            raise ValueError(f"El directorio '{directorio}' ya contiene segmentos")
+        tabla, sin_id, _ = cargar_tabla(archivo_csv, COLUMNAS)
+        # Los ids de las filas con lápida (o ya compactadas) no se reasignan
+        id_maximo = max(max(tabla.ids, default=0), leer_id_maximo(archivo_csv + ".ultimo_id"))
+        tabla.eliminar_ids(_leer_lapidas(archivo_csv + ".borrados"))
+        if sin_id:
+            raise ValueError("El ledger tiene filas sin id: compáctalo antes de particionarlo")
+        if id_maximo:
+            guardar_id_maximo(almacen.archivo_ids, id_maximo)
+        return almacen.agregar_lote(tabla.iterar(), conservar_ids=True)
+    finally:
+        almacen.cerrar()
+
+
+class AlmacenamientoParticionado(AlmacenamientoBase):
+    """
+    Almacenamiento en un directorio con un CSV por mes.
+
+    Cada segmento tiene el formato del motor CSV, con sus propias lápidas
+    (``AAAA-MM.csv.borrados``) e instantánea binaria. Los ids son globales
+    y crecientes, por lo que dentro de cada segmento quedan ordenados.
+
+    Los recorridos van segmento por segmento en orden de mes (y de
+    registro dentro de cada mes) y solo leen los meses del rango pedido.
+    Los conteos, totales y estadísticas se reparten entre ``procesos``
+    procesos que leen los segmentos por su cuenta; los resultados parciales
+    se guardan por segmento, de modo que la siguiente consulta solo vuelve
+    a leer los meses modificados.
+    """
+
+    def __init__(self, directorio: str, umbral_compactacion: int = 500,
+                 procesos: Optional[int] = None):
+        """
+        Abre (o crea) el directorio del ledger.
+
+        Args:
+            directorio: Directorio de los segmentos mensuales
+            umbral_compactacion: Lápidas de un segmento a partir de las cuales
+                se compacta automáticamente
+            procesos: Procesos que calculan las agregaciones (por defecto,
+                uno por núcleo; con 1 se calculan en el proceso actual)
+        """
+        self.directorio = directorio
+        self.umbral_compactacion = umbral_compactacion
+        self.procesos = procesos or os.cpu_count() or 1
+        self._bloqueo = obtener_bloqueo(directorio)
+        # Mayor id asignado, por si una compactación quitó su fila o su segmento
+        self.archivo_ids = os.path.join(directorio, "ultimo_id")
+        # Segmentos leídos en el proceso: nombre -> (firma, tabla)
+        self._tablas: Dict[str, Tuple[Tuple, TablaGastos]] = {}
+        # Primer y último id por segmento: nombre -> (firma, (primero, último))
+        self._rangos: Dict[str, Tuple[Tuple, Tuple[int, int]]] = {}
+        # Acumulados por (segmento, filtros, agrupación) -> (firma, acumulados)
+        self._parciales: "OrderedDict[Tuple, Tuple[Tuple, Dict[str, Acumulado]]]" = OrderedDict()
+        self._ejecutor: Optional[ProcessPoolExecutor] = None
+        try:
+            os.makedirs(directorio, exist_ok=True)
+        except OSError as e:
+            raise Exception(f"Error al crear el directorio del ledger: {str(e)}")
+
+    def _ruta(self, nombre: str) -> str:
+        return os.path.join(self.directorio, nombre + ".csv")
+
+    def segmentos(self) -> List[str]:
+        """
+        Retorna los nombres de los segmentos existentes en orden de mes.
+        """
+        nombres = []
+        for archivo in os.listdir(self.directorio):
+            nombre, extension = os.path.splitext(archivo)
+            if extension == ".csv" and (nombre == SEGMENTO_SIN_FECHA
+                                        or segmento_de(nombre + "-01") == nombre):
+                nombres.append(nombre)
+        # "sin-fecha" queda después de los meses
+        return sorted(nombres)
+
+    def _firma(self, nombre: str) -> Optional[Tuple]:
+        """
+        Firma (mtime en ns, tamaño) del segmento y de sus lápidas.
+        """
+        ruta = self._ruta(nombre)
+        try:
+            info = os.stat(ruta)
+        except OSError:
+            return None
+        try:
+            borrados = os.stat(ruta + ".borrados")
+            firma_borrados = (borrados.st_mtime_ns, borrados.st_size)
+        except OSError:
+            firma_borrados = None
+        return info.st_mtime_ns, info.st_size, firma_borrados
+
+    def _tabla(self, nombre: str) -> TablaGastos:
+        """
+        Retorna las filas de un segmento, leyéndolo solo si cambió.
+        """
+        with self._bloqueo.compartido():
+            firma = self._firma(nombre)
+            guardada = self._tablas.get(nombre)
+            if guardada is not None and guardada[0] == firma:
+                return guardada[1]
+            tabla = leer_segmento(self._ruta(nombre)) if firma is not None else TablaGastos()
+            self._tablas[nombre] = (firma, tabla)
+            return tabla
+
+    def _rango_ids(self, nombre: str) -> Tuple[int, int]:
+        """
+        Retorna el primer y el último id de un segmento sin leerlo entero.
+        """
+        firma = self._firma(nombre)
+        guardado = self._rangos.get(nombre)
+        if guardado is not None and guardado[0] == firma:
+            return guardado[1]
+        with open(self._ruta(nombre), 'r', newline='', encoding='utf-8') as archivo:
+            lector = csv.reader(archivo)
+            next(lector, None)
+            primera = next(lector, None)
+        primero = int(primera[0]) if primera and primera[0].isdigit() else 0
+        rango = (primero, ultimo_id(self._ruta(nombre)))
+        self._rangos[nombre] = (firma, rango)
+        return rango
+
+    def _siguiente_id(self) -> int:
+        maximo = max((self._rango_ids(nombre)[1] for nombre in self.segmentos()), default=0)
+        return max(maximo, leer_id_maximo(self.archivo_ids)) + 1
+
+    def _anexar(self, nombre: str, gastos: List[Gasto], sincronizar: bool) -> None:
+        """
+        Anexa gastos con id a un segmento (creándolo si no existe) y los
+        incorpora a su tabla en memoria. Debe llamarse con el bloqueo
+        exclusivo tomado.
+        """
+        ruta = self._ruta(nombre)
+        firma = self._firma(nombre)
+        nuevo = firma is None
+        guardada = self._tablas.get(nombre)
+        try:
+            with open(ruta, 'a', newline='', encoding='utf-8',
+                      buffering=TAMANO_BUFFER_LOTE) as archivo:
+                escritor = csv.writer(archivo)
+                if nuevo:
+                    escritor.writerow(COLUMNAS)
+                for gasto in gastos:
+                    escritor.writerow(gasto.a_diccionario().values())
+                if sincronizar:
+                    archivo.flush()
+                    os.fsync(archivo.fileno())
+        except Exception:
+            self._tablas.pop(nombre, None)
+            raise
+
+        if guardada is not None and guardada[0] == firma:
+            tabla = guardada[1]
+            for gasto in gastos:
+                tabla.agregar(gasto.id, gasto.fecha, gasto.categoria, gasto.descripcion,
+                              a_centavos(gasto.monto))
+            self._tablas[nombre] = (self._firma(nombre), tabla)
+        else:
+            self._tablas.pop(nombre, None)
+
+    def agregar(self, gasto: Gasto) -> Gasto:
+        with self._bloqueo.exclusivo():
+            gasto = gasto._replace(id=self._siguiente_id())
+            self._anexar(segmento_de(gasto.fecha), [gasto], sincronizar=False)
+            return gasto
+
+    def agregar_lote(self, gastos: Iterable[Gasto], conservar_ids: bool = False) -> int:
+        """
+        Persiste un lote repartiendo los gastos entre sus segmentos, con una
+        sincronización por segmento al final.
+
+        Args:
+            gastos: Gastos validados
+            conservar_ids: Escribir los ids que traen los gastos (al
+                particionar un ledger existente) en lugar de asignar nuevos
+        """
+        guardados = 0
+        with self._bloqueo.exclusivo():
+            siguiente_id = self._siguiente_id()
+            pendientes: Dict[str, List[Gasto]] = {}
+            tocados = set()
+            for gasto in gastos:
+                if not conservar_ids:
+                    gasto = gasto._replace(id=siguiente_id)
+                    siguiente_id += 1
+                elif not isinstance(gasto, Gasto):
+                    gasto = Gasto(gasto.id, gasto.fecha, gasto.categoria, gasto.descripcion,
+                                  gasto.monto)
+                nombre = segmento_de(gasto.fecha)
+                grupo = pendientes.setdefault(nombre, [])
+                grupo.append(gasto)
+                guardados += 1
+                if len(grupo) >= FILAS_POR_ESCRITURA:
+                    self._anexar(nombre, grupo, sincronizar=False)
+                    tocados.add(nombre)
+                    pendientes[nombre] = []
+            for nombre, grupo in pendientes.items():
+                if grupo:
+                    self._anexar(nombre, grupo, sincronizar=False)
+                    tocados.add(nombre)
+            for nombre in tocados:
+                with open(self._ruta(nombre), 'a', encoding='utf-8') as archivo:
+                    os.fsync(archivo.fileno())
+        return guardados
+
+    def eliminar(self, id_gasto: int) -> Optional[Gasto]:
+        with self._bloqueo.exclusivo():
+            for nombre in self.segmentos():
+                primero, ultimo = self._rango_ids(nombre)
+                if not primero <= id_gasto <= ultimo:
+                    continue
+                tabla = self._tabla(nombre)
+                indice = tabla.posicion(id_gasto)
+                if indice is None:
+                    continue
+                with open(self._ruta(nombre) + ".borrados", 'a', encoding='utf-8') as archivo:
+                    archivo.write(f"{id_gasto}\n")
+                fila = tabla.fila(indice)
+                eliminado = Gasto(fila.id, fila.fecha, fila.categoria, fila.descripcion,
+                                  fila.monto)
+                tabla.eliminar(indice)
+                self._tablas[nombre] = (self._firma(nombre), tabla)
+                if len(tabla.ids) - len(tabla) >= self.umbral_compactacion:
+                    self._compactar_segmento(nombre)
+                return eliminado
+        return None
+
+    def _compactar_segmento(self, nombre: str) -> None:
+        """
+        Reescribe un segmento sin sus filas eliminadas (o lo borra si quedó
+        vacío). Debe llamarse con el bloqueo exclusivo tomado.
+        """
+        ruta = self._ruta(nombre)
+        # Antes de quitar filas (o el segmento entero) se guarda el mayor id
+        guardar_id_maximo(self.archivo_ids, self._siguiente_id() - 1)
+        tabla = self._tabla(nombre).compactada()
+        self._tablas.pop(nombre, None)
+        if not len(tabla):
+            for archivo in (ruta, ruta + ".instantanea"):
+                if os.path.exists(archivo):
+                    os.remove(archivo)
+        else:
+            temporal = ruta + ".tmp"
+            with open(temporal, 'w', newline='', encoding='utf-8',
+                      buffering=TAMANO_BUFFER_LOTE) as archivo:
+                escritor = csv.writer(archivo)
+                escritor.writerow(COLUMNAS)
+                for fila in tabla.iterar():
+                    escritor.writerow(fila.a_diccionario().values())
+                archivo.flush()
+                os.fsync(archivo.fileno())
+            os.replace(temporal, ruta)
+            if conviene_guardar(len(tabla.ids), len(tabla.ids)):
+                guardar_instantanea(ruta + ".instantanea", tabla, ruta, os.path.getsize(ruta))
+        if os.path.exists(ruta + ".borrados"):
+            os.remove(ruta + ".borrados")
+        if len(tabla):
+            self._tablas[nombre] = (self._firma(nombre), tabla)
+
+    def compactar(self) -> None:
+        with self._bloqueo.exclusivo():
+            for nombre in self.segmentos():
+                if os.path.exists(self._ruta(nombre) + ".borrados"):
+                    self._compactar_segmento(nombre)
+
+    def invalidar_cache(self) -> None:
+        self._tablas = {}
+        self._rangos = {}
+        self._parciales = OrderedDict()
+
+    def memoria_en_uso(self) -> int:
+        return sum(tabla.memoria() for _, tabla in self._tablas.values())
+
+    def cerrar(self) -> None:
+        if self._ejecutor is not None:
+            self._ejecutor.shutdown()
+            self._ejecutor = None
+
+    def _filtros(self, desde: Optional[str], hasta: Optional[str]) -> Optional[Filtros]:
+        """
+        Convierte los filtros de fecha a segundos epoch y meses.
+
+        Returns:
+            Los filtros convertidos, o None si no tienen un formato
+            reconocible (en ese caso se usa el recorrido genérico)
+        """
+        try:
+            inicio, fin = limites_fecha(desde, hasta)
+        except ValueError:
+            return None
+        return (fecha_a_epoch(inicio) if inicio is not None else None,
+                fecha_a_epoch(fin) if fin is not None else None,
+                inicio[:7] if inicio is not None else None,
+                fin[:7] if fin is not None else None)
+
+    def _segmentos_en(self, filtros: Filtros) -> List[str]:
+        """
+        Segmentos que pueden tener gastos en el rango de fechas.
+        """
+        _, _, primer_mes, ultimo_mes = filtros
+        if primer_mes is None and ultimo_mes is None:
+            return self.segmentos()
+        # Las fechas inválidas quedan fuera de cualquier rango
+        return [nombre for nombre in self.segmentos()
+                if nombre != SEGMENTO_SIN_FECHA
+                and (primer_mes is None or nombre >= primer_mes)
+                and (ultimo_mes is None or nombre <= ultimo_mes)]
+
+    def _ejecutor_activo(self) -> ProcessPoolExecutor:
+        if self._ejecutor is None:
+            # "spawn": un proceso nuevo no hereda bloqueos tomados por otros
+            # hilos (la interfaz consulta desde un hilo de fondo)
+            self._ejecutor = ProcessPoolExecutor(
+                max_workers=self.procesos, mp_context=multiprocessing.get_context("spawn"))
+        return self._ejecutor
+
+    def acumular(self, agrupar: str, desde: Optional[str] = None, hasta: Optional[str] = None,
+                 categoria: Optional[str] = None) -> Optional[Dict[str, Acumulado]]:
+        """
+        Calcula en paralelo [cantidad, total, mínimo, máximo] por grupo.
+
+        Cada segmento pendiente es una tarea del grupo de procesos; los
+        acumulados de los segmentos sin cambios desde la consulta anterior
+        con los mismos filtros se reutilizan.
+
+        Args:
+            agrupar: "categoria", "segmento" o "semana" (ver ``acumular_tabla``)
+
+        Returns:
+            Acumulados combinados por grupo, o None si los filtros de fecha
+            no tienen un formato reconocible
+        """
+        filtros = self._filtros(desde, hasta)
+        if filtros is None:
+            return None
+        inicio, fin = filtros[:2]
+        combinados: Dict[str, Acumulado] = {}
+        # El bloqueo compartido deja a los procesos leer sin escrituras de por medio
+        with self._bloqueo.compartido():
+            pendientes = []
+            for nombre in self._segmentos_en(filtros):
+                clave = (nombre, inicio, fin, categoria, agrupar)
+                firma = self._firma(nombre)
+                guardado = self._parciales.get(clave)
+                if guardado is not None and guardado[0] == firma:
+                    self._parciales.move_to_end(clave)
+                    for grupo, acumulado in guardado[1].items():
+                        sumar_acumulado(combinados, grupo, acumulado)
+                else:
+                    pendientes.append((clave, firma))
+
+            tareas = [(self.directorio, clave[0], inicio, fin, categoria, agrupar)
+                      for clave, _ in pendientes]
+            if self.procesos > 1 and len(tareas) > 1:
+                parciales = self._ejecutor_activo().map(acumular_segmento, *zip(*tareas))
+            else:
+                parciales = (acumular_segmento(*tarea) for tarea in tareas)
+
+            for (clave, firma), parcial in zip(pendientes, parciales):
+                self._parciales[clave] = (firma, parcial)
+                if len(self._parciales) > PARCIALES_EN_CACHE:
+                    self._parciales.popitem(last=False)
+                for grupo, acumulado in parcial.items():
+                    sumar_acumulado(combinados, grupo, acumulado)
+        return combinados
+
+    def _ordenar_por_id(self, nombres: List[str]) -> Tuple[List[str], bool]:
+        """
+        Ordena los segmentos por su primer id.
+
+        Returns:
+            Tupla (nombres ordenados, True si sus rangos de ids no se
+            superponen: recorrerlos en ese orden ya es el orden de registro)
+        """
+        rangos = sorted((self._rango_ids(nombre), nombre) for nombre in nombres)
+        anterior = 0
+        disjuntos = True
+        for (primero, ultimo), _ in rangos:
+            if not ultimo:  # Segmento sin filas
+                continue
+            if primero <= anterior:
+                disjuntos = False
+            anterior = max(anterior, ultimo)
+        return [nombre for _, nombre in rangos], disjuntos
+
+    def iterar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+               categoria: Optional[str] = None) -> Iterator[Gasto]:
+        filtros = self._filtros(desde, hasta)
+        if filtros is None:
+            nombres, disjuntos = self._ordenar_por_id(self.segmentos())
+            recorridos = [(fila for fila in self._tabla(nombre).iterar()
+                           if coincide_filtro(fila, desde, hasta, categoria))
+                          for nombre in nombres]
+            if disjuntos:
+                return (fila for recorrido in recorridos for fila in recorrido)
+            return heapq.merge(*recorridos, key=attrgetter('id'))
+        return self._recorrer(self._segmentos_en(filtros), filtros, categoria)
+
+    def _recorrer(self, nombres: List[str], filtros: Filtros, categoria: Optional[str],
+                  saltear: int = 0) -> Iterator[Gasto]:
+        """
+        Recorre en orden de registro las filas que cumplen los filtros en los
+        segmentos indicados, salteando las ``saltear`` primeras.
+
+        Un mes recibe gastos con fecha pasada después de que empezó el
+        siguiente, así que los rangos de ids de los segmentos pueden
+        superponerse: en ese caso los segmentos se intercalan por id.
+        """
+        inicio, fin = filtros[:2]
+        nombres, disjuntos = self._ordenar_por_id(nombres)
+        seleccion = []
+        for nombre in nombres:
+            tabla = self._tabla(nombre)
+            if categoria is None:
+                indices = tabla.indices_filtrados(inicio, fin)
+            elif categoria in tabla.codigos_categoria:
+                indices = tabla.indices_filtrados(inicio, fin, tabla.codigos_categoria[categoria])
+            else:
+                continue
+            seleccion.append((tabla, indices))
+
+        if not disjuntos:
+            # Se intercalan (id, segmento, índice): la fila se arma solo si se usa
+            intercalados = heapq.merge(*(
+                zip(map(tabla.ids.__getitem__, indices), repeat(n), indices)
+                for n, (tabla, indices) in enumerate(seleccion)))
+            for _, n, indice in islice(intercalados, saltear, None):
+                yield seleccion[n][0].fila(indice)
+            return
+
+        for tabla, indices in seleccion:
+            if saltear >= len(indices):
+                saltear -= len(indices)
+                continue
+            for indice in indices[saltear:]:
+                yield tabla.fila(indice)
+            saltear = 0
+
+    def pagina(self, inicio: int, cantidad: int, desde: Optional[str] = None,
+               hasta: Optional[str] = None, categoria: Optional[str] = None) -> List[Gasto]:
+        filtros = self._filtros(desde, hasta)
+        por_segmento = self.acumular("segmento", desde, hasta, categoria)
+        if filtros is None or por_segmento is None:
+            return super().pagina(inicio, cantidad, desde, hasta, categoria)
+
+        inicio = max(inicio, 0)
+        nombres, disjuntos = self._ordenar_por_id(
+            [nombre for nombre in self._segmentos_en(filtros) if por_segmento.get(nombre)])
+        if disjuntos:
+            # Los conteos por segmento evitan leer los segmentos anteriores a la página
+            while nombres and inicio >= por_segmento[nombres[0]][0]:
+                inicio -= por_segmento[nombres.pop(0)][0]
+        return list(islice(self._recorrer(nombres, filtros, categoria, inicio),
+                           max(cantidad, 0)))
+
+    def extraer_columnas(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                         categoria: Optional[str] = None) -> ColumnasGastos:
+        filtros = self._filtros(desde, hasta)
+        if filtros is None:
+            return super().extraer_columnas(desde, hasta, categoria)
+        inicio, fin = filtros[:2]
+        fechas, centavos, categorias = array('q'), array('q'), array('I')
+        codigos: Dict[str, int] = {}
+        for nombre in self._segmentos_en(filtros):
+            tabla = self._tabla(nombre)
+            if categoria is None:
+                indices = tabla.indices_filtrados(inicio, fin)
+            elif categoria in tabla.codigos_categoria:
+                indices = tabla.indices_filtrados(inicio, fin, tabla.codigos_categoria[categoria])
+            else:
+                continue
+            parcial = tabla.columnas(indices)
+            # Cada segmento numera sus categorías: se traducen a una numeración común
+            traduccion = [codigos.setdefault(nombre_categoria, len(codigos))
+                          for nombre_categoria in parcial.nombres_categoria]
+            fechas.extend(parcial.fechas)
+            centavos.extend(parcial.centavos)
+            categorias.extend(map(traduccion.__getitem__, parcial.categorias))
+        return ColumnasGastos(fechas, centavos, categorias, list(codigos))
+
+    def obtener(self, ids: Sequence[int]) -> List[Gasto]:
+        rangos = [(nombre, *self._rango_ids(nombre)) for nombre in self.segmentos()]
+        encontrados = {}
+        for id_gasto in ids:
+            for nombre, primero, ultimo in rangos:
+                if primero <= id_gasto <= ultimo:
+                    tabla = self._tabla(nombre)
+                    indice = tabla.posicion(id_gasto)
+                    if indice is not None:
+                        encontrados[id_gasto] = tabla.fila(indice)
+                        break
+        return [encontrados[id_gasto] for id_gasto in ids if id_gasto in encontrados]
+
+    def contar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+               categoria: Optional[str] = None) -> int:
+        por_segmento = self.acumular("segmento", desde, hasta, categoria)
+        if por_segmento is None:
+            return super().contar(desde, hasta, categoria)
+        return sum(acumulado[0] for acumulado in por_segmento.values())
+
+    def total_centavos(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                       categoria: Optional[str] = None) -> int:
+        return self.estadisticas(desde, hasta, categoria)[1]
+
+    def totales_por_categoria(self, desde: Optional[str] = None,
+                              hasta: Optional[str] = None) -> Dict[str, int]:
+        por_categoria = self.acumular("categoria", desde, hasta)
+        if por_categoria is None:
+            return super().totales_por_categoria(desde, hasta)
+        return {categoria: acumulado[1] for categoria, acumulado in por_categoria.items()}
+
+    def totales_por_periodo(self, periodo: str, desde: Optional[str] = None,
+                            hasta: Optional[str] = None,
+                            categoria: Optional[str] = None) -> Dict[str, int]:
+        # Con segmentos mensuales, el total de un mes es el de su segmento
+        agrupados = self.acumular("segmento" if periodo == "mes" else "semana",
+                                  desde, hasta, categoria)
+        if agrupados is None:
+            return super().totales_por_periodo(periodo, desde, hasta, categoria)
+        return {SIN_FECHA if clave == SEGMENTO_SIN_FECHA else clave: acumulado[1]
+                for clave, acumulado in agrupados.items()}
+
+    def estadisticas(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                     categoria: Optional[str] = None) -> Tuple[int, int, int, int]:
+        por_categoria = self.acumular("categoria", desde, hasta, categoria)
+        if por_categoria is None:
+            return super().estadisticas(desde, hasta, categoria)
+        combinado: Dict[str, Acumulado] = {}
+        for acumulado in por_categoria.values():
+            sumar_acumulado(combinado, 'total', acumulado)
+        cantidad, total, minimo, maximo = combinado.get('total', (0, 0, 0, 0))
+        return cantidad, total, minimo, maximo
@@ -0,0 +1,195 @@
+"""
+Motor de almacenamiento en SQLite
+Guarda los gastos en una tabla indexada por fecha y categoría y delega
+sumas, agrupaciones y mínimos/máximos al propio motor de base de datos
+"""
+
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from almacenamiento import AlmacenamientoBase, Gasto, a_centavos, clave_periodo, limites_fecha
+
+# Cantidad de filas que se piden al cursor en cada lectura
+TAMANO_BLOQUE_LECTURA = 1000
+
+
+class AlmacenamientoSQLite(AlmacenamientoBase):
+    """
+    Almacenamiento en una base de datos SQLite.
+
+    Los montos se guardan como centavos enteros. Los índices sobre
+    ``fecha`` y ``(categoria, monto_centavos)`` permiten que los totales
+    por categoría se resuelvan sin recorrer la tabla.
+    """
+
+    def __init__(self, archivo_db: str):
+        """
+        Abre (o crea) la base de datos y su esquema.
+
+        Args:
+            archivo_db: Ruta del archivo SQLite
+        """
+        self.archivo_db = archivo_db
+        try:
+            self._conexion = sqlite3.connect(archivo_db, check_same_thread=False)
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.executescript("""
+                CREATE TABLE IF NOT EXISTS gastos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fecha TEXT NOT NULL,
+                    categoria TEXT NOT NULL,
+                    descripcion TEXT NOT NULL,
+                    monto_centavos INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_gastos_fecha ON gastos (fecha);
+                CREATE INDEX IF NOT EXISTS idx_gastos_categoria
+                    ON gastos (categoria, monto_centavos);
+            """)
+        except sqlite3.Error as e:
+            raise Exception(f"Error al abrir la base de datos: {str(e)}")
+
+    @staticmethod
+    def _a_gasto(fila: tuple) -> Gasto:
+        """
+        Convierte una fila de la tabla en un gasto tipado.
+        """
+        id_gasto, fecha, categoria, descripcion, centavos = fila
+        return Gasto(id_gasto, fecha, categoria, descripcion, centavos / 100)
+
+    def agregar(self, gasto: Gasto) -> Gasto:
+        with self._conexion:
+            cursor = self._conexion.execute(
+                "INSERT INTO gastos (fecha, categoria, descripcion, monto_centavos) "
+                "VALUES (?, ?, ?, ?)",
+                (gasto.fecha, gasto.categoria, gasto.descripcion, a_centavos(gasto.monto)))
+        return gasto._replace(id=cursor.lastrowid)
+
+    def agregar_lote(self, gastos: Iterable[Gasto]) -> int:
+        # Una sola transacción: un único commit (y fsync) para todo el lote
+        with self._conexion:
+            cursor = self._conexion.executemany(
+                "INSERT INTO gastos (fecha, categoria, descripcion, monto_centavos) "
+                "VALUES (?, ?, ?, ?)",
+                ((g.fecha, g.categoria, g.descripcion, a_centavos(g.monto)) for g in gastos))
+        return cursor.rowcount
+
+    def eliminar(self, id_gasto: int) -> Optional[Gasto]:
+        with self._conexion:
+            fila = self._conexion.execute(
+                "SELECT id, fecha, categoria, descripcion, monto_centavos "
+                "FROM gastos WHERE id = ?", (id_gasto,)).fetchone()
+            if fila is None:
+                return None
+            self._conexion.execute("DELETE FROM gastos WHERE id = ?", (id_gasto,))
+        return self._a_gasto(fila)
+
+    def compactar(self) -> None:
+        self._conexion.execute("VACUUM")
+
+    def cerrar(self) -> None:
+        self._conexion.close()
+
+    @staticmethod
+    def _donde(desde: Optional[str], hasta: Optional[str],
+               categoria: Optional[str]) -> Tuple[str, list]:
+        """
+        Construye la cláusula WHERE de los filtros opcionales.
+
+        Returns:
+            Tupla (cláusula, con espacio inicial o vacía; parámetros)
+        """
+        condiciones, parametros = [], []
+        try:
+            # Límites completos [inicio, fin): comparaciones que usan el índice de fecha
+            inicio, fin = limites_fecha(desde, hasta)
+        except ValueError:
+            inicio, fin = desde, None
+            if hasta is not None:
+                # "hasta" es inclusivo en su propia precisión (día completo, etc.)
+                condiciones.append("substr(fecha, 1, ?) <= ?")
+                parametros.extend((len(hasta), hasta))
+        if inicio is not None:
+            condiciones.append("fecha >= ?")
+            parametros.append(inicio)
+        if fin is not None:
+            condiciones.append("fecha < ?")
+            parametros.append(fin)
+        if categoria is not None:
+            condiciones.append("categoria = ?")
+            parametros.append(categoria)
+        return (f" WHERE {' AND '.join(condiciones)}" if condiciones else ""), parametros
+
+    def iterar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+               categoria: Optional[str] = None) -> Iterator[Gasto]:
+        donde, parametros = self._donde(desde, hasta, categoria)
+        cursor = self._conexion.execute(
+            "SELECT id, fecha, categoria, descripcion, monto_centavos FROM gastos"
+            f"{donde} ORDER BY id", parametros)
+        while True:
+            filas = cursor.fetchmany(TAMANO_BLOQUE_LECTURA)
+            if not filas:
+                break
+            for fila in filas:
+                yield self._a_gasto(fila)
+
+    def pagina(self, inicio: int, cantidad: int, desde: Optional[str] = None,
+               hasta: Optional[str] = None, categoria: Optional[str] = None) -> List[Gasto]:
+        donde, parametros = self._donde(desde, hasta, categoria)
+        filas = self._conexion.execute(
+            "SELECT id, fecha, categoria, descripcion, monto_centavos FROM gastos"
+            f"{donde} ORDER BY id LIMIT ? OFFSET ?",
+            parametros + [max(cantidad, 0), max(inicio, 0)])
+        return [self._a_gasto(fila) for fila in filas]
+
+    def obtener(self, ids: Sequence[int]) -> List[Gasto]:
+        encontrados = {}
+        # En tandas para no superar el límite de parámetros de SQLite
+        for inicio in range(0, len(ids), TAMANO_BLOQUE_LECTURA):
+            tanda = list(ids[inicio:inicio + TAMANO_BLOQUE_LECTURA])
+            for fila in self._conexion.execute(
+                    "SELECT id, fecha, categoria, descripcion, monto_centavos FROM gastos "
+                    f"WHERE id IN ({', '.join('?' * len(tanda))})", tanda):
+                encontrados[fila[0]] = self._a_gasto(fila)
+        return [encontrados[id_gasto] for id_gasto in ids if id_gasto in encontrados]
+
+    def contar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+               categoria: Optional[str] = None) -> int:
+        donde, parametros = self._donde(desde, hasta, categoria)
+        return self._conexion.execute(
+            f"SELECT COUNT(*) FROM gastos{donde}", parametros).fetchone()[0]
+
+    def total_centavos(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                       categoria: Optional[str] = None) -> int:
+        donde, parametros = self._donde(desde, hasta, categoria)
+        return self._conexion.execute(
+            f"SELECT COALESCE(SUM(monto_centavos), 0) FROM gastos{donde}",
+            parametros).fetchone()[0]
+
+    def totales_por_categoria(self, desde: Optional[str] = None,
+                              hasta: Optional[str] = None) -> Dict[str, int]:
+        donde, parametros = self._donde(desde, hasta, None)
+        return dict(self._conexion.execute(
+            f"SELECT categoria, SUM(monto_centavos) FROM gastos{donde} GROUP BY categoria",
+            parametros))
+
+    def totales_por_periodo(self, periodo: str, desde: Optional[str] = None,
+                            hasta: Optional[str] = None,
+                            categoria: Optional[str] = None) -> Dict[str, int]:
+        donde, parametros = self._donde(desde, hasta, categoria)
+        # SQLite agrupa por día; los días se pliegan en meses o semanas ISO
+        totales = {}
+        for dia, centavos in self._conexion.execute(
+                f"SELECT substr(fecha, 1, 10), SUM(monto_centavos) FROM gastos{donde} "
+                "GROUP BY substr(fecha, 1, 10)", parametros):
+            clave = clave_periodo(dia, periodo)
+            totales[clave] = totales.get(clave, 0) + centavos
+        return totales
+
+    def estadisticas(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                     categoria: Optional[str] = None) -> Tuple[int, int, int, int]:
+        donde, parametros = self._donde(desde, hasta, categoria)
+        cantidad, total, minimo, maximo = self._conexion.execute(
+            "SELECT COUNT(*), COALESCE(SUM(monto_centavos), 0), "
+            "COALESCE(MIN(monto_centavos), 0), COALESCE(MAX(monto_centavos), 0) "
+            f"FROM gastos{donde}", parametros).fetchone()
+        return cantidad, total, minimo, maximo
@@ -0,0 +1,360 @@
+"""
+Interfaz de almacenamiento del Sistema de Control de Gastos
+Define la fila tipada de un gasto y el contrato que cumple cada motor de
+persistencia (CSV, SQLite)
+"""
+
+from array import array
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from tabla_columnar import FECHA_INVALIDA, ColumnasGastos, fecha_a_epoch
+
+# Agrupaciones temporales admitidas por totales_por_periodo
+PERIODOS = ("mes", "semana")
+
+# Fecha completa con la que se rellenan los filtros parciales ("2024", "2024-03")
+_PLANTILLA_FECHA = "0000-01-01 00:00:00"
+
+
+class Gasto(NamedTuple):
+    """
+    Representación tipada de un gasto dentro del ledger en memoria.
+    """
+    id: int
+    fecha: str
+    categoria: str
+    descripcion: str
+    monto: float
+
+    def a_diccionario(self) -> Dict[str, str]:
+        """
+        Convierte el gasto al formato de fila del archivo CSV.
+        """
+        return {
+            'id': str(self.id),
+            'fecha': self.fecha,
+            'categoria': self.categoria,
+            'descripcion': self.descripcion,
+            'monto': f"{self.monto:.2f}"
+        }
+
+
+class AvanceCarga(NamedTuple):
+    """
+    Progreso de una carga del ledger por bloques.
+    """
+    filas: int              # Gastos vivos ya cargados
+    bytes_leidos: int
+    bytes_totales: int
+
+    @property
+    def fraccion(self) -> float:
+        """
+        Parte del ledger ya cargada, entre 0 y 1.
+        """
+        if not self.bytes_totales:
+            return 1.0
+        return min(1.0, self.bytes_leidos / self.bytes_totales)
+
+
+def a_centavos(monto: float) -> int:
+    """
+    Convierte un monto en unidades monetarias a centavos enteros.
+    """
+    return int(round(monto * 100))
+
+
+def coincide_filtro(gasto: Gasto, desde: Optional[str] = None, hasta: Optional[str] = None,
+                    categoria: Optional[str] = None) -> bool:
+    """
+    Indica si un gasto cumple los filtros opcionales de fecha y categoría.
+
+    Args:
+        gasto: Gasto a evaluar
+        desde: Fecha mínima inclusiva ("AAAA-MM-DD" o con hora)
+        hasta: Fecha máxima inclusiva; "AAAA-MM-DD" incluye todo ese día
+        categoria: Categoría exacta
+
+    Returns:
+        True si el gasto cumple todos los filtros indicados
+    """
+    if categoria is not None and gasto.categoria != categoria:
+        return False
+    if desde is not None and gasto.fecha < desde:
+        return False
+    if hasta is not None and gasto.fecha[:len(hasta)] > hasta:
+        return False
+    return True
+
+
+def limites_fecha(desde: Optional[str] = None,
+                  hasta: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Convierte los filtros de fecha en un intervalo semiabierto [inicio, fin)
+    de fechas completas "AAAA-MM-DD HH:MM:SS".
+
+    Los filtros pueden tener cualquier precisión ("2024", "2024-03",
+    "2024-03-15", con hora...); ``hasta`` incluye todo su período, igual
+    que en ``coincide_filtro``.
+
+    Returns:
+        Tupla (inicio inclusivo o None, fin exclusivo o None)
+
+    Raises:
+        ValueError: Si algún filtro no es una fecha reconocible
+    """
+    def completar(texto: str) -> datetime:
+        if not 4 <= len(texto) <= len(_PLANTILLA_FECHA):
+            raise ValueError(f"Fecha inválida: {texto!r}")
+        return datetime.strptime(texto + _PLANTILLA_FECHA[len(texto):], "%Y-%m-%d %H:%M:%S")
+
+    inicio = fin = None
+    if desde is not None:
+        inicio = completar(desde).strftime("%Y-%m-%d %H:%M:%S")
+    if hasta is not None:
+        base = completar(hasta)
+        # El fin exclusivo es el comienzo del período siguiente al de "hasta"
+        if len(hasta) < 7:
+            siguiente = base.replace(year=base.year + 1)
+        elif len(hasta) < 10:
+            siguiente = (base.replace(day=28) + timedelta(days=4)).replace(day=1)
+        elif len(hasta) < 13:
+            siguiente = base + timedelta(days=1)
+        elif len(hasta) < 16:
+            siguiente = base + timedelta(hours=1)
+        elif len(hasta) < 19:
+            siguiente = base + timedelta(minutes=1)
+        else:
+            siguiente = base + timedelta(seconds=1)
+        fin = siguiente.strftime("%Y-%m-%d %H:%M:%S")
+    return inicio, fin
+
+
+def clave_periodo(fecha: str, periodo: str) -> str:
+    """
+    Retorna la clave del período al que pertenece una fecha.
+
+    Args:
+        fecha: Fecha "AAAA-MM-DD[ HH:MM:SS]"
+        periodo: "mes" (clave "AAAA-MM") o "semana" (semana ISO "AAAA-Wss")
+
+    Returns:
+        Clave del período, o "Sin fecha" si la fecha no es válida
+    """
+    try:
+        dia = datetime.strptime(fecha[:10], "%Y-%m-%d")
+    except ValueError:
+        return "Sin fecha"
+    if periodo == "mes":
+        return fecha[:7]
+    anio, semana, _ = dia.isocalendar()
+    return f"{anio}-W{semana:02d}"
+
+
+class AlmacenamientoBase:
+    """
+    Contrato común de los motores de almacenamiento.
+
+    Los motores trabajan con gastos ya validados y lanzan excepciones ante
+    errores de E/S; ``GestorGastos`` se encarga de validar y de traducir
+    los errores a mensajes. Los métodos de consulta y agregación aceptan
+    los filtros opcionales de ``coincide_filtro`` y tienen una
+    implementación genérica por recorrido que cada motor puede reemplazar
+    usando sus índices. Los montos agregados se expresan en centavos enteros.
+    """
+
+    # Indica si las consultas sin filtros se responden en O(1) con agregados
+    # incrementales mantenidos en memoria, sin recorrer los gastos
+    agregados_en_memoria = False
+
+    def agregar(self, gasto: Gasto) -> Gasto:
+        """
+        Persiste un gasto validado y le asigna su id.
+
+        Returns:
+            El gasto con su id definitivo
+        """
+        raise NotImplementedError
+
+    def agregar_lote(self, gastos: Iterable[Gasto]) -> int:
+        """
+        Persiste un lote de gastos validados con una sola sincronización.
+
+        Returns:
+            Cantidad de gastos guardados
+        """
+        guardados = 0
+        for gasto in gastos:
+            self.agregar(gasto)
+            guardados += 1
+        return guardados
+
+    def eliminar(self, id_gasto: int) -> Optional[Gasto]:
+        """
+        Elimina un gasto por su id.
+
+        Returns:
+            El gasto eliminado o None si no existía
+        """
+        raise NotImplementedError
+
+    def compactar(self) -> None:
+        """
+        Recupera el espacio ocupado por los gastos eliminados.
+        """
+
+    def invalidar_cache(self) -> None:
+        """
+        Descarta cualquier estado en memoria derivado del almacenamiento.
+        """
+
+    def sincronizar(self) -> None:
+        """
+        Lleva a disco las escrituras que el motor tenga pendientes.
+        """
+
+    def cerrar(self) -> None:
+        """
+        Libera los recursos abiertos por el motor.
+        """
+
+    def esperar_confirmacion(self) -> None:
+        """
+        Espera a que las altas registradas hasta ahora estén en disco. Solo
+        hace falta con la confirmación diferida del modo durable; los demás
+        casos ya confirman cada alta antes de retornar.
+        """
+
+    def memoria_en_uso(self) -> int:
+        """
+        Estimación en bytes de los gastos que el motor mantiene en memoria
+        (``invalidar_cache`` la libera). Los motores sin caché retornan 0.
+        """
+        return 0
+
+    def cargar_por_bloques(self) -> Iterator[AvanceCarga]:
+        """
+        Prepara el ledger para las consultas en pasos cortos, entregando el
+        progreso tras cada uno; entre pasos se pueden hacer otras llamadas
+        (ver ``pagina_cargada``). Los motores sin carga previa lo hacen en
+        un solo paso.
+        """
+        yield AvanceCarga(self.contar(), 0, 0)
+
+    def pagina_cargada(self, inicio: int, cantidad: int) -> List[Gasto]:
+        """
+        Como ``pagina`` sin filtros, pero durante una carga por bloques
+        responde solo con los gastos ya cargados, sin esperar al resto.
+        """
+        return self.pagina(inicio, cantidad)
+
+    def iterar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+               categoria: Optional[str] = None) -> Iterator[Gasto]:
+        """
+        Recorre los gastos vivos en orden de registro, con filtros opcionales
+        (ver ``coincide_filtro``).
+        """
+        raise NotImplementedError
+
+    def recorrer(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                 categoria: Optional[str] = None) -> Iterator[Gasto]:
+        """
+        Como ``iterar``, para una sola pasada: no carga en memoria un ledger
+        que todavía no lo está.
+        """
+        return self.iterar(desde, hasta, categoria)
+
+    def obtener(self, ids: Sequence[int]) -> List[Gasto]:
+        """
+        Retorna los gastos vivos con los ids indicados, en el mismo orden
+        (los ids que no existen se omiten).
+        """
+        buscados = set(ids)
+        encontrados = {gasto.id: gasto for gasto in self.iterar() if gasto.id in buscados}
+        return [encontrados[id_gasto] for id_gasto in ids if id_gasto in encontrados]
+
+    def extraer_columnas(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                         categoria: Optional[str] = None) -> ColumnasGastos:
+        """
+        Retorna las columnas numéricas (fecha epoch, centavos, código de
+        categoría) de los gastos que cumplen los filtros.
+        """
+        fechas, centavos, categorias = array('q'), array('q'), array('I')
+        codigos: Dict[str, int] = {}
+        for gasto in self.iterar(desde, hasta, categoria):
+            try:
+                fechas.append(fecha_a_epoch(gasto.fecha))
+            except ValueError:
+                fechas.append(FECHA_INVALIDA)
+            centavos.append(a_centavos(gasto.monto))
+            categorias.append(codigos.setdefault(gasto.categoria, len(codigos)))
+        return ColumnasGastos(fechas, centavos, categorias, list(codigos))
+
+    def contar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+               categoria: Optional[str] = None) -> int:
+        """
+        Retorna la cantidad de gastos vivos que cumplen los filtros.
+        """
+        return sum(1 for _ in self.iterar(desde, hasta, categoria))
+
+    def pagina(self, inicio: int, cantidad: int, desde: Optional[str] = None,
+               hasta: Optional[str] = None, categoria: Optional[str] = None) -> List[Gasto]:
+        """
+        Retorna los gastos vivos que cumplen los filtros en las posiciones
+        [inicio, inicio + cantidad) según el orden de registro.
+        """
+        return list(islice(self.iterar(desde, hasta, categoria),
+                           max(inicio, 0), max(inicio, 0) + max(cantidad, 0)))
+
+    def total_centavos(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                       categoria: Optional[str] = None) -> int:
+        """
+        Retorna la suma de los montos en centavos.
+        """
+        return sum(a_centavos(gasto.monto) for gasto in self.iterar(desde, hasta, categoria))
+
+    def totales_por_categoria(self, desde: Optional[str] = None,
+                              hasta: Optional[str] = None) -> Dict[str, int]:
+        """
+        Retorna la suma de montos en centavos agrupada por categoría.
+        """
+        totales = {}
+        for gasto in self.iterar(desde, hasta):
+            totales[gasto.categoria] = totales.get(gasto.categoria, 0) + a_centavos(gasto.monto)
+        return totales
+
+    def totales_por_periodo(self, periodo: str, desde: Optional[str] = None,
+                            hasta: Optional[str] = None,
+                            categoria: Optional[str] = None) -> Dict[str, int]:
+        """
+        Retorna la suma de montos en centavos agrupada por mes o semana
+        (ver ``clave_periodo``).
+        """
+        totales = {}
+        for gasto in self.iterar(desde, hasta, categoria):
+            clave = clave_periodo(gasto.fecha, periodo)
+            totales[clave] = totales.get(clave, 0) + a_centavos(gasto.monto)
+        return totales
+
+    def estadisticas(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                     categoria: Optional[str] = None) -> Tuple[int, int, int, int]:
+        """
+        Calcula cantidad, total, mínimo y máximo en una sola pasada.
+
+        Returns:
+            Tupla (cantidad, total, mínimo, máximo) con montos en centavos;
+            mínimo y máximo valen 0 si no hay gastos
+        """
+        cantidad = total = 0
+        minimo = maximo = None
+        for gasto in self.iterar(desde, hasta, categoria):
+            centavos = a_centavos(gasto.monto)
+            cantidad += 1
+            total += centavos
+            if minimo is None or centavos < minimo:
+                minimo = centavos
+            if maximo is None or centavos > maximo:
+                maximo = centavos
+        return cantidad, total, minimo or 0, maximo or 0
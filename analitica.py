@@ -0,0 +1,310 @@
+"""
+Análisis estadístico de los gastos
+Reportes de percentiles, mediana, tablas por categoría y mes, gasto móvil
+de 30 días y distribución por día de la semana calculados sobre las
+columnas del ledger. Con NumPy se usan operaciones vectorizadas y
+agrupadas (bincount, sort, cumsum); sin NumPy, recorridos en Python
+con los mismos resultados
+"""
+
+from collections import defaultdict
+from math import floor
+from typing import Dict, List, Optional, Sequence
+
+from resumenes import SIN_FECHA
+from tabla_columnar import FECHA_INVALIDA, ColumnasGastos, epoch_a_fecha
+
+try:
+    import numpy as np
+except ImportError:  # Sin NumPy: implementaciones en Python puro
+    np = None
+
+NUMPY_DISPONIBLE = np is not None
+
+# Percentiles del reporte por defecto
+CUANTILES = (5, 25, 50, 75, 90, 95, 99)
+
+# Días de la ventana del gasto móvil
+DIAS_VENTANA = 30
+
+DIAS_SEMANA = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+
+_SEGUNDOS_DIA = 86400
+
+# Bits del monto (desplazado al mínimo) al ordenar por (categoría, monto) con una clave
+_BITS_MONTO = 40
+
+
+def _dia(dia: int) -> str:
+    """
+    Convierte días desde 1970 en "AAAA-MM-DD".
+    """
+    return epoch_a_fecha(dia * _SEGUNDOS_DIA)[:10]
+
+
+def _mes(mes: int) -> str:
+    """
+    Convierte meses desde enero de 1970 en "AAAA-MM".
+    """
+    return f"{1970 + mes // 12:04d}-{mes % 12 + 1:02d}"
+
+
+def _percentil_ordenado(valores: Sequence[int], cuantil: float) -> float:
+    """
+    Percentil por interpolación lineal entre los dos valores más cercanos
+    (el método por defecto de ``numpy.percentile``).
+    """
+    posicion = (len(valores) - 1) * cuantil / 100
+    bajo = floor(posicion)
+    alto = min(bajo + 1, len(valores) - 1)
+    return valores[bajo] + (valores[alto] - valores[bajo]) * (posicion - bajo)
+
+
+class AnalisisGastos:
+    """
+    Reportes estadísticos sobre una copia en columnas de los gastos.
+
+    Los montos de los reportes se expresan en unidades monetarias, igual
+    que en ``GestorGastos``. Los gastos con fecha inválida cuentan en los
+    percentiles y en los totales por categoría, aparecen como "Sin fecha"
+    en la tabla por mes y quedan fuera del gasto móvil y de los días de la
+    semana.
+    """
+
+    def __init__(self, columnas: ColumnasGastos, usar_numpy: Optional[bool] = None):
+        """
+        Prepara el análisis de un conjunto de gastos.
+
+        Args:
+            columnas: Columnas de los gastos (ver ``GestorGastos.obtener_columnas``)
+            usar_numpy: Forzar (True) o evitar (False) NumPy; por defecto
+                se usa si está instalado
+
+        Raises:
+            ValueError: Si se pide NumPy y no está instalado
+        """
+        if usar_numpy is None:
+            usar_numpy = NUMPY_DISPONIBLE
+        elif usar_numpy and not NUMPY_DISPONIBLE:
+            raise ValueError("NumPy no está instalado (pip install numpy)")
+        self.usar_numpy = usar_numpy
+        self.nombres_categoria = columnas.nombres_categoria
+
+        if usar_numpy:
+            # Las columnas ya son una copia: se leen sin volver a copiarlas
+            self._fechas = np.frombuffer(columnas.fechas, dtype=np.int64)
+            self._centavos = np.frombuffer(columnas.centavos, dtype=np.int64)
+            self._categorias = np.asarray(columnas.categorias).astype(np.intp)
+            validas = self._fechas != FECHA_INVALIDA
+            self._validas = validas
+            self._dias = self._fechas[validas] // _SEGUNDOS_DIA
+        else:
+            self._fechas = columnas.fechas
+            self._centavos = columnas.centavos
+            self._categorias = columnas.categorias
+
+    @classmethod
+    def desde_gestor(cls, gestor, desde: Optional[str] = None, hasta: Optional[str] = None,
+                     categoria: Optional[str] = None,
+                     usar_numpy: Optional[bool] = None) -> "AnalisisGastos":
+        """
+        Analiza los gastos de un ``GestorGastos`` que cumplen los filtros
+        (ver ``GestorGastos.iterar_gastos``).
+        """
+        return cls(gestor.obtener_columnas(desde, hasta, categoria), usar_numpy)
+
+    @property
+    def cantidad(self) -> int:
+        return len(self._centavos)
+
+    def percentiles(self, cuantiles: Sequence[float] = CUANTILES) -> Dict[float, float]:
+        """
+        Percentiles de los montos.
+
+        Returns:
+            Diccionario cuantil -> monto (0 si no hay gastos)
+        """
+        if not self.cantidad:
+            return {cuantil: 0.0 for cuantil in cuantiles}
+        if self.usar_numpy:
+            valores = np.percentile(self._centavos, cuantiles) / 100
+            return dict(zip(cuantiles, valores.tolist()))
+        ordenados = sorted(self._centavos)
+        return {cuantil: _percentil_ordenado(ordenados, cuantil) / 100 for cuantil in cuantiles}
+
+    def mediana(self) -> float:
+        """
+        Mediana de los montos (0 si no hay gastos).
+        """
+        return self.percentiles((50,))[50]
+
+    def por_categoria(self) -> Dict[str, Dict[str, float]]:
+        """
+        Cantidad, total, promedio, mediana, percentil 90, mínimo y máximo
+        de cada categoría con gastos.
+        """
+        if not self.usar_numpy:
+            grupos: Dict[int, List[int]] = defaultdict(list)
+            for codigo, centavos in zip(self._categorias, self._centavos):
+                grupos[codigo].append(centavos)
+            reporte = {}
+            for codigo in sorted(grupos):
+                valores = sorted(grupos[codigo])
+                total = sum(valores)
+                reporte[self.nombres_categoria[codigo]] = {
+                    'cantidad': len(valores),
+                    'total': total / 100,
+                    'promedio': total / len(valores) / 100,
+                    'mediana': _percentil_ordenado(valores, 50) / 100,
+                    'p90': _percentil_ordenado(valores, 90) / 100,
+                    'minimo': valores[0] / 100,
+                    'maximo': valores[-1] / 100,
+                }
+            return reporte
+
+        if not self.cantidad:
+            return {}
+        grupos = len(self.nombres_categoria)
+        # Montos ordenados dentro de cada categoría: cada grupo es un tramo contiguo.
+        # Categoría y monto se combinan en un solo entero para ordenar una vez
+        minimo = int(self._centavos.min())
+        if int(self._centavos.max()) - minimo < 1 << _BITS_MONTO and grupos < 1 << 20:
+            claves = np.sort((self._categorias.astype(np.int64) << _BITS_MONTO)
+                             + (self._centavos - minimo))
+            ordenados = (claves & ((1 << _BITS_MONTO) - 1)) + minimo
+        else:
+            ordenados = self._centavos[np.lexsort((self._centavos, self._categorias))]
+        cantidades = np.bincount(self._categorias, minlength=grupos)
+        totales = np.bincount(self._categorias, weights=self._centavos, minlength=grupos)
+        inicios = np.concatenate(([0], np.cumsum(cantidades)[:-1]))
+        con_gastos = np.flatnonzero(cantidades)
+        inicios, cantidades = inicios[con_gastos], cantidades[con_gastos]
+        totales = np.rint(totales[con_gastos])
+
+        def percentil(cuantil: float):
+            posicion = (cantidades - 1) * cuantil / 100
+            bajo = np.floor(posicion).astype(np.intp)
+            alto = np.minimum(bajo + 1, cantidades - 1)
+            inferior = ordenados[inicios + bajo]
+            return inferior + (ordenados[inicios + alto] - inferior) * (posicion - bajo)
+
+        medianas, p90 = percentil(50), percentil(90)
+        minimos = ordenados[inicios]
+        maximos = ordenados[inicios + cantidades - 1]
+        return {self.nombres_categoria[codigo]: {
+                    'cantidad': int(cantidades[i]),
+                    'total': totales[i] / 100,
+                    'promedio': totales[i] / cantidades[i] / 100,
+                    'mediana': medianas[i] / 100,
+                    'p90': p90[i] / 100,
+                    'minimo': minimos[i] / 100,
+                    'maximo': maximos[i] / 100,
+                } for i, codigo in enumerate(con_gastos.tolist())}
+
+    def pivote_mensual(self) -> Dict[str, Dict[str, float]]:
+        """
+        Tabla de totales por mes ("AAAA-MM", o "Sin fecha") y categoría.
+        """
+        totales: Dict[str, Dict[str, int]] = defaultdict(dict)
+        nombres = self.nombres_categoria
+        if not self.usar_numpy:
+            for epoch, codigo, centavos in zip(self._fechas, self._categorias, self._centavos):
+                mes = SIN_FECHA if epoch == FECHA_INVALIDA else epoch_a_fecha(epoch)[:7]
+                fila = totales[mes]
+                fila[nombres[codigo]] = fila.get(nombres[codigo], 0) + centavos
+        elif self.cantidad:
+            grupos = len(nombres)
+            validas = self._validas
+            meses = self._fechas[validas].astype('datetime64[s]').astype('datetime64[M]')
+            meses = meses.astype(np.int64)
+            if len(meses):
+                primero = int(meses.min())
+                # Una celda por (mes, categoría): un solo bincount para toda la tabla
+                claves = (meses - primero) * grupos + self._categorias[validas]
+                celdas = np.rint(np.bincount(claves, weights=self._centavos[validas]))
+                cantidades = np.bincount(claves)
+                for clave in np.flatnonzero(cantidades).tolist():
+                    mes, codigo = divmod(clave, grupos)
+                    totales[_mes(primero + mes)][nombres[codigo]] = int(celdas[clave])
+            invalidas = ~validas
+            if invalidas.any():
+                celdas = np.bincount(self._categorias[invalidas],
+                                     weights=self._centavos[invalidas], minlength=grupos)
+                cantidades = np.bincount(self._categorias[invalidas], minlength=grupos)
+                for codigo in np.flatnonzero(cantidades).tolist():
+                    totales[SIN_FECHA][nombres[codigo]] = int(round(celdas[codigo]))
+        return {mes: {categoria: centavos / 100 for categoria, centavos in
+                      sorted(totales[mes].items())}
+                for mes in sorted(totales)}
+
+    def gasto_movil(self, dias: int = DIAS_VENTANA) -> Dict[str, float]:
+        """
+        Gasto acumulado en la ventana de ``dias`` días que termina en cada
+        día, desde el primer gasto hasta el último ("AAAA-MM-DD" -> total).
+
+        Raises:
+            ValueError: Si ``dias`` no es positivo
+        """
+        if dias < 1:
+            raise ValueError("La ventana debe tener al menos un día")
+        if self.usar_numpy:
+            if not len(self._dias):
+                return {}
+            primero = int(self._dias.min())
+            diarios = np.bincount(self._dias - primero, weights=self._centavos[self._validas])
+            acumulado = np.cumsum(np.rint(diarios).astype(np.int64))
+            movil = acumulado.copy()
+            # Suma de la ventana como diferencia de dos sumas acumuladas
+            movil[dias:] -= acumulado[:-dias]
+            return {_dia(primero + desplazamiento): centavos / 100
+                    for desplazamiento, centavos in enumerate(movil.tolist())}
+
+        diarios: Dict[int, int] = defaultdict(int)
+        for epoch, centavos in zip(self._fechas, self._centavos):
+            if epoch != FECHA_INVALIDA:
+                diarios[epoch // _SEGUNDOS_DIA] += centavos
+        if not diarios:
+            return {}
+        primero, ultimo = min(diarios), max(diarios)
+        reporte = {}
+        ventana = 0
+        for dia in range(primero, ultimo + 1):
+            ventana += diarios.get(dia, 0) - diarios.get(dia - dias, 0)
+            reporte[_dia(dia)] = ventana / 100
+        return reporte
+
+    def por_dia_semana(self) -> Dict[str, Dict[str, float]]:
+        """
+        Cantidad, total y promedio de los gastos de cada día de la semana.
+        """
+        if self.usar_numpy:
+            # El 1970-01-01 fue jueves: (días + 3) % 7 da 0 para el lunes
+            semana = (self._dias + 3) % 7
+            cantidades = np.bincount(semana, minlength=7).tolist()
+            totales = np.rint(np.bincount(semana, weights=self._centavos[self._validas],
+                                          minlength=7)).tolist()
+        else:
+            cantidades, totales = [0] * 7, [0] * 7
+            for epoch, centavos in zip(self._fechas, self._centavos):
+                if epoch != FECHA_INVALIDA:
+                    dia = (epoch // _SEGUNDOS_DIA + 3) % 7
+                    cantidades[dia] += 1
+                    totales[dia] += centavos
+        return {nombre: {'cantidad': int(cantidades[dia]),
+                         'total': totales[dia] / 100,
+                         'promedio': totales[dia] / cantidades[dia] / 100 if cantidades[dia] else 0}
+                for dia, nombre in enumerate(DIAS_SEMANA)}
+
+    def reporte(self) -> Dict[str, object]:
+        """
+        Todos los reportes en un solo diccionario.
+        """
+        return {
+            'cantidad': self.cantidad,
+            'percentiles': self.percentiles(),
+            'mediana': self.mediana(),
+            'por_categoria': self.por_categoria(),
+            'por_mes': self.pivote_mensual(),
+            'gasto_movil': self.gasto_movil(),
+            'por_dia_semana': self.por_dia_semana(),
+        }
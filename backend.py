@@ -3,45 +3,326 @@ Backend del Sistema de Control de Gastos
 Módulo que gestiona toda la lógica de negocio y persistencia de datos
 """
 
-import csv
+import math
 import os
+from array import array
+from contextlib import nullcontext
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Iterable, Iterator, NamedTuple, Tuple, Optional
+
+# Gasto y AgregadosGastos se reexportan como parte de la API de backend
+from almacenamiento import (AlmacenamientoBase, AvanceCarga, Gasto, PERIODOS, a_centavos,
+                            coincide_filtro)
+from almacen_csv import AlmacenamientoCSV, AgregadosGastos
+from almacen_particionado import AlmacenamientoParticionado
+from almacen_sqlite import AlmacenamientoSQLite
+from exportar import FILAS_POR_BLOQUE, ResultadoExportacion, exportar_gastos
+from indice_texto import CAMBIOS_POR_GUARDADO, IndiceTexto, coincide_texto, descartar_indice
+from resumenes import ResumenMensual, sumar_acumulado
+from tabla_columnar import CENTAVOS_MAXIMOS, ColumnasGastos
+
+# Motores de almacenamiento disponibles para GestorGastos
+MOTORES = ("csv", "sqlite", "particionado")
+
+
+class CambioLedger(NamedTuple):
+    """
+    Descripción de un alta o baja en el ledger y su efecto en las estadísticas.
+    """
+    gasto: Gasto
+    delta_cantidad: int
+    delta_centavos: int
 
 
 class GestorGastos:
     """
     Clase encargada de gestionar los gastos del usuario.
-    Maneja la persistencia en CSV y operaciones CRUD.
+    Valida los datos y delega la persistencia en un motor de almacenamiento
+    (CSV plano, SQLite indexado o CSV particionado por mes).
+    
+    Cada gasto tiene un identificador estable. En el motor CSV las
+    eliminaciones se registran como lápidas de solo anexado
+    (``<archivo>.borrados``) y se aplican físicamente al compactar.
+    
+    Los totales y estadísticas usan resúmenes mensuales precalculados
+    (``<archivo>.resumen``): los meses cerrados se leen del resumen y solo
+    el mes en curso se calcula sobre los gastos.
+    
+    En modo durable (solo CSV) las altas pasan por un diario de escritura
+    anticipada con confirmación por grupos; hay que llamar a ``cerrar``
+    al terminar para volcar el último grupo.
+    
+    La búsqueda por descripción usa un índice invertido guardado en
+    ``<archivo>.indice``, que se actualiza con cada alta o baja.
     """
     
-    def __init__(self, archivo_csv: str = "gastos.csv"):
+    def __init__(self, archivo_csv: str = "gastos.csv", umbral_compactacion: int = 500,
+                 motor: str = "csv", en_memoria: bool = True, usar_resumenes: bool = True,
+                 durable: bool = False, politica_fsync: str = "grupo",
+                 registros_por_grupo: int = 1000, espera_grupo_ms: float = 10.0,
+                 usar_instantanea: bool = True, procesos: Optional[int] = None,
+                 usar_indice: bool = True, confirmacion_diferida: bool = False):
         """
         Inicializa el gestor de gastos.
         
         Args:
-            archivo_csv: Nombre del archivo CSV donde se almacenarán los gastos
+            archivo_csv: Nombre del archivo donde se almacenarán los gastos
+                (CSV, base de datos SQLite o directorio de segmentos
+                mensuales según el motor)
+            umbral_compactacion: Cantidad de lápidas pendientes a partir de la
+                cual se compacta el archivo automáticamente (motores CSV y
+                particionado; en este último, por segmento)
+            motor: Motor de almacenamiento: "csv", "sqlite" o "particionado"
+                (un CSV por mes, con agregaciones en paralelo)
+            en_memoria: Mantener el ledger CSV en memoria; con False las
+                consultas recorren el archivo en streaming con memoria constante
+            usar_resumenes: Calcular totales y estadísticas a partir de los
+                resúmenes mensuales de los meses cerrados
+            durable: Registrar las altas en un diario (``<archivo>.wal``) con
+                confirmación por grupos (solo motor CSV en memoria)
+            politica_fsync: Sincronización del diario: "grupo" (un fsync por
+                grupo), "siempre" (cada alta espera su fsync) o "nunca"
+            registros_por_grupo: Altas que disparan la confirmación de un grupo
+            espera_grupo_ms: Tiempo máximo en ms que un alta espera a su grupo
+                (ventana de durabilidad con la política "grupo")
+            usar_instantanea: Mantener una instantánea binaria del ledger
+                (``<archivo>.instantanea``) para abrirlo sin reanalizar todo
+                el CSV (solo motor CSV en memoria)
+            procesos: Procesos que calculan las agregaciones del motor
+                particionado (por defecto, uno por núcleo)
+            usar_indice: Buscar por descripción con el índice de texto; con
+                False cada búsqueda recorre todos los gastos
+            confirmacion_diferida: Con la política "siempre", las altas
+                retornan sin esperar su fsync y quien las registra llama
+                después a ``esperar_confirmacion``; así varias altas seguidas
+                comparten el mismo fsync (solo modo durable)
         """
         self.archivo_csv = archivo_csv
-        self.columnas = ["fecha", "categoria", "descripcion", "monto"]
-        self._inicializar_archivo()
+        self.motor = motor
+        self.confirmacion_diferida = durable and confirmacion_diferida
+        ledger_nuevo = not os.path.exists(archivo_csv)
+        
+        if motor == "csv":
+            self._almacen: AlmacenamientoBase = AlmacenamientoCSV(
+                archivo_csv, umbral_compactacion, en_memoria, durable, politica_fsync,
+                registros_por_grupo, espera_grupo_ms, usar_instantanea,
+                confirmacion_diferida)
+        elif durable:
+            raise ValueError("El modo durable solo está disponible con el motor CSV")
+        elif motor == "sqlite":
+            self._almacen = AlmacenamientoSQLite(archivo_csv)
+        elif motor == "particionado":
+            self._almacen = AlmacenamientoParticionado(archivo_csv, umbral_compactacion, procesos)
+        else:
+            raise ValueError(f"Motor de almacenamiento desconocido: {motor} "
+                             f"(disponibles: {', '.join(MOTORES)})")
+        
+        self._resumen: Optional[ResumenMensual] = None
+        # El motor particionado ya guarda acumulados por segmento mensual
+        if usar_resumenes and motor != "particionado":
+            # Solo el CSV se vigila por ediciones a mano (ver ResumenMensual)
+            self._resumen = ResumenMensual(self._almacen, archivo_csv + ".resumen",
+                                           archivo_csv if motor == "csv" else None)
+            if ledger_nuevo:
+                # Un resumen que sobrevivió a su ledger no le corresponde al nuevo
+                self._resumen.descartar()
+        
+        self.usar_indice = usar_indice
+        self.archivo_indice = archivo_csv + ".indice"
+        # Se carga (o se construye) en la primera búsqueda
+        self._indice: Optional[IndiceTexto] = None
+        # Última búsqueda con filtros: (clave, ids que los cumplen)
+        self._ultima_busqueda: Optional[Tuple[tuple, List[int]]] = None
+        if usar_indice and ledger_nuevo:
+            descartar_indice(self.archivo_indice)
+    
+    def invalidar_cache(self) -> None:
+        """
+        Descarta el ledger en memoria para forzar una relectura del archivo.
+        """
+        self._almacen.invalidar_cache()
+        self._ultima_busqueda = None
+    
+    def reconstruir_resumenes(self) -> None:
+        """
+        Descarta los resúmenes mensuales para recalcularlos en la próxima
+        consulta. Las ediciones a mano del CSV se detectan solas; con los
+        demás motores hace falta llamarlo tras modificar el archivo por fuera.
+        """
+        if self._resumen is not None:
+            self._resumen.descartar()
+    
+    def _invalidar_resumenes(self, fechas: Iterable[str]) -> None:
+        """
+        Avisa a los resúmenes mensuales de las fechas de gastos agregados o eliminados.
+        """
+        if self._resumen is None:
+            return
+        try:
+            self._resumen.invalidar(fechas)
+        except Exception as e:
+            print(f"Error al actualizar los resúmenes: {str(e)}")
+    
+    def _reemplazo_propio(self):
+        """
+        Contexto para las operaciones que pueden reemplazar el archivo del
+        ledger, de modo que los resúmenes no lo tomen por una edición a mano.
+        """
+        if self._resumen is None:
+            return nullcontext()
+        return self._resumen.reemplazo_propio()
+    
+    def _usar_resumen(self, desde: Optional[str], hasta: Optional[str],
+                      categoria: Optional[str] = None) -> bool:
+        """
+        Indica si conviene responder con los resúmenes mensuales. Sin
+        filtros, un motor con agregados en memoria responde en O(1) sin
+        recorrer el mes en curso.
+        """
+        if self._resumen is None:
+            return False
+        sin_filtros = desde is None and hasta is None and categoria is None
+        return not (sin_filtros and self._almacen.agregados_en_memoria)
+    
+    def _firma_ledger(self) -> Tuple[int, int]:
+        """
+        Firma barata del contenido del ledger: cantidad de gastos e id de la
+        última fila. Cambia con cualquier alta o baja, propia o de otro proceso.
+        """
+        cantidad = self._almacen.contar()
+        ultima = self._almacen.pagina(cantidad - 1, 1) if cantidad else []
+        return cantidad, ultima[0].id if ultima else 0
+    
+    def _obtener_indice(self, firma: Tuple[int, int]) -> IndiceTexto:
+        """
+        Retorna el índice de texto al día con el ledger, cargándolo del
+        archivo (o construyéndolo) la primera vez.
+        """
+        if self._indice is None:
+            self._indice = IndiceTexto.cargar(self.archivo_indice) or IndiceTexto()
+        if self._indice.firma != firma:
+            # Cambios que no pasaron por este gestor: se recorre el ledger una vez
+            self._indice.sincronizar(
+                lambda: ((gasto.id, gasto.descripcion) for gasto in self._almacen.iterar()))
+            self._indice.firma = firma
+            self._indice.guardar(self.archivo_indice)
+        return self._indice
+    
+    def _actualizar_indice(self, aplicar) -> None:
+        """
+        Aplica un alta o baja al índice de texto si ya está cargado; si no,
+        se sincroniza al cargarlo.
+        """
+        if self._indice is None:
+            return
+        try:
+            aplicar(self._indice)
+            self._indice.firma = self._firma_ledger()
+            if self._indice.cambios_sin_guardar >= CAMBIOS_POR_GUARDADO:
+                self._indice.guardar(self.archivo_indice)
+        except Exception as e:
+            print(f"Error al actualizar el índice de búsqueda: {str(e)}")
+    
+    def sincronizar(self) -> Tuple[bool, str]:
+        """
+        Lleva a disco las altas pendientes del modo durable sin esperar a
+        que se complete su grupo.
+        
+        Returns:
+            Tupla (éxito: bool, mensaje: str)
+        """
+        try:
+            self._almacen.sincronizar()
+            return True, "Gastos sincronizados"
+        except Exception as e:
+            return False, f"Error al sincronizar: {str(e)}"
     
-    def _inicializar_archivo(self) -> None:
+    def esperar_confirmacion(self) -> None:
         """
-        Crea el archivo CSV con encabezados si no existe.
+        Espera a que las altas ya registradas estén sincronizadas en el
+        diario (ver ``confirmacion_diferida``). Se puede llamar desde otro
+        hilo mientras se registran más altas.
         """
-        if not os.path.exists(self.archivo_csv):
+        self._almacen.esperar_confirmacion()
+    
+    def cerrar(self) -> None:
+        """
+        Libera los recursos del motor de almacenamiento (en modo durable,
+        vuelca antes el grupo pendiente).
+
+        Raises:
+            RuntimeError: Si en modo durable quedaron altas sin escribir en el
+                diario o sin aplicar al ledger
+        """
+        if self._indice is not None and self._indice.cambios_sin_guardar:
+            self._indice.guardar(self.archivo_indice)
+        self._almacen.cerrar()
+
+    def memoria_en_uso(self) -> int:
+        """
+        Estimación en bytes del ledger en memoria y del índice de búsqueda.
+        """
+        indice = self._indice.memoria() if self._indice is not None else 0
+        return self._almacen.memoria_en_uso() + indice
+
+    def liberar_memoria(self) -> None:
+        """
+        Descarta el ledger en memoria y el índice de búsqueda (guardándolo
+        antes si tiene cambios); se vuelven a cargar en la próxima consulta.
+        """
+        if self._indice is not None and self._indice.cambios_sin_guardar:
+            self._indice.guardar(self.archivo_indice)
+        self._indice = None
+        self.invalidar_cache()
+
+    def _validar_gasto(self, categoria: str, descripcion: str, monto,
+                       fecha: Optional[str] = None) -> Tuple[Optional[str], Optional[Gasto]]:
+        """
+        Valida los datos de un gasto y construye su fila tipada (sin id).
+        
+        Args:
+            categoria: Categoría del gasto
+            descripcion: Descripción del gasto
+            monto: Cantidad monetaria (número o texto)
+            fecha: Fecha opcional "AAAA-MM-DD[ HH:MM:SS]"; por defecto, ahora
+            
+        Returns:
+            Tupla (mensaje de error o None, gasto validado o None)
+        """
+        if not categoria or not str(categoria).strip():
+            return "La categoría no puede estar vacía", None
+        
+        if not descripcion or not str(descripcion).strip():
+            return "La descripción no puede estar vacía", None
+        
+        try:
+            monto_float = float(monto)
+        except (ValueError, TypeError):
+            return "El monto debe ser un número válido", None
+        # "inf", "nan" o "1e400" no se pueden guardar como centavos
+        if not math.isfinite(monto_float):
+            return "El monto debe ser un número válido", None
+        if monto_float <= 0:
+            return "El monto debe ser mayor a 0", None
+        if a_centavos(monto_float) > CENTAVOS_MAXIMOS:
+            return "El monto es demasiado grande", None
+        
+        if fecha is None or not str(fecha).strip():
+            fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            fecha = str(fecha).strip()
             try:
-                with open(self.archivo_csv, 'w', newline='', encoding='utf-8') as archivo:
-                    escritor = csv.DictWriter(archivo, fieldnames=self.columnas)
-                    escritor.writeheader()
-                print(f"✓ Archivo '{self.archivo_csv}' creado exitosamente")
-            except Exception as e:
-                raise Exception(f"Error al crear el archivo: {str(e)}")
+                formato = "%Y-%m-%d %H:%M:%S" if len(fecha) > 10 else "%Y-%m-%d"
+                fecha = datetime.strptime(fecha, formato).strftime("%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                return "La fecha debe tener formato AAAA-MM-DD [HH:MM:SS]", None
+        
+        return None, Gasto(0, fecha, str(categoria).strip(), str(descripcion).strip(),
+                           round(monto_float, 2))
     
     def guardar_gasto(self, categoria: str, descripcion: str, monto: float) -> Tuple[bool, str]:
         """
-        Guarda un nuevo gasto en el archivo CSV.
+        Guarda un nuevo gasto en el almacenamiento.
         
         Args:
             categoria: Categoría del gasto (Ej: Comida, Transporte, etc.)
@@ -51,118 +332,425 @@ class GestorGastos:
         Returns:
             Tupla (éxito: bool, mensaje: str)
         """
+        exito, mensaje, _ = self.guardar_gasto_detallado(categoria, descripcion, monto)
+        return exito, mensaje
+    
+    def guardar_gasto_detallado(self, categoria: str, descripcion: str,
+                                monto: float) -> Tuple[bool, str, Optional[CambioLedger]]:
+        """
+        Guarda un nuevo gasto y describe el cambio producido en el ledger.
+        
+        Permite a la interfaz insertar solo la fila nueva y ajustar las
+        estadísticas sin volver a consultar todo el ledger.
+        
+        Args:
+            categoria: Categoría del gasto (Ej: Comida, Transporte, etc.)
+            descripcion: Descripción detallada del gasto
+            monto: Cantidad monetaria del gasto
+            
+        Returns:
+            Tupla (éxito: bool, mensaje: str, cambio: CambioLedger o None)
+        """
         # Validaciones
-        if not categoria or not categoria.strip():
-            return False, "La categoría no puede estar vacía"
+        error, gasto = self._validar_gasto(categoria, descripcion, monto)
+        if error:
+            return False, error, None
+        
+        # Guardar el gasto
+        try:
+            gasto = self._almacen.agregar(gasto)
+        except Exception as e:
+            return False, f"Error al guardar el gasto: {str(e)}", None
+        
+        self._invalidar_resumenes([gasto.fecha])
+        self._actualizar_indice(lambda indice: indice.agregar(gasto.id, gasto.descripcion))
+        return True, "Gasto guardado exitosamente", CambioLedger(gasto, 1, a_centavos(gasto.monto))
+    
+    def guardar_gastos_lote(self, gastos: Iterable) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        Guarda muchos gastos con una sola escritura sincronizada.
+        
+        Los gastos se validan y escriben a medida que se consume el iterable,
+        por lo que puede ser un generador arbitrariamente grande. Las filas
+        inválidas se omiten y se informan en la lista de errores.
         
-        if not descripcion or not descripcion.strip():
-            return False, "La descripción no puede estar vacía"
+        Args:
+            gastos: Iterable de diccionarios (claves categoria, descripcion,
+                monto y opcionalmente fecha) o tuplas
+                (categoria, descripcion, monto[, fecha])
+            
+        Returns:
+            Tupla (cantidad guardada: int, errores: lista de (posición 1-based, mensaje))
+        """
+        errores = []
+        meses = {}
+        
+        def validados():
+            for posicion, dato in enumerate(gastos, 1):
+                if isinstance(dato, dict):
+                    error, gasto = self._validar_gasto(dato.get('categoria'),
+                                                       dato.get('descripcion'),
+                                                       dato.get('monto'),
+                                                       dato.get('fecha'))
+                elif not isinstance(dato, (list, tuple)):
+                    # Ni diccionario ni fila (un número, un texto...): se
+                    # informa en su posición, sin cortar el lote ya escrito
+                    error, gasto = "Cada gasto debe ser un diccionario o una fila de campos", None
+                elif 3 <= len(dato) <= 4:
+                    error, gasto = self._validar_gasto(*dato)
+                else:
+                    error, gasto = "La fila debe tener 3 o 4 campos", None
+                if error:
+                    errores.append((posicion, error))
+                else:
+                    # Un representante por mes basta para invalidar su resumen
+                    meses.setdefault(gasto.fecha[:7], gasto.fecha)
+                    yield gasto
         
         try:
-            monto_float = float(monto)
-            if monto_float <= 0:
-                return False, "El monto debe ser mayor a 0"
-        except (ValueError, TypeError):
-            return False, "El monto debe ser un número válido"
+            guardados = self._almacen.agregar_lote(validados())
+        except Exception as e:
+            guardados = 0
+            errores.append((0, f"Error al guardar el lote: {str(e)}"))
         
-        # Guardar el gasto
+        self._invalidar_resumenes(meses.values())
+        return guardados, errores
+    
+    def iterar_gastos(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                      categoria: Optional[str] = None) -> Iterator[Gasto]:
+        """
+        Recorre los gastos uno a uno sin materializar el ledger completo.
+        
+        Args:
+            desde: Fecha mínima inclusiva ("AAAA-MM-DD" o "AAAA-MM-DD HH:MM:SS")
+            hasta: Fecha máxima inclusiva ("AAAA-MM-DD" incluye todo ese día)
+            categoria: Mostrar solo los gastos de esta categoría
+            
+        Yields:
+            Gastos tipados en orden de registro
+        """
         try:
-            with open(self.archivo_csv, 'a', newline='', encoding='utf-8') as archivo:
-                escritor = csv.DictWriter(archivo, fieldnames=self.columnas)
-                escritor.writerow({
-                    'fecha': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    'categoria': categoria.strip(),
-                    'descripcion': descripcion.strip(),
-                    'monto': f"{monto_float:.2f}"
-                })
-            return True, "Gasto guardado exitosamente"
+            yield from self._almacen.iterar(desde, hasta, categoria)
         except Exception as e:
-            return False, f"Error al guardar el gasto: {str(e)}"
+            print(f"Error al leer gastos: {str(e)}")
     
     def obtener_gastos(self) -> List[Dict[str, str]]:
         """
-        Lee y retorna todos los gastos del archivo CSV.
+        Lee y retorna todos los gastos del almacenamiento.
         
         Returns:
             Lista de diccionarios con los gastos
         """
-        gastos = []
+        return [gasto.a_diccionario() for gasto in self.iterar_gastos()]
+    
+    def contar_gastos(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                      categoria: Optional[str] = None) -> int:
+        """
+        Retorna la cantidad de gastos registrados, con filtros opcionales
+        (ver ``iterar_gastos``).
+        """
         try:
-            if os.path.exists(self.archivo_csv):
-                with open(self.archivo_csv, 'r', encoding='utf-8') as archivo:
-                    lector = csv.DictReader(archivo)
-                    gastos = list(lector)
+            return self._almacen.contar(desde, hasta, categoria)
+        except Exception as e:
+            print(f"Error al contar gastos: {str(e)}")
+            return 0
+    
+    def obtener_pagina(self, inicio: int, cantidad: int, desde: Optional[str] = None,
+                       hasta: Optional[str] = None,
+                       categoria: Optional[str] = None) -> List[Gasto]:
+        """
+        Obtiene una ventana de gastos en orden de registro, sin leer el resto.
+        
+        Args:
+            inicio: Posición 0-based del primer gasto de la ventana
+            cantidad: Cantidad máxima de gastos a retornar
+            desde: Fecha mínima inclusiva
+            hasta: Fecha máxima inclusiva
+            categoria: Mostrar solo los gastos de esta categoría
+            
+        Returns:
+            Lista de gastos tipados
+        """
+        try:
+            return self._almacen.pagina(inicio, cantidad, desde, hasta, categoria)
         except Exception as e:
             print(f"Error al leer gastos: {str(e)}")
+            return []
+    
+    def cargar_por_bloques(self) -> Iterator[AvanceCarga]:
+        """
+        Carga el ledger en pasos cortos (en CSV, un bloque del archivo por
+        paso) y entrega el progreso tras cada uno.
+        
+        Entre pasos se puede seguir usando el gestor: las altas no esperan
+        al resto de la carga y ``obtener_pagina_cargada`` muestra los gastos
+        ya leídos; las demás consultas completan la carga antes de
+        responder (y entonces el recorrido termina antes).
+        
+        Yields:
+            AvanceCarga con los gastos cargados y los bytes leídos
+        """
+        try:
+            yield from self._almacen.cargar_por_bloques()
+        except Exception as e:
+            print(f"Error al leer gastos: {str(e)}")
+    
+    def obtener_pagina_cargada(self, inicio: int, cantidad: int) -> List[Gasto]:
+        """
+        Como ``obtener_pagina`` sin filtros, pero durante una carga por
+        bloques solo con los gastos ya leídos (no espera al resto).
+        """
+        try:
+            return self._almacen.pagina_cargada(inicio, cantidad)
+        except Exception as e:
+            print(f"Error al leer gastos: {str(e)}")
+            return []
+    
+    def obtener_columnas(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                         categoria: Optional[str] = None) -> ColumnasGastos:
+        """
+        Retorna las fechas (epoch), los montos (centavos) y las categorías
+        (códigos) de los gastos en columnas, para análisis vectorizados
+        (ver ``analitica.AnalisisGastos``). Acepta los filtros de
+        ``iterar_gastos``.
+        """
+        try:
+            return self._almacen.extraer_columnas(desde, hasta, categoria)
+        except Exception as e:
+            print(f"Error al leer gastos: {str(e)}")
+            return ColumnasGastos(array('q'), array('q'), array('I'), [])
+    
+    def _coincidencias(self, texto: str, desde: Optional[str], hasta: Optional[str],
+                       categoria: Optional[str]) -> List[int]:
+        """
+        Ids de los gastos que coinciden con una búsqueda y cumplen los filtros.
+        """
+        firma = self._firma_ledger()
+        indice = self._obtener_indice(firma) if self.usar_indice else None
+        if indice is not None and desde is None and hasta is None and categoria is None:
+            return indice.buscar(texto)
+        
+        clave = (texto, desde, hasta, categoria, firma, indice.version if indice else None)
+        if self._ultima_busqueda is not None and self._ultima_busqueda[0] == clave:
+            return self._ultima_busqueda[1]
+        if indice is None:
+            ids = [gasto.id for gasto in self._almacen.iterar(desde, hasta, categoria)
+                   if coincide_texto(gasto.descripcion, texto)]
+        else:
+            # Los filtros se aplican solo sobre los gastos encontrados
+            ids = [gasto.id for gasto in self._almacen.obtener(indice.buscar(texto))
+                   if coincide_filtro(gasto, desde, hasta, categoria)]
+        self._ultima_busqueda = (clave, ids)
+        return ids
+    
+    def contar_busqueda(self, texto: str, desde: Optional[str] = None,
+                        hasta: Optional[str] = None, categoria: Optional[str] = None) -> int:
+        """
+        Retorna la cantidad de gastos que encuentra ``buscar_gastos``.
+        """
+        try:
+            return len(self._coincidencias(texto, desde, hasta, categoria))
+        except Exception as e:
+            print(f"Error al buscar gastos: {str(e)}")
+            return 0
+    
+    def buscar_gastos(self, texto: str, inicio: int = 0, cantidad: Optional[int] = None,
+                      desde: Optional[str] = None, hasta: Optional[str] = None,
+                      categoria: Optional[str] = None) -> List[Gasto]:
+        """
+        Busca gastos por palabras de la descripción, sin distinguir tildes
+        ni mayúsculas. Cada palabra vale como prefijo y deben aparecer todas
+        ("super sem" encuentra "Supermercado semanal").
         
-        return gastos
+        Args:
+            texto: Palabras a buscar
+            inicio: Posición 0-based del primer resultado a retornar
+            cantidad: Cantidad máxima de resultados (None: todos)
+            desde: Fecha mínima inclusiva
+            hasta: Fecha máxima inclusiva
+            categoria: Buscar solo entre los gastos de esta categoría
+            
+        Returns:
+            Lista de gastos tipados en orden de registro
+        """
+        try:
+            ids = self._coincidencias(texto, desde, hasta, categoria)
+            inicio = max(inicio, 0)
+            fin = len(ids) if cantidad is None else inicio + max(cantidad, 0)
+            return self._almacen.obtener(ids[inicio:fin])
+        except Exception as e:
+            print(f"Error al buscar gastos: {str(e)}")
+            return []
     
-    def calcular_total(self) -> float:
+    def calcular_total(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                       categoria: Optional[str] = None) -> float:
         """
-        Calcula el total de todos los gastos registrados.
+        Calcula el total de los gastos registrados.
         
+        Args:
+            desde: Fecha mínima inclusiva ("AAAA-MM-DD", "AAAA-MM", ...)
+            hasta: Fecha máxima inclusiva ("AAAA-MM" incluye todo ese mes)
+            categoria: Sumar solo los gastos de esta categoría
+            
         Returns:
             Suma total de los gastos
         """
-        gastos = self.obtener_gastos()
-        total = sum(float(gasto['monto']) for gasto in gastos if gasto.get('monto'))
-        return total
+        if self._usar_resumen(desde, hasta, categoria):
+            meses = self._resumen.consultar(desde, hasta, categoria)
+            return sum(acumulado[1] for categorias in meses.values()
+                       for acumulado in categorias.values()) / 100
+        return self._almacen.total_centavos(desde, hasta, categoria) / 100
     
-    def calcular_total_por_categoria(self) -> Dict[str, float]:
+    def calcular_total_por_categoria(self, desde: Optional[str] = None,
+                                     hasta: Optional[str] = None) -> Dict[str, float]:
         """
         Calcula el total de gastos agrupados por categoría.
         
+        Args:
+            desde: Fecha mínima inclusiva
+            hasta: Fecha máxima inclusiva
+            
         Returns:
             Diccionario con categorías y sus totales
         """
-        gastos = self.obtener_gastos()
-        totales = {}
-        
-        for gasto in gastos:
-            categoria = gasto.get('categoria', 'Sin categoría')
-            monto = float(gasto.get('monto', 0))
-            totales[categoria] = totales.get(categoria, 0) + monto
+        if self._usar_resumen(desde, hasta):
+            totales = {}
+            for categorias in self._resumen.consultar(desde, hasta).values():
+                for categoria, acumulado in categorias.items():
+                    totales[categoria] = totales.get(categoria, 0) + acumulado[1]
+        else:
+            totales = self._almacen.totales_por_categoria(desde, hasta)
+        return {categoria: centavos / 100 for categoria, centavos in totales.items()}
+    
+    def calcular_totales_por_periodo(self, periodo: str = "mes", desde: Optional[str] = None,
+                                     hasta: Optional[str] = None,
+                                     categoria: Optional[str] = None) -> Dict[str, float]:
+        """
+        Calcula el total de gastos agrupados por mes o por semana.
         
-        return totales
+        Args:
+            periodo: "mes" (claves "AAAA-MM") o "semana" (claves ISO "AAAA-Wss")
+            desde: Fecha mínima inclusiva
+            hasta: Fecha máxima inclusiva
+            categoria: Sumar solo los gastos de esta categoría
+            
+        Returns:
+            Diccionario ordenado por período con sus totales
+            
+        Raises:
+            ValueError: Si el período no es válido
+        """
+        if periodo not in PERIODOS:
+            raise ValueError(f"Período desconocido: {periodo} "
+                             f"(disponibles: {', '.join(PERIODOS)})")
+        if periodo == "mes" and self._resumen is not None:
+            totales = {mes: sum(acumulado[1] for acumulado in categorias.values())
+                       for mes, categorias in self._resumen.consultar(desde, hasta,
+                                                                      categoria).items()}
+        else:
+            totales = self._almacen.totales_por_periodo(periodo, desde, hasta, categoria)
+        return {clave: totales[clave] / 100 for clave in sorted(totales)}
     
-    def eliminar_gasto(self, indice: int) -> Tuple[bool, str]:
+    def eliminar_gasto(self, id_gasto: int) -> Tuple[bool, str]:
         """
-        Elimina un gasto específico por su índice.
+        Elimina un gasto específico por su identificador.
         
         Args:
-            indice: Índice del gasto a eliminar (0-based)
+            id_gasto: Identificador estable del gasto (columna ``id``)
             
         Returns:
             Tupla (éxito: bool, mensaje: str)
         """
-        gastos = self.obtener_gastos()
+        exito, mensaje, _ = self.eliminar_gasto_detallado(id_gasto)
+        return exito, mensaje
+    
+    def eliminar_gasto_detallado(self, id_gasto: int) -> Tuple[bool, str, Optional[CambioLedger]]:
+        """
+        Elimina un gasto y describe el cambio producido en el ledger.
         
-        if indice < 0 or indice >= len(gastos):
-            return False, "Índice inválido"
+        Args:
+            id_gasto: Identificador estable del gasto (columna ``id``)
+            
+        Returns:
+            Tupla (éxito: bool, mensaje: str, cambio: CambioLedger o None)
+        """
+        try:
+            id_gasto = int(id_gasto)
+        except (ValueError, TypeError):
+            return False, "Identificador inválido", None
         
         try:
-            gastos.pop(indice)
-            
-            # Reescribir el archivo sin el gasto eliminado
-            with open(self.archivo_csv, 'w', newline='', encoding='utf-8') as archivo:
-                escritor = csv.DictWriter(archivo, fieldnames=self.columnas)
-                escritor.writeheader()
-                escritor.writerows(gastos)
-            
-            return True, "Gasto eliminado exitosamente"
+            # La baja puede disparar una compactación, que reemplaza el CSV
+            with self._reemplazo_propio():
+                eliminado = self._almacen.eliminar(id_gasto)
+        except Exception as e:
+            return False, f"Error al eliminar el gasto: {str(e)}", None
+        
+        if eliminado is None:
+            return False, "Identificador inválido", None
+        
+        self._invalidar_resumenes([eliminado.fecha])
+        self._actualizar_indice(lambda indice: indice.quitar(eliminado.id, eliminado.descripcion))
+        return (True, "Gasto eliminado exitosamente",
+                CambioLedger(eliminado, -1, -a_centavos(eliminado.monto)))
+    
+    def compactar(self) -> Tuple[bool, str]:
+        """
+        Recupera el espacio de los gastos eliminados (en CSV, reescribe el
+        archivo sin las filas con lápida).
+        
+        Returns:
+            Tupla (éxito: bool, mensaje: str)
+        """
+        try:
+            with self._reemplazo_propio():
+                self._almacen.compactar()
+            return True, "Archivo compactado exitosamente"
+        except Exception as e:
+            return False, f"Error al compactar el archivo: {str(e)}"
+    
+    def exportar_gastos(self, ruta: str, formato: str = "csv", compresion: Optional[str] = None,
+                        desde: Optional[str] = None, hasta: Optional[str] = None,
+                        categoria: Optional[str] = None,
+                        filas_por_bloque: int = FILAS_POR_BLOQUE,
+                        al_avanzar: Optional[Callable[[int, int], None]] = None
+                        ) -> Tuple[bool, str, Optional[ResultadoExportacion]]:
+        """
+        Exporta los gastos en streaming a CSV, JSON Lines o columnar, con
+        compresión gzip o zstd opcional (ver ``exportar.exportar_gastos``).
+        Acepta los filtros de ``iterar_gastos``. Si el ledger no está en
+        memoria se lee del archivo en streaming, sin cargarlo.
+        
+        Returns:
+            Tupla (éxito: bool, mensaje: str, resumen o None si falló)
+        """
+        try:
+            resultado = exportar_gastos(self._almacen.recorrer(desde, hasta, categoria), ruta,
+                                        formato, compresion, filas_por_bloque, al_avanzar)
         except Exception as e:
-            return False, f"Error al eliminar el gasto: {str(e)}"
+            return False, f"Error al exportar gastos: {str(e)}", None
+        return True, resultado.describir(), resultado
     
-    def obtener_estadisticas(self) -> Dict[str, any]:
+    def obtener_estadisticas(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                             categoria: Optional[str] = None) -> Dict[str, any]:
         """
-        Genera estadísticas generales de los gastos.
+        Genera estadísticas generales de los gastos, con filtros opcionales
+        (ver ``iterar_gastos``).
         
         Returns:
             Diccionario con estadísticas
         """
-        gastos = self.obtener_gastos()
+        if self._usar_resumen(desde, hasta, categoria):
+            combinado = {}
+            for categorias in self._resumen.consultar(desde, hasta, categoria).values():
+                for acumulado in categorias.values():
+                    sumar_acumulado(combinado, 'total', acumulado)
+            cantidad, total_centavos, minimo, maximo = combinado.get('total', (0, 0, 0, 0))
+        else:
+            cantidad, total_centavos, minimo, maximo = self._almacen.estadisticas(desde, hasta,
+                                                                                  categoria)
         
-        if not gastos:
+        if cantidad == 0:
             return {
                 'total_gastos': 0,
                 'cantidad_gastos': 0,
@@ -171,14 +759,14 @@ class GestorGastos:
                 'gasto_menor': 0
             }
         
-        montos = [float(g['monto']) for g in gastos]
+        total = total_centavos / 100
         
         return {
-            'total_gastos': sum(montos),
-            'cantidad_gastos': len(gastos),
-            'promedio': sum(montos) / len(montos),
-            'gasto_mayor': max(montos),
-            'gasto_menor': min(montos)
+            'total_gastos': total,
+            'cantidad_gastos': cantidad,
+            'promedio': total / cantidad,
+            'gasto_mayor': maximo / 100,
+            'gasto_menor': minimo / 100
         }
 
 
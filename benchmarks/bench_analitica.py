@@ -0,0 +1,68 @@
+"""
+Benchmark de los reportes de analitica.py
+Genera un ledger sintético, extrae sus columnas y mide cada reporte con
+NumPy (vectorizado) y con la implementación en Python puro
+
+Uso:
+    python3 benchmarks/bench_analitica.py [--filas 1000000] [--repeticiones 3]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from sinteticos import generar_ledger
+from analitica import NUMPY_DISPONIBLE, AnalisisGastos
+from backend import GestorGastos
+
+REPORTES = ("percentiles", "por_categoria", "pivote_mensual", "gasto_movil", "por_dia_semana")
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """
+    Mejor tiempo en segundos de ``repeticiones`` llamadas.
+    """
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = generar_ledger(os.path.join(directorio, "ledger.csv"), args.filas)
+        gestor = GestorGastos(ruta)
+        gestor.contar_gastos()
+        extraccion = medir(gestor.obtener_columnas, args.repeticiones)
+        columnas = gestor.obtener_columnas()
+        gestor.cerrar()
+
+    print(f"{args.filas} filas, columnas extraídas en {extraccion * 1000:.1f} ms\n")
+    python = AnalisisGastos(columnas, usar_numpy=False)
+    if not NUMPY_DISPONIBLE:
+        print("NumPy no está instalado: solo se mide Python puro\n")
+    numpy = AnalisisGastos(columnas, usar_numpy=True) if NUMPY_DISPONIBLE else None
+
+    print(f"{'reporte':>16} | {'Python ms':>10} | {'NumPy ms':>9} | aceleración")
+    print("-" * 56)
+    for reporte in REPORTES:
+        lento = medir(getattr(python, reporte), args.repeticiones)
+        if numpy is None:
+            print(f"{reporte:>16} | {lento * 1000:10.1f} | {'-':>9} | {'-':>10}")
+            continue
+        rapido = medir(getattr(numpy, reporte), args.repeticiones)
+        print(f"{reporte:>16} | {lento * 1000:10.1f} | {rapido * 1000:9.1f} | "
+              f"{lento / rapido:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
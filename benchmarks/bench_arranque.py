@@ -0,0 +1,141 @@
+"""
+Benchmark del arranque de la interfaz
+Genera un ledger sintético y mide cuánto tarda en verse la primera página
+de gastos al abrir el ledger de una vez (la interfaz anterior esperaba la
+carga completa antes de mostrar la ventana) y por bloques (la ventana se
+muestra enseguida y la tabla se llena a medida que se lee el CSV).
+
+Con una pantalla disponible también se mide la interfaz real: tiempo hasta
+que la ventana se dibuja, hasta las primeras filas y hasta el final de la
+carga
+
+Uso:
+    python3 benchmarks/bench_arranque.py [--filas 1000000] [--repeticiones 3]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from sinteticos import generar_ledger
+from backend import GestorGastos
+
+# Filas de la primera página que pide la tabla virtual
+FILAS_PAGINA = 50
+
+
+def sincronica(ruta: str, usar_instantanea: bool) -> tuple:
+    """
+    Primera página esperando la carga completa. Retorna (primera página, total) en s.
+    """
+    inicio = time.perf_counter()
+    gestor = GestorGastos(ruta, usar_instantanea=usar_instantanea)
+    gestor.contar_gastos()
+    gestor.obtener_pagina(0, FILAS_PAGINA)
+    primera = time.perf_counter() - inicio
+    gestor.cerrar()
+    return primera, primera
+
+
+def por_bloques(ruta: str, usar_instantanea: bool) -> tuple:
+    """
+    Primera página tras el primer bloque. Retorna (primera página, total) en s.
+    """
+    inicio = time.perf_counter()
+    gestor = GestorGastos(ruta, usar_instantanea=usar_instantanea)
+    carga = gestor.cargar_por_bloques()
+    next(carga)
+    gestor.obtener_pagina_cargada(0, FILAS_PAGINA)
+    primera = time.perf_counter() - inicio
+    for _ in carga:
+        pass
+    total = time.perf_counter() - inicio
+    gestor.cerrar()
+    return primera, total
+
+
+def medir(funcion, ruta: str, usar_instantanea: bool, repeticiones: int) -> tuple:
+    """
+    Mejores tiempos de ``repeticiones`` arranques.
+    """
+    resultados = [funcion(ruta, usar_instantanea) for _ in range(repeticiones)]
+    return min(r[0] for r in resultados), min(r[1] for r in resultados)
+
+
+def medir_interfaz(directorio: str) -> dict:
+    """
+    Abre la interfaz sobre ``<directorio>/gastos.csv`` y mide, desde que
+    se crea la ventana, cuándo se dibuja, cuándo muestra las primeras
+    filas y cuándo termina la carga (en s).
+    """
+    import tkinter as tk
+    from main import AplicacionGastos
+
+    anterior = os.getcwd()
+    os.chdir(directorio)
+    marcas = {}
+    try:
+        inicio = time.perf_counter()
+        root = tk.Tk()
+        root.bind('<Map>', lambda e: marcas.setdefault('ventana', time.perf_counter() - inicio))
+        app = AplicacionGastos(root)
+
+        def vigilar() -> None:
+            ahora = time.perf_counter() - inicio
+            if app.tabla.get_children():
+                marcas.setdefault('primeras_filas', ahora)
+            if app._carga is None and 'primeras_filas' in marcas:
+                marcas['carga_completa'] = ahora
+                app.cerrar()
+                return
+            root.after(5, vigilar)
+
+        root.after(5, vigilar)
+        root.mainloop()
+    finally:
+        os.chdir(anterior)
+    return marcas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = generar_ledger(os.path.join(directorio, "gastos.csv"), args.filas)
+        print(f"{args.filas} filas ({os.path.getsize(ruta) / 2 ** 20:.1f} MiB)\n")
+        print(f"{'arranque':>12} | {'instantánea':>11} | {'primera página s':>16} | "
+              f"{'carga completa s':>16}")
+        print("-" * 66)
+        for usar_instantanea in (False, True):
+            if usar_instantanea:
+                # Deja escrita la instantánea para las mediciones que la usan
+                gestor = GestorGastos(ruta)
+                gestor.contar_gastos()
+                gestor.cerrar()
+            for nombre, funcion in (("sincrónico", sincronica), ("por bloques", por_bloques)):
+                primera, total = medir(funcion, ruta, usar_instantanea, args.repeticiones)
+                print(f"{nombre:>12} | {'sí' if usar_instantanea else 'no':>11} | "
+                      f"{primera:16.3f} | {total:16.3f}")
+
+        # La interfaz se mide en el peor caso: un CSV sin instantánea
+        os.remove(ruta + ".instantanea")
+        try:
+            marcas = medir_interfaz(directorio)
+        except Exception as e:  # Sin pantalla (o sin Tkinter) solo se mide el backend
+            print(f"\nInterfaz no medida: {str(e)}")
+            return
+        print("\nInterfaz (sin instantánea):")
+        for clave, texto in (('ventana', "ventana dibujada"),
+                             ('primeras_filas', "primeras filas"),
+                             ('carga_completa', "carga completa")):
+            if clave in marcas:
+                print(f"  {texto:>18}: {marcas[clave]:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark de la búsqueda por descripción
+Genera un ledger sintético y mide la construcción y la carga del índice de
+texto, y el tiempo de la primera página de resultados (conteo más 50 filas,
+lo que pide la tabla de la interfaz) con el índice y recorriendo el ledger
+
+Uso:
+    python3 benchmarks/bench_busqueda.py [--filas 1000000] [--repeticiones 5]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from sinteticos import generar_ledger
+from backend import GestorGastos
+
+# Consultas de distinta selectividad sobre las descripciones sintéticas
+CONSULTAS = ["uber aero", "SUPERMERCADO", "cafeteria", "farm vit", "gas", "inexistente"]
+
+# Filas de la primera página que pide la tabla virtual
+FILAS_PAGINA = 50
+
+
+def primera_pagina(gestor: GestorGastos, texto: str, repeticiones: int) -> float:
+    """
+    Mejor tiempo (ms) del conteo y la primera página de una búsqueda.
+    """
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        # Sin reutilizar el resultado de la búsqueda anterior
+        if gestor._indice is not None:
+            gestor._indice._ultima_busqueda = None
+        inicio = time.perf_counter()
+        gestor.contar_busqueda(texto)
+        gestor.buscar_gastos(texto, 0, FILAS_PAGINA)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = generar_ledger(os.path.join(directorio, "ledger.csv"), args.filas)
+        gestor = GestorGastos(ruta)
+        gestor.contar_gastos()
+
+        inicio = time.perf_counter()
+        gestor.contar_busqueda("uber")
+        construccion = time.perf_counter() - inicio
+        gestor.cerrar()
+
+        # Un gestor nuevo lee el índice guardado en lugar de construirlo
+        gestor = GestorGastos(ruta)
+        gestor.contar_gastos()
+        inicio = time.perf_counter()
+        gestor.contar_busqueda("uber")
+        carga = time.perf_counter() - inicio
+        print(f"{args.filas} filas: índice construido en {construccion:.2f} s, "
+              f"leído de {ruta}.indice en {carga:.3f} s "
+              f"({os.path.getsize(ruta + '.indice') / 2 ** 20:.1f} MiB)\n")
+
+        sin_indice = GestorGastos(ruta, usar_indice=False)
+        print(f"{'consulta':>14} | {'resultados':>10} | {'índice ms':>9} | "
+              f"{'recorrido ms':>12} | aceleración")
+        print("-" * 66)
+        for texto in CONSULTAS:
+            con = primera_pagina(gestor, texto, args.repeticiones)
+            # El recorrido guarda su último resultado: una sola medición
+            sin = primera_pagina(sin_indice, texto, 1)
+            print(f"{texto:>14} | {gestor.contar_busqueda(texto):10d} | {con:9.1f} | "
+                  f"{sin:12.1f} | {sin / con:10.0f}x")
+        gestor.cerrar()
+        sin_indice.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark de concurrencia entre procesos
+Lanza N procesos que agregan y eliminan gastos a la vez sobre el mismo
+ledger CSV, verifica al final que no se perdió ni duplicó ninguna fila y
+reporta el rendimiento bajo contención
+
+Uso:
+    python3 benchmarks/bench_concurrencia.py [--procesos 1 2 4 8] [--operaciones 300]
+                                             [--streaming] [--umbral 50]
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import tempfile
+import time
+
+import sinteticos  # noqa: F401  (agrega la raíz del proyecto a sys.path)
+from backend import GestorGastos
+
+
+def trabajador(numero: int, ruta: str, operaciones: int, en_memoria: bool, umbral: int,
+               inicio, resultados) -> None:
+    """
+    Agrega ``operaciones`` gastos propios y elimina uno de cada tres.
+
+    Informa por la cola (número, descripciones guardadas, eliminadas, segundos).
+    """
+    gestor = GestorGastos(ruta, umbral_compactacion=umbral, en_memoria=en_memoria,
+                          usar_resumenes=False)
+    guardadas, eliminadas, propios = [], [], []
+    inicio.wait()
+    comienzo = time.perf_counter()
+    for i in range(operaciones):
+        descripcion = f"p{numero}-{i}"
+        exito, mensaje, cambio = gestor.guardar_gasto_detallado("Comida", descripcion,
+                                                                1 + i % 50)
+        if not exito:
+            raise RuntimeError(mensaje)
+        guardadas.append(descripcion)
+        propios.append(cambio.gasto)
+        if i % 3 == 2:
+            # Eliminar un gasto propio anterior (el del medio de los pendientes)
+            victima = propios.pop(len(propios) // 2)
+            exito, mensaje = gestor.eliminar_gasto(victima.id)
+            if not exito:
+                raise RuntimeError(f"{descripcion}: {mensaje}")
+            eliminadas.append(victima.descripcion)
+    resultados.put((numero, guardadas, eliminadas, time.perf_counter() - comienzo))
+    gestor.cerrar()
+
+
+def verificar(ruta: str, esperadas: set) -> list:
+    """
+    Comprueba que el ledger contiene exactamente los gastos esperados.
+
+    Returns:
+        Lista de problemas encontrados (vacía si todo está bien)
+    """
+    problemas = []
+    with open(ruta, newline='', encoding='utf-8') as archivo:
+        lector = csv.reader(archivo)
+        next(lector)
+        for numero, fila in enumerate(lector, 2):
+            if len(fila) != 5:
+                problemas.append(f"línea {numero} malformada: {fila!r}")
+
+    gestor = GestorGastos(ruta, usar_resumenes=False)
+    gastos = list(gestor.iterar_gastos())
+    ids = [gasto.id for gasto in gastos]
+    if len(ids) != len(set(ids)):
+        problemas.append(f"{len(ids) - len(set(ids))} ids duplicados")
+    vivas = [gasto.descripcion for gasto in gastos]
+    if len(vivas) != len(set(vivas)):
+        problemas.append(f"{len(vivas) - len(set(vivas))} filas duplicadas")
+    perdidas = esperadas - set(vivas)
+    sobrantes = set(vivas) - esperadas
+    if perdidas:
+        problemas.append(f"{len(perdidas)} filas perdidas (ej. {sorted(perdidas)[:3]})")
+    if sobrantes:
+        problemas.append(f"{len(sobrantes)} filas que debían estar eliminadas")
+    return problemas
+
+
+def ejecutar(procesos: int, operaciones: int, en_memoria: bool, umbral: int) -> tuple:
+    """
+    Corre una ronda con la cantidad de procesos indicada.
+
+    Returns:
+        Tupla (segundos de pared, operaciones totales, problemas)
+    """
+    contexto = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "gastos.csv")
+        GestorGastos(ruta, usar_resumenes=False)
+        inicio = contexto.Event()
+        resultados = contexto.Queue()
+        hijos = [contexto.Process(target=trabajador,
+                                  args=(n, ruta, operaciones, en_memoria, umbral,
+                                        inicio, resultados))
+                 for n in range(procesos)]
+        for hijo in hijos:
+            hijo.start()
+        time.sleep(0.5)  # dar tiempo a que todos importen el backend
+
+        comienzo = time.perf_counter()
+        inicio.set()
+        esperadas = set()
+        total_operaciones = 0
+        for _ in hijos:
+            _, guardadas, eliminadas, _ = resultados.get()
+            esperadas |= set(guardadas) - set(eliminadas)
+            total_operaciones += len(guardadas) + len(eliminadas)
+        duracion = time.perf_counter() - comienzo
+        for hijo in hijos:
+            hijo.join()
+            if hijo.exitcode != 0:
+                raise RuntimeError(f"Un proceso terminó con código {hijo.exitcode}")
+
+        return duracion, total_operaciones, verificar(ruta, esperadas)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procesos", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--operaciones", type=int, default=300,
+                        help="altas por proceso (se elimina una de cada tres)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="usar en_memoria=False en los procesos")
+    parser.add_argument("--umbral", type=int, default=50,
+                        help="lápidas que disparan la compactación automática")
+    args = parser.parse_args()
+
+    print(f"{'procesos':>8} | {'operaciones':>11} | {'segundos':>8} | {'ops/s':>8} | resultado")
+    print("-" * 60)
+    fallas = 0
+    for procesos in args.procesos:
+        duracion, total, problemas = ejecutar(procesos, args.operaciones,
+                                              not args.streaming, args.umbral)
+        resultado = "OK" if not problemas else "; ".join(problemas)
+        fallas += bool(problemas)
+        print(f"{procesos:>8} | {total:>11} | {duracion:8.2f} | {total / duracion:8.0f} | "
+              f"{resultado}")
+    raise SystemExit(1 if fallas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark del espacio de trabajo con varios ledgers
+Genera varios ledgers sintéticos y mide cuánto tarda en cambiar de ledger
+(activarlo y contar sus gastos) cuando se abre por primera vez, cuando
+vuelve a uno que sigue en memoria en el pool y cuando el presupuesto de
+memoria ya lo había desalojado. Informa también la memoria estimada de
+los ledgers abiertos frente al presupuesto
+
+Uso:
+    python3 benchmarks/bench_espacio.py [--ledgers 6] [--filas 200000] [--memoria-mb 64]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from sinteticos import generar_ledger
+from espacio_trabajo import EspacioTrabajo
+
+
+def cambiar(espacio: EspacioTrabajo, nombre: str) -> float:
+    """
+    Activa el ledger y consulta su cantidad de gastos. Retorna el tiempo en s.
+    """
+    inicio = time.perf_counter()
+    espacio.activar(nombre).contar_gastos()
+    return time.perf_counter() - inicio
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ledgers", type=int, default=6)
+    parser.add_argument("--filas", type=int, default=200_000)
+    parser.add_argument("--memoria-mb", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        espacio = EspacioTrabajo(os.path.join(directorio, "espacio.json"),
+                                 memoria_maxima=args.memoria_mb * 2 ** 20,
+                                 usar_instantanea=False)
+        for numero in range(args.ledgers):
+            ruta = generar_ledger(os.path.join(directorio, f"ledger{numero}.csv"), args.filas)
+            espacio.agregar_ledger(f"ledger{numero}", os.path.basename(ruta))
+        print(f"{args.ledgers} ledgers de {args.filas} filas, "
+              f"presupuesto {args.memoria_mb} MiB\n")
+        print(f"{'ledger':>9} | {'primera vez s':>13} | {'caliente s':>10} | "
+              f"{'en memoria MiB':>14}")
+        print("-" * 57)
+        for nombre in espacio.nombres:
+            fria = cambiar(espacio, nombre)
+            caliente = cambiar(espacio, nombre)
+            print(f"{nombre:>9} | {fria:13.3f} | {caliente:10.4f} | "
+                  f"{espacio.memoria_en_uso() / 2 ** 20:14.1f}")
+
+        # Vuelve del más reciente al más antiguo: los últimos siguen en
+        # memoria y los primeros ya fueron desalojados por el presupuesto
+        print("\nSegunda vuelta, del más reciente al más antiguo:")
+        for nombre in reversed(espacio.nombres):
+            estaba = "caliente" if espacio.caliente(nombre) else "desalojado"
+            print(f"{nombre:>9} | {estaba:>10} | {cambiar(espacio, nombre):.4f} s")
+
+        inicio = time.perf_counter()
+        total = espacio.calcular_total()
+        print(f"\nTotal combinado ${total:,.2f} en {time.perf_counter() - inicio:.3f} s")
+        print(f"Aperturas {espacio.aperturas}, cierres {espacio.cierres}, "
+              f"cachés liberadas {espacio.liberaciones}")
+        espacio.cerrar()
+
+
+if __name__ == "__main__":
+    main()
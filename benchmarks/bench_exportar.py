@@ -0,0 +1,61 @@
+"""
+Benchmark de la exportación en streaming
+Genera un ledger sintético y lo exporta en cada formato y compresión,
+midiendo el rendimiento, el tamaño final y el pico de memoria del proceso
+de exportación (que no debería crecer con la cantidad de filas)
+
+Uso:
+    python3 benchmarks/bench_exportar.py [--filas 1000000]
+"""
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from sinteticos import generar_ledger
+from backend import GestorGastos
+from exportar import FORMATOS, zstandard
+
+EXTENSIONES = {"ninguna": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    compresiones = [c for c in EXTENSIONES if c != "zstd" or zstandard is not None]
+    if zstandard is None:
+        print("zstandard no está instalado: se omite zstd\n")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = generar_ledger(os.path.join(directorio, "ledger.csv"), args.filas)
+        gestor = GestorGastos(ruta)
+        gestor.contar_gastos()
+        print(f"{args.filas} filas ({os.path.getsize(ruta) / 2 ** 20:.1f} MiB de CSV)\n")
+        print(f"{'formato':>9} | {'compresión':>10} | {'filas/s':>10} | {'MB/s':>6} | "
+              f"{'MiB disco':>9} | pico MiB")
+        print("-" * 68)
+        for formato in FORMATOS:
+            for compresion in compresiones:
+                salida = os.path.join(directorio, f"salida.{formato}{EXTENSIONES[compresion]}")
+                exito, mensaje, resultado = gestor.exportar_gastos(salida, formato, compresion)
+                if not exito:
+                    print(mensaje)
+                    continue
+                # tracemalloc frena la exportación: el pico se mide en otra pasada
+                tracemalloc.start()
+                gestor.exportar_gastos(salida, formato, compresion)
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"{formato:>9} | {compresion:>10} | {resultado.filas_por_segundo:10,.0f} | "
+                      f"{resultado.mb_por_segundo:6.1f} | "
+                      f"{resultado.bytes_archivo / 2 ** 20:9.1f} | {pico / 2 ** 20:8.1f}")
+                os.remove(salida)
+        gestor.cerrar()
+
+
+if __name__ == "__main__":
+    main()
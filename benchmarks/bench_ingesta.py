@@ -0,0 +1,87 @@
+"""
+Benchmark de ingesta
+Mide cuántos gastos por segundo registra guardar_gasto con la escritura
+directa al CSV y con el modo durable (diario con confirmación por grupos)
+bajo cada política de fsync
+
+Uso:
+    python3 benchmarks/bench_ingesta.py [--cantidad 20000] [--hilos 1]
+                                        [--registros-por-grupo 1000] [--espera-ms 10]
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import sinteticos  # noqa: F401  (agrega la raíz del proyecto a sys.path)
+from backend import GestorGastos
+
+# (nombre, argumentos de GestorGastos)
+MODOS = [
+    ("directo", {}),
+    ("durable/nunca", {"durable": True, "politica_fsync": "nunca"}),
+    ("durable/grupo", {"durable": True, "politica_fsync": "grupo"}),
+    ("durable/siempre", {"durable": True, "politica_fsync": "siempre"}),
+]
+
+
+def ingerir(gestor: GestorGastos, cantidad: int, hilos: int) -> float:
+    """
+    Registra ``cantidad`` gastos repartidos entre ``hilos`` hilos.
+
+    Returns:
+        Segundos transcurridos hasta que todo quedó registrado y cerrado
+    """
+    def trabajar(numero: int, cuantos: int) -> None:
+        for i in range(cuantos):
+            exito, mensaje = gestor.guardar_gasto("Comida", f"h{numero}-{i}", 1 + i % 50)
+            if not exito:
+                raise RuntimeError(mensaje)
+
+    por_hilo = cantidad // hilos
+    comienzo = time.perf_counter()
+    trabajadores = [threading.Thread(target=trabajar, args=(n, por_hilo)) for n in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    gestor.cerrar()
+    return time.perf_counter() - comienzo
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cantidad", type=int, default=20_000)
+    parser.add_argument("--hilos", type=int, default=1,
+                        help="hilos registrando a la vez (comparten los fsync de grupo)")
+    parser.add_argument("--registros-por-grupo", type=int, default=1000)
+    parser.add_argument("--espera-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{'modo':>16} | {'gastos':>8} | {'segundos':>8} | {'gastos/s':>9} | verificado")
+    print("-" * 62)
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre, opciones in MODOS:
+            ruta = os.path.join(directorio, nombre.replace("/", "_") + ".csv")
+            cantidad = args.cantidad
+            if opciones.get("politica_fsync") == "siempre":
+                # Un fsync por alta (o por ráfaga de hilos): se mide con menos altas
+                cantidad = max(args.hilos, cantidad // 20)
+            cantidad -= cantidad % args.hilos
+            if opciones.get("durable"):
+                opciones = dict(opciones, registros_por_grupo=args.registros_por_grupo,
+                                espera_grupo_ms=args.espera_ms)
+            gestor = GestorGastos(ruta, usar_resumenes=False, **opciones)
+            duracion = ingerir(gestor, cantidad, args.hilos)
+
+            registrados = GestorGastos(ruta, usar_resumenes=False).contar_gastos()
+            verificado = "OK" if registrados == cantidad else f"faltan {cantidad - registrados}"
+            print(f"{nombre:>16} | {cantidad:>8} | {duracion:8.2f} | "
+                  f"{cantidad / duracion:9.0f} | {verificado}")
+
+
+if __name__ == "__main__":
+    main()
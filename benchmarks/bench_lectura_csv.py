@@ -0,0 +1,149 @@
+"""
+Benchmark de lectura del CSV
+Compara la carga del ledger a la tabla columnar con csv.DictReader, con
+csv.reader fila a fila (la lectura anterior del motor CSV), con el lector
+por bloques de lector_csv y con la instantánea binaria (arranque con la
+instantánea ya guardada y sin cola que reanalizar)
+
+Uso:
+    python3 benchmarks/bench_lectura_csv.py [--filas 1000000] [--comillas 0.01]
+                                            [--repeticiones 5]
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from typing import Dict
+
+from sinteticos import generar_ledger
+from instantanea import cargar_instantanea, guardar_instantanea
+from lector_csv import cargar_tabla
+from tabla_columnar import TablaGastos, texto_a_centavos
+
+COLUMNAS = ["id", "fecha", "categoria", "descripcion", "monto"]
+
+
+def con_dictreader(ruta: str) -> int:
+    """
+    Una fila como diccionario por gasto, convertida a la tabla columnar.
+    """
+    tabla = TablaGastos()
+    with open(ruta, 'r', newline='', encoding='utf-8') as archivo:
+        for fila in csv.DictReader(archivo):
+            tabla.agregar(int(fila['id']), fila['fecha'], fila['categoria'] or 'Sin categoría',
+                          fila['descripcion'], texto_a_centavos(fila['monto']))
+    return len(tabla)
+
+
+def con_reader(ruta: str) -> int:
+    """
+    csv.reader fila a fila hacia la tabla columnar (lectura anterior).
+    """
+    tabla = TablaGastos()
+    with open(ruta, 'r', newline='', encoding='utf-8') as archivo:
+        lector = csv.reader(archivo)
+        next(lector, None)
+        for fila in lector:
+            if fila:
+                tabla.agregar(int(fila[0]), fila[1], fila[2] or 'Sin categoría', fila[3],
+                              texto_a_centavos(fila[4]))
+    return len(tabla)
+
+
+def con_bloques(ruta: str) -> int:
+    """
+    Lector por bloques con conversión columnar (lectura actual).
+    """
+    tabla, _, _ = cargar_tabla(ruta, COLUMNAS)
+    return len(tabla)
+
+
+def con_instantanea(ruta: str) -> int:
+    """
+    Instantánea binaria mapeada en memoria más la cola del CSV (vacía).
+    """
+    tabla, inicio = cargar_instantanea(ruta + ".instantanea", ruta)
+    tabla, _, _ = cargar_tabla(ruta, COLUMNAS, tabla, inicio)
+    return len(tabla)
+
+
+# (nombre, función, nombre de la referencia con la que se compara)
+LECTORES = [
+    ("DictReader", con_dictreader, None),
+    ("csv.reader", con_reader, "DictReader"),
+    ("bloques", con_bloques, "DictReader"),
+    ("instantánea", con_instantanea, "bloques"),
+]
+
+
+def agregar_comillas(ruta: str, fraccion: float) -> None:
+    """
+    Reescribe una fracción de las descripciones con comas y comillas, que
+    obligan a escribirlas entre comillas.
+    """
+    with open(ruta, 'r', newline='', encoding='utf-8') as archivo:
+        filas = list(csv.reader(archivo))
+    aleatorio = random.Random(3)
+    for fila in filas[1:]:
+        if aleatorio.random() < fraccion:
+            fila[3] = f'{fila[3]}, "especial"'
+    with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+        csv.writer(archivo).writerows(filas)
+
+
+def medir(ruta: str, repeticiones: int) -> Dict[str, float]:
+    """
+    Mejor tiempo de cada lector en varias lecturas completas.
+
+    Las repeticiones se intercalan entre lectores para que las variaciones
+    de carga de la máquina afecten a todos por igual.
+    """
+    mejores = {nombre: float("inf") for nombre, _, _ in LECTORES}
+    for _ in range(repeticiones):
+        for nombre, funcion, _ in LECTORES:
+            inicio = time.perf_counter()
+            funcion(ruta)
+            mejores[nombre] = min(mejores[nombre], time.perf_counter() - inicio)
+    return mejores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--comillas", type=float, default=0.0,
+                        help="fracción de descripciones que requieren comillas")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "ledger.csv")
+        generar_ledger(ruta, args.filas)
+        if args.comillas:
+            agregar_comillas(ruta, args.comillas)
+        megas = os.path.getsize(ruta) / (1024 * 1024)
+        print(f"{args.filas} filas ({megas:.1f} MiB), {args.comillas:.1%} entre comillas\n")
+
+        tabla, _, fin = cargar_tabla(ruta, COLUMNAS)
+        if not guardar_instantanea(ruta + ".instantanea", tabla, ruta, fin):
+            raise RuntimeError("no se pudo guardar la instantánea")
+
+        for nombre, funcion, _ in LECTORES:
+            if funcion(ruta) != args.filas:
+                raise RuntimeError(f"{nombre} no leyó todas las filas")
+        tiempos = medir(ruta, args.repeticiones)
+
+        print(f"{'lector':>18} | {'segundos':>8} | {'filas/s':>10} | {'MiB/s':>7} | aceleración")
+        print("-" * 70)
+        for nombre, _, referencia in LECTORES:
+            segundos = tiempos[nombre]
+            aceleracion = f"{tiempos[referencia] / segundos:.1f}x vs {referencia}" if referencia else ""
+            print(f"{nombre:>18} | {segundos:8.3f} | {args.filas / segundos:10.0f} | "
+                  f"{megas / segundos:7.1f} | {aceleracion}")
+
+
+if __name__ == "__main__":
+    main()
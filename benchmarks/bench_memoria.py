@@ -0,0 +1,70 @@
+"""
+Benchmark de memoria de la ruta de lectura
+Compara el pico de memoria de materializar el ledger (obtener_gastos) con el
+de las agregaciones en streaming (en_memoria=False) para varios tamaños, y
+mide cuánto ocupa por fila el ledger columnar en memoria (en_memoria=True)
+
+Uso:
+    python3 benchmarks/bench_memoria.py [--tamanos 10000 100000 300000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sinteticos import generar_ledger
+from backend import GestorGastos
+
+
+def medir(funcion):
+    """
+    Ejecuta una función midiendo su pico de memoria y su duración.
+
+    Returns:
+        Tupla (pico en MiB, segundos)
+    """
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcion()
+    duracion = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / (1024 * 1024), duracion
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    args = parser.parse_args()
+
+    print(f"{'filas':>10} | {'obtener_gastos':>18} | {'estadísticas stream':>20} | "
+          f"{'totales cat. stream':>20} | {'ledger columnar':>22}")
+    print("-" * 103)
+    with tempfile.TemporaryDirectory() as directorio:
+        for cantidad in args.tamanos:
+            ruta = generar_ledger(os.path.join(directorio, f"ledger_{cantidad}.csv"), cantidad)
+            # Sin resúmenes mensuales: se mide el recorrido en streaming
+            gestor = GestorGastos(ruta, en_memoria=False, usar_resumenes=False)
+
+            lista = medir(gestor.obtener_gastos)
+            stats = medir(gestor.obtener_estadisticas)
+            categorias = medir(gestor.calcular_total_por_categoria)
+
+            # Ledger en memoria: se mide lo que queda retenido tras la carga
+            tracemalloc.start()
+            en_memoria = GestorGastos(ruta, usar_resumenes=False)
+            en_memoria.calcular_total()
+            retenido, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f"{cantidad:>10} | {lista[0]:8.2f} MiB {lista[1]:5.2f}s | "
+                  f"{stats[0]:9.3f} MiB {stats[1]:5.2f}s | "
+                  f"{categorias[0]:9.3f} MiB {categorias[1]:5.2f}s | "
+                  f"{retenido / (1024 * 1024):8.2f} MiB {retenido / cantidad:5.0f} B/fila")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark de agregación en paralelo sobre el ledger particionado
+Genera un ledger sintético, lo particiona por mes y mide totales por
+categoría y estadísticas con distinta cantidad de procesos, sin reutilizar
+los acumulados de una consulta anterior (cada repetición lee todos los
+segmentos)
+
+Uso:
+    python3 benchmarks/bench_particionado.py [--filas 2000000] [--procesos 1 2 4 8]
+                                             [--repeticiones 3]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from sinteticos import generar_ledger
+from almacen_particionado import AlmacenamientoParticionado, particionar
+
+
+def medir(directorio: str, procesos: int, repeticiones: int) -> float:
+    """
+    Mejor tiempo de totales por categoría más estadísticas con ``procesos``.
+    """
+    almacen = AlmacenamientoParticionado(directorio, procesos=procesos)
+    try:
+        # Arranque del grupo de procesos fuera de la medición
+        almacen.estadisticas()
+        mejor = float("inf")
+        for _ in range(repeticiones):
+            almacen.invalidar_cache()
+            inicio = time.perf_counter()
+            almacen.totales_por_categoria()
+            almacen.invalidar_cache()
+            almacen.estadisticas()
+            mejor = min(mejor, time.perf_counter() - inicio)
+        return mejor
+    finally:
+        almacen.cerrar()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=2_000_000)
+    parser.add_argument("--procesos", type=int, nargs="+",
+                        default=[p for p in (1, 2, 4, 8, 16) if p <= (os.cpu_count() or 1)])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "ledger.csv")
+        generar_ledger(ruta, args.filas)
+        segmentos = os.path.join(directorio, "meses")
+        particionar(ruta, segmentos)
+        cantidad = len(AlmacenamientoParticionado(segmentos, procesos=1).segmentos())
+        print(f"{args.filas} filas en {cantidad} segmentos mensuales, "
+              f"{os.cpu_count()} núcleos disponibles\n")
+
+        print(f"{'procesos':>8} | {'segundos':>8} | {'filas/s':>10} | aceleración | eficiencia")
+        print("-" * 62)
+        # Un proceso es la referencia de la aceleración
+        base = None
+        for procesos in sorted(set(args.procesos) | {1}):
+            segundos = medir(segmentos, procesos, args.repeticiones)
+            base = base or segundos
+            aceleracion = base / segundos
+            print(f"{procesos:8d} | {segundos:8.3f} | {2 * args.filas / segundos:10.0f} | "
+                  f"{aceleracion:10.1f}x | {aceleracion / procesos:9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Generador de carga para el servicio HTTP/JSON
+Abre varias conexiones persistentes contra servidor.py y envía una mezcla de
+altas, páginas del listado y estadísticas; reporta peticiones por segundo y
+las latencias p50/p99 por tipo de petición
+
+Sin --puerto, levanta su propio servidor sobre un ledger temporal.
+
+Uso:
+    python3 benchmarks/carga_servidor.py [--conexiones 16] [--peticiones 5000]
+                                         [--escrituras 0.5] [--durable]
+                                         [--host 127.0.0.1 --puerto 8080]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from sinteticos import RAIZ_PROYECTO
+
+
+def percentil(valores: List[float], fraccion: float) -> float:
+    """
+    Percentil por el método del rango más cercano (valores ordenados).
+    """
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(fraccion * len(valores)))]
+
+
+async def peticion(lector: asyncio.StreamReader, escritor: asyncio.StreamWriter,
+                   metodo: str, ruta: str, datos=None) -> Tuple[int, bytes]:
+    """
+    Envía una petición por una conexión persistente y lee la respuesta.
+
+    Returns:
+        Tupla (estado HTTP, cuerpo)
+    """
+    cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else b""
+    escritor.write(f"{metodo} {ruta} HTTP/1.1\r\nHost: localhost\r\n"
+                   f"Content-Type: application/json\r\n"
+                   f"Content-Length: {len(cuerpo)}\r\n\r\n".encode('latin-1') + cuerpo)
+    await escritor.drain()
+
+    estado = int((await lector.readline()).split()[1])
+    longitud = 0
+    while True:
+        linea = await lector.readline()
+        if linea in (b"\r\n", b""):
+            break
+        nombre, _, valor = linea.decode('latin-1').partition(":")
+        if nombre.strip().lower() == "content-length":
+            longitud = int(valor)
+    return estado, await lector.readexactly(longitud)
+
+
+async def cliente(host: str, puerto: int, cantidad: int, escrituras: float,
+                  latencias: Dict[str, List[float]], errores: List[str]) -> None:
+    """
+    Una conexión que envía ``cantidad`` peticiones seguidas.
+    """
+    lector, escritor = await asyncio.open_connection(host, puerto)
+    azar = random.Random()
+    try:
+        for i in range(cantidad):
+            sorteo = azar.random()
+            if sorteo < escrituras:
+                tipo, metodo, ruta = "alta", "POST", "/gastos"
+                datos = {"categoria": azar.choice(["Comida", "Transporte", "Hogar"]),
+                         "descripcion": f"carga {i}", "monto": round(azar.uniform(1, 200), 2)}
+            elif sorteo < escrituras + (1 - escrituras) / 2:
+                tipo, metodo, ruta, datos = "página", "GET", "/gastos?inicio=0&cantidad=50", None
+            else:
+                tipo, metodo, ruta, datos = "estadísticas", "GET", "/estadisticas", None
+            comienzo = time.perf_counter()
+            estado, cuerpo = await peticion(lector, escritor, metodo, ruta, datos)
+            latencias[tipo].append(time.perf_counter() - comienzo)
+            if estado >= 300:
+                errores.append(f"{tipo}: {estado} {cuerpo[:100]!r}")
+    finally:
+        escritor.close()
+
+
+async def generar_carga(host: str, puerto: int, conexiones: int, peticiones: int,
+                        escrituras: float) -> Tuple[float, Dict[str, List[float]], List[str]]:
+    """
+    Reparte las peticiones entre las conexiones y las lanza a la vez.
+
+    Returns:
+        Tupla (segundos totales, latencias por tipo, errores)
+    """
+    latencias: Dict[str, List[float]] = {"alta": [], "página": [], "estadísticas": []}
+    errores: List[str] = []
+    por_conexion = max(1, peticiones // conexiones)
+    comienzo = time.perf_counter()
+    await asyncio.gather(*(cliente(host, puerto, por_conexion, escrituras, latencias, errores)
+                           for _ in range(conexiones)))
+    return time.perf_counter() - comienzo, latencias, errores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=None,
+                        help="servidor ya en marcha (por defecto se levanta uno temporal)")
+    parser.add_argument("--conexiones", type=int, default=16)
+    parser.add_argument("--peticiones", type=int, default=5000)
+    parser.add_argument("--escrituras", type=float, default=0.5,
+                        help="fracción de altas; el resto se reparte entre páginas y estadísticas")
+    parser.add_argument("--durable", action="store_true",
+                        help="levantar el servidor temporal en modo durable")
+    args = parser.parse_args()
+
+    proceso = None
+    directorio = None
+    puerto = args.puerto
+    if puerto is None:
+        directorio = tempfile.TemporaryDirectory()
+        comando = [sys.executable, os.path.join(RAIZ_PROYECTO, "servidor.py"),
+                   "--archivo", os.path.join(directorio.name, "gastos.csv"),
+                   "--host", args.host, "--puerto", "0"]
+        if args.durable:
+            comando.append("--durable")
+        proceso = subprocess.Popen(comando, stdout=subprocess.PIPE, text=True)
+        # El servidor anuncia el puerto elegido en su última línea de arranque
+        while True:
+            linea = proceso.stdout.readline()
+            if not linea:
+                raise RuntimeError("El servidor terminó antes de escuchar")
+            if linea.startswith("Escuchando en"):
+                puerto = int(linea.rsplit(":", 1)[1])
+                break
+
+    try:
+        duracion, latencias, errores = asyncio.run(
+            generar_carga(args.host, puerto, args.conexiones, args.peticiones, args.escrituras))
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+            directorio.cleanup()
+
+    total = sum(len(valores) for valores in latencias.values())
+    print(f"{args.conexiones} conexiones, {total} peticiones en {duracion:.2f} s: "
+          f"{total / duracion:.0f} peticiones/s")
+    print(f"{'tipo':>14} | {'cantidad':>8} | {'p50 ms':>8} | {'p99 ms':>8}")
+    print("-" * 48)
+    for tipo, valores in list(latencias.items()) + [("todas", sum(latencias.values(), []))]:
+        valores.sort()
+        print(f"{tipo:>14} | {len(valores):>8} | {percentil(valores, 0.50) * 1000:8.2f} | "
+              f"{percentil(valores, 0.99) * 1000:8.2f}")
+    if errores:
+        print(f"✗ {len(errores)} respuestas con error, por ejemplo: {errores[0]}")
+
+
+if __name__ == "__main__":
+    main()
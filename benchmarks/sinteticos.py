@@ -0,0 +1,57 @@
+"""
+Generación de ledgers sintéticos para los benchmarks
+Escribe archivos CSV con el formato de GestorGastos sin pasar por el backend,
+de modo que crear millones de filas tome solo unos segundos
+"""
+
+import csv
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+# Permite importar backend.py y el resto de módulos del proyecto
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ_PROYECTO not in sys.path:
+    sys.path.insert(0, RAIZ_PROYECTO)
+
+CATEGORIAS = ["Comida", "Transporte", "Entretenimiento", "Salud",
+              "Educación", "Servicios", "Hogar", "Otros"]
+
+DESCRIPCIONES = ["Supermercado semanal", "Uber al aeropuerto", "Cine con palomitas",
+                 "Farmacia - Vitaminas", "Libro de Python", "Internet mensual",
+                 "Bombillas LED", "Desayuno en cafetería", "Gasolina", "Estacionamiento"]
+
+
+def generar_ledger(ruta: str, cantidad: int, semilla: int = 42,
+                   inicio: datetime = datetime(2020, 1, 1)) -> str:
+    """
+    Genera un ledger CSV sintético con fechas crecientes.
+
+    Args:
+        ruta: Archivo CSV a crear (se sobrescribe si existe)
+        cantidad: Cantidad de gastos a generar
+        semilla: Semilla del generador aleatorio (resultados reproducibles)
+        inicio: Fecha del primer gasto
+
+    Returns:
+        La ruta del archivo generado
+    """
+    aleatorio = random.Random(semilla)
+    # Repartir los gastos en unos 5 años con fechas crecientes
+    paso = max(1, int(5 * 365 * 24 * 3600 / max(cantidad, 1)))
+    fecha = inicio
+    with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(["id", "fecha", "categoria", "descripcion", "monto"])
+        for id_gasto in range(1, cantidad + 1):
+            fecha += timedelta(seconds=aleatorio.randint(1, 2 * paso))
+            escritor.writerow((id_gasto,
+                               fecha.strftime("%Y-%m-%d %H:%M:%S"),
+                               aleatorio.choice(CATEGORIAS),
+                               aleatorio.choice(DESCRIPCIONES),
+                               f"{aleatorio.randint(100, 50000) / 100:.2f}"))
+    for auxiliar in (ruta + ".borrados", ruta + ".ultimo_id"):
+        if os.path.exists(auxiliar):
+            os.remove(auxiliar)
+    return ruta
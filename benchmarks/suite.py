@@ -0,0 +1,296 @@
+"""
+Suite de benchmarks del backend
+Genera ledgers sintéticos de varios tamaños y mide las operaciones públicas
+de GestorGastos (carga, guardar_gasto, obtener_gastos, calcular_total,
+calcular_total_por_categoria, obtener_estadisticas y eliminar_gasto).
+Registra tiempo de pared, pico de RSS y pico de memoria asignada en JSON y
+puede compararse contra una línea base guardada, marcando las regresiones.
+
+Cada operación corre en un proceso propio sobre una copia del ledger, de modo
+que el pico de RSS corresponde solo a esa operación y las escrituras no
+afectan a las mediciones siguientes.
+
+Uso:
+    python3 benchmarks/suite.py [--tamanos 1000 10000 100000] [--salida resultados.json]
+                                [--linea-base base.json] [--tolerancia 0.25]
+                                [--motor csv|sqlite|particionado] [--streaming]
+                                [--sin-resumenes]
+
+Ejemplo de flujo:
+    python3 benchmarks/suite.py --salida base.json             # antes del cambio
+    python3 benchmarks/suite.py --linea-base base.json          # después del cambio
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sinteticos import generar_ledger
+from backend import GestorGastos, MOTORES
+from almacen_particionado import particionar
+
+try:
+    import resource
+except ImportError:  # Windows: sin pico de RSS
+    resource = None
+
+# Operaciones medidas, en orden de ejecución
+OPERACIONES = ["carga", "guardar_gasto", "obtener_gastos", "calcular_total",
+               "calcular_total_por_categoria", "obtener_estadisticas", "eliminar_gasto"]
+
+# Las operaciones de escritura se miden sobre varias llamadas y se informa por llamada
+LLAMADAS_ESCRITURA = 200
+
+# Las lecturas más rápidas se repiten hasta ocupar al menos este tiempo por
+# medición, para que la resolución del reloj no domine el resultado
+DURACION_MINIMA = 0.02
+
+
+def pico_rss_mib() -> Optional[float]:
+    """
+    Pico de memoria residente del proceso actual en MiB (None si no se puede medir).
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB; macOS, bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def preparar(operacion: str, ruta: str, opciones: Dict) -> Callable[[], object]:
+    """
+    Abre el ledger (salvo para "carga") y retorna la función a medir.
+    """
+    if operacion == "carga":
+        def cargar():
+            gestor = GestorGastos(ruta, **opciones)
+            gestor.contar_gastos()
+            gestor.cerrar()
+        return cargar
+
+    gestor = GestorGastos(ruta, **opciones)
+    # Carga inicial y resúmenes fuera de la medición: se mide la operación en régimen
+    gestor.contar_gastos()
+    gestor.obtener_estadisticas()
+    aleatorio = random.Random(7)
+
+    if operacion == "guardar_gasto":
+        def guardar():
+            for i in range(LLAMADAS_ESCRITURA):
+                gestor.guardar_gasto("Comida", f"benchmark {i}", 10 + i % 90)
+        return guardar
+    if operacion == "eliminar_gasto":
+        # Ids sin repetir entre repeticiones: cada llamada elimina un gasto existente
+        ids = list(range(1, gestor.contar_gastos() + 1))
+        aleatorio.shuffle(ids)
+
+        def eliminar():
+            for _ in range(min(LLAMADAS_ESCRITURA, len(ids))):
+                gestor.eliminar_gasto(ids.pop())
+        return eliminar
+    return getattr(gestor, operacion)
+
+
+def medir_operacion(operacion: str, ruta: str, opciones: Dict, repeticiones: int,
+                    resultados) -> None:
+    """
+    Proceso hijo: mide una operación y envía sus métricas por la cola.
+    """
+    try:
+        funcion = preparar(operacion, ruta, opciones)
+        rss_base = pico_rss_mib()
+        if operacion in ("carga", "guardar_gasto", "eliminar_gasto"):
+            llamadas = LLAMADAS_ESCRITURA if operacion != "carga" else 1
+            vueltas = 1
+        else:
+            # Primera llamada de calentamiento, usada también para calibrar
+            inicio = time.perf_counter()
+            funcion()
+            vueltas = max(1, min(10_000, int(DURACION_MINIMA
+                                             / max(time.perf_counter() - inicio, 1e-7))))
+            llamadas = vueltas
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            for _ in range(vueltas):
+                funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        rss_pico = pico_rss_mib()
+
+        # Las asignaciones se miden en una pasada aparte: tracemalloc distorsiona el tiempo
+        tracemalloc.start()
+        funcion()
+        _, pico_asignado = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        resultados.put({
+            "segundos": statistics.median(tiempos) / llamadas,
+            "segundos_min": min(tiempos) / llamadas,
+            "pico_rss_mib": rss_pico,
+            "rss_operacion_mib": (rss_pico - rss_base) if rss_base is not None else None,
+            "asignado_pico_mib": pico_asignado / (1024 * 1024),
+        })
+    except Exception as e:
+        resultados.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def ejecutar_suite(tamanos: List[int], opciones: Dict, repeticiones: int) -> Dict:
+    """
+    Mide todas las operaciones para cada tamaño.
+
+    Returns:
+        Diccionario "operación@tamaño" -> métricas
+    """
+    contexto = multiprocessing.get_context("spawn")
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        for tamano in tamanos:
+            original = os.path.join(directorio, f"ledger_{tamano}.csv")
+            print(f"Generando ledger de {tamano} filas...", flush=True)
+            generar_ledger(original, tamano)
+            if opciones.get("motor") == "sqlite":
+                # El ledger SQLite se construye una vez importando el CSV generado
+                origen = GestorGastos(original, usar_resumenes=False)
+                destino = GestorGastos(original + ".db", motor="sqlite", usar_resumenes=False)
+                destino.guardar_gastos_lote((g.categoria, g.descripcion, g.monto, g.fecha)
+                                            for g in origen.iterar_gastos())
+                destino.cerrar()
+                original += ".db"
+            elif opciones.get("motor") == "particionado":
+                particionar(original, original + ".meses")
+                original += ".meses"
+
+            for operacion in OPERACIONES:
+                copia = os.path.join(directorio, f"copia_{tamano}_{operacion}"
+                                                 f"{os.path.splitext(original)[1]}")
+                if os.path.isdir(original):
+                    shutil.copytree(original, copia)
+                else:
+                    shutil.copyfile(original, copia)
+                cola = contexto.Queue()
+                hijo = contexto.Process(target=medir_operacion,
+                                        args=(operacion, copia, opciones, repeticiones, cola))
+                hijo.start()
+                metricas = cola.get()
+                hijo.join()
+                for archivo in os.listdir(directorio):
+                    if archivo.startswith(os.path.basename(copia)):
+                        ruta = os.path.join(directorio, archivo)
+                        if os.path.isdir(ruta):
+                            shutil.rmtree(ruta)
+                        else:
+                            os.remove(ruta)
+
+                clave = f"{operacion}@{tamano}"
+                resultados[clave] = metricas
+                if "error" in metricas:
+                    print(f"  {clave:>40}: ✗ {metricas['error']}")
+                else:
+                    print(f"  {clave:>40}: {metricas['segundos'] * 1000:10.3f} ms  "
+                          f"RSS {metricas['pico_rss_mib'] or 0:8.1f} MiB  "
+                          f"asignado {metricas['asignado_pico_mib']:8.2f} MiB", flush=True)
+    return resultados
+
+
+def comparar(actual: Dict, base: Dict, tolerancia: float, tolerancia_memoria: float) -> int:
+    """
+    Compara los resultados con una línea base e imprime las diferencias.
+
+    Se compara el mejor tiempo de cada operación, que es el menos sensible
+    al ruido de la máquina. Una operación es una regresión si ese tiempo
+    supera el de la base en más de ``tolerancia`` (fracción) o su memoria
+    asignada en más de ``tolerancia_memoria``.
+
+    Returns:
+        Cantidad de regresiones encontradas
+    """
+    regresiones = 0
+    print(f"\n{'operación':>40} | {'base ms':>10} | {'actual ms':>10} | {'tiempo':>8} | "
+          f"{'memoria':>8} | estado")
+    print("-" * 100)
+    for clave, metricas in actual.items():
+        anterior = base.get(clave)
+        if anterior is None or "error" in metricas or "error" in anterior:
+            print(f"{clave:>40} | {'-':>10} | {'-':>10} | {'-':>8} | {'-':>8} | sin comparar")
+            continue
+        razon_tiempo = metricas["segundos_min"] / max(anterior["segundos_min"], 1e-9)
+        razon_memoria = (metricas["asignado_pico_mib"]
+                         / max(anterior["asignado_pico_mib"], 1e-6))
+        if razon_tiempo > 1 + tolerancia or razon_memoria > 1 + tolerancia_memoria:
+            estado = "⚠ REGRESIÓN"
+            regresiones += 1
+        elif razon_tiempo < 1 / (1 + tolerancia):
+            estado = "mejora"
+        else:
+            estado = "="
+        print(f"{clave:>40} | {anterior['segundos_min'] * 1000:10.3f} | "
+              f"{metricas['segundos_min'] * 1000:10.3f} | {razon_tiempo:7.2f}x | "
+              f"{razon_memoria:7.2f}x | {estado}")
+    return regresiones
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="filas de cada ledger (hasta 10_000_000)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--motor", default="csv", choices=MOTORES)
+    parser.add_argument("--streaming", action="store_true", help="usar en_memoria=False")
+    parser.add_argument("--sin-resumenes", action="store_true",
+                        help="desactivar los resúmenes mensuales")
+    parser.add_argument("--salida", default=None, help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--linea-base", default=None, help="resultados JSON con los que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="aumento de tiempo tolerado antes de marcar regresión (0.25 = 25%%)")
+    parser.add_argument("--tolerancia-memoria", type=float, default=0.25,
+                        help="aumento de memoria asignada tolerado")
+    args = parser.parse_args()
+
+    opciones = {"motor": args.motor, "en_memoria": not args.streaming,
+                "usar_resumenes": not args.sin_resumenes}
+    resultados = ejecutar_suite(args.tamanos, opciones, args.repeticiones)
+    documento = {
+        "metadatos": {
+            "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "procesador": platform.processor() or platform.machine(),
+            "opciones": opciones,
+            "repeticiones": args.repeticiones,
+            "llamadas_escritura": LLAMADAS_ESCRITURA,
+            "duracion_minima": DURACION_MINIMA,
+        },
+        "resultados": resultados,
+    }
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(documento, archivo, ensure_ascii=False, indent=2)
+        print(f"\n✓ Resultados guardados en {args.salida}")
+
+    if args.linea_base:
+        with open(args.linea_base, 'r', encoding='utf-8') as archivo:
+            base = json.load(archivo)
+        if base.get("metadatos", {}).get("opciones") != opciones:
+            print("⚠ La línea base se midió con otras opciones; la comparación es orientativa")
+        regresiones = comparar(resultados, base["resultados"], args.tolerancia,
+                               args.tolerancia_memoria)
+        if regresiones:
+            print(f"\n✗ {regresiones} regresiones respecto de {args.linea_base}")
+            sys.exit(1)
+        print(f"\n✓ Sin regresiones respecto de {args.linea_base}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Bloqueo de archivos entre procesos
+Coordina a los procesos que comparten un ledger mediante flock sobre un
+archivo de bloqueo auxiliar, con modos compartido (lectura) y exclusivo
+(escritura)
+"""
+
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock, el bloqueo solo protege entre hilos
+    fcntl = None
+
+
+class BloqueoArchivo:
+    """
+    Bloqueo reentrante de lectura/escritura sobre ``<archivo>.lock``.
+
+    Se bloquea un archivo auxiliar y no el propio ledger porque las
+    reescrituras atómicas (``os.replace``) cambian el inodo del ledger y
+    dejarían sin efecto un bloqueo tomado sobre él. Dentro de un mismo
+    proceso, un ``threading.RLock`` serializa a los hilos y permite anidar
+    secciones: una sección compartida dentro de una exclusiva reutiliza el
+    bloqueo exclusivo. No se admite pasar de compartido a exclusivo
+    anidando, porque dos procesos haciéndolo a la vez se bloquearían.
+    """
+
+    def __init__(self, archivo: str):
+        """
+        Args:
+            archivo: Ruta del archivo a proteger; el bloqueo usa ``<archivo>.lock``
+        """
+        self.archivo_bloqueo = archivo + ".lock"
+        self._hilos = threading.RLock()
+        self._descriptor = None
+        self._nivel = 0
+        self._exclusivo = False
+
+    def _adquirir(self, exclusivo: bool) -> None:
+        self._hilos.acquire()
+        if self._nivel:
+            if exclusivo and not self._exclusivo:
+                self._hilos.release()
+                raise RuntimeError("No se puede pasar de bloqueo compartido a exclusivo")
+            self._nivel += 1
+            return
+
+        try:
+            if fcntl is not None:
+                self._descriptor = os.open(self.archivo_bloqueo, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._descriptor, fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+        except OSError:
+            if self._descriptor is not None:
+                os.close(self._descriptor)
+                self._descriptor = None
+            self._hilos.release()
+            raise
+        self._nivel = 1
+        self._exclusivo = exclusivo
+
+    def _liberar(self) -> None:
+        self._nivel -= 1
+        if self._nivel == 0 and self._descriptor is not None:
+            # Cerrar el descriptor libera el flock
+            os.close(self._descriptor)
+            self._descriptor = None
+        self._hilos.release()
+
+    @contextmanager
+    def compartido(self) -> Iterator[None]:
+        """
+        Sección de lectura: varios procesos pueden leer a la vez.
+        """
+        self._adquirir(exclusivo=False)
+        try:
+            yield
+        finally:
+            self._liberar()
+
+    @contextmanager
+    def exclusivo(self) -> Iterator[None]:
+        """
+        Sección de escritura: excluye a todos los demás lectores y escritores.
+        """
+        self._adquirir(exclusivo=True)
+        try:
+            yield
+        finally:
+            self._liberar()
+
+
+# Un único bloqueo por archivo dentro del proceso: dos instancias sobre el
+# mismo ledger no deben competir entre sí por el flock
+_bloqueos: "weakref.WeakValueDictionary[str, BloqueoArchivo]" = weakref.WeakValueDictionary()
+_bloqueos_mutex = threading.Lock()
+
+
+def obtener_bloqueo(archivo: str) -> BloqueoArchivo:
+    """
+    Retorna el bloqueo del archivo indicado, compartido por todo el proceso.
+    """
+    clave = os.path.abspath(archivo)
+    with _bloqueos_mutex:
+        bloqueo = _bloqueos.get(clave)
+        if bloqueo is None:
+            bloqueo = BloqueoArchivo(archivo)
+            _bloqueos[clave] = bloqueo
+        return bloqueo
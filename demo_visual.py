@@ -3,8 +3,8 @@ Script de demostración visual del sistema
 Crea gastos de ejemplo para mostrar el sistema en acción
 """
 
+from analitica import AnalisisGastos
 from backend import GestorGastos
-import time
 
 def crear_datos_demo():
     """Crea datos de demostración en gastos.csv"""
@@ -31,13 +31,15 @@ def crear_datos_demo():
     
     print("\n📝 Registrando gastos de ejemplo:\n")
     
+    # Un solo lote: un archivo abierto y un fsync para todos los gastos
+    _, errores = gestor.guardar_gastos_lote(gastos_demo)
+    mensajes_error = dict(errores)
+    
     for i, (categoria, descripcion, monto) in enumerate(gastos_demo, 1):
-        exito, mensaje = gestor.guardar_gasto(categoria, descripcion, monto)
-        if exito:
-            print(f"✓ {i:2d}. [{categoria:15s}] {descripcion:30s} ${monto:6.2f}")
+        if i in mensajes_error:
+            print(f"✗ {i:2d}. Error: {mensajes_error[i]}")
         else:
-            print(f"✗ {i:2d}. Error: {mensaje}")
-        time.sleep(0.1)  # Pequeña pausa para efecto visual
+            print(f"✓ {i:2d}. [{categoria:15s}] {descripcion:30s} ${monto:6.2f}")
     
     print("\n" + "=" * 60)
     print("\n📊 ESTADÍSTICAS GENERADAS:\n")
@@ -56,6 +58,19 @@ def crear_datos_demo():
         barra = "█" * int(porcentaje / 2)
         print(f"   {categoria:15s} ${total:7.2f}  {barra} {porcentaje:.1f}%")
     
+    print("\n📈 ANÁLISIS DE LOS MONTOS:\n")
+    analisis = AnalisisGastos.desde_gestor(gestor)
+    for cuantil, monto in analisis.percentiles((25, 50, 75, 90)).items():
+        print(f"   Percentil {cuantil:2d}:      ${monto:8.2f}")
+    print()
+    dias = analisis.por_dia_semana()
+    mayor = max(dia['total'] for dia in dias.values()) or 1
+    for nombre, dia in dias.items():
+        barra = "█" * int(dia['total'] / mayor * 30)
+        print(f"   {nombre:10s} ${dia['total']:7.2f}  {barra}")
+    motor = "NumPy" if analisis.usar_numpy else "Python (NumPy no instalado)"
+    print(f"\n   Calculado con {motor}")
+    
     print("\n" + "=" * 60)
     print("\n✅ ¡Datos de demostración creados exitosamente!")
     print("\n🚀 Ahora ejecuta: python3 main.py")
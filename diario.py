@@ -0,0 +1,365 @@
+"""
+Diario de escritura anticipada (write-ahead log)
+Registra las altas en un archivo de solo anexado antes de llevarlas al
+ledger, agrupando las sincronizaciones a disco (group commit) para
+sostener tasas altas de ingesta con una ventana de durabilidad acotada
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Callable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no se puede detectar otro escritor durable
+    fcntl = None
+
+# Políticas de sincronización a disco del diario
+POLITICAS_FSYNC = ("siempre", "grupo", "nunca")
+
+# Registro del diario: [id, fecha, categoria, descripcion, monto] como texto
+Registro = List[str]
+
+
+def _codificar(registro: Registro) -> bytes:
+    """
+    Codifica un registro como una línea "<crc32> <json>\\n".
+
+    El JSON nunca contiene saltos de línea, de modo que cada registro
+    ocupa exactamente una línea y una escritura cortada se detecta por el
+    CRC o por la falta del salto final.
+    """
+    datos = json.dumps(registro, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return b"%08x %s\n" % (zlib.crc32(datos), datos)
+
+
+def leer_registros(archivo_diario: str) -> List[Registro]:
+    """
+    Lee los registros válidos de un diario.
+
+    La lectura se detiene en el primer registro incompleto o con CRC
+    incorrecto: lo que sigue a una escritura cortada por una caída no se
+    considera confirmado.
+
+    Returns:
+        Registros en orden de escritura (lista vacía si el diario no existe)
+    """
+    registros = []
+    try:
+        with open(archivo_diario, 'rb') as archivo:
+            for linea in archivo:
+                if not linea.endswith(b"\n") or len(linea) < 10:
+                    break
+                crc, datos = linea[:8], linea[9:-1]
+                try:
+                    if int(crc, 16) != zlib.crc32(datos):
+                        break
+                    registro = json.loads(datos.decode('utf-8'))
+                except ValueError:
+                    break
+                registros.append(registro)
+    except FileNotFoundError:
+        pass
+    return registros
+
+
+def tomar_diario(archivo_diario: str, esperar: bool = False) -> Optional[int]:
+    """
+    Abre el diario y toma su bloqueo exclusivo (flock).
+
+    Solo un proceso puede tener el diario: el escritor durable lo retiene
+    mientras está abierto y la recuperación lo toma para reproducirlo.
+
+    Args:
+        archivo_diario: Ruta del diario (se crea si no existe)
+        esperar: Esperar a que se libere en lugar de fallar de inmediato
+
+    Returns:
+        Descriptor con el bloqueo tomado, o None si otro proceso lo tiene
+    """
+    descriptor = os.open(archivo_diario, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+    if fcntl is not None:
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX if esperar else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(descriptor)
+            return None
+    return descriptor
+
+
+class DiarioEscritura:
+    """
+    Diario de altas con confirmación por grupos.
+
+    ``anotar`` deja el registro en un búfer y retorna de inmediato. Un
+    hilo de fondo confirma el búfer cuando junta ``registros_por_grupo``
+    registros o cuando el más antiguo lleva ``espera_ms`` milisegundos:
+    escribe el grupo en el diario con una sola llamada, lo sincroniza a
+    disco según la política y luego entrega el grupo a ``al_confirmar``
+    (que lo aplica al ledger).
+
+    Escribir en el diario y aplicar al ledger son pasos separados: si
+    falla ``al_confirmar``, el grupo ya está en el diario y solo se
+    reintenta la aplicación. Si falla la escritura, el diario se recorta
+    al tamaño anterior y el grupo vuelve al búfer.
+
+    Políticas de ``fsync``:
+        - ``"grupo"``: un fsync por grupo; una caída pierde a lo sumo los
+          últimos ``espera_ms`` milisegundos de altas.
+        - ``"siempre"``: cada alta espera (``esperar``) a que su grupo esté
+          sincronizado; los hilos que anotan a la vez comparten el mismo fsync.
+        - ``"nunca"``: el diario se escribe pero la sincronización queda en
+          manos del sistema operativo.
+    """
+
+    def __init__(self, descriptor: int, al_confirmar: Callable[[List[Registro]], None],
+                 politica_fsync: str = "grupo", registros_por_grupo: int = 1000,
+                 espera_ms: float = 10.0):
+        """
+        Inicializa el diario y arranca el hilo de confirmación.
+
+        Args:
+            descriptor: Descriptor del diario con el bloqueo tomado (ver ``tomar_diario``)
+            al_confirmar: Función que recibe cada grupo ya escrito en el diario;
+                si falla, se le vuelve a entregar el mismo grupo
+            politica_fsync: "grupo", "siempre" o "nunca"
+            registros_por_grupo: Tamaño de grupo que dispara una confirmación
+            espera_ms: Tiempo máximo que un registro espera en el búfer
+
+        Raises:
+            ValueError: Si la política no es válida
+        """
+        if politica_fsync not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync desconocida: {politica_fsync} "
+                             f"(disponibles: {', '.join(POLITICAS_FSYNC)})")
+        self.politica_fsync = politica_fsync
+        self.registros_por_grupo = max(1, registros_por_grupo)
+        self.espera = max(0.0, espera_ms) / 1000
+        self._descriptor = descriptor
+        self._al_confirmar = al_confirmar
+        self._condicion = threading.Condition()
+        self._pendientes: List[Registro] = []
+        self._primero = 0.0
+        # Registros anotados, escritos en el diario y aplicados al ledger
+        # desde la apertura (para esperar y sincronizar)
+        self._anotados = 0
+        self._escritos = 0
+        self._aplicados = 0
+        # Último error del hilo, para informarlo si se abandona al cerrar
+        self._error: Optional[Exception] = None
+        self._urgente = False
+        self._cerrado = False
+        self._hilo = threading.Thread(target=self._ciclo, name="diario-escritura", daemon=True)
+        self._hilo.start()
+
+    def anotar(self, registro: Registro) -> int:
+        """
+        Agrega un registro al grupo en curso y retorna su número de orden.
+
+        No espera a que el registro llegue a disco: con la política
+        "siempre", quien anota debe llamar luego a ``esperar``.
+        """
+        with self._condicion:
+            if self._cerrado:
+                raise RuntimeError("El diario está cerrado")
+            if not self._pendientes:
+                self._primero = time.monotonic()
+            self._pendientes.append(registro)
+            self._anotados += 1
+            if self.politica_fsync == "siempre":
+                # Sin espera: lo que se anote durante este fsync forma el grupo siguiente
+                self._urgente = True
+                self._condicion.notify_all()
+            elif len(self._pendientes) >= self.registros_por_grupo or len(self._pendientes) == 1:
+                self._condicion.notify_all()
+            return self._anotados
+
+    def _esperar_contador(self, atributo: str, numero: int) -> None:
+        """
+        Espera a que el contador indicado llegue a ``numero``.
+
+        Raises:
+            RuntimeError: Si el hilo terminó (al cerrar) sin llegar
+        """
+        with self._condicion:
+            while getattr(self, atributo) < numero and self._hilo.is_alive():
+                self._condicion.wait(0.5)
+            if getattr(self, atributo) < numero:
+                raise RuntimeError(self._describir_fallo())
+
+    def esperar(self, numero: int) -> None:
+        """
+        Espera a que el registro con el número indicado esté escrito (y
+        sincronizado, según la política) en el diario.
+
+        Raises:
+            RuntimeError: Si el diario se cerró sin poder escribirlo
+        """
+        self._esperar_contador('_escritos', numero)
+
+    def sincronizar(self) -> None:
+        """
+        Confirma de inmediato el grupo en curso y espera a que esté
+        aplicado al ledger.
+
+        Raises:
+            RuntimeError: Si el diario se cerró sin poder aplicarlo
+        """
+        with self._condicion:
+            if self._aplicados == self._anotados:
+                return
+            self._urgente = True
+            self._condicion.notify_all()
+            numero = self._anotados
+        self._esperar_contador('_aplicados', numero)
+
+    def truncar(self) -> None:
+        """
+        Vacía el diario. Solo debe llamarse cuando todo lo confirmado ya
+        está sincronizado en el ledger (por ejemplo, desde ``al_confirmar``).
+        """
+        os.ftruncate(self._descriptor, 0)
+        if self.politica_fsync != "nunca":
+            os.fsync(self._descriptor)
+
+    def tamano(self) -> int:
+        """
+        Retorna el tamaño actual del diario en bytes.
+        """
+        return os.fstat(self._descriptor).st_size
+
+    def _describir_fallo(self) -> str:
+        perdidos = self._anotados - self._escritos
+        sin_aplicar = self._escritos - self._aplicados
+        partes = []
+        if perdidos:
+            partes.append(f"{perdidos} altas no llegaron al diario")
+        if sin_aplicar:
+            partes.append(f"{sin_aplicar} altas quedaron en el diario sin aplicar "
+                          f"(se reaplicarán al abrir el ledger)")
+        detalle = f": {str(self._error)}" if self._error is not None else ""
+        return f"Diario cerrado con errores, {' y '.join(partes)}{detalle}"
+
+    def _ciclo(self) -> None:
+        """
+        Hilo de confirmación: junta grupos, los escribe en el diario y los
+        aplica al ledger.
+        """
+        # Grupos ya escritos en el diario cuya aplicación falló
+        por_aplicar: List[Registro] = []
+        while True:
+            with self._condicion:
+                while not self._pendientes and not por_aplicar and not self._cerrado:
+                    self._condicion.wait()
+                if not self._pendientes and not por_aplicar:
+                    return
+                grupo: List[Registro] = []
+                if self._pendientes:
+                    limite = self._primero + self.espera
+                    while (len(self._pendientes) < self.registros_por_grupo
+                           and not self._urgente and not self._cerrado):
+                        restante = limite - time.monotonic()
+                        if restante <= 0:
+                            break
+                        self._condicion.wait(restante)
+                    grupo, self._pendientes = self._pendientes, []
+                    self._urgente = False
+
+            if grupo:
+                try:
+                    self._escribir(grupo)
+                except Exception as e:
+                    print(f"Error al escribir el diario, se reintentará: {str(e)}")
+                    with self._condicion:
+                        self._error = e
+                        if not self._pendientes:
+                            self._primero = time.monotonic()
+                        self._pendientes[:0] = grupo
+                        if not self._cerrado:
+                            self._condicion.wait(max(self.espera, 0.1))
+                            continue
+                        # Al cerrar no se reintenta indefinidamente: lo que no
+                        # llegó al diario se informa como perdido
+                        self._pendientes = []
+                        self._condicion.notify_all()
+                    if not por_aplicar:
+                        return
+                else:
+                    por_aplicar.extend(grupo)
+                    with self._condicion:
+                        self._escritos += len(grupo)
+                        self._condicion.notify_all()
+
+            if not por_aplicar:
+                continue
+            try:
+                self._al_confirmar(por_aplicar)
+            except Exception as e:
+                print(f"Error al aplicar el diario al ledger, se reintentará: {str(e)}")
+                with self._condicion:
+                    self._error = e
+                    if not self._cerrado:
+                        self._condicion.wait(max(self.espera, 0.1))
+                        continue
+                    # Al cerrar, lo que quedó sin aplicar sigue en el diario
+                    self._pendientes = []
+                    self._condicion.notify_all()
+                    return
+            with self._condicion:
+                self._aplicados += len(por_aplicar)
+                self._condicion.notify_all()
+            por_aplicar = []
+
+    def _escribir(self, grupo: List[Registro]) -> None:
+        """
+        Escribe un grupo en el diario. Si falla, recorta el diario al tamaño
+        que tenía, para que un registro cortado no oculte a los siguientes.
+        """
+        datos = b"".join(_codificar(registro) for registro in grupo)
+        tamano = os.fstat(self._descriptor).st_size
+        try:
+            escritos = 0
+            while escritos < len(datos):
+                escritos += os.write(self._descriptor, datos[escritos:])
+            if self.politica_fsync != "nunca":
+                os.fsync(self._descriptor)
+        except Exception:
+            try:
+                os.ftruncate(self._descriptor, tamano)
+            except OSError:
+                pass
+            raise
+
+    def detener(self) -> None:
+        """
+        Confirma lo pendiente y detiene el hilo, sin liberar el diario.
+
+        Raises:
+            RuntimeError: Si quedaron altas sin escribir en el diario o sin
+                aplicar al ledger
+        """
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify_all()
+        self._hilo.join()
+        if self._aplicados < self._anotados:
+            raise RuntimeError(self._describir_fallo())
+
+    def cerrar(self) -> None:
+        """
+        Confirma lo pendiente, detiene el hilo y libera el diario.
+
+        Raises:
+            RuntimeError: Si quedaron altas sin escribir o sin aplicar (el
+                diario se libera igual)
+        """
+        if self._descriptor is None:
+            return
+        try:
+            self.detener()
+        finally:
+            os.close(self._descriptor)
+            self._descriptor = None
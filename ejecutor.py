@@ -0,0 +1,151 @@
+"""
+Ejecutor en segundo plano para la interfaz Tkinter
+Corre las llamadas al backend en un hilo de trabajo y entrega los
+resultados al hilo de Tk consultando periódicamente con root.after
+"""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Hashable, Optional
+
+
+class _Tarea:
+    """
+    Trabajo enviado al ejecutor junto con sus funciones de respuesta.
+    """
+
+    __slots__ = ('futuro', 'al_terminar', 'al_fallar', 'clave', 'descartada')
+
+    def __init__(self, futuro: Future, al_terminar: Optional[Callable[[Any], None]],
+                 al_fallar: Optional[Callable[[Exception], None]], clave: Optional[Hashable]):
+        self.futuro = futuro
+        self.al_terminar = al_terminar
+        self.al_fallar = al_fallar
+        self.clave = clave
+        self.descartada = False
+
+
+class EjecutorTk:
+    """
+    Ejecuta funciones en un único hilo de trabajo y entrega sus resultados
+    en el hilo de Tk.
+
+    Un solo hilo basta para que el backend, que no es seguro entre hilos,
+    reciba las llamadas de a una y en el orden en que se enviaron; los
+    resultados también se entregan en ese orden. Las tareas enviadas con
+    la misma ``clave`` se combinan: la nueva cancela a la anterior si aún
+    no empezó, o descarta su resultado si ya estaba corriendo.
+    """
+
+    def __init__(self, root, al_cambiar_estado: Optional[Callable[[bool], None]] = None,
+                 intervalo_ms: int = 30):
+        """
+        Crea el ejecutor.
+
+        Args:
+            root: Ventana de Tk cuyo ``after`` se usa para consultar resultados
+            al_cambiar_estado: Función que recibe True al empezar a haber
+                trabajo pendiente y False al terminar (indicador de carga)
+            intervalo_ms: Milisegundos entre consultas mientras hay trabajo
+        """
+        self._root = root
+        self._al_cambiar_estado = al_cambiar_estado
+        self._intervalo_ms = intervalo_ms
+        self._hilo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backend")
+        self._pendientes: Deque[_Tarea] = deque()
+        self._por_clave: Dict[Hashable, _Tarea] = {}
+        self._consulta_programada = False
+        self._cerrado = False
+
+    @property
+    def ocupado(self) -> bool:
+        """
+        Indica si hay tareas enviadas que todavía no se entregaron.
+        """
+        return bool(self._pendientes)
+
+    def enviar(self, funcion: Callable[[], Any],
+               al_terminar: Optional[Callable[[Any], None]] = None,
+               al_fallar: Optional[Callable[[Exception], None]] = None,
+               clave: Optional[Hashable] = None) -> None:
+        """
+        Programa una función para el hilo de trabajo.
+
+        Debe llamarse desde el hilo de Tk. ``al_terminar`` y ``al_fallar``
+        también se ejecutan en el hilo de Tk.
+
+        Args:
+            funcion: Función sin argumentos que corre en segundo plano
+            al_terminar: Recibe el valor retornado por ``funcion``
+            al_fallar: Recibe la excepción lanzada por ``funcion``
+            clave: Identifica trabajos equivalentes; solo se entrega el último
+        """
+        if self._cerrado:
+            return
+        estaba_ocupado = self.ocupado
+
+        if clave is not None:
+            anterior = self._por_clave.get(clave)
+            if anterior is not None:
+                anterior.descartada = True
+                anterior.futuro.cancel()
+
+        tarea = _Tarea(self._hilo.submit(funcion), al_terminar, al_fallar, clave)
+        self._pendientes.append(tarea)
+        if clave is not None:
+            self._por_clave[clave] = tarea
+
+        if not estaba_ocupado and self._al_cambiar_estado is not None:
+            self._al_cambiar_estado(True)
+        self._programar_consulta()
+
+    def _programar_consulta(self) -> None:
+        if not self._consulta_programada:
+            self._consulta_programada = True
+            self._root.after(self._intervalo_ms, self._consultar)
+
+    def _consultar(self) -> None:
+        """
+        Entrega, en orden de envío, los resultados de las tareas terminadas.
+        """
+        self._consulta_programada = False
+        if self._cerrado:
+            return
+
+        try:
+            while self._pendientes and self._pendientes[0].futuro.done():
+                tarea = self._pendientes.popleft()
+                if tarea.clave is not None and self._por_clave.get(tarea.clave) is tarea:
+                    del self._por_clave[tarea.clave]
+                if tarea.descartada:
+                    continue
+
+                error = tarea.futuro.exception()
+                if error is None:
+                    if tarea.al_terminar is not None:
+                        tarea.al_terminar(tarea.futuro.result())
+                elif tarea.al_fallar is not None:
+                    tarea.al_fallar(error)
+                else:
+                    # Tk lo reporta con report_callback_exception
+                    raise error
+        finally:
+            if self._pendientes:
+                self._programar_consulta()
+            elif self._al_cambiar_estado is not None:
+                self._al_cambiar_estado(False)
+
+    def cerrar(self) -> None:
+        """
+        Detiene el hilo de trabajo.
+
+        Las tareas con clave (consultas que se pueden repetir) se cancelan;
+        las demás, como las escrituras, se dejan terminar para no perderlas.
+        """
+        self._cerrado = True
+        for tarea in self._pendientes:
+            if tarea.clave is not None:
+                tarea.futuro.cancel()
+        self._pendientes.clear()
+        self._por_clave.clear()
+        self._hilo.shutdown(wait=True)
@@ -0,0 +1,489 @@
+"""
+Espacio de trabajo con varios ledgers
+Registra ledgers con nombre (por hogar, proyecto o año) y los abre a
+través de un pool acotado de GestorGastos: los menos usados recientemente
+liberan su memoria o se cierran al superar el presupuesto. Permite además
+consultar totales y estadísticas combinados de varios ledgers
+
+Uso:
+    python3 espacio_trabajo.py listar
+    python3 espacio_trabajo.py agregar Casa gastos_casa.csv [--motor csv]
+    python3 espacio_trabajo.py quitar Casa
+    python3 espacio_trabajo.py resumen [--desde 2025-01] [--hasta 2025-12]
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from almacenamiento import PERIODOS, a_centavos
+from backend import GestorGastos, MOTORES
+
+# Archivo donde se guarda el registro de ledgers del espacio
+ARCHIVO_ESPACIO = "espacio_gastos.json"
+
+# Versión del formato del registro
+VERSION_ESPACIO = 1
+
+# Gestores abiertos a la vez (conexiones, diarios y procesos de agregación)
+MAX_ABIERTOS = 8
+
+# Memoria total para los ledgers abiertos, en bytes
+MEMORIA_MAXIMA = 512 * 2 ** 20
+
+
+class LedgerEspacio(NamedTuple):
+    """
+    Ledger registrado en el espacio de trabajo.
+    """
+    nombre: str
+    ruta: str
+    motor: str
+
+
+class EspacioTrabajo:
+    """
+    Conjunto de ledgers con nombre abiertos mediante un pool LRU de gestores.
+
+    ``obtener`` abre el gestor de un ledger o reutiliza el que ya está en
+    el pool, que conserva su ledger en memoria: volver a un ledger reciente
+    no lo reanaliza. Tras cada acceso se ajusta el pool, empezando por los
+    ledgers usados hace más tiempo: si hay más de ``max_abiertos`` se
+    cierran (liberando conexiones, diarios y procesos) y si la memoria
+    estimada supera ``memoria_maxima`` se descartan sus cachés, que se
+    vuelven a leer en la próxima consulta. El ledger pedido y el activo
+    nunca se desalojan.
+
+    Como GestorGastos, no es seguro entre hilos: en la interfaz se usa
+    solo desde el hilo del ejecutor.
+    """
+
+    def __init__(self, archivo: Optional[str] = ARCHIVO_ESPACIO,
+                 max_abiertos: int = MAX_ABIERTOS,
+                 memoria_maxima: Optional[int] = MEMORIA_MAXIMA, **opciones):
+        """
+        Abre el espacio de trabajo y lee su registro de ledgers.
+
+        Args:
+            archivo: Archivo JSON del registro (None: el registro solo vive
+                en memoria). Las rutas relativas de los ledgers se resuelven
+                desde su directorio
+            max_abiertos: Cantidad máxima de gestores abiertos a la vez
+            memoria_maxima: Memoria en bytes para los ledgers abiertos
+                (None: sin límite)
+            **opciones: Argumentos adicionales para cada GestorGastos
+                (por ejemplo, usar_instantanea o procesos)
+        """
+        if max_abiertos < 1:
+            raise ValueError("El pool debe admitir al menos un ledger abierto")
+        self.archivo = archivo
+        self.max_abiertos = max_abiertos
+        self.memoria_maxima = memoria_maxima
+        self._opciones = opciones
+        self._ledgers: Dict[str, LedgerEspacio] = {}
+        # Ledger que muestra la interfaz (se conserva al desalojar)
+        self.activo: Optional[str] = None
+        # Gestores abiertos, del usado hace más tiempo al más reciente
+        self._abiertos: "OrderedDict[str, GestorGastos]" = OrderedDict()
+        # Contadores del pool: gestores abiertos, cerrados y cachés liberadas
+        self.aperturas = 0
+        self.cierres = 0
+        self.liberaciones = 0
+        if archivo is not None:
+            self._cargar()
+
+    def _cargar(self) -> None:
+        """
+        Lee el registro; si falta o no es válido, se empieza vacío.
+        """
+        if not os.path.exists(self.archivo):
+            return
+        try:
+            with open(self.archivo, 'r', encoding='utf-8') as archivo:
+                datos = json.load(archivo)
+            if datos.get('version') != VERSION_ESPACIO:
+                raise ValueError(f"versión {datos.get('version')} no soportada")
+            ledgers = [LedgerEspacio(ledger['nombre'], ledger['ruta'], ledger['motor'])
+                       for ledger in datos['ledgers']]
+            activo = datos.get('activo')
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Espacio de trabajo descartado, se empieza vacío: {str(e)}")
+            return
+        self._ledgers = {ledger.nombre: ledger for ledger in ledgers}
+        self.activo = activo if activo in self._ledgers else None
+
+    def guardar(self) -> bool:
+        """
+        Escribe el registro de forma atómica mediante un archivo temporal.
+
+        Returns:
+            True si se guardó (si no, el registro sigue valiendo en memoria)
+        """
+        if self.archivo is None:
+            return True
+        temporal = f"{self.archivo}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                json.dump({'version': VERSION_ESPACIO,
+                           'activo': self.activo,
+                           'ledgers': [ledger._asdict() for ledger in self._ledgers.values()]},
+                          archivo, ensure_ascii=False, indent=2)
+            os.replace(temporal, self.archivo)
+        except OSError as e:
+            print(f"Error al guardar el espacio de trabajo: {str(e)}")
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return False
+        return True
+
+    @property
+    def nombres(self) -> List[str]:
+        """
+        Nombres de los ledgers registrados, en orden de registro.
+        """
+        return list(self._ledgers)
+
+    @property
+    def ledgers(self) -> List[LedgerEspacio]:
+        """
+        Ledgers registrados, en orden de registro.
+        """
+        return list(self._ledgers.values())
+
+    def ruta_de(self, nombre: str) -> str:
+        """
+        Ruta del ledger, resuelta desde el directorio del registro.
+
+        Raises:
+            KeyError: Si el ledger no está registrado
+        """
+        ruta = self._ledger(nombre).ruta
+        if self.archivo is None:
+            return ruta
+        return os.path.join(os.path.dirname(os.path.abspath(self.archivo)), ruta)
+
+    def _ledger(self, nombre: str) -> LedgerEspacio:
+        ledger = self._ledgers.get(nombre)
+        if ledger is None:
+            raise KeyError(f"Ledger desconocido: {nombre}")
+        return ledger
+
+    def agregar_ledger(self, nombre: str, ruta: str, motor: str = "csv") -> Tuple[bool, str]:
+        """
+        Registra un ledger (el archivo se crea al abrirlo si no existe).
+
+        Args:
+            nombre: Nombre único del ledger en el espacio
+            ruta: Archivo del ledger (relativa al registro o absoluta)
+            motor: Motor de almacenamiento del ledger
+
+        Returns:
+            Tupla (éxito: bool, mensaje: str)
+        """
+        nombre = str(nombre or "").strip()
+        if not nombre:
+            return False, "El nombre del ledger no puede estar vacío"
+        if nombre in self._ledgers:
+            return False, f"Ya existe un ledger llamado '{nombre}'"
+        if not ruta or not str(ruta).strip():
+            return False, "La ruta del ledger no puede estar vacía"
+        if motor not in MOTORES:
+            return False, (f"Motor de almacenamiento desconocido: {motor} "
+                           f"(disponibles: {', '.join(MOTORES)})")
+        self._ledgers[nombre] = LedgerEspacio(nombre, str(ruta).strip(), motor)
+        self.guardar()
+        return True, f"Ledger '{nombre}' agregado al espacio de trabajo"
+
+    def quitar_ledger(self, nombre: str) -> Tuple[bool, str]:
+        """
+        Quita un ledger del registro y cierra su gestor; sus archivos no se borran.
+
+        Returns:
+            Tupla (éxito: bool, mensaje: str)
+        """
+        if nombre not in self._ledgers:
+            return False, f"No existe un ledger llamado '{nombre}'"
+        if nombre == self.activo:
+            return False, "No se puede quitar el ledger activo"
+        if nombre in self._abiertos:
+            self._cerrar(nombre)
+        del self._ledgers[nombre]
+        self.guardar()
+        return True, f"Ledger '{nombre}' quitado del espacio de trabajo"
+
+    def obtener(self, nombre: str) -> GestorGastos:
+        """
+        Retorna el gestor del ledger, abriéndolo si no está en el pool.
+
+        El gestor puede cerrarse en un acceso posterior a otro ledger: no
+        debe guardarse más allá de la operación en curso (salvo el del
+        ledger activo).
+
+        Raises:
+            KeyError: Si el ledger no está registrado
+        """
+        ledger = self._ledger(nombre)
+        gestor = self._abiertos.get(nombre)
+        if gestor is None:
+            gestor = GestorGastos(self.ruta_de(nombre), motor=ledger.motor, **self._opciones)
+            self._abiertos[nombre] = gestor
+            self.aperturas += 1
+        else:
+            self._abiertos.move_to_end(nombre)
+        self.ajustar(nombre)
+        return gestor
+
+    def activar(self, nombre: str) -> GestorGastos:
+        """
+        Marca el ledger como activo (el que muestra la interfaz, que no se
+        desaloja) y retorna su gestor.
+
+        Raises:
+            KeyError: Si el ledger no está registrado
+        """
+        gestor = self.obtener(nombre)
+        self.activo = nombre
+        self.guardar()
+        return gestor
+
+    def caliente(self, nombre: str) -> bool:
+        """
+        Indica si el ledger está abierto con sus gastos en memoria, es
+        decir, si cambiar a él no requiere volver a leerlo.
+        """
+        gestor = self._abiertos.get(nombre)
+        return gestor is not None and gestor.memoria_en_uso() > 0
+
+    @property
+    def abiertos(self) -> List[str]:
+        """
+        Ledgers con gestor abierto, del usado hace más tiempo al más reciente.
+        """
+        return list(self._abiertos)
+
+    def memoria_en_uso(self) -> int:
+        """
+        Estimación en bytes de la memoria de todos los ledgers abiertos.
+        """
+        return sum(gestor.memoria_en_uso() for gestor in self._abiertos.values())
+
+    def _cerrar(self, nombre: str) -> None:
+        gestor = self._abiertos.pop(nombre)
+        try:
+            gestor.cerrar()
+        except Exception as e:
+            print(f"Error al cerrar el ledger '{nombre}': {str(e)}")
+        self.cierres += 1
+
+    def ajustar(self, conservar: Optional[str] = None) -> None:
+        """
+        Desaloja los ledgers usados hace más tiempo hasta respetar el límite
+        de gestores abiertos y el presupuesto de memoria.
+
+        Args:
+            conservar: Ledger que no se desaloja además del activo
+        """
+        protegidos = {conservar, self.activo}
+        for nombre in [nombre for nombre in self._abiertos if nombre not in protegidos]:
+            if len(self._abiertos) <= self.max_abiertos:
+                break
+            self._cerrar(nombre)
+
+        if self.memoria_maxima is None:
+            return
+        uso = {nombre: gestor.memoria_en_uso() for nombre, gestor in self._abiertos.items()}
+        total = sum(uso.values())
+        for nombre, gestor in self._abiertos.items():
+            if total <= self.memoria_maxima:
+                break
+            if nombre in protegidos or not uso[nombre]:
+                continue
+            gestor.liberar_memoria()
+            total -= uso[nombre]
+            self.liberaciones += 1
+
+    def cerrar(self) -> None:
+        """
+        Cierra todos los gestores abiertos (en modo durable, vuelcan antes
+        su grupo pendiente).
+        """
+        for nombre in list(self._abiertos):
+            self._cerrar(nombre)
+
+    # Consultas combinadas: se recorren los ledgers de a uno, así que el
+    # pool respeta sus límites aunque el espacio tenga muchos ledgers
+
+    def _por_ledger(self, consulta: Callable[[GestorGastos], object],
+                    nombres: Optional[List[str]]) -> Iterator[Tuple[str, object]]:
+        for nombre in self.nombres if nombres is None else nombres:
+            yield nombre, consulta(self.obtener(nombre))
+        self.ajustar()
+
+    def totales_por_ledger(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                           categoria: Optional[str] = None,
+                           nombres: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Total de cada ledger con los filtros indicados.
+
+        Args:
+            desde: Fecha mínima inclusiva
+            hasta: Fecha máxima inclusiva
+            categoria: Sumar solo los gastos de esta categoría
+            nombres: Ledgers a consultar (por defecto, todos)
+
+        Returns:
+            Diccionario ledger -> total
+        """
+        return dict(self._por_ledger(
+            lambda gestor: gestor.calcular_total(desde, hasta, categoria), nombres))
+
+    def calcular_total(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                       categoria: Optional[str] = None,
+                       nombres: Optional[List[str]] = None) -> float:
+        """
+        Total combinado de los ledgers (ver ``totales_por_ledger``).
+        """
+        totales = self.totales_por_ledger(desde, hasta, categoria, nombres)
+        return sum(map(a_centavos, totales.values())) / 100
+
+    def calcular_total_por_categoria(self, desde: Optional[str] = None,
+                                     hasta: Optional[str] = None,
+                                     nombres: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Totales por categoría sumando todos los ledgers.
+
+        Returns:
+            Diccionario con categorías y sus totales
+        """
+        centavos: Dict[str, int] = {}
+        for _, totales in self._por_ledger(
+                lambda gestor: gestor.calcular_total_por_categoria(desde, hasta), nombres):
+            for categoria, total in totales.items():
+                centavos[categoria] = centavos.get(categoria, 0) + a_centavos(total)
+        return {categoria: total / 100 for categoria, total in centavos.items()}
+
+    def calcular_totales_por_periodo(self, periodo: str = "mes", desde: Optional[str] = None,
+                                     hasta: Optional[str] = None,
+                                     categoria: Optional[str] = None,
+                                     nombres: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Totales por mes o por semana sumando todos los ledgers.
+
+        Returns:
+            Diccionario ordenado por período con sus totales
+
+        Raises:
+            ValueError: Si el período no es válido
+        """
+        if periodo not in PERIODOS:
+            raise ValueError(f"Período desconocido: {periodo} "
+                             f"(disponibles: {', '.join(PERIODOS)})")
+        centavos: Dict[str, int] = {}
+        for _, totales in self._por_ledger(
+                lambda gestor: gestor.calcular_totales_por_periodo(periodo, desde, hasta,
+                                                                   categoria), nombres):
+            for clave, total in totales.items():
+                centavos[clave] = centavos.get(clave, 0) + a_centavos(total)
+        return {clave: centavos[clave] / 100 for clave in sorted(centavos)}
+
+    def obtener_estadisticas(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                             categoria: Optional[str] = None,
+                             nombres: Optional[List[str]] = None) -> Dict[str, any]:
+        """
+        Estadísticas combinadas de los ledgers, con las mismas claves que
+        las de ``GestorGastos.obtener_estadisticas``.
+        """
+        cantidad = total = 0
+        mayores, menores = [], []
+        for _, stats in self._por_ledger(
+                lambda gestor: gestor.obtener_estadisticas(desde, hasta, categoria), nombres):
+            if not stats['cantidad_gastos']:
+                continue
+            cantidad += stats['cantidad_gastos']
+            total += a_centavos(stats['total_gastos'])
+            mayores.append(a_centavos(stats['gasto_mayor']))
+            menores.append(a_centavos(stats['gasto_menor']))
+
+        if cantidad == 0:
+            return {
+                'total_gastos': 0,
+                'cantidad_gastos': 0,
+                'promedio': 0,
+                'gasto_mayor': 0,
+                'gasto_menor': 0
+            }
+
+        return {
+            'total_gastos': total / 100,
+            'cantidad_gastos': cantidad,
+            'promedio': total / 100 / cantidad,
+            'gasto_mayor': max(mayores) / 100,
+            'gasto_menor': min(menores) / 100
+        }
+
+
+def main(argumentos: Optional[List[str]] = None) -> int:
+    """
+    Punto de entrada de la administración del espacio de trabajo.
+
+    Returns:
+        Código de salida (0 si la operación se completó, 1 si hubo un error)
+    """
+    parser = argparse.ArgumentParser(
+        description="Administra los ledgers del espacio de trabajo y sus totales combinados")
+    parser.add_argument("--espacio", default=ARCHIVO_ESPACIO,
+                        help=f"Registro del espacio de trabajo (por defecto: {ARCHIVO_ESPACIO})")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("listar", help="Muestra los ledgers registrados")
+    agregar = comandos.add_parser("agregar", help="Registra un ledger")
+    agregar.add_argument("nombre", help="Nombre del ledger en el espacio")
+    agregar.add_argument("ruta", help="Archivo del ledger (se crea si no existe)")
+    agregar.add_argument("--motor", default="csv", choices=MOTORES,
+                         help="Motor de almacenamiento del ledger")
+    quitar = comandos.add_parser("quitar", help="Quita un ledger (sin borrar sus archivos)")
+    quitar.add_argument("nombre", help="Nombre del ledger en el espacio")
+    resumen = comandos.add_parser("resumen", help="Totales de cada ledger y combinados")
+    resumen.add_argument("--desde", default=None, help="Fecha mínima (AAAA-MM-DD, AAAA-MM o AAAA)")
+    resumen.add_argument("--hasta", default=None, help="Fecha máxima inclusiva")
+    resumen.add_argument("--categoria", default=None, help="Sumar solo esta categoría")
+    args = parser.parse_args(argumentos)
+
+    espacio = EspacioTrabajo(args.espacio)
+    try:
+        if args.comando == "listar":
+            for ledger in espacio.ledgers:
+                marca = "*" if ledger.nombre == espacio.activo else " "
+                print(f"{marca} {ledger.nombre:<20} {ledger.motor:<12} {ledger.ruta}")
+            return 0
+        if args.comando in ("agregar", "quitar"):
+            if args.comando == "agregar":
+                exito, mensaje = espacio.agregar_ledger(args.nombre, args.ruta, args.motor)
+            else:
+                exito, mensaje = espacio.quitar_ledger(args.nombre)
+            print(f"✓ {mensaje}" if exito else f"✗ {mensaje}",
+                  file=sys.stdout if exito else sys.stderr)
+            return 0 if exito else 1
+
+        filtros = {'desde': args.desde, 'hasta': args.hasta, 'categoria': args.categoria}
+        totales = espacio.totales_por_ledger(**filtros)
+        for nombre, total in totales.items():
+            print(f"   {nombre:<20} ${total:>14,.2f}")
+        print(f"   {'Total':<20} ${sum(map(a_centavos, totales.values())) / 100:>14,.2f}")
+        if args.categoria is None:
+            print("\nPor categoría:")
+            por_categoria = espacio.calcular_total_por_categoria(args.desde, args.hasta)
+            for categoria, total in sorted(por_categoria.items(), key=lambda c: -c[1]):
+                print(f"   {categoria:<20} ${total:>14,.2f}")
+        return 0
+    except Exception as e:
+        print(f"✗ Error al consultar el espacio de trabajo: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        espacio.cerrar()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
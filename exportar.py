@@ -0,0 +1,352 @@
+"""
+Exportación de gastos en streaming
+Escribe el ledger (o una parte filtrada) en CSV, JSON Lines o un formato
+binario por columnas, con compresión gzip o zstd opcional. Las filas se
+procesan por bloques: nunca hay más de un bloque en memoria
+
+Uso:
+    python3 exportar.py salida.jsonl.gz [--origen gastos.csv] [--formato jsonl]
+                        [--desde 2025-01] [--hasta 2025-06] [--categoria Comida]
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from itertools import islice
+from typing import BinaryIO, Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+from almacenamiento import Gasto, a_centavos
+from tabla_columnar import FECHA_INVALIDA, epoch_a_fecha, fecha_a_epoch
+
+try:
+    import zstandard
+except ImportError:  # Sin zstandard solo se ofrece gzip
+    zstandard = None
+
+FORMATOS = ("csv", "jsonl", "columnar")
+
+COMPRESIONES = ("ninguna", "gzip", "zstd")
+
+# Filas que se leen, convierten y escriben de una vez; bloques más grandes
+# no exportan más rápido y suman unos 10 MiB por cada 10.000 filas
+FILAS_POR_BLOQUE = 10_000
+
+# Nivel de gzip: el 9 por defecto comprime apenas más y es varias veces más lento
+NIVEL_GZIP = 6
+
+COLUMNAS = ["id", "fecha", "categoria", "descripcion", "monto"]
+
+# Formato columnar: mágico, versión y orden de bytes al inicio del archivo
+MAGICO_COLUMNAR = b'GASTOSCL'
+VERSION_COLUMNAR = 1
+_INICIO = struct.Struct('<8sII')
+
+# Cabecera de cada grupo de filas: filas y largo de los bloques de categorías
+# (JSON), descripciones (UTF-8) y fechas inválidas (JSON). Un grupo de 0 filas
+# cierra el archivo y va seguido del total de filas
+_GRUPO = struct.Struct('<QQQQ')
+_TOTAL = struct.Struct('<Q')
+
+# Columnas de ancho fijo de cada grupo: (nombre, tipo de array)
+_COLUMNAS_FIJAS = (('ids', 'q'), ('fechas', 'q'), ('centavos', 'q'), ('categorias', 'I'),
+                   ('largos', 'I'))
+
+_ORDEN = 1 if sys.byteorder == 'little' else 2
+
+
+class ResultadoExportacion(NamedTuple):
+    """
+    Resumen de una exportación.
+    """
+    filas: int
+    bytes_datos: int        # Bytes generados antes de comprimir
+    bytes_archivo: int      # Tamaño final del archivo
+    segundos: float
+
+    @property
+    def filas_por_segundo(self) -> float:
+        return self.filas / self.segundos if self.segundos else 0.0
+
+    @property
+    def mb_por_segundo(self) -> float:
+        return self.bytes_datos / 2 ** 20 / self.segundos if self.segundos else 0.0
+
+    def describir(self) -> str:
+        """
+        Texto con las filas, el tiempo y el rendimiento.
+        """
+        return (f"{self.filas} gastos exportados en {self.segundos:.2f} s "
+                f"({self.filas_por_segundo:,.0f} filas/s, {self.mb_por_segundo:.1f} MB/s; "
+                f"{self.bytes_archivo / 2 ** 20:.1f} MB en disco)")
+
+
+def compresion_de(ruta: str) -> str:
+    """
+    Deduce la compresión por la extensión (".gz", ".zst").
+    """
+    if ruta.endswith(".gz"):
+        return "gzip"
+    if ruta.endswith(".zst"):
+        return "zstd"
+    return "ninguna"
+
+
+def _abrir(ruta: str, modo: str, compresion: str) -> BinaryIO:
+    """
+    Abre un archivo binario con la compresión indicada.
+
+    Raises:
+        ValueError: Si la compresión no existe o falta su paquete
+    """
+    if compresion == "ninguna":
+        return open(ruta, modo)
+    if compresion == "gzip":
+        return gzip.open(ruta, modo, compresslevel=NIVEL_GZIP) if 'w' in modo else gzip.open(ruta, modo)
+    if compresion == "zstd":
+        if zstandard is None:
+            raise ValueError("La compresión zstd requiere el paquete zstandard "
+                             "(pip install zstandard)")
+        return zstandard.open(ruta, modo)
+    raise ValueError(f"Compresión desconocida: {compresion} "
+                     f"(disponibles: {', '.join(COMPRESIONES)})")
+
+
+def bloques(gastos: Iterable[Gasto], filas_por_bloque: int = FILAS_POR_BLOQUE) -> Iterator[List[Gasto]]:
+    """
+    Agrupa un recorrido de gastos en listas de a lo sumo ``filas_por_bloque``.
+    """
+    gastos = iter(gastos)
+    while True:
+        bloque = list(islice(gastos, filas_por_bloque))
+        if not bloque:
+            return
+        yield bloque
+
+
+def _bloque_csv(bloque: List[Gasto]) -> bytes:
+    texto = io.StringIO()
+    csv.writer(texto).writerows((gasto.id, gasto.fecha, gasto.categoria, gasto.descripcion,
+                                 f"{gasto.monto:.2f}") for gasto in bloque)
+    return texto.getvalue().encode('utf-8')
+
+
+def _bloque_jsonl(bloque: List[Gasto]) -> bytes:
+    return ''.join(json.dumps({'id': gasto.id, 'fecha': gasto.fecha,
+                               'categoria': gasto.categoria,
+                               'descripcion': gasto.descripcion,
+                               'monto': round(gasto.monto, 2)}, ensure_ascii=False) + '\n'
+                   for gasto in bloque).encode('utf-8')
+
+
+def _bloque_columnar(bloque: List[Gasto]) -> bytes:
+    """
+    Un grupo de filas del formato columnar: cada columna contigua, con las
+    categorías como códigos de un diccionario propio del grupo.
+    """
+    columnas = {nombre: array(tipo) for nombre, tipo in _COLUMNAS_FIJAS}
+    codigos = {}
+    fechas_texto = {}
+    descripciones = []
+    for posicion, gasto in enumerate(bloque):
+        columnas['ids'].append(gasto.id)
+        try:
+            columnas['fechas'].append(fecha_a_epoch(gasto.fecha))
+        except ValueError:
+            columnas['fechas'].append(FECHA_INVALIDA)
+            fechas_texto[posicion] = gasto.fecha
+        columnas['centavos'].append(a_centavos(gasto.monto))
+        columnas['categorias'].append(codigos.setdefault(gasto.categoria, len(codigos)))
+        descripcion = gasto.descripcion.encode('utf-8')
+        columnas['largos'].append(len(descripcion))
+        descripciones.append(descripcion)
+
+    textos = [json.dumps(list(codigos), ensure_ascii=False).encode('utf-8'),
+              b''.join(descripciones),
+              json.dumps(fechas_texto, ensure_ascii=False).encode('utf-8')]
+    partes = [_GRUPO.pack(len(bloque), *map(len, textos))]
+    partes.extend(columnas[nombre].tobytes() for nombre, _ in _COLUMNAS_FIJAS)
+    partes.extend(textos)
+    return b''.join(partes)
+
+
+def _cierre_columnar(filas: int) -> bytes:
+    return _GRUPO.pack(0, 0, 0, 0) + _TOTAL.pack(filas)
+
+
+# Por formato: (inicio del archivo, codificador de un bloque, cierre según las filas escritas)
+_FORMATOS = {
+    "csv": ((','.join(COLUMNAS) + '\r\n').encode('utf-8'), _bloque_csv, lambda filas: b''),
+    "jsonl": (b'', _bloque_jsonl, lambda filas: b''),
+    "columnar": (_INICIO.pack(MAGICO_COLUMNAR, VERSION_COLUMNAR, _ORDEN), _bloque_columnar,
+                 _cierre_columnar),
+}
+
+
+def exportar_gastos(gastos: Iterable[Gasto], ruta: str, formato: str = "csv",
+                    compresion: Optional[str] = None,
+                    filas_por_bloque: int = FILAS_POR_BLOQUE,
+                    al_avanzar: Optional[Callable[[int, int], None]] = None
+                    ) -> ResultadoExportacion:
+    """
+    Escribe los gastos en ``ruta`` por bloques, de forma atómica mediante
+    un archivo temporal.
+
+    Args:
+        gastos: Recorrido de los gastos a exportar (se consume una sola vez)
+        ruta: Archivo de salida
+        formato: "csv", "jsonl" o "columnar"
+        compresion: "ninguna", "gzip" o "zstd"; por defecto según la
+            extensión de ``ruta``
+        filas_por_bloque: Filas que se convierten y escriben de una vez
+        al_avanzar: Función (filas, bytes) llamada tras escribir cada bloque
+
+    Returns:
+        Resumen con las filas, los bytes y el tiempo
+
+    Raises:
+        ValueError: Si el formato o la compresión no existen
+        OSError: Si no se puede escribir el archivo
+    """
+    if formato not in _FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato} (disponibles: {', '.join(FORMATOS)})")
+    inicio_archivo, codificar, cerrar = _FORMATOS[formato]
+    compresion = compresion or compresion_de(ruta)
+
+    inicio = time.perf_counter()
+    filas = bytes_datos = 0
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        with _abrir(temporal, 'wb', compresion) as salida:
+            salida.write(inicio_archivo)
+            for bloque in bloques(gastos, filas_por_bloque):
+                datos = codificar(bloque)
+                salida.write(datos)
+                filas += len(bloque)
+                bytes_datos += len(datos)
+                if al_avanzar is not None:
+                    al_avanzar(filas, bytes_datos)
+            cierre = cerrar(filas)
+            salida.write(cierre)
+        bytes_datos += len(inicio_archivo) + len(cierre)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return ResultadoExportacion(filas, bytes_datos, os.path.getsize(ruta),
+                                time.perf_counter() - inicio)
+
+
+def _leer_exacto(archivo: BinaryIO, cantidad: int) -> bytes:
+    datos = archivo.read(cantidad)
+    if len(datos) != cantidad:
+        raise ValueError("archivo columnar truncado")
+    return datos
+
+
+def leer_columnar(ruta: str, compresion: Optional[str] = None) -> Iterator[Gasto]:
+    """
+    Recorre los gastos de un archivo columnar, un grupo de filas a la vez.
+
+    Raises:
+        ValueError: Si el archivo no es columnar o está dañado
+    """
+    with _abrir(ruta, 'rb', compresion or compresion_de(ruta)) as archivo:
+        magico, version, orden = _INICIO.unpack(_leer_exacto(archivo, _INICIO.size))
+        if magico != MAGICO_COLUMNAR or version != VERSION_COLUMNAR:
+            raise ValueError(f"'{ruta}' no es un archivo columnar de gastos")
+        leidas = 0
+        while True:
+            cantidad, *largos = _GRUPO.unpack(_leer_exacto(archivo, _GRUPO.size))
+            if cantidad == 0:
+                total, = _TOTAL.unpack(_leer_exacto(archivo, _TOTAL.size))
+                if total != leidas:
+                    raise ValueError("el total de filas no coincide")
+                return
+            columnas = {}
+            for nombre, tipo in _COLUMNAS_FIJAS:
+                columna = array(tipo)
+                columna.frombytes(_leer_exacto(archivo, cantidad * columna.itemsize))
+                if orden != _ORDEN:
+                    columna.byteswap()
+                columnas[nombre] = columna
+            categorias, descripciones, fechas_texto = (_leer_exacto(archivo, largo)
+                                                       for largo in largos)
+            nombres = json.loads(categorias)
+            fechas_texto = {int(posicion): texto
+                            for posicion, texto in json.loads(fechas_texto).items()}
+            desplazamiento = 0
+            for posicion in range(cantidad):
+                largo = columnas['largos'][posicion]
+                descripcion = descripciones[desplazamiento:desplazamiento + largo].decode('utf-8')
+                desplazamiento += largo
+                epoch = columnas['fechas'][posicion]
+                fecha = (fechas_texto.get(posicion, '') if epoch == FECHA_INVALIDA
+                         else epoch_a_fecha(epoch))
+                yield Gasto(columnas['ids'][posicion], fecha,
+                            nombres[columnas['categorias'][posicion]], descripcion,
+                            columnas['centavos'][posicion] / 100)
+            leidas += cantidad
+
+
+def main(argumentos=None) -> int:
+    """
+    Punto de entrada del exportador.
+
+    Returns:
+        Código de salida (0 si se exportó, 1 si hubo un error)
+    """
+    from backend import GestorGastos, MOTORES
+
+    parser = argparse.ArgumentParser(
+        description="Exporta los gastos del ledger en streaming (CSV, JSON Lines o columnar)")
+    parser.add_argument("salida", help="Archivo de salida (.gz o .zst comprimen)")
+    parser.add_argument("--origen", default="gastos.csv",
+                        help="Ledger de origen (por defecto: gastos.csv)")
+    parser.add_argument("--motor", default="csv", choices=MOTORES,
+                        help="Motor de almacenamiento del origen")
+    parser.add_argument("--formato", default=None, choices=FORMATOS,
+                        help="Formato de salida (por defecto según la extensión; si no, csv)")
+    parser.add_argument("--compresion", default=None, choices=COMPRESIONES,
+                        help="Compresión (por defecto según la extensión)")
+    parser.add_argument("--desde", default=None, help="Fecha mínima (AAAA-MM-DD, AAAA-MM o AAAA)")
+    parser.add_argument("--hasta", default=None, help="Fecha máxima inclusiva")
+    parser.add_argument("--categoria", default=None, help="Exportar solo esta categoría")
+    parser.add_argument("--filas-por-bloque", type=int, default=FILAS_POR_BLOQUE,
+                        help="Filas que se convierten y escriben de una vez")
+    args = parser.parse_args(argumentos)
+
+    formato = args.formato
+    if formato is None:
+        base = args.salida[:-len(".gz")] if args.salida.endswith(".gz") else args.salida
+        base = base[:-len(".zst")] if base.endswith(".zst") else base
+        extension = os.path.splitext(base)[1].lstrip('.')
+        formato = extension if extension in FORMATOS else "csv"
+
+    if not os.path.exists(args.origen):
+        print(f"✗ No existe el ledger '{args.origen}'", file=sys.stderr)
+        return 1
+    # Una sola pasada por el archivo: ni ledger en memoria ni instantánea
+    gestor = GestorGastos(args.origen, motor=args.motor, en_memoria=False,
+                          usar_instantanea=False)
+    try:
+        exito, mensaje, _ = gestor.exportar_gastos(
+            args.salida, formato, args.compresion, args.desde, args.hasta, args.categoria,
+            args.filas_por_bloque,
+            al_avanzar=lambda filas, _: print(f"\r   {filas} filas...", end='', flush=True))
+    finally:
+        gestor.cerrar()
+    print()
+    print(f"✓ {mensaje}" if exito else f"✗ {mensaje}", file=sys.stdout if exito else sys.stderr)
+    return 0 if exito else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
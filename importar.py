@@ -0,0 +1,108 @@
+"""
+Importador de gastos por línea de comandos
+Carga archivos CSV externos (por ejemplo, exportaciones bancarias) en el
+ledger usando la escritura por lotes del backend
+"""
+
+import argparse
+import csv
+import sys
+import time
+from typing import Dict, Iterator
+
+from backend import GestorGastos, MOTORES
+
+
+def leer_origen(ruta: str, columnas: Dict[str, str], delimitador: str,
+                codificacion: str) -> Iterator[Dict[str, str]]:
+    """
+    Recorre el CSV de origen fila a fila sin cargarlo en memoria.
+
+    Args:
+        ruta: Ruta del CSV de origen
+        columnas: Mapeo campo del ledger -> nombre de columna en el origen
+        delimitador: Separador de campos del origen
+        codificacion: Codificación del archivo de origen
+
+    Yields:
+        Diccionarios con las claves categoria, descripcion, monto y fecha
+    """
+    with open(ruta, 'r', newline='', encoding=codificacion) as archivo:
+        for fila in csv.DictReader(archivo, delimiter=delimitador):
+            yield {campo: fila.get(columna) for campo, columna in columnas.items()}
+
+
+def escribir_reporte(ruta: str, errores) -> None:
+    """
+    Escribe el reporte de errores por fila en formato CSV.
+
+    Args:
+        ruta: Ruta del reporte
+        errores: Lista de (fila del origen, mensaje)
+    """
+    with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(["fila", "error"])
+        escritor.writerows(errores)
+
+
+def main(argumentos=None) -> int:
+    """
+    Punto de entrada del importador.
+
+    Returns:
+        Código de salida (0 si no hubo errores, 1 si hubo filas rechazadas)
+    """
+    parser = argparse.ArgumentParser(
+        description="Importa gastos desde un CSV externo al ledger de gastos")
+    parser.add_argument("origen", help="CSV de origen a importar")
+    parser.add_argument("--destino", default="gastos.csv",
+                        help="Ledger de destino (por defecto: gastos.csv)")
+    parser.add_argument("--motor", default="csv", choices=MOTORES,
+                        help="Motor de almacenamiento del destino")
+    parser.add_argument("--reporte", default=None,
+                        help="Archivo CSV donde escribir los errores por fila")
+    parser.add_argument("--delimitador", default=",", help="Separador del origen")
+    parser.add_argument("--codificacion", default="utf-8", help="Codificación del origen")
+    parser.add_argument("--col-fecha", default="fecha", help="Columna con la fecha")
+    parser.add_argument("--col-categoria", default="categoria", help="Columna con la categoría")
+    parser.add_argument("--col-descripcion", default="descripcion",
+                        help="Columna con la descripción")
+    parser.add_argument("--col-monto", default="monto", help="Columna con el monto")
+    args = parser.parse_args(argumentos)
+
+    columnas = {
+        'fecha': args.col_fecha,
+        'categoria': args.col_categoria,
+        'descripcion': args.col_descripcion,
+        'monto': args.col_monto,
+    }
+
+    gestor = GestorGastos(args.destino, motor=args.motor)
+    inicio = time.perf_counter()
+    try:
+        filas = leer_origen(args.origen, columnas, args.delimitador, args.codificacion)
+        guardados, errores = gestor.guardar_gastos_lote(filas)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f"✗ Error al leer '{args.origen}': {str(e)}", file=sys.stderr)
+        return 2
+    duracion = time.perf_counter() - inicio
+
+    # La posición 1-based del lote corresponde a la fila de datos del origen
+    print(f"✓ {guardados} gastos importados en {duracion:.2f} s")
+    if errores:
+        print(f"✗ {len(errores)} filas rechazadas")
+        if args.reporte:
+            escribir_reporte(args.reporte, errores)
+            print(f"   Reporte de errores: {args.reporte}")
+        else:
+            for fila, mensaje in errores[:20]:
+                print(f"   Fila {fila}: {mensaje}")
+            if len(errores) > 20:
+                print(f"   ... y {len(errores) - 20} más (use --reporte)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+"""
+Índice de texto completo sobre las descripciones
+Índice invertido de las palabras de cada descripción, normalizadas sin
+tildes ni mayúsculas, con búsqueda por prefijo. Se guarda junto al ledger
+(``<archivo>.indice``) y se actualiza con cada alta o baja
+"""
+
+import os
+import re
+import struct
+import sys
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Versión del formato del archivo del índice
+VERSION_INDICE = 1
+
+MAGICO = b'GASTOSTX'
+
+# Cambios incrementales tras los que el índice se vuelve a guardar
+CAMBIOS_POR_GUARDADO = 10_000
+
+# Separador de los términos en el bloque de texto del archivo
+SEPARADOR = '\x00'
+
+# Mágico, versión, orden de bytes, firma del ledger indexado (cantidad de
+# gastos e id de la última fila), cantidad de términos, de documentos y de
+# ids en las listas, y largo del bloque de términos
+_CABECERA = struct.Struct('<8sIIQqQQQQ')
+
+_ORDEN = 1 if sys.byteorder == 'little' else 2
+
+_PALABRA = re.compile(r'\w+')
+
+
+def normalizar(texto: str) -> str:
+    """
+    Pasa un texto a minúsculas y le quita las tildes y diéresis
+    ("Crédito ÑANDÚ" -> "credito nandu").
+    """
+    descompuesto = unicodedata.normalize('NFKD', texto.casefold())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def terminos_de(texto: str) -> List[str]:
+    """
+    Retorna las palabras normalizadas de un texto, sin repetir.
+    """
+    return list(dict.fromkeys(_PALABRA.findall(normalizar(texto))))
+
+
+def coincide_texto(descripcion: str, texto: str) -> bool:
+    """
+    Indica si una descripción contiene todas las palabras de ``texto``
+    como prefijos de sus palabras (búsqueda sin índice).
+    """
+    palabras = terminos_de(descripcion)
+    return all(any(palabra.startswith(prefijo) for palabra in palabras)
+               for prefijo in terminos_de(texto))
+
+
+def _contiene(lista: array, id_gasto: int) -> bool:
+    indice = bisect_left(lista, id_gasto)
+    return indice < len(lista) and lista[indice] == id_gasto
+
+
+class IndiceTexto:
+    """
+    Índice invertido término -> ids de los gastos cuya descripción lo contiene.
+
+    Cada lista de ids está ordenada, lo que permite quitar un id o
+    comprobar si está por bisección. Los términos se guardan además en
+    una lista ordenada: los que empiezan con un prefijo forman un tramo
+    contiguo que se ubica también por bisección.
+    """
+
+    def __init__(self):
+        self.listas: Dict[str, array] = {}
+        self.terminos: List[str] = []
+        # Ids indexados, en orden creciente
+        self.documentos = array('q')
+        # (cantidad de gastos, id de la última fila) del ledger al indexarlo
+        self.firma: Tuple[int, int] = (0, 0)
+        # Crece con cada cambio; invalida la última búsqueda guardada
+        self.version = 0
+        self.cambios_sin_guardar = 0
+        self._ultima_busqueda: Optional[Tuple[str, int, List[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.documentos)
+
+    def memoria(self) -> int:
+        """
+        Estimación en bytes de la memoria que ocupan los términos y sus listas.
+        """
+        return (sys.getsizeof(self.documentos) + sys.getsizeof(self.listas)
+                + sys.getsizeof(self.terminos)
+                + sum(sys.getsizeof(termino) + sys.getsizeof(lista)
+                      for termino, lista in self.listas.items()))
+
+    @staticmethod
+    def _insertar(lista: array, id_gasto: int) -> None:
+        # Los ids nuevos son casi siempre mayores que todos los anteriores
+        if not lista or lista[-1] < id_gasto:
+            lista.append(id_gasto)
+        elif not _contiene(lista, id_gasto):
+            lista.insert(bisect_left(lista, id_gasto), id_gasto)
+
+    @staticmethod
+    def _retirar(lista: array, id_gasto: int) -> bool:
+        indice = bisect_left(lista, id_gasto)
+        if indice < len(lista) and lista[indice] == id_gasto:
+            del lista[indice]
+            return True
+        return False
+
+    def agregar(self, id_gasto: int, descripcion: str) -> None:
+        """
+        Indexa la descripción de un gasto.
+        """
+        for termino in terminos_de(descripcion):
+            lista = self.listas.get(termino)
+            if lista is None:
+                self.listas[termino] = lista = array('q')
+                insort(self.terminos, termino)
+            self._insertar(lista, id_gasto)
+        self._insertar(self.documentos, id_gasto)
+        self.version += 1
+        self.cambios_sin_guardar += 1
+
+    def agregar_lote(self, gastos: Iterable[Tuple[int, str]]) -> None:
+        """
+        Indexa muchos pares (id, descripción) de una vez.
+        """
+        nuevos = []
+        # Las descripciones se repiten mucho: cada una se normaliza una sola vez
+        terminos_por_texto: Dict[str, List[str]] = {}
+        for id_gasto, descripcion in gastos:
+            terminos = terminos_por_texto.get(descripcion)
+            if terminos is None:
+                terminos = terminos_por_texto[descripcion] = terminos_de(descripcion)
+            for termino in terminos:
+                lista = self.listas.get(termino)
+                if lista is None:
+                    self.listas[termino] = lista = array('q')
+                    nuevos.append(termino)
+                self._insertar(lista, id_gasto)
+            self._insertar(self.documentos, id_gasto)
+            self.cambios_sin_guardar += 1
+        if nuevos:
+            self.terminos = sorted(self.listas)
+        self.version += 1
+
+    def quitar(self, id_gasto: int, descripcion: Optional[str] = None) -> None:
+        """
+        Quita un gasto del índice. Sin su descripción se revisan las listas
+        de todos los términos.
+        """
+        if not self._retirar(self.documentos, id_gasto):
+            return
+        terminos = self.terminos if descripcion is None else terminos_de(descripcion)
+        vacios = []
+        for termino in terminos:
+            lista = self.listas.get(termino)
+            if lista is not None and self._retirar(lista, id_gasto) and not lista:
+                vacios.append(termino)
+        for termino in vacios:
+            del self.listas[termino]
+            del self.terminos[bisect_left(self.terminos, termino)]
+        self.version += 1
+        self.cambios_sin_guardar += 1
+
+    def sincronizar(self, recorrer: Callable[[], Iterable[Tuple[int, str]]]) -> int:
+        """
+        Pone el índice al día con los gastos vivos del ledger: indexa los
+        que faltan y quita los que ya no existen (altas y bajas hechas por
+        otro proceso o sin el índice cargado).
+
+        Args:
+            recorrer: Función que retorna los pares (id, descripción) de
+                todos los gastos vivos
+
+        Returns:
+            Cantidad de gastos agregados más quitados
+        """
+        vivos = set()
+        faltantes = []
+        for id_gasto, descripcion in recorrer():
+            vivos.add(id_gasto)
+            if not _contiene(self.documentos, id_gasto):
+                faltantes.append((id_gasto, descripcion))
+        sobrantes = [id_gasto for id_gasto in self.documentos if id_gasto not in vivos]
+        if len(sobrantes) * 10 > len(self.documentos):
+            # Quitar sin descripción revisa todas las listas: sale más barato reindexar
+            self.listas, self.terminos, self.documentos = {}, [], array('q')
+            self.agregar_lote(recorrer())
+        else:
+            for id_gasto in sobrantes:
+                self.quitar(id_gasto)
+            if faltantes:
+                self.agregar_lote(faltantes)
+        return len(faltantes) + len(sobrantes)
+
+    def _con_prefijo(self, prefijo: str) -> List[array]:
+        """
+        Retorna las listas de ids de los términos que empiezan con ``prefijo``.
+        """
+        inicio = bisect_left(self.terminos, prefijo)
+        # Ningún término con ese prefijo es mayor que prefijo + el último carácter
+        fin = bisect_right(self.terminos, prefijo + '\U0010ffff', inicio)
+        return [self.listas[termino] for termino in self.terminos[inicio:fin]]
+
+    def buscar(self, texto: str) -> List[int]:
+        """
+        Busca los gastos cuya descripción contiene todas las palabras del
+        texto; cada palabra vale como prefijo ("super sem" encuentra
+        "Supermercado semanal").
+
+        Returns:
+            Ids en orden creciente (orden de registro)
+        """
+        consulta = ' '.join(terminos_de(texto))
+        ultima = self._ultima_busqueda
+        if ultima is not None and ultima[0] == consulta and ultima[1] == self.version:
+            return ultima[2]
+
+        grupos = [self._con_prefijo(prefijo) for prefijo in consulta.split()]
+        if not grupos or not all(grupos):
+            resultado = []
+        else:
+            # Se parte del prefijo más selectivo y se descartan candidatos con los demás
+            grupos.sort(key=lambda listas: sum(map(len, listas)))
+            primero = grupos[0]
+            candidatos = primero[0] if len(primero) == 1 else sorted(set().union(*primero))
+            for listas in grupos[1:]:
+                if len(candidatos) * len(listas) * 16 < sum(map(len, listas)):
+                    candidatos = [id_gasto for id_gasto in candidatos
+                                  if any(_contiene(lista, id_gasto) for lista in listas)]
+                else:
+                    presentes = set().union(*listas)
+                    candidatos = [id_gasto for id_gasto in candidatos if id_gasto in presentes]
+                if not candidatos:
+                    break
+            resultado = list(candidatos)
+        self._ultima_busqueda = (consulta, self.version, resultado)
+        return resultado
+
+    def guardar(self, ruta: str) -> bool:
+        """
+        Escribe el índice de forma atómica mediante un archivo temporal.
+
+        Returns:
+            True si se guardó (si no, el índice sigue valiendo en memoria)
+        """
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        bloque = SEPARADOR.join(self.terminos).encode('utf-8')
+        conteos = array('q', (len(self.listas[termino]) for termino in self.terminos))
+        try:
+            with open(temporal, 'wb') as archivo:
+                archivo.write(_CABECERA.pack(MAGICO, VERSION_INDICE, _ORDEN, *self.firma,
+                                             len(self.terminos), len(self.documentos),
+                                             sum(conteos), len(bloque)))
+                archivo.write(self.documentos)
+                archivo.write(conteos)
+                for termino in self.terminos:
+                    archivo.write(self.listas[termino])
+                archivo.write(bloque)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            print(f"Error al guardar el índice de búsqueda: {str(e)}")
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return False
+        self.cambios_sin_guardar = 0
+        return True
+
+    @classmethod
+    def cargar(cls, ruta: str) -> Optional["IndiceTexto"]:
+        """
+        Lee un índice guardado.
+
+        Returns:
+            El índice, o None si no existe o está dañado (en ese caso se
+            reconstruye desde el ledger)
+        """
+        try:
+            with open(ruta, 'rb') as archivo:
+                datos = archivo.read()
+            (magico, version, orden, cantidad_gastos, ultimo_id, cantidad_terminos,
+             cantidad_documentos, cantidad_ids, largo_bloque) = _CABECERA.unpack_from(datos)
+            if magico != MAGICO or version != VERSION_INDICE or orden != _ORDEN:
+                return None
+            ancho = array('q').itemsize
+            if len(datos) != (_CABECERA.size + ancho * (cantidad_documentos + cantidad_terminos
+                                                        + cantidad_ids) + largo_bloque):
+                raise ValueError("largo inesperado")
+
+            indice = cls()
+            indice.firma = (cantidad_gastos, ultimo_id)
+            vista = memoryview(datos)
+            posicion = _CABECERA.size
+            fin = posicion + ancho * cantidad_documentos
+            indice.documentos.frombytes(vista[posicion:fin])
+            conteos = array('q')
+            posicion, fin = fin, fin + ancho * cantidad_terminos
+            conteos.frombytes(vista[posicion:fin])
+            posicion = fin
+            terminos = str(vista[-largo_bloque:], 'utf-8').split(SEPARADOR) if largo_bloque else []
+            if len(terminos) != cantidad_terminos:
+                raise ValueError("términos incompletos")
+            for termino, conteo in zip(terminos, conteos):
+                lista = array('q')
+                fin = posicion + ancho * conteo
+                lista.frombytes(vista[posicion:fin])
+                indice.listas[termino] = lista
+                posicion = fin
+            indice.terminos = terminos
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Índice de búsqueda descartado, se reconstruirá: {str(e)}")
+            return None
+        return indice
+
+
+def descartar_indice(ruta: str) -> None:
+    """
+    Borra el índice guardado (por ejemplo, si el ledger se creó de nuevo).
+    """
+    if os.path.exists(ruta):
+        os.remove(ruta)
@@ -0,0 +1,190 @@
+"""
+Instantánea binaria del ledger CSV
+Guarda junto al CSV (``<archivo>.instantanea``) la tabla columnar ya
+convertida: columnas de ancho fijo para ids, fechas epoch, centavos y
+códigos de categoría, más un bloque de texto con las descripciones. Al
+abrir el ledger se mapea en memoria y solo se analiza la cola del CSV
+anexada después de guardarla
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Optional, Tuple
+
+from tabla_columnar import TablaGastos
+
+# Versión del formato de la instantánea
+VERSION_INSTANTANEA = 1
+
+MAGICO = b'GASTOSIB'
+
+# Con menos filas el CSV se lee casi al instante y no vale la pena guardarla
+FILAS_MINIMAS = 10_000
+
+# Bytes del CSV, antes del final cubierto, que se comparan al validar
+VENTANA_HUELLA = 64 * 1024
+
+# Separador de las descripciones y categorías en los bloques de texto
+SEPARADOR = '\x00'
+
+# Mágico, versión, orden de bytes, filas, bytes del CSV cubiertos, tamaño,
+# mtime en ns e inodo del CSV al guardar, huella del CSV y largo de los
+# bloques de categorías, descripciones y fechas inválidas (JSON)
+_CABECERA = struct.Struct('<8sIIQQQqQ16sQQQ')
+
+# Columnas de ancho fijo en el orden del archivo: (atributo, tipo de array)
+_COLUMNAS = (('ids', 'q'), ('fechas', 'q'), ('centavos', 'q'), ('categorias', 'I'))
+
+_ORDEN = 1 if sys.byteorder == 'little' else 2
+
+
+def huella_csv(archivo_csv: str, hasta: int) -> bytes:
+    """
+    Huella del CSV hasta ``hasta``: encabezado y último tramo cubierto.
+
+    Las altas solo anexan al final y la compactación reemplaza el archivo,
+    así que una edición de lo ya cubierto altera el inodo, el tamaño o
+    este tramo.
+    """
+    huella = hashlib.blake2b(str(hasta).encode(), digest_size=16)
+    with open(archivo_csv, 'rb') as archivo:
+        huella.update(archivo.readline())
+        archivo.seek(max(0, hasta - VENTANA_HUELLA))
+        huella.update(archivo.read(min(hasta, VENTANA_HUELLA)))
+    return huella.digest()
+
+
+def conviene_guardar(filas: int, nuevas: int) -> bool:
+    """
+    Indica si conviene (re)escribir la instantánea tras leer ``nuevas``
+    filas del CSV sobre un total de ``filas``: cuando no existía o la cola
+    reanalizada ya es una parte apreciable del ledger.
+    """
+    return filas >= FILAS_MINIMAS and nuevas >= max(FILAS_MINIMAS, filas // 10)
+
+
+def guardar_instantanea(ruta: str, tabla: TablaGastos, archivo_csv: str, hasta: int) -> bool:
+    """
+    Escribe la instantánea de forma atómica mediante un archivo temporal.
+
+    Debe llamarse con el CSV bloqueado, cuando ``tabla`` contiene
+    exactamente las filas de sus primeros ``hasta`` bytes (sin aplicar las
+    lápidas, que se leen aparte).
+
+    Args:
+        ruta: Archivo de la instantánea
+        tabla: Tabla con las filas del CSV
+        archivo_csv: Ruta del CSV
+        hasta: Bytes del CSV cubiertos por la tabla
+
+    Returns:
+        True si se guardó; False si la tabla no se puede representar (un
+        separador dentro de un texto) o el CSV no termina en un salto de línea
+    """
+    cantidad = len(tabla.ids)
+    descripciones = SEPARADOR.join(tabla.descripciones)
+    categorias = SEPARADOR.join(tabla.nombres_categoria)
+    if (descripciones.count(SEPARADOR) != max(0, cantidad - 1)
+            or categorias.count(SEPARADOR) != max(0, len(tabla.nombres_categoria) - 1)):
+        return False
+
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        with open(archivo_csv, 'rb') as archivo:
+            # Una última línea sin salto podría completarse con la próxima alta
+            archivo.seek(hasta - 1)
+            if archivo.read(1) != b'\n':
+                return False
+            info = os.fstat(archivo.fileno())
+        huella = huella_csv(archivo_csv, hasta)
+        bloques = [categorias.encode('utf-8'), descripciones.encode('utf-8'),
+                   json.dumps(tabla._fechas_texto, ensure_ascii=False).encode('utf-8')]
+        with open(temporal, 'wb') as archivo:
+            archivo.write(_CABECERA.pack(MAGICO, VERSION_INSTANTANEA, _ORDEN, cantidad, hasta,
+                                         info.st_size, info.st_mtime_ns, info.st_ino, huella,
+                                         *map(len, bloques)))
+            for atributo, _ in _COLUMNAS:
+                archivo.write(getattr(tabla, atributo))
+            for bloque in bloques:
+                archivo.write(bloque)
+        os.replace(temporal, ruta)
+    except OSError as e:
+        print(f"Error al guardar la instantánea: {str(e)}")
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return False
+    return True
+
+
+def cargar_instantanea(ruta: str, archivo_csv: str) -> Optional[Tuple[TablaGastos, int]]:
+    """
+    Lee la instantánea si corresponde al contenido actual del CSV.
+
+    Es válida si el CSV es el mismo archivo (inodo), no se achicó, no
+    cambió de fecha sin crecer y conserva la huella de lo cubierto.
+
+    Returns:
+        Tupla (tabla, bytes del CSV cubiertos) o None si no existe, no
+        corresponde al CSV o está dañada (en ese caso se lee el CSV completo)
+    """
+    try:
+        info_csv = os.stat(archivo_csv)
+        with open(ruta, 'rb') as archivo:
+            if os.fstat(archivo.fileno()).st_size < _CABECERA.size:
+                return None
+            with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                (magico, version, orden, cantidad, hasta, tamano, mtime_ns, inodo, huella,
+                 *largos) = _CABECERA.unpack_from(mapa)
+                if magico != MAGICO or version != VERSION_INSTANTANEA or orden != _ORDEN:
+                    return None
+                if (inodo != info_csv.st_ino or info_csv.st_size < hasta
+                        or (info_csv.st_size == tamano and info_csv.st_mtime_ns != mtime_ns)):
+                    return None
+                if huella_csv(archivo_csv, hasta) != huella:
+                    return None
+
+                columnas = {}
+                posicion = _CABECERA.size
+                with memoryview(mapa) as vista:
+                    for atributo, tipo in _COLUMNAS:
+                        columna = array(tipo)
+                        fin = posicion + cantidad * columna.itemsize
+                        columna.frombytes(vista[posicion:fin])
+                        columnas[atributo] = columna
+                        posicion = fin
+                    textos = []
+                    for largo in largos:
+                        textos.append(str(vista[posicion:posicion + largo], 'utf-8'))
+                        posicion += largo
+                if posicion != len(mapa):
+                    raise ValueError("largo inesperado")
+
+        categorias, descripciones, fechas_texto = textos
+        descripciones = descripciones.split(SEPARADOR) if cantidad else []
+        if len(descripciones) != cantidad:
+            raise ValueError("descripciones incompletas")
+        tabla = TablaGastos.desde_columnas(
+            descripciones=descripciones,
+            nombres_categoria=categorias.split(SEPARADOR) if categorias else [],
+            fechas_texto={int(indice): texto
+                          for indice, texto in json.loads(fechas_texto).items()},
+            **columnas)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Instantánea descartada, se leerá el CSV completo: {str(e)}")
+        return None
+    return tabla, hasta
+
+
+def descartar_instantanea(ruta: str) -> None:
+    """
+    Borra la instantánea (por ejemplo, si el ledger se creó de nuevo).
+    """
+    if os.path.exists(ruta):
+        os.remove(ruta)
@@ -0,0 +1,324 @@
+"""
+Instrumentación opcional del Sistema de Control de Gastos
+Mide llamadas, latencias y bytes leídos/escritos por método y los exporta
+como JSON o en formato de texto de Prometheus. Desactivada no cuesta nada:
+los métodos solo se envuelven al activarla
+"""
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latencias recientes que se conservan por método para calcular percentiles
+MUESTRAS_POR_METODO = 2048
+
+# Percentiles informados
+PERCENTILES = (0.5, 0.9, 0.99)
+
+# Objetivo de instrumentación: (clase, métodos o None para todos los públicos)
+Objetivo = Tuple[type, Optional[Sequence[str]]]
+
+
+class _ContadoresIO:
+    """
+    Bytes leídos y escritos por el hilo actual según /proc/thread-self/io
+    (solo Linux; en otros sistemas no se informan bytes).
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self.disponible = os.path.exists("/proc/thread-self/io")
+
+    def leer(self) -> Optional[Tuple[int, int]]:
+        """
+        Returns:
+            Tupla (bytes leídos, bytes escritos) acumulados por el hilo, sin
+            contar las lecturas de los propios contadores, o None si no está
+            disponible
+        """
+        if not self.disponible:
+            return None
+        local = self._local
+        try:
+            if not hasattr(local, 'descriptor'):
+                local.descriptor = os.open("/proc/thread-self/io", os.O_RDONLY)
+                local.propios = 0
+            datos = os.pread(local.descriptor, 512, 0)
+        except OSError:
+            self.disponible = False
+            return None
+        leidos = escritos = 0
+        for linea in datos.split(b"\n", 2)[:2]:
+            nombre, _, valor = linea.partition(b":")
+            if nombre == b"rchar":
+                leidos = int(valor)
+            elif nombre == b"wchar":
+                escritos = int(valor)
+        # rchar ya incluye las lecturas anteriores de este archivo
+        propios = local.propios
+        local.propios += len(datos)
+        return leidos - propios, escritos
+
+
+class EstadisticaMetodo:
+    """
+    Acumulados de un método instrumentado.
+    """
+
+    __slots__ = ('llamadas', 'errores', 'segundos', 'maximo', 'bytes_leidos',
+                 'bytes_escritos', 'muestras')
+
+    def __init__(self):
+        self.llamadas = 0
+        self.errores = 0
+        self.segundos = 0.0
+        self.maximo = 0.0
+        self.bytes_leidos = 0
+        self.bytes_escritos = 0
+        self.muestras = deque(maxlen=MUESTRAS_POR_METODO)
+
+    def percentil(self, fraccion: float) -> float:
+        """
+        Percentil de las latencias recientes (en segundos).
+        """
+        if not self.muestras:
+            return 0.0
+        ordenadas = sorted(self.muestras)
+        return ordenadas[min(len(ordenadas) - 1, int(fraccion * len(ordenadas)))]
+
+
+class Instrumentacion:
+    """
+    Registro de métricas por método.
+
+    ``activar`` reemplaza los métodos de las clases objetivo por envoltorios
+    que miden cada llamada y ``desactivar`` restaura los originales, de modo
+    que con la instrumentación apagada el código corre sin ningún agregado.
+    Las funciones generadoras (``iterar_gastos``) se miden durante todo su
+    recorrido, no solo al crearlas.
+    """
+
+    def __init__(self):
+        self._estadisticas: Dict[str, EstadisticaMetodo] = {}
+        self._mutex = threading.Lock()
+        self._originales: List[Tuple[type, str, object]] = []
+        self._io = _ContadoresIO()
+        self.desde = time.time()
+
+    @property
+    def activa(self) -> bool:
+        return bool(self._originales)
+
+    def activar(self, objetivos: Iterable[Objetivo] = ()) -> None:
+        """
+        Envuelve los métodos de ``GestorGastos`` y de los objetivos indicados.
+
+        Args:
+            objetivos: Pares (clase, nombres de métodos); con None se
+                instrumentan todos los métodos públicos de la clase
+        """
+        from backend import GestorGastos
+
+        instrumentados = {(clase, nombre) for clase, nombre, _ in self._originales}
+        for clase, metodos in [(GestorGastos, None)] + list(objetivos):
+            if metodos is None:
+                metodos = [nombre for nombre, valor in vars(clase).items()
+                           if not nombre.startswith('_') and inspect.isfunction(valor)]
+            for nombre in metodos:
+                if (clase, nombre) in instrumentados:
+                    continue
+                original = vars(clase)[nombre]
+                setattr(clase, nombre, self._envolver(original, f"{clase.__name__}.{nombre}"))
+                self._originales.append((clase, nombre, original))
+                instrumentados.add((clase, nombre))
+
+    def desactivar(self) -> None:
+        """
+        Restaura los métodos originales (las métricas acumuladas se conservan).
+        """
+        for clase, nombre, original in reversed(self._originales):
+            setattr(clase, nombre, original)
+        self._originales = []
+
+    def reiniciar(self) -> None:
+        """
+        Descarta las métricas acumuladas.
+        """
+        with self._mutex:
+            self._estadisticas = {}
+            self.desde = time.time()
+
+    def _envolver(self, funcion: Callable, nombre: str) -> Callable:
+        registrar, io = self._registrar, self._io
+
+        if inspect.isgeneratorfunction(funcion):
+            @functools.wraps(funcion)
+            def envoltorio_generador(*args, **kwargs):
+                # Se acumula solo el tiempo pasado dentro del generador
+                segundos = leidos = escritos = 0
+                error = False
+                generador = funcion(*args, **kwargs)
+                try:
+                    while True:
+                        inicio_io = io.leer()
+                        inicio = time.perf_counter()
+                        try:
+                            valor = next(generador)
+                        except StopIteration:
+                            return
+                        finally:
+                            segundos += time.perf_counter() - inicio
+                            fin_io = io.leer()
+                            if inicio_io is not None and fin_io is not None:
+                                leidos += fin_io[0] - inicio_io[0]
+                                escritos += fin_io[1] - inicio_io[1]
+                        yield valor
+                except BaseException as e:
+                    error = not isinstance(e, GeneratorExit)
+                    raise
+                finally:
+                    generador.close()
+                    registrar(nombre, segundos, leidos, escritos, error)
+            return envoltorio_generador
+
+        @functools.wraps(funcion)
+        def envoltorio(*args, **kwargs):
+            inicio_io = io.leer()
+            inicio = time.perf_counter()
+            error = True
+            try:
+                resultado = funcion(*args, **kwargs)
+                error = False
+                return resultado
+            finally:
+                segundos = time.perf_counter() - inicio
+                fin_io = io.leer()
+                if inicio_io is not None and fin_io is not None:
+                    registrar(nombre, segundos, fin_io[0] - inicio_io[0],
+                              fin_io[1] - inicio_io[1], error)
+                else:
+                    registrar(nombre, segundos, 0, 0, error)
+        return envoltorio
+
+    def _registrar(self, nombre: str, segundos: float, leidos: int, escritos: int,
+                   error: bool) -> None:
+        with self._mutex:
+            estadistica = self._estadisticas.get(nombre)
+            if estadistica is None:
+                estadistica = self._estadisticas[nombre] = EstadisticaMetodo()
+            estadistica.llamadas += 1
+            estadistica.errores += error
+            estadistica.segundos += segundos
+            if segundos > estadistica.maximo:
+                estadistica.maximo = segundos
+            estadistica.bytes_leidos += max(0, leidos)
+            estadistica.bytes_escritos += max(0, escritos)
+            estadistica.muestras.append(segundos)
+
+    def instantanea(self) -> Dict[str, Dict[str, float]]:
+        """
+        Retorna las métricas actuales por método.
+
+        Returns:
+            Diccionario método -> {llamadas, errores, segundos_total,
+            promedio_ms, p50_ms, p90_ms, p99_ms, maximo_ms, bytes_leidos,
+            bytes_escritos}
+        """
+        with self._mutex:
+            resultado = {}
+            for nombre, estadistica in sorted(self._estadisticas.items()):
+                metricas = {
+                    'llamadas': estadistica.llamadas,
+                    'errores': estadistica.errores,
+                    'segundos_total': estadistica.segundos,
+                    'promedio_ms': estadistica.segundos / estadistica.llamadas * 1000,
+                }
+                for fraccion in PERCENTILES:
+                    metricas[f"p{int(fraccion * 100)}_ms"] = estadistica.percentil(fraccion) * 1000
+                metricas['maximo_ms'] = estadistica.maximo * 1000
+                metricas['bytes_leidos'] = estadistica.bytes_leidos
+                metricas['bytes_escritos'] = estadistica.bytes_escritos
+                resultado[nombre] = metricas
+            return resultado
+
+    def a_json(self) -> str:
+        """
+        Serializa la instantánea como JSON.
+        """
+        return json.dumps({'desde': time.strftime("%Y-%m-%d %H:%M:%S",
+                                                  time.localtime(self.desde)),
+                           'bytes_disponibles': self._io.disponible,
+                           'metodos': self.instantanea()},
+                          ensure_ascii=False, indent=2)
+
+    def a_prometheus(self) -> str:
+        """
+        Serializa la instantánea en el formato de texto de Prometheus.
+        """
+        metodos = self.instantanea()
+        lineas = []
+
+        def familia(nombre: str, tipo: str, ayuda: str, valores) -> None:
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            lineas.extend(valores)
+
+        def etiqueta(metodo: str, extra: str = "") -> str:
+            return f'{{metodo="{metodo}"{extra}}}'
+
+        familia("gastos_llamadas_total", "counter", "Llamadas por método",
+                [f"gastos_llamadas_total{etiqueta(m)} {v['llamadas']}"
+                 for m, v in metodos.items()])
+        familia("gastos_errores_total", "counter", "Llamadas que terminaron con excepción",
+                [f"gastos_errores_total{etiqueta(m)} {v['errores']}"
+                 for m, v in metodos.items()])
+        latencias = []
+        for metodo, valores in metodos.items():
+            for fraccion in PERCENTILES:
+                cuantil = ',quantile="%s"' % fraccion
+                latencias.append(
+                    f"gastos_latencia_segundos{etiqueta(metodo, cuantil)} "
+                    f"{valores[f'p{int(fraccion * 100)}_ms'] / 1000:.9f}")
+            latencias.append(f"gastos_latencia_segundos_sum{etiqueta(metodo)} "
+                             f"{valores['segundos_total']:.9f}")
+            latencias.append(f"gastos_latencia_segundos_count{etiqueta(metodo)} "
+                             f"{valores['llamadas']}")
+        familia("gastos_latencia_segundos", "summary", "Latencia por método", latencias)
+        familia("gastos_bytes_leidos_total", "counter", "Bytes leídos durante el método",
+                [f"gastos_bytes_leidos_total{etiqueta(m)} {v['bytes_leidos']}"
+                 for m, v in metodos.items()])
+        familia("gastos_bytes_escritos_total", "counter", "Bytes escritos durante el método",
+                [f"gastos_bytes_escritos_total{etiqueta(m)} {v['bytes_escritos']}"
+                 for m, v in metodos.items()])
+        return "\n".join(lineas) + "\n"
+
+    def exportar(self, ruta: str) -> None:
+        """
+        Escribe la instantánea en un archivo: formato Prometheus si la ruta
+        termina en ``.prom`` o ``.txt``; JSON en otro caso.
+        """
+        contenido = self.a_prometheus() if ruta.endswith(('.prom', '.txt')) else self.a_json()
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(contenido)
+
+
+# Registro global del proceso
+instrumentacion = Instrumentacion()
+
+
+def activar_si_corresponde(objetivos: Iterable[Objetivo] = ()) -> bool:
+    """
+    Activa la instrumentación si la variable de entorno ``GASTOS_METRICAS``
+    tiene un valor distinto de vacío o "0".
+
+    Returns:
+        True si quedó activada
+    """
+    if os.environ.get("GASTOS_METRICAS", "") not in ("", "0"):
+        instrumentacion.activar(objetivos)
+    return instrumentacion.activa
@@ -0,0 +1,259 @@
+"""
+Lectura rápida del CSV del ledger
+Lee el archivo en bloques grandes y separa los campos de las líneas sin
+comillas con operaciones de cadena (split/join) en lugar de analizar cada
+fila con el módulo csv; solo las líneas entre comillas (descripciones con
+comas, comillas o saltos de línea) y las irregulares pasan por csv.reader.
+Las columnas de cada bloque se convierten de una vez a la tabla columnar
+"""
+
+import csv
+import io
+from array import array
+from itertools import repeat
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple
+
+from tabla_columnar import TablaGastos, fechas_a_epoch, texto_a_centavos, textos_a_centavos
+
+# Bytes leídos del archivo por bloque
+TAMANO_BLOQUE = 4 * 1024 * 1024
+
+# Columnas de un bloque: una lista de textos por columna, todas del mismo largo
+Columnas = List[List[str]]
+
+
+def _separar_simple(texto: str, ancho: int) -> Optional[Columnas]:
+    """
+    Separa líneas sin comillas en columnas.
+
+    Returns:
+        Las columnas, o None si alguna línea no tiene exactamente ``ancho``
+        campos (líneas vacías, filas incompletas o retornos de carro sueltos)
+    """
+    # csv.writer termina las líneas con \r\n; los archivos editados a mano pueden usar \n
+    salto = '\r\n' if '\r' in texto else '\n'
+    if texto.endswith(salto):
+        texto = texto[:-len(salto)]
+    if not texto:
+        return [[] for _ in range(ancho)]
+    lineas = texto.split(salto)
+    if salto == '\r\n' and not texto.count('\r') == texto.count('\n') == len(lineas) - 1:
+        # Saltos de línea mezclados o retornos de carro sueltos
+        return None
+    comas = ancho - 1
+    if set(map(str.count, lineas, repeat(','))) != {comas}:
+        return None
+    campos = ','.join(lineas).split(',')
+    return [campos[i::ancho] for i in range(ancho)]
+
+
+def _separar_csv(texto: str, posiciones: Sequence[Optional[int]]) -> Columnas:
+    """
+    Separa un fragmento con el módulo csv (comillas, filas irregulares).
+
+    Las filas vacías se omiten y los campos faltantes quedan como ''.
+    """
+    filas = [[fila[i] if i is not None and i < len(fila) else '' for i in posiciones]
+             for fila in csv.reader(io.StringIO(texto, newline='')) if fila]
+    if not filas:
+        return [[] for _ in posiciones]
+    return [list(columna) for columna in zip(*filas)]
+
+
+def _separar(texto: str, posiciones: Sequence[Optional[int]], directo: bool) -> Columnas:
+    """
+    Separa un bloque de líneas completas en columnas.
+
+    Con el encabezado estándar (``directo``), las líneas sin comillas se
+    separan con ``_separar_simple`` y solo cada registro entre comillas
+    (que puede abarcar varias líneas) pasa por el módulo csv.
+    """
+    if not directo:
+        return _separar_csv(texto, posiciones)
+    ancho = len(posiciones)
+    if '"' not in texto:
+        columnas = _separar_simple(texto, ancho)
+        return columnas if columnas is not None else _separar_csv(texto, posiciones)
+
+    columnas: Columnas = [[] for _ in range(ancho)]
+
+    def anexar(fragmento: Columnas) -> None:
+        for columna, valores in zip(columnas, fragmento):
+            columna.extend(valores)
+
+    def anexar_simple(fragmento: str) -> None:
+        partes = _separar_simple(fragmento, ancho)
+        anexar(partes if partes is not None else _separar_csv(fragmento, posiciones))
+
+    inicio = 0
+    comilla = texto.find('"')
+    while comilla != -1:
+        # El registro entre comillas empieza al principio de su línea y termina
+        # en el primer salto de línea con las comillas balanceadas
+        principio = texto.rfind('\n', 0, comilla) + 1
+        fin = texto.find('\n', comilla)
+        while fin != -1 and texto.count('"', principio, fin) % 2:
+            fin = texto.find('\n', fin + 1)
+        fin = len(texto) if fin == -1 else fin + 1
+        if principio > inicio:
+            anexar_simple(texto[inicio:principio])
+        anexar(_separar_csv(texto[principio:fin], posiciones))
+        inicio = fin
+        comilla = texto.find('"', inicio)
+    if inicio < len(texto):
+        anexar_simple(texto[inicio:])
+    return columnas
+
+
+def leer_columnas(archivo: BinaryIO, columnas: Sequence[str],
+                  inicio: int = 0) -> Iterator[Columnas]:
+    """
+    Recorre el CSV por bloques y entrega, de cada bloque, las columnas pedidas.
+
+    Al terminar, la posición del archivo queda al final de lo leído.
+
+    Args:
+        archivo: Archivo CSV con encabezado, abierto en modo binario
+        columnas: Nombres de las columnas a entregar, en ese orden (las que
+            no estén en el encabezado se entregan vacías)
+        inicio: Posición en bytes desde la que se leen las filas (debe ser
+            el comienzo de una línea); 0 para leer el archivo completo
+
+    Yields:
+        Una lista de textos por columna, en el orden de ``columnas``
+    """
+    # El encabezado puede estar entre comillas: se analiza con csv
+    archivo.seek(0)
+    encabezado = next(csv.reader([archivo.readline().decode('utf-8')]), [])
+    posiciones = [encabezado.index(c) if c in encabezado else None for c in columnas]
+    directo = encabezado == list(columnas)
+    if inicio > archivo.tell():
+        archivo.seek(inicio)
+
+    resto = b''
+    while True:
+        datos = archivo.read(TAMANO_BLOQUE)
+        if datos:
+            bloque = resto + datos
+            corte = bloque.rfind(b'\n') + 1
+            # Sin un salto de línea, o con una comilla abierta (un campo con
+            # saltos de línea cortado por el bloque), se sigue leyendo
+            if corte == 0 or bloque.count(b'"', 0, corte) % 2:
+                resto = bloque
+                continue
+            bloque, resto = bloque[:corte], bloque[corte:]
+        else:
+            bloque, resto = resto, b''
+            if not bloque:
+                return
+        # El corte en un salto de línea nunca parte un carácter UTF-8
+        yield _separar(bloque.decode('utf-8'), posiciones, directo)
+        if not datos:
+            return
+
+
+def _convertir(ids: List[str], fechas: List[str], categorias: List[str],
+               montos: List[str]) -> Optional[Tuple[array, array, List[str], array]]:
+    """
+    Convierte las columnas de texto de un bloque a sus tipos.
+
+    Returns:
+        Tupla (ids, fechas epoch, categorías, centavos) o None si alguna fila
+        tiene un id, una fecha o un monto irregular
+    """
+    if not all(ids) or not ''.join(ids).isdigit():
+        return None
+    try:
+        epochs = fechas_a_epoch(fechas)
+        centavos = textos_a_centavos(montos)
+        enteros = array('q', map(int, ids))
+    except (ValueError, OverflowError):
+        # Un monto o un id que no cabe en 64 bits se convierte fila por fila
+        return None
+    if '' in categorias:
+        categorias = [categoria or 'Sin categoría' for categoria in categorias]
+    return enteros, epochs, categorias, centavos
+
+
+def cargar_tabla(ruta: str, columnas: Sequence[str], tabla: Optional[TablaGastos] = None,
+                 inicio: int = 0) -> Tuple[TablaGastos, List[Tuple], int]:
+    """
+    Lee el CSV (completo o desde una posición) en una tabla columnar.
+
+    Los bloques regulares se agregan en bloque; los que tienen alguna fila
+    irregular se agregan fila a fila con las mismas reglas que la lectura
+    con el módulo csv (montos inválidos como 0, categoría vacía como
+    "Sin categoría", fechas inválidas conservadas como texto).
+
+    Args:
+        ruta: Archivo CSV del ledger
+        columnas: Columnas del ledger (id, fecha, categoria, descripcion, monto)
+        tabla: Tabla a la que se anexan las filas (por ejemplo, la cargada
+            de la instantánea binaria); None para crear una nueva
+        inicio: Posición en bytes del archivo desde la que se leen las filas
+
+    Returns:
+        Tupla (tabla, filas sin id, posición en bytes donde terminó la
+        lectura) con las filas sin id como tuplas (fecha, categoria,
+        descripcion, centavos), en orden de archivo
+    """
+    if tabla is None:
+        tabla = TablaGastos()
+    sin_id = []
+    with open(ruta, 'rb') as archivo:
+        for _ in anexar_por_bloques(archivo, columnas, tabla, sin_id, inicio):
+            pass
+        fin = archivo.tell()
+    return tabla, sin_id, fin
+
+
+def anexar_por_bloques(archivo: BinaryIO, columnas: Sequence[str], tabla: TablaGastos,
+                       sin_id: List[Tuple], inicio: int = 0) -> Iterator[int]:
+    """
+    Anexa a la tabla las filas del CSV de a un bloque por paso (ver
+    ``cargar_tabla``); las filas sin id se agregan a ``sin_id``.
+
+    Yields:
+        Posición en bytes del archivo hasta la que se leyó
+    """
+    for bloque in leer_columnas(archivo, columnas, inicio):
+        _anexar_bloque(tabla, bloque, sin_id)
+        yield archivo.tell()
+
+
+def _anexar_bloque(tabla: TablaGastos, bloque: Columnas, sin_id: List[Tuple]) -> None:
+    """
+    Anexa a la tabla las filas de un bloque; las filas sin id se agregan a ``sin_id``.
+    """
+    ids, fechas, categorias, descripciones, montos = bloque
+    convertidas = _convertir(ids, fechas, categorias, montos)
+    if convertidas is not None:
+        enteros, epochs, categorias, centavos = convertidas
+        tabla.extender(enteros, epochs, categorias, descripciones, centavos)
+        return
+
+    for id_texto, fecha, categoria, descripcion, monto in zip(
+            ids, fechas, categorias, descripciones, montos):
+        try:
+            centavos = texto_a_centavos(monto)
+        except (ValueError, OverflowError):
+            centavos = 0
+        categoria = categoria or 'Sin categoría'
+        if not id_texto.isdigit():
+            sin_id.append((fecha, categoria, descripcion, centavos))
+            continue
+        tabla.agregar(int(id_texto), fecha, categoria, descripcion, centavos)
+
+
+def lineas_hasta(archivo: BinaryIO, fin: int) -> Iterator[str]:
+    """
+    Recorre las líneas del archivo hasta el byte ``fin`` como texto (con su
+    salto de línea, como espera csv.reader). Una línea que pasa de ``fin``
+    es un alta posterior, quizás a medio escribir, y termina el recorrido.
+    """
+    restante = fin
+    for linea in archivo:
+        if len(linea) > restante:
+            return
+        restante -= len(linea)
+        yield linea.decode('utf-8')
@@ -3,11 +3,27 @@ Interfaz Gráfica del Sistema de Control de Gastos
 Aplicación de escritorio usando Tkinter
 """
 
+import os
 import tkinter as tk
-from tkinter import ttk, messagebox, font
-from backend import GestorGastos
+from tkinter import ttk, messagebox, font, filedialog, simpledialog
+from almacenamiento import a_centavos, coincide_filtro, limites_fecha
+from ejecutor import EjecutorTk
+from espacio_trabajo import EspacioTrabajo
+from indice_texto import coincide_texto
+from instrumentacion import activar_si_corresponde, instrumentacion
+from tabla_virtual import TablaVirtual
+from datetime import date
 from typing import Optional
 
+# Refresco del panel de diagnóstico (ms)
+INTERVALO_DIAGNOSTICO = 1000
+
+# Pausa de escritura tras la que se lanza la búsqueda (ms)
+ESPERA_BUSQUEDA = 250
+
+# Nombre del ledger gastos.csv en un espacio de trabajo nuevo
+LEDGER_INICIAL = "Principal"
+
 
 class AplicacionGastos:
     """
@@ -22,10 +38,30 @@ class AplicacionGastos:
             root: Ventana principal de Tkinter
         """
         self.root = root
-        self.gestor = GestorGastos()
+        # Ledgers del espacio de trabajo; self.gestor es el del ledger activo
+        self.espacio = EspacioTrabajo()
+        if not self.espacio.nombres:
+            # Primer arranque: el ledger de siempre pasa a ser el del espacio
+            self.espacio.agregar_ledger(LEDGER_INICIAL, "gastos.csv")
+        self.ledger_activo = self.espacio.activo or self.espacio.nombres[0]
+        self.gestor = self.espacio.activar(self.ledger_activo)
+        # Último ledger elegido en el selector (puede estar abriéndose)
+        self._ledger_pedido = self.ledger_activo
+        # Las llamadas al backend corren en segundo plano para no congelar la ventana
+        self.ejecutor = EjecutorTk(root, al_cambiar_estado=self._mostrar_carga)
+        self._cantidad = 0
+        self._total_centavos = 0
+        # Filtros activos de la tabla y las estadísticas (desde, hasta, categoria)
+        self.filtros = {}
+        # Texto de la caja de búsqueda (None: sin búsqueda)
+        self.busqueda: Optional[str] = None
+        self._busqueda_programada = None
+        # Carga inicial por bloques en curso (None al terminar) y gastos ya cargados
+        self._carga = None
+        self._cargados = 0
         
         # Configuración de la ventana principal
-        self.root.title("💰 Sistema de Control de Gastos")
+        self.root.title(f"💰 Sistema de Control de Gastos — {self.ledger_activo}")
         self.root.geometry("900x700")
         self.root.resizable(True, True)
         
@@ -35,9 +71,17 @@ class AplicacionGastos:
         # Construir la interfaz
         self._construir_interfaz()
         
-        # Cargar datos iniciales
-        self.actualizar_tabla()
-        self.actualizar_estadisticas()
+        self.root.protocol("WM_DELETE_WINDOW", self.cerrar)
+        
+        # Panel de diagnóstico oculto; las métricas se activan con GASTOS_METRICAS=1
+        # o desde el propio panel
+        self.ventana_diagnostico = None
+        activar_si_corresponde(objetivos_interfaz())
+        self.root.bind('<Control-Shift-D>', lambda e: self.abrir_diagnostico())
+        
+        # Cargar datos iniciales: la ventana se muestra enseguida y el ledger
+        # se lee por bloques en segundo plano
+        self.iniciar_carga()
     
     def _configurar_estilos(self) -> None:
         """
@@ -78,7 +122,10 @@ class AplicacionGastos:
                          font=titulo_font,
                          bg='#f0f0f0',
                          fg='#0078d7')
-        titulo.pack(pady=(0, 20))
+        titulo.pack(pady=(0, 10))
+        
+        # Selector del ledger activo
+        self._crear_barra_ledgers(main_frame)
         
         # Frame de entrada de datos
         self._crear_frame_entrada(main_frame)
@@ -92,6 +139,32 @@ class AplicacionGastos:
         # Frame de botones de acción
         self._crear_frame_acciones(main_frame)
     
+    def _crear_barra_ledgers(self, parent: tk.Frame) -> None:
+        """
+        Crea el selector de ledgers del espacio de trabajo.
+        """
+        barra = tk.Frame(parent, bg='#f0f0f0')
+        barra.pack(fill=tk.X, pady=(0, 10))
+        
+        tk.Label(barra, text="📒 Ledger:", bg='#f0f0f0',
+                 font=('Arial', 10, 'bold')).pack(side=tk.LEFT)
+        self.ledger_var = tk.StringVar(value=self.ledger_activo)
+        self.combo_ledger = ttk.Combobox(barra,
+                                         textvariable=self.ledger_var,
+                                         values=self.espacio.nombres,
+                                         state='readonly',
+                                         width=25,
+                                         font=('Arial', 10))
+        self.combo_ledger.pack(side=tk.LEFT, padx=(5, 8))
+        self.combo_ledger.bind('<<ComboboxSelected>>',
+                               lambda e: self.cambiar_ledger(self.ledger_var.get()))
+        
+        for texto, comando in (("➕ Nuevo", self.nuevo_ledger),
+                               ("📂 Abrir...", self.abrir_ledger),
+                               ("Σ Todos los ledgers", self.mostrar_totales_espacio)):
+            tk.Button(barra, text=texto, command=comando, font=('Arial', 9),
+                      cursor='hand2').pack(side=tk.LEFT, padx=2)
+    
     def _crear_frame_entrada(self, parent: tk.Frame) -> None:
         """
         Crea el frame para ingresar nuevos gastos.
@@ -110,11 +183,11 @@ class AplicacionGastos:
             row=0, column=0, sticky='e', padx=(0, 10), pady=5)
         
         self.categoria_var = tk.StringVar()
-        categorias = ["Comida", "Transporte", "Entretenimiento", "Salud", 
-                     "Educación", "Servicios", "Hogar", "Otros"]
+        self.categorias = ["Comida", "Transporte", "Entretenimiento", "Salud", 
+                           "Educación", "Servicios", "Hogar", "Otros"]
         self.combo_categoria = ttk.Combobox(frame,
                                            textvariable=self.categoria_var,
-                                           values=categorias,
+                                           values=self.categorias,
                                            state='readonly',
                                            width=30,
                                            font=('Arial', 10))
@@ -207,44 +280,93 @@ class AplicacionGastos:
                              pady=10)
         frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
         
-        # Crear Treeview con scrollbar
-        tree_frame = tk.Frame(frame, bg='#ffffff')
-        tree_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Scrollbars
-        scrollbar_y = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL)
-        scrollbar_x = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL)
-        
-        # Treeview
-        self.tabla = ttk.Treeview(tree_frame,
-                                 columns=('fecha', 'categoria', 'descripcion', 'monto'),
-                                 show='headings',
-                                 yscrollcommand=scrollbar_y.set,
-                                 xscrollcommand=scrollbar_x.set,
-                                 selectmode='browse')
-        
-        scrollbar_y.config(command=self.tabla.yview)
-        scrollbar_x.config(command=self.tabla.xview)
-        
-        # Configurar columnas
-        self.tabla.heading('fecha', text='Fecha')
-        self.tabla.heading('categoria', text='Categoría')
-        self.tabla.heading('descripcion', text='Descripción')
-        self.tabla.heading('monto', text='Monto ($)')
-        
-        self.tabla.column('fecha', width=150, anchor='center')
-        self.tabla.column('categoria', width=120, anchor='center')
-        self.tabla.column('descripcion', width=300, anchor='w')
-        self.tabla.column('monto', width=100, anchor='e')
-        
-        # Empaquetar
-        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
-        scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
-        self.tabla.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self._crear_barra_filtros(frame)
+        
+        # Tabla virtual: solo se crean items para las filas visibles
+        self.tabla_virtual = TablaVirtual(
+            frame,
+            columnas=(('fecha', 'Fecha', 150, 'center'),
+                      ('categoria', 'Categoría', 120, 'center'),
+                      ('descripcion', 'Descripción', 300, 'w'),
+                      ('monto', 'Monto ($)', 100, 'e')),
+            contar=self._contar_filas,
+            obtener_pagina=self._obtener_filas,
+            formatear=self._formatear_fila,
+            ejecutor=self.ejecutor)
+        self.tabla_virtual.frame.pack(fill=tk.BOTH, expand=True)
+        self.tabla = self.tabla_virtual.arbol
         
         # Bind doble click
         self.tabla.bind('<Double-1>', self.confirmar_eliminacion)
     
+    def _contar_filas(self) -> int:
+        """
+        Cantidad de filas de la tabla según la búsqueda y los filtros.
+        """
+        if self._cargando():
+            return self._cargados
+        if self.busqueda is not None:
+            return self.gestor.contar_busqueda(self.busqueda, **self.filtros)
+        return self.gestor.contar_gastos(**self.filtros)
+    
+    def _obtener_filas(self, inicio: int, cantidad: int) -> list:
+        """
+        Ventana de filas de la tabla según la búsqueda y los filtros.
+        """
+        if self._cargando():
+            return self.gestor.obtener_pagina_cargada(inicio, cantidad)
+        if self.busqueda is not None:
+            return self.gestor.buscar_gastos(self.busqueda, inicio, cantidad, **self.filtros)
+        return self.gestor.obtener_pagina(inicio, cantidad, **self.filtros)
+    
+    def _crear_barra_filtros(self, parent: tk.Frame) -> None:
+        """
+        Crea la caja de búsqueda y los controles para filtrar por rango de
+        fechas y categoría.
+        """
+        barra_busqueda = tk.Frame(parent, bg='#ffffff')
+        barra_busqueda.pack(fill=tk.X, pady=(0, 6))
+        
+        tk.Label(barra_busqueda, text="🔎 Buscar:", bg='#ffffff',
+                 font=('Arial', 9)).pack(side=tk.LEFT)
+        self.busqueda_entry = tk.Entry(barra_busqueda, width=40, font=('Arial', 9))
+        self.busqueda_entry.pack(side=tk.LEFT, padx=(2, 8))
+        # La búsqueda se lanza al dejar de escribir
+        self.busqueda_entry.bind('<KeyRelease>', lambda e: self._programar_busqueda())
+        self.busqueda_entry.bind('<Return>', lambda e: self.aplicar_busqueda())
+        self.busqueda_entry.bind('<Escape>', lambda e: self.quitar_busqueda())
+        
+        barra = tk.Frame(parent, bg='#ffffff')
+        barra.pack(fill=tk.X, pady=(0, 8))
+        
+        tk.Label(barra, text="Desde:", bg='#ffffff', font=('Arial', 9)).pack(side=tk.LEFT)
+        self.filtro_desde_entry = tk.Entry(barra, width=12, font=('Arial', 9))
+        self.filtro_desde_entry.pack(side=tk.LEFT, padx=(2, 8))
+        
+        tk.Label(barra, text="Hasta:", bg='#ffffff', font=('Arial', 9)).pack(side=tk.LEFT)
+        self.filtro_hasta_entry = tk.Entry(barra, width=12, font=('Arial', 9))
+        self.filtro_hasta_entry.pack(side=tk.LEFT, padx=(2, 8))
+        
+        tk.Label(barra, text="Categoría:", bg='#ffffff', font=('Arial', 9)).pack(side=tk.LEFT)
+        self.filtro_categoria_var = tk.StringVar()
+        self.combo_filtro_categoria = ttk.Combobox(barra,
+                                                  textvariable=self.filtro_categoria_var,
+                                                  values=["Todas"] + self.categorias,
+                                                  state='readonly',
+                                                  width=15,
+                                                  font=('Arial', 9))
+        self.combo_filtro_categoria.pack(side=tk.LEFT, padx=(2, 8))
+        self.combo_filtro_categoria.current(0)
+        
+        for texto, comando in (("🔍 Filtrar", self.aplicar_filtro),
+                               ("📅 Este mes", self.filtrar_mes_actual),
+                               ("✖ Quitar filtro", self.quitar_filtro)):
+            tk.Button(barra, text=texto, command=comando, font=('Arial', 9),
+                      cursor='hand2').pack(side=tk.LEFT, padx=2)
+        
+        self.filtro_desde_entry.bind('<Return>', lambda e: self.aplicar_filtro())
+        self.filtro_hasta_entry.bind('<Return>', lambda e: self.aplicar_filtro())
+    
     def _crear_frame_acciones(self, parent: tk.Frame) -> None:
         """
         Crea el frame con botones de acción.
@@ -284,6 +406,213 @@ class AplicacionGastos:
                                pady=8,
                                cursor='hand2')
         btn_limpiar.pack(side=tk.LEFT, padx=5)
+        
+        # Indicador de carga mientras hay trabajo en segundo plano
+        self.label_carga = tk.Label(frame,
+                                   text="",
+                                   bg='#f0f0f0',
+                                   fg='#555555',
+                                   font=('Arial', 10, 'italic'))
+        self.label_carga.pack(side=tk.RIGHT, padx=5)
+        
+        # Progreso de la carga inicial del ledger (se oculta al terminar)
+        self.barra_carga = ttk.Progressbar(frame, length=150, maximum=1.0)
+    
+    def _mostrar_carga(self, ocupado: bool) -> None:
+        """
+        Muestra u oculta el indicador de carga.
+        """
+        if self._carga is not None:
+            # Durante la carga inicial el indicador muestra su progreso
+            return
+        self.label_carga.config(text="⏳ Cargando..." if ocupado else "")
+    
+    def iniciar_carga(self) -> None:
+        """
+        Lee el ledger por bloques en segundo plano, llenando la tabla con
+        los gastos ya cargados y mostrando el progreso.
+        
+        Cada bloque es una tarea aparte del ejecutor, así que las altas y
+        las demás consultas se atienden entre bloque y bloque.
+        """
+        self._carga = self.gestor.cargar_por_bloques()
+        self._cargados = 0
+        self.barra_carga.config(value=0)
+        self.barra_carga.pack(side=tk.RIGHT, padx=5)
+        self.label_carga.config(text="⏳ Cargando gastos...")
+        self._cargar_bloque()
+    
+    def _cargar_bloque(self) -> None:
+        """
+        Pide el siguiente bloque de la carga inicial.
+        """
+        carga = self._carga
+        self.ejecutor.enviar(lambda: next(carga, None), self._bloque_cargado,
+                             self._error_carga, clave='carga')
+    
+    def _bloque_cargado(self, avance) -> None:
+        """
+        Muestra el progreso de la carga y los gastos ya leídos.
+        
+        Args:
+            avance: AvanceCarga del bloque, o None si la carga terminó
+        """
+        if avance is None:
+            self._terminar_carga()
+            return
+        self._cargados = avance.filas
+        self.barra_carga.config(value=avance.fraccion)
+        self.label_carga.config(text=f"⏳ Cargando gastos... {avance.fraccion:.0%} "
+                                     f"({avance.filas} leídos)")
+        self.actualizar_tabla()
+        self._cargar_bloque()
+    
+    def _error_carga(self, error: Exception) -> None:
+        """
+        Informa un error de la carga inicial; las consultas leerán el
+        ledger completo.
+        """
+        self._terminar_carga()
+        self._error_backend(error)
+    
+    def _terminar_carga(self) -> None:
+        """
+        Oculta el progreso de la carga y consulta la tabla y las
+        estadísticas del ledger completo.
+        """
+        self._carga = None
+        self.barra_carga.pack_forget()
+        self.label_carga.config(text="⏳ Cargando..." if self.ejecutor.ocupado else "")
+        self.actualizar_todo()
+    
+    def _cargando(self) -> bool:
+        """
+        Indica si la tabla muestra la carga inicial en curso (sin búsqueda
+        ni filtros, que esperan al ledger completo).
+        """
+        return self._carga is not None and self.busqueda is None and not self.filtros
+    
+    def cambiar_ledger(self, nombre: str) -> None:
+        """
+        Muestra otro ledger del espacio de trabajo, conservando la búsqueda
+        y los filtros.
+        
+        Si el ledger sigue en memoria en el pool del espacio, la carga
+        termina en un solo paso, sin volver a leer el archivo.
+        """
+        if nombre == self._ledger_pedido:
+            return
+        self._ledger_pedido = nombre
+        self.ejecutor.enviar(lambda: self._activar_ledger(nombre),
+                             lambda _: self._ledger_cambiado(nombre),
+                             self._error_cambio_ledger,
+                             clave='ledger')
+    
+    def _activar_ledger(self, nombre: str) -> None:
+        """
+        Activa el ledger en el espacio de trabajo. Corre en el hilo del
+        ejecutor, así que las tareas enviadas después ya usan su gestor.
+        """
+        self.gestor = self.espacio.activar(nombre)
+    
+    def _ledger_cambiado(self, nombre: str) -> None:
+        """
+        Muestra desde el principio el ledger recién activado.
+        """
+        self.ledger_activo = nombre
+        self.ledger_var.set(nombre)
+        self.root.title(f"💰 Sistema de Control de Gastos — {nombre}")
+        self._cantidad = 0
+        self._total_centavos = 0
+        self._mostrar_estadisticas()
+        self.tabla_virtual.inicio = 0
+        self.iniciar_carga()
+    
+    def _error_cambio_ledger(self, error: Exception) -> None:
+        """
+        Informa que no se pudo abrir el ledger y vuelve a mostrar el activo.
+        """
+        self._ledger_pedido = self.ledger_activo
+        self.ledger_var.set(self.ledger_activo)
+        messagebox.showerror("✗ Error", f"No se pudo abrir el ledger: {str(error)}")
+    
+    def nuevo_ledger(self) -> None:
+        """
+        Crea un ledger vacío en el espacio de trabajo y cambia a él.
+        """
+        nombre = simpledialog.askstring("📒 Nuevo ledger", "Nombre del ledger:",
+                                        parent=self.root)
+        if not nombre:
+            return
+        ruta = filedialog.asksaveasfilename(parent=self.root,
+                                            title="Archivo del nuevo ledger",
+                                            initialfile=f"gastos_{nombre.strip()}.csv",
+                                            defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv")])
+        if ruta:
+            self._registrar_ledger(nombre, ruta)
+    
+    def abrir_ledger(self) -> None:
+        """
+        Agrega un ledger existente (CSV o base SQLite) al espacio de trabajo
+        y cambia a él.
+        """
+        ruta = filedialog.askopenfilename(parent=self.root,
+                                          title="Abrir ledger",
+                                          filetypes=[("Ledgers", "*.csv *.db"),
+                                                     ("Todos", "*")])
+        if not ruta:
+            return
+        nombre = simpledialog.askstring(
+            "📒 Abrir ledger", "Nombre del ledger:", parent=self.root,
+            initialvalue=os.path.splitext(os.path.basename(ruta))[0])
+        if nombre:
+            self._registrar_ledger(nombre, ruta)
+    
+    def _registrar_ledger(self, nombre: str, ruta: str) -> None:
+        """
+        Registra el ledger en el espacio de trabajo y, si se pudo, cambia a él.
+        """
+        motor = "sqlite" if ruta.endswith(".db") else "csv"
+        
+        def registrado(resultado: tuple) -> None:
+            exito, mensaje = resultado
+            if not exito:
+                messagebox.showerror("✗ Error", mensaje)
+                return
+            self.combo_ledger.config(values=self.espacio.nombres)
+            self.cambiar_ledger(nombre.strip())
+        
+        self.ejecutor.enviar(lambda: self.espacio.agregar_ledger(nombre, ruta, motor),
+                             registrado,
+                             self._error_backend)
+    
+    def mostrar_totales_espacio(self) -> None:
+        """
+        Muestra el total de cada ledger del espacio de trabajo y el total
+        combinado, con los filtros activos.
+        """
+        filtros = dict(self.filtros)
+        self.ejecutor.enviar(lambda: self.espacio.totales_por_ledger(**filtros),
+                             self._totales_espacio_recibidos,
+                             self._error_backend)
+    
+    def _totales_espacio_recibidos(self, totales: dict) -> None:
+        """
+        Muestra los totales por ledger consultados al espacio de trabajo.
+        """
+        lineas = [f"{nombre}: ${total:,.2f}" for nombre, total in totales.items()]
+        total = sum(map(a_centavos, totales.values())) / 100
+        lineas.append(f"\nTotal combinado: ${total:,.2f}")
+        if self.filtros:
+            lineas.append("(con los filtros activos)")
+        messagebox.showinfo("Σ Todos los ledgers", "\n".join(lineas))
+    
+    def _error_backend(self, error: Exception) -> None:
+        """
+        Informa un error inesperado de una llamada en segundo plano.
+        """
+        messagebox.showerror("✗ Error", f"Error inesperado: {str(error)}")
     
     def guardar_gasto(self) -> None:
         """
@@ -293,42 +622,92 @@ class AplicacionGastos:
         descripcion = self.descripcion_entry.get()
         monto = self.monto_entry.get()
         
-        exito, mensaje = self.gestor.guardar_gasto(categoria, descripcion, monto)
+        self.ejecutor.enviar(
+            lambda: self.gestor.guardar_gasto_detallado(categoria, descripcion, monto),
+            self._gasto_guardado,
+            self._error_backend)
+    
+    def _gasto_guardado(self, resultado: tuple) -> None:
+        """
+        Muestra el resultado de guardar un gasto y actualiza la vista.
+        """
+        exito, mensaje, cambio = resultado
         
         if exito:
             messagebox.showinfo("✓ Éxito", mensaje)
             self.limpiar_campos()
-            self.actualizar_todo()
+            if self._carga is not None:
+                # La carga en curso leerá el alta al llegar al final del archivo
+                return
+            # Solo se agrega la fila nueva y se ajustan los totales (si pasa el filtro)
+            if coincide_filtro(cambio.gasto, **self.filtros):
+                if self.busqueda is None or coincide_texto(cambio.gasto.descripcion,
+                                                           self.busqueda):
+                    self.tabla_virtual.fila_agregada(cambio.gasto)
+                self._aplicar_cambio(cambio)
         else:
             messagebox.showerror("✗ Error", mensaje)
     
+    def _formatear_fila(self, gasto) -> tuple:
+        """
+        Convierte un gasto en (iid, valores) para la tabla.
+        
+        El id estable del gasto se usa como identificador del item.
+        """
+        return str(gasto.id), (gasto.fecha,
+                               gasto.categoria,
+                               gasto.descripcion,
+                               f"${gasto.monto:.2f}")
+    
     def actualizar_tabla(self) -> None:
         """
         Actualiza la tabla con los gastos del backend.
-        """
-        # Limpiar tabla
-        for item in self.tabla.get_children():
-            self.tabla.delete(item)
         
-        # Obtener gastos y llenar tabla
-        gastos = self.gestor.obtener_gastos()
-        for gasto in gastos:
-            self.tabla.insert('', tk.END, values=(
-                gasto['fecha'],
-                gasto['categoria'],
-                gasto['descripcion'],
-                f"${float(gasto['monto']):.2f}"
-            ))
+        Solo se consultan y dibujan las filas de la ventana visible, por lo
+        que el costo no depende del tamaño del ledger.
+        """
+        self.tabla_virtual.refrescar()
     
     def actualizar_estadisticas(self) -> None:
         """
         Actualiza las estadísticas mostradas.
         """
-        stats = self.gestor.obtener_estadisticas()
+        filtros = dict(self.filtros)
+        self.ejecutor.enviar(lambda: self.gestor.obtener_estadisticas(**filtros),
+                             self._estadisticas_recibidas,
+                             self._error_backend,
+                             clave='estadisticas')
+    
+    def _estadisticas_recibidas(self, stats: dict) -> None:
+        """
+        Guarda y muestra las estadísticas consultadas al backend.
+        """
+        self._cantidad = stats['cantidad_gastos']
+        self._total_centavos = a_centavos(stats['total_gastos'])
+        self._mostrar_estadisticas()
+    
+    def _mostrar_estadisticas(self) -> None:
+        """
+        Muestra en las etiquetas las estadísticas guardadas en memoria.
+        """
+        total = self._total_centavos / 100
+        promedio = total / self._cantidad if self._cantidad else 0
+        
+        self.label_total.config(text=f"Total Gastado: ${total:.2f}")
+        self.label_cantidad.config(text=f"Cantidad de Gastos: {self._cantidad}")
+        self.label_promedio.config(text=f"Promedio: ${promedio:.2f}")
+    
+    def _aplicar_cambio(self, cambio) -> None:
+        """
+        Ajusta las estadísticas mostradas con el efecto de un alta o una
+        baja, sin volver a consultar el backend.
         
-        self.label_total.config(text=f"Total Gastado: ${stats['total_gastos']:.2f}")
-        self.label_cantidad.config(text=f"Cantidad de Gastos: {stats['cantidad_gastos']}")
-        self.label_promedio.config(text=f"Promedio: ${stats['promedio']:.2f}")
+        Args:
+            cambio: CambioLedger retornado por el backend
+        """
+        self._cantidad += cambio.delta_cantidad
+        self._total_centavos += cambio.delta_centavos
+        self._mostrar_estadisticas()
     
     def actualizar_todo(self) -> None:
         """
@@ -337,6 +716,85 @@ class AplicacionGastos:
         self.actualizar_tabla()
         self.actualizar_estadisticas()
     
+    def aplicar_filtro(self) -> None:
+        """
+        Aplica a la tabla y a las estadísticas los filtros de la barra.
+        """
+        desde = self.filtro_desde_entry.get().strip() or None
+        hasta = self.filtro_hasta_entry.get().strip() or None
+        categoria = self.filtro_categoria_var.get()
+        
+        try:
+            limites_fecha(desde, hasta)
+        except ValueError:
+            messagebox.showerror("✗ Error",
+                                 "Las fechas del filtro deben tener formato AAAA-MM-DD "
+                                 "(o AAAA-MM, AAAA)")
+            return
+        
+        self.filtros = {}
+        if desde:
+            self.filtros['desde'] = desde
+        if hasta:
+            self.filtros['hasta'] = hasta
+        if categoria and categoria != "Todas":
+            self.filtros['categoria'] = categoria
+        self.tabla_virtual.inicio = 0
+        self.actualizar_todo()
+    
+    def filtrar_mes_actual(self) -> None:
+        """
+        Filtra los gastos del mes en curso.
+        """
+        mes = date.today().strftime("%Y-%m")
+        self.filtro_desde_entry.delete(0, tk.END)
+        self.filtro_desde_entry.insert(0, mes)
+        self.filtro_hasta_entry.delete(0, tk.END)
+        self.filtro_hasta_entry.insert(0, mes)
+        self.aplicar_filtro()
+    
+    def _programar_busqueda(self) -> None:
+        """
+        Reprograma la búsqueda para cuando se deje de escribir.
+        """
+        if self._busqueda_programada is not None:
+            self.root.after_cancel(self._busqueda_programada)
+        self._busqueda_programada = self.root.after(ESPERA_BUSQUEDA, self.aplicar_busqueda)
+    
+    def aplicar_busqueda(self) -> None:
+        """
+        Muestra en la tabla los gastos cuya descripción contiene las
+        palabras de la caja de búsqueda (las estadísticas siguen
+        reflejando solo los filtros).
+        """
+        if self._busqueda_programada is not None:
+            self.root.after_cancel(self._busqueda_programada)
+            self._busqueda_programada = None
+        busqueda = self.busqueda_entry.get().strip() or None
+        if busqueda == self.busqueda:
+            return
+        self.busqueda = busqueda
+        self.tabla_virtual.inicio = 0
+        self.actualizar_tabla()
+    
+    def quitar_busqueda(self) -> None:
+        """
+        Vacía la caja de búsqueda y vuelve a mostrar los gastos filtrados.
+        """
+        self.busqueda_entry.delete(0, tk.END)
+        self.aplicar_busqueda()
+    
+    def quitar_filtro(self) -> None:
+        """
+        Quita la búsqueda y los filtros y vuelve a mostrar todos los gastos.
+        """
+        self.busqueda_entry.delete(0, tk.END)
+        self.busqueda = None
+        self.filtro_desde_entry.delete(0, tk.END)
+        self.filtro_hasta_entry.delete(0, tk.END)
+        self.combo_filtro_categoria.current(0)
+        self.aplicar_filtro()
+    
     def confirmar_eliminacion(self, event=None) -> None:
         """
         Confirma y elimina el gasto seleccionado.
@@ -351,15 +809,27 @@ class AplicacionGastos:
                                         "¿Está seguro de eliminar este gasto?")
         
         if respuesta:
-            # Obtener el índice del item seleccionado
-            indice = self.tabla.index(seleccion[0])
-            exito, mensaje = self.gestor.eliminar_gasto(indice)
-            
-            if exito:
-                messagebox.showinfo("✓ Éxito", mensaje)
-                self.actualizar_todo()
-            else:
-                messagebox.showerror("✗ Error", mensaje)
+            # El identificador del item es el id estable del gasto
+            id_gasto = int(seleccion[0])
+            self.ejecutor.enviar(
+                lambda: self.gestor.eliminar_gasto_detallado(id_gasto),
+                lambda resultado: self._gasto_eliminado(seleccion[0], resultado),
+                self._error_backend)
+    
+    def _gasto_eliminado(self, iid: str, resultado: tuple) -> None:
+        """
+        Muestra el resultado de eliminar un gasto y actualiza la vista.
+        """
+        exito, mensaje, cambio = resultado
+        
+        if exito:
+            messagebox.showinfo("✓ Éxito", mensaje)
+            self.tabla_virtual.fila_eliminada(iid)
+            # Durante la carga inicial las estadísticas se consultan al terminar
+            if self._carga is None:
+                self._aplicar_cambio(cambio)
+        else:
+            messagebox.showerror("✗ Error", mensaje)
     
     def limpiar_campos(self) -> None:
         """
@@ -369,6 +839,107 @@ class AplicacionGastos:
         self.descripcion_entry.delete(0, tk.END)
         self.monto_entry.delete(0, tk.END)
         self.descripcion_entry.focus()
+    
+    def abrir_diagnostico(self) -> None:
+        """
+        Muestra el panel de diagnóstico con las métricas de instrumentación
+        (Ctrl+Shift+D).
+        """
+        if self.ventana_diagnostico is not None:
+            self.ventana_diagnostico.lift()
+            return
+        
+        ventana = tk.Toplevel(self.root)
+        ventana.title("Diagnóstico")
+        ventana.geometry("820x360")
+        self.ventana_diagnostico = ventana
+        
+        columnas = ('Llamadas', 'Errores', 'Total s', 'p50 ms', 'p99 ms', 'Máx ms',
+                    'Leído', 'Escrito')
+        tabla = ttk.Treeview(ventana, columns=columnas, show='tree headings')
+        tabla.heading('#0', text='Método')
+        tabla.column('#0', width=240)
+        for columna in columnas:
+            tabla.heading(columna, text=columna)
+            tabla.column(columna, width=70, anchor=tk.E)
+        tabla.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        botones = tk.Frame(ventana)
+        botones.pack(fill=tk.X, padx=5, pady=(0, 5))
+        boton_activar = tk.Button(botones, command=lambda: alternar())
+        boton_activar.pack(side=tk.LEFT, padx=2)
+        tk.Button(botones, text="Reiniciar",
+                  command=lambda: (instrumentacion.reiniciar(), refrescar(False))
+                  ).pack(side=tk.LEFT, padx=2)
+        tk.Button(botones, text="Exportar JSON",
+                  command=lambda: exportar("metricas_gastos.json")).pack(side=tk.LEFT, padx=2)
+        tk.Button(botones, text="Exportar Prometheus",
+                  command=lambda: exportar("metricas_gastos.prom")).pack(side=tk.LEFT, padx=2)
+        
+        def alternar() -> None:
+            if instrumentacion.activa:
+                instrumentacion.desactivar()
+            else:
+                instrumentacion.activar(objetivos_interfaz())
+            refrescar(False)
+        
+        def exportar(ruta: str) -> None:
+            try:
+                instrumentacion.exportar(ruta)
+                messagebox.showinfo("✓ Exportado", f"Métricas guardadas en {ruta}",
+                                    parent=ventana)
+            except OSError as e:
+                messagebox.showerror("✗ Error", f"No se pudo exportar: {str(e)}",
+                                     parent=ventana)
+        
+        def refrescar(programar: bool = True) -> None:
+            if self.ventana_diagnostico is not ventana:
+                return
+            boton_activar.config(text="Desactivar" if instrumentacion.activa else "Activar")
+            tabla.delete(*tabla.get_children())
+            for metodo, m in instrumentacion.instantanea().items():
+                tabla.insert('', tk.END, text=metodo,
+                             values=(m['llamadas'], m['errores'], f"{m['segundos_total']:.3f}",
+                                     f"{m['p50_ms']:.2f}", f"{m['p99_ms']:.2f}",
+                                     f"{m['maximo_ms']:.2f}", formatear_bytes(m['bytes_leidos']),
+                                     formatear_bytes(m['bytes_escritos'])))
+            if programar:
+                ventana.after(INTERVALO_DIAGNOSTICO, refrescar)
+        
+        def cerrar_panel() -> None:
+            self.ventana_diagnostico = None
+            ventana.destroy()
+        
+        ventana.protocol("WM_DELETE_WINDOW", cerrar_panel)
+        refrescar()
+    
+    def cerrar(self) -> None:
+        """
+        Espera las escrituras pendientes, cierra los ledgers abiertos y la ventana.
+        """
+        self.ejecutor.cerrar()
+        self.espacio.cerrar()
+        self.root.destroy()
+
+
+def objetivos_interfaz() -> list:
+    """
+    Métodos de la interfaz que se instrumentan junto con GestorGastos.
+    """
+    return [(AplicacionGastos, ['actualizar_tabla', 'actualizar_estadisticas',
+                                '_estadisticas_recibidas']),
+            (TablaVirtual, ['refrescar', '_dibujar'])]
+
+
+def formatear_bytes(cantidad: int) -> str:
+    """
+    Cantidad de bytes en la unidad más legible.
+    """
+    for unidad in ("B", "KiB", "MiB"):
+        if cantidad < 1024:
+            return f"{cantidad:.0f} {unidad}"
+        cantidad /= 1024
+    return f"{cantidad:.1f} GiB"
 
 
 def main():
@@ -0,0 +1,409 @@
+"""
+Resúmenes mensuales precalculados
+Guarda en un archivo auxiliar la cantidad, suma, mínimo y máximo de cada
+mes cerrado y categoría, de modo que las consultas sobre períodos largos
+solo recorren esos resúmenes y los gastos del mes en curso
+"""
+
+import csv
+import json
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from almacenamiento import AlmacenamientoBase, Gasto, a_centavos, clave_periodo, limites_fecha
+from instantanea import VENTANA_HUELLA, huella_csv
+from lector_csv import lineas_hasta
+
+# Versión del formato del archivo de resúmenes
+VERSION_RESUMEN = 2
+
+# Clave de los gastos cuya fecha no se pudo interpretar
+SIN_FECHA = "Sin fecha"
+
+# Acumulado de un grupo: [cantidad, total, mínimo, máximo] con montos en centavos
+Acumulado = List[int]
+
+
+def sumar_acumulado(destino: Dict[str, Acumulado], clave: str, origen: Acumulado) -> None:
+    """
+    Combina un acumulado dentro de un diccionario de acumulados.
+    """
+    actual = destino.get(clave)
+    if actual is None:
+        destino[clave] = list(origen)
+    else:
+        actual[0] += origen[0]
+        actual[1] += origen[1]
+        actual[2] = min(actual[2], origen[2])
+        actual[3] = max(actual[3], origen[3])
+
+
+def _mes_siguiente(mes: str) -> str:
+    anio, numero = int(mes[:4]), int(mes[5:7])
+    return f"{anio + numero // 12:04d}-{numero % 12 + 1:02d}"
+
+
+def _mes_anterior(mes: str) -> str:
+    anio, numero = int(mes[:4]), int(mes[5:7])
+    return f"{anio - 1:04d}-12" if numero == 1 else f"{anio:04d}-{numero - 1:02d}"
+
+
+def _segundo_anterior(fecha: str) -> str:
+    """
+    Convierte un límite exclusivo "AAAA-MM-DD HH:MM:SS" en el inclusivo equivalente.
+    """
+    anterior = datetime.strptime(fecha, "%Y-%m-%d %H:%M:%S") - timedelta(seconds=1)
+    return anterior.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class ResumenMensual:
+    """
+    Resúmenes por mes y categoría de los meses cerrados de un ledger.
+
+    Los meses anteriores al actual se resumen una sola vez y se guardan
+    en ``<archivo>.resumen`` (JSON). El mes en curso (y cualquier fecha
+    futura) se consulta siempre sobre los gastos. Cuando un alta o una
+    baja afecta a un mes ya resumido, ``invalidar`` lo marca como
+    pendiente y se recalcula en la siguiente consulta. Otro proceso que
+    modifique el mismo ledger a través de ``GestorGastos`` también marca
+    el archivo, que se relee al detectar que cambió.
+
+    Con ``archivo_ledger`` (un CSV de solo anexado) el resumen guarda
+    además la identidad del ledger, como la instantánea: inodo, tamaño,
+    mtime y huella de lo ya visto. Si en la siguiente consulta el CSV solo
+    creció, se marcan los meses de las filas anexadas; cualquier otro
+    cambio (una edición a mano, otro archivo) reconstruye todo.
+    """
+
+    def __init__(self, almacen: AlmacenamientoBase, archivo_resumen: str,
+                 archivo_ledger: Optional[str] = None):
+        """
+        Inicializa el resumen y lee el archivo si existe.
+
+        Args:
+            almacen: Motor de almacenamiento cuyos gastos se resumen
+            archivo_resumen: Ruta del archivo JSON de resúmenes
+            archivo_ledger: CSV del ledger cuyos cambios externos se vigilan
+                (None: solo se consideran las altas y bajas avisadas)
+        """
+        self._almacen = almacen
+        self.archivo_resumen = archivo_resumen
+        self.archivo_ledger = archivo_ledger
+        # Último mes cerrado incluido en los resúmenes (None: aún no se construyeron)
+        self.cubierto_hasta: Optional[str] = None
+        self.meses: Dict[str, Dict[str, Acumulado]] = {}
+        self.pendientes: Set[str] = set()
+        # Identidad del ledger resumido: [inodo, tamaño, mtime en ns, bytes
+        # vistos (hasta la última línea completa), huella de esos bytes]
+        self.ledger: Optional[list] = None
+        self._firma: Optional[tuple] = None
+        self._cargar()
+
+    def _firma_archivo(self) -> Optional[tuple]:
+        try:
+            info = os.stat(self.archivo_resumen)
+        except OSError:
+            return None
+        return info.st_mtime_ns, info.st_size
+
+    def _cargar(self) -> None:
+        """
+        Lee el archivo de resúmenes; si falta o no es válido, se empieza vacío.
+        """
+        self.cubierto_hasta, self.meses, self.pendientes = None, {}, set()
+        self.ledger = None
+        self._firma = self._firma_archivo()
+        if self._firma is None:
+            return
+        try:
+            with open(self.archivo_resumen, 'r', encoding='utf-8') as archivo:
+                datos = json.load(archivo)
+            if datos.get('version') != VERSION_RESUMEN:
+                return
+            self.cubierto_hasta = datos['cubierto_hasta']
+            self.meses = datos['meses']
+            self.pendientes = set(datos['pendientes'])
+            self.ledger = datos.get('ledger')
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Resúmenes descartados, se reconstruirán: {str(e)}")
+            self.cubierto_hasta, self.meses, self.pendientes = None, {}, set()
+            self.ledger = None
+
+    def _guardar(self) -> None:
+        """
+        Escribe los resúmenes de forma atómica mediante un archivo temporal.
+
+        Si no se puede escribir, los resúmenes siguen valiendo en memoria.
+        """
+        # Nombre propio del proceso: otro proceso puede estar guardando a la vez
+        temporal = f"{self.archivo_resumen}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                json.dump({'version': VERSION_RESUMEN,
+                           'cubierto_hasta': self.cubierto_hasta,
+                           'pendientes': sorted(self.pendientes),
+                           'ledger': self.ledger,
+                           'meses': self.meses}, archivo, ensure_ascii=False)
+            os.replace(temporal, self.archivo_resumen)
+        except OSError as e:
+            print(f"Error al guardar los resúmenes: {str(e)}")
+        self._firma = self._firma_archivo()
+
+    def _releer_si_cambio(self) -> None:
+        if self._firma_archivo() != self._firma:
+            self._cargar()
+
+    def descartar(self) -> None:
+        """
+        Borra los resúmenes para reconstruirlos desde cero en la próxima
+        consulta (por ejemplo, tras editar el archivo a mano).
+        """
+        self.cubierto_hasta, self.meses, self.pendientes = None, {}, set()
+        self.ledger = None
+        if os.path.exists(self.archivo_resumen):
+            os.remove(self.archivo_resumen)
+        self._firma = None
+
+    def _identidad_ledger(self) -> Optional[list]:
+        """
+        Identidad actual del CSV del ledger (ver ``ledger``), o None si no
+        se puede leer.
+        """
+        try:
+            with open(self.archivo_ledger, 'rb') as archivo:
+                info = os.fstat(archivo.fileno())
+                # Una última línea sin salto puede ser un alta a medio escribir
+                inicio = max(0, info.st_size - VENTANA_HUELLA)
+                archivo.seek(inicio)
+                hasta = inicio + archivo.read(info.st_size - inicio).rfind(b'\n') + 1
+            return [info.st_ino, info.st_size, info.st_mtime_ns, hasta,
+                    huella_csv(self.archivo_ledger, hasta).hex()]
+        except OSError:
+            return None
+
+    def _fechas_anexadas(self, desde: int, hasta: int) -> Iterator[str]:
+        """
+        Fechas de las filas del CSV entre los bytes ``desde`` y ``hasta``.
+        """
+        with open(self.archivo_ledger, 'rb') as archivo:
+            encabezado = next(csv.reader([archivo.readline().decode('utf-8')]), [])
+            columna = encabezado.index('fecha') if 'fecha' in encabezado else None
+            desde = max(desde, archivo.tell())
+            archivo.seek(desde)
+            for fila in csv.reader(lineas_hasta(archivo, hasta - desde)):
+                if fila:
+                    yield fila[columna] if columna is not None and columna < len(fila) else ''
+
+    def _verificar_ledger(self) -> bool:
+        """
+        Compara el CSV con la identidad guardada. Si solo se le anexaron
+        filas, marca como pendientes sus meses resumidos; si cambió de otra
+        forma, marca una reconstrucción completa.
+
+        Returns:
+            True si la identidad cambió y hay que guardar los resúmenes
+        """
+        if self.archivo_ledger is None or self.cubierto_hasta is None:
+            return False
+        try:
+            info = os.stat(self.archivo_ledger)
+        except OSError:
+            info = None
+        if (info is not None and self.ledger is not None
+                and [info.st_ino, info.st_size, info.st_mtime_ns] == self.ledger[:3]):
+            return False
+
+        identidad = self._identidad_ledger()
+        try:
+            inodo, tamano, mtime_ns, hasta, huella = self.ledger
+            solo_anexado = (identidad is not None and identidad[0] == inodo
+                            and identidad[3] >= hasta
+                            and not (identidad[1] == tamano and identidad[2] != mtime_ns)
+                            and huella_csv(self.archivo_ledger, hasta).hex() == huella)
+            if solo_anexado:
+                meses = {clave_periodo(fecha, "mes")
+                         for fecha in self._fechas_anexadas(hasta, identidad[3])}
+                self.pendientes |= {mes for mes in meses
+                                    if mes == SIN_FECHA or mes <= self.cubierto_hasta}
+        except (OSError, ValueError, TypeError):
+            solo_anexado = False
+        if not solo_anexado:
+            self.pendientes.add(SIN_FECHA)
+        self.ledger = identidad
+        return True
+
+    @contextmanager
+    def reemplazo_propio(self) -> Iterator[None]:
+        """
+        Contexto para una operación propia que puede reemplazar el CSV sin
+        cambiar los totales (la compactación quita filas con lápida, cuyos
+        meses ya se marcaron). Verifica el ledger antes y adopta después la
+        identidad del archivo nuevo, para no reconstruir todo por eso.
+        """
+        if self.archivo_ledger is None:
+            yield
+            return
+        self._releer_si_cambio()
+        if self._verificar_ledger():
+            self._guardar()
+        anterior = self.ledger
+        try:
+            yield
+        finally:
+            identidad = self._identidad_ledger()
+            if anterior is not None and identidad is not None and identidad[0] != anterior[0]:
+                self.ledger = identidad
+                self._guardar()
+
+    def invalidar(self, fechas: Iterable[str]) -> None:
+        """
+        Marca como pendientes los meses resumidos que contienen las fechas
+        de gastos agregados o eliminados. Los meses abiertos se ignoran.
+
+        Args:
+            fechas: Fechas de los gastos modificados
+        """
+        fechas = list(fechas)
+        # Ningún proceso resume el mes en curso: las altas de hoy no tocan
+        # el archivo (ni hace falta releerlo) en la ruta de ingesta
+        hoy = date.today().isoformat()
+        if all(fecha[:10] == hoy for fecha in fechas):
+            return
+        self._releer_si_cambio()
+        if self.cubierto_hasta is None:
+            return
+        meses = {clave_periodo(fecha, "mes") for fecha in fechas}
+        meses = {mes for mes in meses
+                 if (mes == SIN_FECHA or mes <= self.cubierto_hasta) and mes not in self.pendientes}
+        if meses:
+            for mes in meses:
+                self.meses.pop(mes, None)
+            self.pendientes |= meses
+            self._guardar()
+
+    @staticmethod
+    def _acumular(gastos: Iterable[Gasto], hasta_mes: Optional[str] = None,
+                  destino: Optional[Dict[str, Dict[str, Acumulado]]] = None
+                  ) -> Dict[str, Dict[str, Acumulado]]:
+        """
+        Agrupa gastos por mes y categoría.
+
+        Args:
+            gastos: Gastos a acumular
+            hasta_mes: Ignorar los gastos de meses posteriores a este
+            destino: Diccionario donde acumular (por defecto, uno nuevo)
+        """
+        meses = {} if destino is None else destino
+        # La clave del mes se valida una vez por día, no por gasto
+        mes_por_dia: Dict[str, str] = {}
+        for gasto in gastos:
+            fecha = gasto.fecha
+            mes = mes_por_dia.get(fecha[:10])
+            if mes is None:
+                mes = mes_por_dia[fecha[:10]] = clave_periodo(fecha, "mes")
+            if hasta_mes is not None and mes != SIN_FECHA and mes > hasta_mes:
+                continue
+            centavos = a_centavos(gasto.monto)
+            categorias = meses.get(mes)
+            if categorias is None:
+                categorias = meses[mes] = {}
+            acumulado = categorias.get(gasto.categoria)
+            if acumulado is None:
+                categorias[gasto.categoria] = [1, centavos, centavos, centavos]
+            else:
+                acumulado[0] += 1
+                acumulado[1] += centavos
+                if centavos < acumulado[2]:
+                    acumulado[2] = centavos
+                if centavos > acumulado[3]:
+                    acumulado[3] = centavos
+        return meses
+
+    def actualizar(self) -> None:
+        """
+        Resume los meses que se cerraron desde la última consulta y
+        recalcula los pendientes.
+        """
+        self._releer_si_cambio()
+        ultimo_cerrado = _mes_anterior(date.today().strftime("%Y-%m"))
+        cambios = self._verificar_ledger()
+
+        if self.cubierto_hasta is None or SIN_FECHA in self.pendientes:
+            # Construcción completa: una única pasada por todo el ledger
+            if self.archivo_ledger is not None:
+                self.ledger = self._identidad_ledger()
+            self.meses = self._acumular(self._almacen.iterar(), ultimo_cerrado)
+            self.cubierto_hasta = ultimo_cerrado
+            self.pendientes = set()
+            cambios = True
+        elif self.cubierto_hasta < ultimo_cerrado:
+            desde = _mes_siguiente(self.cubierto_hasta)
+            self._acumular(self._almacen.iterar(desde, ultimo_cerrado), ultimo_cerrado,
+                           self.meses)
+            self.cubierto_hasta = ultimo_cerrado
+            cambios = True
+
+        for mes in sorted(self.pendientes):
+            self.meses.pop(mes, None)
+            self._acumular(self._almacen.iterar(mes, mes), destino=self.meses)
+            cambios = True
+        self.pendientes = set()
+
+        if cambios:
+            self._guardar()
+
+    def consultar(self, desde: Optional[str] = None, hasta: Optional[str] = None,
+                  categoria: Optional[str] = None) -> Dict[str, Dict[str, Acumulado]]:
+        """
+        Obtiene los acumulados por mes y categoría de los gastos que
+        cumplen los filtros (ver ``coincide_filtro``).
+
+        Los meses cerrados que el rango cubre por completo salen de los
+        resúmenes; solo los extremos parciales y los meses abiertos se
+        consultan sobre los gastos.
+
+        Returns:
+            Diccionario mes -> categoría -> [cantidad, total, mínimo, máximo]
+        """
+        self.actualizar()
+        try:
+            inicio, fin = limites_fecha(desde, hasta)
+        except ValueError:
+            return self._acumular(self._almacen.iterar(desde, hasta, categoria))
+
+        # Meses completos dentro de [inicio, fin) que ya están resumidos
+        primero = "0000-01"
+        if inicio is not None:
+            primero = inicio[:7] if inicio[7:] == "-01 00:00:00" else _mes_siguiente(inicio[:7])
+        ultimo = self.cubierto_hasta
+        if fin is not None:
+            ultimo = min(ultimo, _mes_anterior(fin[:7]))
+        if primero > ultimo:
+            return self._acumular(self._almacen.iterar(desde, hasta, categoria))
+
+        resultado: Dict[str, Dict[str, Acumulado]] = {}
+        for mes, categorias in self.meses.items():
+            if mes == SIN_FECHA:
+                # Las fechas inválidas solo cuentan en las consultas sin rango
+                incluir = desde is None and hasta is None
+            else:
+                incluir = primero <= mes <= ultimo
+            if not incluir:
+                continue
+            for nombre, acumulado in categorias.items():
+                if categoria is None or nombre == categoria:
+                    sumar_acumulado(resultado.setdefault(mes, {}), nombre, acumulado)
+
+        # Extremos que no están resumidos: antes del primer mes y después del último
+        inicio_primero = f"{primero}-01 00:00:00"
+        if inicio is not None and inicio < inicio_primero:
+            self._acumular(self._almacen.iterar(inicio, _segundo_anterior(inicio_primero),
+                                                categoria), destino=resultado)
+        inicio_resto = f"{_mes_siguiente(ultimo)}-01 00:00:00"
+        if fin is None or inicio_resto < fin:
+            self._acumular(self._almacen.iterar(
+                inicio_resto, _segundo_anterior(fin) if fin is not None else None, categoria),
+                destino=resultado)
+        return resultado
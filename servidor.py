@@ -0,0 +1,557 @@
+"""
+Servicio HTTP/JSON del Sistema de Control de Gastos
+Expone GestorGastos a varios clientes locales sobre asyncio: las
+modificaciones se aplican de a una en un hilo escritor dedicado y las
+consultas se responden desde el ledger en memoria
+"""
+
+import argparse
+import asyncio
+import json
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from backend import GestorGastos, MOTORES
+from diario import POLITICAS_FSYNC
+from instrumentacion import activar_si_corresponde, instrumentacion
+
+# Tamaño máximo aceptado para el cuerpo de una petición
+TAMANO_MAXIMO_CUERPO = 16 * 1024 * 1024
+
+# Cantidad máxima de encabezados por petición
+MAXIMO_ENCABEZADOS = 100
+
+# Gastos por fragmento al transmitir el listado en streaming
+GASTOS_POR_FRAGMENTO = 1000
+
+# Gastos de un lote que se guardan de una vez; entre tramos el hilo escritor
+# suelta el mutex y las consultas pendientes pueden leer
+GASTOS_POR_TRAMO = 10_000
+
+# Tamaño de página por defecto y máximo del listado paginado
+PAGINA_POR_DEFECTO = 100
+PAGINA_MAXIMA = 10_000
+
+TEXTOS_ESTADO = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class ErrorPeticion(Exception):
+    """
+    Error atribuible a la petición del cliente; se responde con su estado HTTP.
+    """
+
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.mensaje = mensaje
+
+
+class RespuestaInterrumpida(Exception):
+    """
+    Error después de enviar los encabezados de una respuesta: ya no se puede
+    responder con otro estado y hay que cerrar la conexión.
+    """
+
+
+def _gasto_json(gasto) -> Dict[str, Any]:
+    # Sirve tanto para Gasto como para las filas de la tabla en memoria
+    return {'id': gasto.id, 'fecha': gasto.fecha, 'categoria': gasto.categoria,
+            'descripcion': gasto.descripcion, 'monto': gasto.monto}
+
+
+def _filtros(consulta: Dict[str, List[str]]) -> Dict[str, Optional[str]]:
+    """
+    Extrae los filtros opcionales desde/hasta/categoria de la consulta.
+    """
+    return {clave: consulta[clave][0] if clave in consulta else None
+            for clave in ("desde", "hasta", "categoria")}
+
+
+def _entero(consulta: Dict[str, List[str]], clave: str, defecto: int) -> int:
+    try:
+        return int(consulta[clave][0]) if clave in consulta else defecto
+    except ValueError:
+        raise ErrorPeticion(400, f"'{clave}' debe ser un entero")
+
+
+class ServidorGastos:
+    """
+    Servidor HTTP/1.1 mínimo (con conexiones persistentes) sobre un GestorGastos.
+
+    Rutas:
+        - ``POST /gastos``: guarda un gasto ``{categoria, descripcion, monto}``
+        - ``POST /gastos/lote``: guarda una lista de gastos (como ``guardar_gastos_lote``)
+        - ``GET /gastos``: página ``?inicio=&cantidad=`` con filtros
+          ``desde``/``hasta``/``categoria``; con ``?stream=1`` transmite todos
+          los gastos como JSON Lines
+        - ``DELETE /gastos/<id>``: elimina un gasto
+        - ``GET /estadisticas``: estadísticas y totales por categoría (con filtros)
+        - ``GET /metricas``: métricas de instrumentación en formato Prometheus
+          (``?formato=json`` para JSON)
+
+    Todas las modificaciones se encolan hacia una sola tarea escritora, que
+    las aplica de a una y en orden de llegada en un hilo dedicado: una
+    escritura que espera su fsync no detiene el bucle de eventos. Las
+    consultas leen el ledger en memoria desde otros hilos, sin esperar a
+    las escrituras encoladas; un mutex evita que lean mientras el hilo
+    escritor lo modifica, y un lote grande se guarda por tramos para no
+    retenerlo todo ese tiempo. El bucle de eventos nunca toma el mutex.
+
+    En modo durable con la política "siempre" el gestor debe abrirse con
+    ``confirmacion_diferida``: cada alta se confirma fuera del hilo
+    escritor, de modo que las altas que llegan juntas comparten un fsync.
+    """
+
+    def __init__(self, gestor: GestorGastos, host: str = "127.0.0.1", puerto: int = 8080):
+        """
+        Args:
+            gestor: Gestor de gastos a exponer (preferentemente con el ledger en memoria)
+            host: Dirección donde escuchar
+            puerto: Puerto donde escuchar (0 elige uno libre)
+        """
+        self.gestor = gestor
+        self.host = host
+        self.puerto = puerto
+        self._servidor: Optional[asyncio.AbstractServer] = None
+        self._cola: Optional[asyncio.Queue] = None
+        self._tarea_escritora: Optional[asyncio.Task] = None
+        self._hilo_escritor: Optional[ThreadPoolExecutor] = None
+        # Lo toman el hilo escritor al modificar el ledger y las consultas al leerlo
+        self._mutex = threading.Lock()
+
+    async def iniciar(self) -> None:
+        """
+        Abre el socket y arranca la tarea escritora.
+        """
+        self._cola = asyncio.Queue()
+        self._hilo_escritor = ThreadPoolExecutor(max_workers=1,
+                                                 thread_name_prefix="escritor")
+        self._tarea_escritora = asyncio.ensure_future(self._escritor())
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+
+    async def servir(self) -> None:
+        """
+        Atiende conexiones hasta que se cancele la tarea.
+        """
+        if self._servidor is None:
+            await self.iniciar()
+        try:
+            async with self._servidor:
+                await self._servidor.serve_forever()
+        finally:
+            await self.cerrar()
+
+    async def cerrar(self) -> None:
+        """
+        Deja de aceptar conexiones y espera a que terminen las escrituras encoladas.
+        """
+        if self._servidor is not None:
+            self._servidor.close()
+        if self._tarea_escritora is not None:
+            await self._cola.put(None)
+            await self._tarea_escritora
+            self._tarea_escritora = None
+        if self._hilo_escritor is not None:
+            self._hilo_escritor.shutdown()
+            self._hilo_escritor = None
+
+    # Escritura
+
+    async def _escritor(self) -> None:
+        """
+        Tarea escritora: aplica las modificaciones encoladas de a una en el
+        hilo escritor. Las que ya esperan en la cola se le pasan juntas, para
+        no pagar el cambio de hilo por cada una.
+        """
+        loop = asyncio.get_running_loop()
+        terminar = False
+        while not terminar:
+            trabajos = [await self._cola.get()]
+            while not self._cola.empty():
+                trabajos.append(self._cola.get_nowait())
+            if None in trabajos:
+                terminar = True
+                trabajos = trabajos[:trabajos.index(None)]
+            trabajos = [trabajo for trabajo in trabajos if not trabajo[2].cancelled()]
+            if not trabajos:
+                continue
+            resultados = await loop.run_in_executor(self._hilo_escritor, self._aplicar, trabajos)
+            for (_, _, futuro), (exito, valor) in zip(trabajos, resultados):
+                if futuro.cancelled():
+                    continue
+                if exito:
+                    futuro.set_result(valor)
+                else:
+                    futuro.set_exception(valor)
+
+    async def _leer(self, funcion: Callable, *argumentos) -> Any:
+        """
+        Ejecuta una consulta con el mutex tomado en un hilo aparte, de modo
+        que esperar a una escritura en curso no detiene el bucle de eventos.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._aplicar_consulta, funcion, argumentos)
+
+    def _aplicar_consulta(self, funcion: Callable, argumentos: tuple) -> Any:
+        with self._mutex:
+            return funcion(*argumentos)
+
+    def _aplicar(self, trabajos: List[tuple]) -> List[Tuple[bool, Any]]:
+        """
+        Aplica en orden las modificaciones en el hilo escritor.
+
+        Returns:
+            Por cada una, (True, resultado) o (False, excepción)
+        """
+        resultados = []
+        for funcion, argumentos, _ in trabajos:
+            with self._mutex:
+                try:
+                    resultados.append((True, funcion(*argumentos)))
+                except Exception as e:
+                    resultados.append((False, e))
+        return resultados
+
+    def _escribir(self, funcion: Callable, *argumentos) -> Awaitable:
+        """
+        Encola una modificación del ledger y retorna un futuro con su resultado.
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        self._cola.put_nowait((funcion, argumentos, futuro))
+        return futuro
+
+    # Protocolo HTTP
+
+    async def _atender(self, lector: asyncio.StreamReader,
+                       escritor: asyncio.StreamWriter) -> None:
+        """
+        Atiende las peticiones de una conexión hasta que el cliente la cierre.
+        """
+        try:
+            while True:
+                peticion = await self._leer_peticion(lector, escritor)
+                if peticion is None:
+                    break
+                metodo, destino, cuerpo, mantener = peticion
+                try:
+                    await self._despachar(metodo, destino, cuerpo, escritor)
+                except RespuestaInterrumpida:
+                    break
+                except ErrorPeticion as e:
+                    self._responder(escritor, e.estado, {"error": e.mensaje})
+                except Exception as e:
+                    self._responder(escritor, 500, {"error": str(e)})
+                await escritor.drain()
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _leer_peticion(self, lector: asyncio.StreamReader,
+                             escritor: asyncio.StreamWriter
+                             ) -> Optional[Tuple[str, str, bytes, bool]]:
+        """
+        Lee una petición completa.
+
+        Returns:
+            Tupla (método, destino, cuerpo, mantener conexión) o None si el
+            cliente cerró la conexión o envió una petición inválida
+        """
+        linea = await lector.readline()
+        if not linea.strip():
+            return None
+        try:
+            metodo, destino, version = linea.decode('latin-1').split()
+        except ValueError:
+            self._responder(escritor, 400, {"error": "Línea de petición inválida"})
+            return None
+
+        encabezados = {}
+        for _ in range(MAXIMO_ENCABEZADOS + 1):
+            linea = await lector.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = linea.decode('latin-1').partition(":")
+            encabezados[nombre.strip().lower()] = valor.strip()
+        else:
+            self._responder(escritor, 400, {"error": "Demasiados encabezados"})
+            return None
+
+        try:
+            longitud = int(encabezados.get("content-length", 0))
+        except ValueError:
+            longitud = -1
+        if longitud < 0 or longitud > TAMANO_MAXIMO_CUERPO:
+            self._responder(escritor, 413, {"error": "Cuerpo demasiado grande o inválido"})
+            return None
+        cuerpo = await lector.readexactly(longitud) if longitud else b""
+
+        conexion = encabezados.get("connection", "").lower()
+        mantener = conexion != "close" and (version == "HTTP/1.1" or conexion == "keep-alive")
+        return metodo.upper(), destino, cuerpo, mantener
+
+    @staticmethod
+    def _responder(escritor: asyncio.StreamWriter, estado: int, datos: Any) -> None:
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        escritor.write(
+            f"HTTP/1.1 {estado} {TEXTOS_ESTADO.get(estado, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(cuerpo)}\r\n\r\n".encode('latin-1') + cuerpo)
+
+    @staticmethod
+    def _responder_texto(escritor: asyncio.StreamWriter, texto: str, tipo: str) -> None:
+        cuerpo = texto.encode('utf-8')
+        escritor.write(
+            f"HTTP/1.1 200 OK\r\n"
+            f"Content-Type: {tipo}; charset=utf-8\r\n"
+            f"Content-Length: {len(cuerpo)}\r\n\r\n".encode('latin-1') + cuerpo)
+
+    async def _despachar(self, metodo: str, destino: str, cuerpo: bytes,
+                         escritor: asyncio.StreamWriter) -> None:
+        """
+        Resuelve la ruta de la petición y escribe su respuesta.
+        """
+        partes = urlsplit(destino)
+        ruta = partes.path.rstrip("/") or "/"
+        consulta = parse_qs(partes.query)
+
+        if ruta == "/gastos":
+            if metodo == "GET":
+                if consulta.get("stream", ["0"])[0] not in ("0", "", "false"):
+                    await self._transmitir_gastos(consulta, escritor)
+                else:
+                    self._responder(escritor, 200, await self._leer(self._listar, consulta))
+                return
+            if metodo == "POST":
+                await self._guardar(self._leer_json(cuerpo), escritor)
+                return
+            raise ErrorPeticion(405, f"Método no permitido en {ruta}")
+
+        if ruta == "/gastos/lote":
+            if metodo != "POST":
+                raise ErrorPeticion(405, f"Método no permitido en {ruta}")
+            datos = self._leer_json(cuerpo)
+            if isinstance(datos, dict):
+                datos = datos.get("gastos")
+            if not isinstance(datos, list):
+                raise ErrorPeticion(400, "Se esperaba una lista de gastos")
+            guardados, errores = await self._guardar_lote(datos)
+            self._responder(escritor, 200, {"guardados": guardados, "errores": errores})
+            return
+
+        if ruta.startswith("/gastos/"):
+            if metodo != "DELETE":
+                raise ErrorPeticion(405, f"Método no permitido en {ruta}")
+            exito, mensaje, cambio = await self._escribir(
+                self.gestor.eliminar_gasto_detallado, ruta[len("/gastos/"):])
+            if not exito:
+                raise ErrorPeticion(404, mensaje)
+            self._responder(escritor, 200, {"mensaje": mensaje,
+                                            "gasto": _gasto_json(cambio.gasto)})
+            return
+
+        if ruta == "/estadisticas":
+            if metodo != "GET":
+                raise ErrorPeticion(405, f"Método no permitido en {ruta}")
+            self._responder(escritor, 200, await self._leer(self._estadisticas, consulta))
+            return
+
+        if ruta == "/metricas":
+            if metodo != "GET":
+                raise ErrorPeticion(405, f"Método no permitido en {ruta}")
+            if not instrumentacion.activa:
+                raise ErrorPeticion(404, "Instrumentación desactivada (use --metricas)")
+            if consulta.get("formato", [""])[0] == "json":
+                self._responder_texto(escritor, instrumentacion.a_json(), "application/json")
+            else:
+                self._responder_texto(escritor, instrumentacion.a_prometheus(),
+                                      "text/plain; version=0.0.4")
+            return
+
+        raise ErrorPeticion(404, f"Ruta desconocida: {ruta}")
+
+    @staticmethod
+    def _leer_json(cuerpo: bytes) -> Any:
+        try:
+            return json.loads(cuerpo.decode('utf-8'))
+        except ValueError:
+            raise ErrorPeticion(400, "El cuerpo no es JSON válido")
+
+    async def _guardar(self, datos: Any, escritor: asyncio.StreamWriter) -> None:
+        if not isinstance(datos, dict):
+            raise ErrorPeticion(400, "Se esperaba un objeto con categoria, descripcion y monto")
+        exito, mensaje, cambio = await self._escribir(
+            self.gestor.guardar_gasto_detallado, datos.get("categoria"),
+            datos.get("descripcion"), datos.get("monto"))
+        if not exito:
+            raise ErrorPeticion(400, mensaje)
+        if self.gestor.confirmacion_diferida:
+            # El alta ya está en el ledger pero su fsync se espera acá, junto
+            # con el de las altas que llegaron a la par
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.gestor.esperar_confirmacion)
+        self._responder(escritor, 201, {"mensaje": mensaje, "gasto": _gasto_json(cambio.gasto)})
+
+    async def _guardar_lote(self, datos: List[Any]) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        Guarda un lote por tramos de ``GASTOS_POR_TRAMO``. Entre tramos se
+        pueden intercalar otras escrituras encoladas.
+
+        Returns:
+            Tupla (cantidad guardada, errores con la posición dentro del lote)
+        """
+        guardados = 0
+        errores: List[Tuple[int, str]] = []
+        for inicio in range(0, len(datos), GASTOS_POR_TRAMO):
+            cantidad, errores_tramo = await self._escribir(
+                self.gestor.guardar_gastos_lote, datos[inicio:inicio + GASTOS_POR_TRAMO])
+            guardados += cantidad
+            # La posición 0 es un error del lote entero: no se siguen escribiendo tramos
+            errores.extend((posicion + inicio if posicion else 0, mensaje)
+                           for posicion, mensaje in errores_tramo)
+            if any(posicion == 0 for posicion, _ in errores_tramo):
+                break
+        return guardados, errores
+
+    def _estadisticas(self, consulta: Dict[str, List[str]]) -> Dict[str, Any]:
+        filtros = _filtros(consulta)
+        estadisticas = self.gestor.obtener_estadisticas(**filtros)
+        if filtros["categoria"] is None:
+            estadisticas["por_categoria"] = self.gestor.calcular_total_por_categoria(
+                filtros["desde"], filtros["hasta"])
+        return estadisticas
+
+    def _listar(self, consulta: Dict[str, List[str]]) -> Dict[str, Any]:
+        filtros = _filtros(consulta)
+        inicio = max(0, _entero(consulta, "inicio", 0))
+        cantidad = min(max(0, _entero(consulta, "cantidad", PAGINA_POR_DEFECTO)), PAGINA_MAXIMA)
+        return {
+            "total": self.gestor.contar_gastos(**filtros),
+            "inicio": inicio,
+            "gastos": [_gasto_json(gasto)
+                       for gasto in self.gestor.obtener_pagina(inicio, cantidad, **filtros)],
+        }
+
+    async def _transmitir_gastos(self, consulta: Dict[str, List[str]],
+                                 escritor: asyncio.StreamWriter) -> None:
+        """
+        Envía los gastos como JSON Lines con codificación chunked, de a un
+        fragmento por vez y cediendo el bucle entre fragmentos.
+
+        Cada fragmento se lee en otro hilo con el mutex tomado y se suelta
+        antes de enviarlo, así un cliente lento no frena las escrituras. El primero
+        se lee antes de los encabezados para que un error temprano todavía
+        se pueda responder; uno posterior cierra la conexión.
+        """
+        gastos = self.gestor.iterar_gastos(**_filtros(consulta))
+        fragmento = await self._leer(self._leer_fragmento, gastos)
+        escritor.write(b"HTTP/1.1 200 OK\r\n"
+                       b"Content-Type: application/x-ndjson; charset=utf-8\r\n"
+                       b"Transfer-Encoding: chunked\r\n\r\n")
+        try:
+            while fragmento:
+                self._escribir_fragmento(escritor, fragmento)
+                await escritor.drain()
+                fragmento = await self._leer(self._leer_fragmento, gastos)
+            escritor.write(b"0\r\n\r\n")
+        except Exception as e:
+            raise RespuestaInterrumpida(str(e)) from e
+        finally:
+            gastos.close()
+
+    @staticmethod
+    def _leer_fragmento(gastos: Iterator) -> List[str]:
+        return [json.dumps(_gasto_json(gasto), ensure_ascii=False)
+                for gasto in islice(gastos, GASTOS_POR_FRAGMENTO)]
+
+    @staticmethod
+    def _escribir_fragmento(escritor: asyncio.StreamWriter, lineas: List[str]) -> None:
+        datos = ("\n".join(lineas) + "\n").encode('utf-8')
+        escritor.write(b"%x\r\n%s\r\n" % (len(datos), datos))
+
+
+def main(argumentos=None) -> int:
+    """
+    Punto de entrada del servicio.
+
+    Returns:
+        Código de salida
+    """
+    parser = argparse.ArgumentParser(
+        description="Expone el ledger de gastos como un servicio HTTP/JSON local")
+    parser.add_argument("--archivo", default="gastos.csv",
+                        help="Ledger a servir (por defecto: gastos.csv)")
+    parser.add_argument("--motor", default="csv", choices=MOTORES,
+                        help="Motor de almacenamiento del ledger")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección donde escuchar")
+    parser.add_argument("--puerto", type=int, default=8080,
+                        help="Puerto donde escuchar (0 elige uno libre)")
+    parser.add_argument("--durable", action="store_true",
+                        help="Registrar las altas en el diario con confirmación por grupos")
+    parser.add_argument("--politica-fsync", default="grupo", choices=POLITICAS_FSYNC,
+                        help="Sincronización del diario en modo durable")
+    parser.add_argument("--metricas", action="store_true",
+                        help="Instrumentar el gestor y exponer GET /metricas "
+                             "(también con GASTOS_METRICAS=1)")
+    args = parser.parse_args(argumentos)
+
+    if args.metricas:
+        instrumentacion.activar()
+    else:
+        activar_si_corresponde()
+
+    try:
+        gestor = GestorGastos(args.archivo, motor=args.motor, durable=args.durable,
+                              politica_fsync=args.politica_fsync,
+                              confirmacion_diferida=args.durable)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"✗ No se pudo abrir '{args.archivo}': {str(e)}", file=sys.stderr)
+        return 2
+    servidor = ServidorGastos(gestor, args.host, args.puerto)
+
+    async def ejecutar():
+        await servidor.iniciar()
+        try:
+            # SIGTERM termina igual que Ctrl+C: se vacía la cola de escrituras
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM,
+                                                          asyncio.current_task().cancel)
+        except NotImplementedError:  # Windows
+            pass
+        print(f"Escuchando en http://{args.host}:{servidor.puerto}", flush=True)
+        try:
+            await servidor.servir()
+        except asyncio.CancelledError:
+            pass
+
+    codigo = 0
+    try:
+        asyncio.run(ejecutar())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            gestor.cerrar()
+        except RuntimeError as e:
+            print(f"✗ Error al cerrar el ledger: {str(e)}", file=sys.stderr)
+            codigo = 1
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,652 @@
+"""
+Tabla columnar compacta para el ledger en memoria
+Guarda cada columna en un array tipado: ids, fechas como segundos epoch,
+montos como centavos enteros y categorías como códigos de un diccionario
+pequeño. Las filas se exponen mediante vistas ligeras con __slots__.
+Las consultas por rango de fechas y categoría usan un índice temporal y
+listas de posiciones por categoría que se construyen al primer uso
+"""
+
+import calendar
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from itertools import compress, islice, repeat
+from operator import add, attrgetter, le, lt, mul, sub
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+# Origen usado para convertir segundos epoch a texto sin depender de la zona horaria
+_EPOCH = datetime(1970, 1, 1)
+
+# Columna de montos unidos por comas, todos con dos decimales ("12.50,3.00")
+# Mayor monto en centavos que cabe en las columnas de enteros de 64 bits
+CENTAVOS_MAXIMOS = 2 ** 63 - 1
+
+_MONTOS_CON_CENTAVOS = re.compile(r'\d+\.\d\d(?:,\d+\.\d\d)*')
+
+# Marca de fecha que no pudo convertirse; el texto original se guarda aparte
+FECHA_INVALIDA = -(2 ** 62)
+
+# Descripciones que se miden para estimar la memoria de la tabla
+MUESTRA_MEMORIA = 1000
+
+
+def texto_a_centavos(texto: str) -> int:
+    """
+    Convierte un monto en texto ("12.50") a centavos enteros.
+
+    Los montos que escribe el backend siempre tienen dos decimales, así que
+    se evita ``float`` en ese caso; cualquier otro formato se redondea.
+
+    Raises:
+        ValueError: Si el texto no es un número finito o no cabe en 64 bits
+    """
+    if len(texto) > 3 and texto[-3] == '.' and texto[-2:].isdigit() and texto[:-3].isdigit():
+        centavos = int(texto[:-3]) * 100 + int(texto[-2:])
+    else:
+        try:
+            # "inf" da OverflowError y "nan", ValueError
+            centavos = int(round(float(texto) * 100))
+        except OverflowError:
+            raise ValueError(f"monto no finito: {texto!r}")
+    if abs(centavos) > CENTAVOS_MAXIMOS:
+        raise ValueError(f"monto fuera de rango: {texto!r}")
+    return centavos
+
+
+def fecha_a_epoch(texto: str, _dias: Dict[str, int] = {}) -> int:
+    """
+    Convierte "AAAA-MM-DD HH:MM:SS" a segundos desde 1970 (sin zona horaria).
+
+    El inicio de cada día se memoriza, porque muchos gastos comparten fecha.
+
+    Raises:
+        ValueError: Si el texto no tiene el formato esperado
+    """
+    dia = texto[:10]
+    base = _dias.get(dia)
+    if base is None:
+        if len(dia) != 10 or dia[4] != '-' or dia[7] != '-':
+            raise ValueError(f"Fecha inválida: {texto!r}")
+        base = calendar.timegm((int(dia[:4]), int(dia[5:7]), int(dia[8:10]), 0, 0, 0))
+        if len(_dias) < 100_000:
+            _dias[dia] = base
+    if len(texto) == 10:
+        return base
+    if len(texto) != 19 or texto[13] != ':' or texto[16] != ':':
+        raise ValueError(f"Fecha inválida: {texto!r}")
+    return base + int(texto[11:13]) * 3600 + int(texto[14:16]) * 60 + int(texto[17:19])
+
+
+def textos_a_centavos(textos: Sequence[str]) -> array:
+    """
+    Convierte una columna de montos en texto a centavos enteros.
+
+    Si todos los montos tienen dos decimales (el formato que escribe el
+    backend), se quitan los puntos de una vez y cada monto se interpreta
+    directamente como entero; si no, se convierten uno por uno.
+
+    Raises:
+        ValueError: Si algún texto no es un número
+    """
+    unidos = ','.join(textos)
+    if _MONTOS_CON_CENTAVOS.fullmatch(unidos):
+        return array('q', map(int, unidos.replace('.', '').split(',')))
+    return array('q', map(texto_a_centavos, textos))
+
+
+def fechas_a_epoch(textos: Sequence[str]) -> array:
+    """
+    Convierte una columna de fechas "AAAA-MM-DD HH:MM:SS" a segundos epoch.
+
+    Si todas tienen exactamente ese formato se interpretan con
+    ``datetime.fromisoformat`` (en C) y se restan del origen; si no, se
+    convierten una por una con ``fecha_a_epoch``.
+
+    Raises:
+        ValueError: Si alguna fecha no tiene el formato esperado
+    """
+    cantidad = len(textos)
+    unidas = ''.join(textos) if set(map(len, textos)) <= {19} else ''
+    # Separadores en su lugar: descarta los otros formatos que acepta fromisoformat
+    if (len(unidas) == 19 * cantidad
+            and unidas[4::19] == unidas[7::19] == '-' * cantidad
+            and unidas[13::19] == unidas[16::19] == ':' * cantidad):
+        try:
+            diferencias = list(map(sub, map(datetime.fromisoformat, textos), repeat(_EPOCH)))
+        except ValueError:
+            pass
+        else:
+            return array('q', map(add, map(mul, map(attrgetter('days'), diferencias),
+                                           repeat(86400)),
+                                  map(attrgetter('seconds'), diferencias)))
+    return array('q', map(fecha_a_epoch, textos))
+
+
+def epoch_a_fecha(segundos: int, _dias: Dict[int, str] = {}) -> str:
+    """
+    Convierte segundos desde 1970 a "AAAA-MM-DD HH:MM:SS".
+
+    El texto de cada día se memoriza; la hora se arma con aritmética entera.
+    """
+    dia, resto = divmod(segundos, 86400)
+    texto_dia = _dias.get(dia)
+    if texto_dia is None:
+        texto_dia = (_EPOCH + timedelta(days=dia)).strftime("%Y-%m-%d")
+        if len(_dias) < 100_000:
+            _dias[dia] = texto_dia
+    horas, resto = divmod(resto, 3600)
+    minutos, segundos = divmod(resto, 60)
+    return f"{texto_dia} {horas:02d}:{minutos:02d}:{segundos:02d}"
+
+
+def _bisect_por_fecha(fechas: array, indices: Sequence[int], epoch: int) -> int:
+    """
+    Bisección izquierda sobre una secuencia de índices ordenada por fecha.
+
+    Returns:
+        Primera posición de ``indices`` cuya fecha es >= ``epoch``
+    """
+    bajo, alto = 0, len(indices)
+    while bajo < alto:
+        medio = (bajo + alto) // 2
+        if fechas[indices[medio]] < epoch:
+            bajo = medio + 1
+        else:
+            alto = medio
+    return bajo
+
+
+class ColumnasGastos(NamedTuple):
+    """
+    Copia de las columnas numéricas de un conjunto de gastos, para análisis
+    vectorizados: fechas en segundos epoch (``FECHA_INVALIDA`` si no se
+    pudo convertir), montos en centavos y códigos de categoría.
+    """
+    fechas: array
+    centavos: array
+    categorias: array
+    nombres_categoria: List[str]
+
+
+class FilaGasto:
+    """
+    Vista de solo lectura de una fila de ``TablaGastos``.
+
+    Ofrece los mismos atributos que ``Gasto`` (id, fecha, categoria,
+    descripcion, monto) calculándolos a partir de las columnas.
+    """
+
+    __slots__ = ('_tabla', '_indice')
+
+    def __init__(self, tabla: "TablaGastos", indice: int):
+        self._tabla = tabla
+        self._indice = indice
+
+    @property
+    def id(self) -> int:
+        return self._tabla.ids[self._indice]
+
+    @property
+    def fecha(self) -> str:
+        return self._tabla.fecha_texto(self._indice)
+
+    @property
+    def epoch(self) -> int:
+        return self._tabla.fechas[self._indice]
+
+    @property
+    def categoria(self) -> str:
+        return self._tabla.nombres_categoria[self._tabla.categorias[self._indice]]
+
+    @property
+    def descripcion(self) -> str:
+        return self._tabla.descripciones[self._indice]
+
+    @property
+    def centavos(self) -> int:
+        return self._tabla.centavos[self._indice]
+
+    @property
+    def monto(self) -> float:
+        return self._tabla.centavos[self._indice] / 100
+
+    def a_diccionario(self) -> Dict[str, str]:
+        """
+        Convierte la fila al formato de fila del archivo CSV.
+        """
+        centavos = self.centavos
+        return {
+            'id': str(self.id),
+            'fecha': self.fecha,
+            'categoria': self.categoria,
+            'descripcion': self.descripcion,
+            'monto': f"{centavos // 100}.{centavos % 100:02d}"
+        }
+
+    def __repr__(self) -> str:
+        return (f"FilaGasto(id={self.id}, fecha={self.fecha!r}, categoria={self.categoria!r}, "
+                f"descripcion={self.descripcion!r}, monto={self.monto})")
+
+
+class TablaGastos:
+    """
+    Ledger en memoria con almacenamiento por columnas.
+
+    Las filas eliminadas solo se marcan en ``vivos``; ``compactada`` crea
+    una tabla nueva sin ellas. Mientras los ids se anexen en orden
+    creciente, la búsqueda por id usa bisección sobre la columna ``ids``;
+    si no, se construye un índice auxiliar.
+
+    Lo mismo ocurre con las fechas: si se anexan en orden cronológico (el
+    caso normal) los rangos se resuelven con bisección directa sobre
+    ``fechas``; si no, se mantiene una permutación ordenada por fecha.
+    """
+
+    def __init__(self):
+        self.ids = array('q')
+        self.fechas = array('q')
+        self.centavos = array('q')
+        self.categorias = array('I')
+        self.descripciones: List[str] = []
+        self.vivos = bytearray()
+        # Diccionario de categorías: nombre <-> código
+        self.nombres_categoria: List[str] = []
+        self.codigos_categoria: Dict[str, int] = {}
+        # Texto original de las fechas que no se pudieron convertir
+        self._fechas_texto: Dict[int, str] = {}
+        self._posicion_por_id: Optional[Dict[int, int]] = None
+        # Índices físicos de las filas eliminadas, ordenados (acotados por la compactación)
+        self._muertos: List[int] = []
+        self.cantidad_vivos = 0
+        # Índices de consulta, creados al primer uso y mantenidos al anexar:
+        # posiciones de cada código de categoría y permutación ordenada por
+        # fecha (solo si las fechas dejaron de estar en orden de registro)
+        self._posiciones_categoria: Optional[List[array]] = None
+        self._fechas_desordenadas = False
+        self._orden_fecha: Optional[array] = None
+        # Cambia con cada alta o baja; permite cachear resultados de consultas
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self.cantidad_vivos
+
+    def codigo_categoria(self, categoria: str) -> int:
+        """
+        Retorna el código de una categoría, registrándola si es nueva.
+        """
+        codigo = self.codigos_categoria.get(categoria)
+        if codigo is None:
+            codigo = len(self.nombres_categoria)
+            self.nombres_categoria.append(categoria)
+            self.codigos_categoria[categoria] = codigo
+        return codigo
+
+    def agregar(self, id_gasto: int, fecha: str, categoria: str, descripcion: str,
+                centavos: int) -> int:
+        """
+        Anexa una fila a la tabla.
+
+        Returns:
+            Índice de la fila nueva
+        """
+        indice = len(self.ids)
+        try:
+            epoch = fecha_a_epoch(fecha)
+        except ValueError:
+            epoch = FECHA_INVALIDA
+            self._fechas_texto[indice] = fecha
+
+        if self._posicion_por_id is not None:
+            self._posicion_por_id[id_gasto] = indice
+        elif indice and id_gasto <= self.ids[-1]:
+            # Ids desordenados: la bisección deja de servir
+            self._posicion_por_id = {id_: i for i, id_ in enumerate(self.ids)}
+            self._posicion_por_id[id_gasto] = indice
+
+        if indice and epoch < self.fechas[-1]:
+            self._fechas_desordenadas = True
+        if self._orden_fecha is not None:
+            posicion = _bisect_por_fecha(self.fechas, self._orden_fecha, epoch + 1)
+            self._orden_fecha.insert(posicion, indice)
+
+        codigo = self.codigo_categoria(categoria)
+        self.ids.append(id_gasto)
+        self.fechas.append(epoch)
+        self.centavos.append(centavos)
+        self.categorias.append(codigo)
+        self.descripciones.append(descripcion)
+        self.vivos.append(1)
+        self.cantidad_vivos += 1
+        self.version += 1
+
+        if self._posiciones_categoria is not None:
+            while len(self._posiciones_categoria) <= codigo:
+                self._posiciones_categoria.append(array('I'))
+            self._posiciones_categoria[codigo].append(indice)
+        return indice
+
+    def extender(self, ids: array, fechas: array, categorias: Sequence[str],
+                 descripciones: List[str], centavos: array) -> None:
+        """
+        Anexa un bloque de filas de una vez.
+
+        Equivale a llamar a ``agregar`` por cada fila, pero extiende las
+        columnas en bloque; los índices de consulta se reconstruyen al
+        siguiente uso.
+
+        Args:
+            ids: Ids de las filas
+            fechas: Fechas ya convertidas a segundos epoch (válidas)
+            categorias: Nombres de categoría
+            descripciones: Descripciones
+            centavos: Montos en centavos
+        """
+        cantidad = len(ids)
+        if not cantidad:
+            return
+        inicio = len(self.ids)
+
+        if self._posicion_por_id is None and (
+                (inicio and ids[0] <= self.ids[-1])
+                or not all(map(lt, ids, islice(ids, 1, None)))):
+            # Ids desordenados: la bisección deja de servir
+            self._posicion_por_id = {id_: i for i, id_ in enumerate(self.ids)}
+        if self._posicion_por_id is not None:
+            self._posicion_por_id.update(zip(ids, range(inicio, inicio + cantidad)))
+
+        if not self._fechas_desordenadas and (
+                (inicio and fechas[0] < self.fechas[-1])
+                or not all(map(le, fechas, islice(fechas, 1, None)))):
+            self._fechas_desordenadas = True
+
+        try:
+            codigos = array('I', map(self.codigos_categoria.__getitem__, categorias))
+        except KeyError:
+            # Códigos nuevos en orden de primera aparición, como al agregar fila a fila
+            for categoria in dict.fromkeys(categorias):
+                self.codigo_categoria(categoria)
+            codigos = array('I', map(self.codigos_categoria.__getitem__, categorias))
+        self.ids.extend(ids)
+        self.fechas.extend(fechas)
+        self.centavos.extend(centavos)
+        self.categorias.extend(codigos)
+        self.descripciones.extend(descripciones)
+        self.vivos.extend(b'\x01' * cantidad)
+        self.cantidad_vivos += cantidad
+        self.version += cantidad
+        self._posiciones_categoria = None
+        self._orden_fecha = None
+
+    @classmethod
+    def desde_columnas(cls, ids: array, fechas: array, centavos: array, categorias: array,
+                       descripciones: List[str], nombres_categoria: List[str],
+                       fechas_texto: Dict[int, str]) -> "TablaGastos":
+        """
+        Crea una tabla con todas sus filas vivas a partir de columnas ya
+        convertidas (por ejemplo, las de la instantánea binaria).
+
+        Args:
+            ids, fechas, centavos: Columnas de enteros de 64 bits
+            categorias: Códigos de categoría, índices de ``nombres_categoria``
+            descripciones: Descripciones
+            nombres_categoria: Nombre de cada código de categoría
+            fechas_texto: Texto original de las filas con fecha inválida
+        """
+        tabla = cls()
+        tabla.ids, tabla.fechas, tabla.centavos = ids, fechas, centavos
+        tabla.categorias, tabla.descripciones = categorias, descripciones
+        tabla.nombres_categoria = nombres_categoria
+        tabla.codigos_categoria = {nombre: i for i, nombre in enumerate(nombres_categoria)}
+        tabla._fechas_texto = fechas_texto
+        cantidad = len(ids)
+        tabla.vivos = bytearray(b'\x01') * cantidad
+        tabla.cantidad_vivos = cantidad
+        tabla.version = cantidad
+        if not all(map(lt, ids, islice(ids, 1, None))):
+            tabla._posicion_por_id = {id_: i for i, id_ in enumerate(ids)}
+        tabla._fechas_desordenadas = not all(map(le, fechas, islice(fechas, 1, None)))
+        return tabla
+
+    def posicion(self, id_gasto: int) -> Optional[int]:
+        """
+        Busca la fila viva con el id indicado.
+
+        Returns:
+            Índice de la fila o None si no existe o fue eliminada
+        """
+        if self._posicion_por_id is not None:
+            indice = self._posicion_por_id.get(id_gasto)
+        else:
+            indice = bisect_left(self.ids, id_gasto)
+            if indice >= len(self.ids) or self.ids[indice] != id_gasto:
+                indice = None
+        if indice is None or not self.vivos[indice]:
+            return None
+        return indice
+
+    def eliminar(self, indice: int) -> None:
+        """
+        Marca una fila como eliminada.
+        """
+        if self.vivos[indice]:
+            self.vivos[indice] = 0
+            self.cantidad_vivos -= 1
+            self.version += 1
+            insort(self._muertos, indice)
+
+    def eliminar_ids(self, ids: set) -> None:
+        """
+        Marca como eliminadas todas las filas cuyos ids están en ``ids``.
+
+        Con los ids en orden creciente cada uno se busca por bisección; si
+        no, se recorre la columna de ids.
+        """
+        if self._posicion_por_id is None:
+            indices = (self.posicion(id_gasto) for id_gasto in ids)
+        else:
+            # Puede haber ids repetidos: se eliminan todas sus filas
+            indices = [i for i, id_gasto in enumerate(self.ids) if id_gasto in ids]
+        for indice in indices:
+            if indice is not None:
+                self.eliminar(indice)
+
+    def indice_de_posicion(self, posicion: int) -> int:
+        """
+        Convierte la posición de una fila entre las vivas en su índice físico.
+
+        Se busca el menor punto fijo de ``indice = posicion + muertos(<= indice)``
+        con bisección sobre las filas eliminadas, sin recorrer la tabla.
+
+        Args:
+            posicion: Posición 0-based entre las filas vivas
+
+        Returns:
+            Índice físico de la fila
+        """
+        indice = posicion
+        while True:
+            candidato = posicion + bisect_right(self._muertos, indice)
+            if candidato == indice:
+                return indice
+            indice = candidato
+
+    def _posiciones_de(self, codigo: int) -> array:
+        """
+        Retorna los índices físicos (en orden de registro) de una categoría.
+        """
+        if self._posiciones_categoria is None:
+            posiciones = [array('I') for _ in self.nombres_categoria]
+            for indice, codigo_fila in enumerate(self.categorias):
+                posiciones[codigo_fila].append(indice)
+            self._posiciones_categoria = posiciones
+        if codigo >= len(self._posiciones_categoria):
+            return array('I')
+        return self._posiciones_categoria[codigo]
+
+    def _indices_por_fecha(self) -> Sequence[int]:
+        """
+        Retorna los índices físicos ordenados por fecha.
+        """
+        if not self._fechas_desordenadas:
+            return range(len(self.fechas))
+        if self._orden_fecha is None:
+            self._orden_fecha = array('I', sorted(range(len(self.fechas)),
+                                                  key=self.fechas.__getitem__))
+        return self._orden_fecha
+
+    def indices_filtrados(self, inicio: Optional[int] = None, fin: Optional[int] = None,
+                          codigo: Optional[int] = None) -> List[int]:
+        """
+        Busca las filas vivas con fecha en [inicio, fin) y la categoría indicada.
+
+        Con las fechas en orden de registro el costo es O(log n + k), con k
+        la cantidad de filas del rango (o de la categoría, si no hay rango).
+
+        Args:
+            inicio: Segundos epoch mínimos (inclusivo) o None
+            fin: Segundos epoch máximos (exclusivo) o None
+            codigo: Código de categoría o None para todas
+
+        Returns:
+            Índices físicos en orden de registro
+        """
+        vivos = self.vivos
+        if inicio is None and fin is None:
+            candidatos = self._posiciones_de(codigo) if codigo is not None else range(len(vivos))
+            return [i for i in candidatos if vivos[i]]
+
+        # Las fechas inválidas quedan fuera de cualquier rango
+        inicio = FECHA_INVALIDA + 1 if inicio is None else inicio
+        fin = 2 ** 62 if fin is None else fin
+        fechas = self.fechas
+        if codigo is not None and not self._fechas_desordenadas:
+            # Las posiciones de la categoría también están ordenadas por fecha
+            posiciones = self._posiciones_de(codigo)
+            desde = _bisect_por_fecha(fechas, posiciones, inicio)
+            hasta = _bisect_por_fecha(fechas, posiciones, fin)
+            return [i for i in posiciones[desde:hasta] if vivos[i]]
+
+        orden = self._indices_por_fecha()
+        desde = _bisect_por_fecha(fechas, orden, inicio)
+        hasta = _bisect_por_fecha(fechas, orden, fin)
+        categorias = self.categorias
+        indices = [i for i in orden[desde:hasta]
+                   if vivos[i] and (codigo is None or categorias[i] == codigo)]
+        if self._fechas_desordenadas:
+            indices.sort()
+        return indices
+
+    def pagina(self, inicio: int, cantidad: int) -> List[FilaGasto]:
+        """
+        Retorna las filas vivas en las posiciones [inicio, inicio + cantidad).
+        """
+        filas = []
+        if inicio >= self.cantidad_vivos or cantidad <= 0:
+            return filas
+        vivos = self.vivos
+        indice = self.indice_de_posicion(max(inicio, 0))
+        while indice < len(vivos) and len(filas) < cantidad:
+            if vivos[indice]:
+                filas.append(FilaGasto(self, indice))
+            indice += 1
+        return filas
+
+    def fecha_texto(self, indice: int) -> str:
+        """
+        Retorna la fecha de una fila en formato "AAAA-MM-DD HH:MM:SS".
+        """
+        epoch = self.fechas[indice]
+        if epoch == FECHA_INVALIDA:
+            return self._fechas_texto.get(indice, '')
+        return epoch_a_fecha(epoch)
+
+    def fila(self, indice: int) -> FilaGasto:
+        """
+        Retorna la vista de una fila.
+        """
+        return FilaGasto(self, indice)
+
+    def indices_vivos(self) -> Iterator[int]:
+        """
+        Recorre los índices de las filas vivas en orden de registro.
+        """
+        vivos = self.vivos
+        for indice in range(len(vivos)):
+            if vivos[indice]:
+                yield indice
+
+    def iterar(self) -> Iterator[FilaGasto]:
+        """
+        Recorre las filas vivas en orden de registro.
+        """
+        for indice in self.indices_vivos():
+            yield FilaGasto(self, indice)
+
+    def columnas(self, indices: Optional[Sequence[int]] = None) -> ColumnasGastos:
+        """
+        Copia las columnas numéricas de las filas vivas, o de las filas
+        ``indices`` si se indican.
+
+        Se copian para que quien las analice no dependa de la tabla, que
+        puede seguir creciendo.
+        """
+        nombres = list(self.nombres_categoria)
+        if indices is None:
+            if self.cantidad_vivos == len(self.ids):
+                return ColumnasGastos(array('q', self.fechas), array('q', self.centavos),
+                                      array('I', self.categorias), nombres)
+            return ColumnasGastos(array('q', compress(self.fechas, self.vivos)),
+                                  array('q', compress(self.centavos, self.vivos)),
+                                  array('I', compress(self.categorias, self.vivos)), nombres)
+        return ColumnasGastos(array('q', map(self.fechas.__getitem__, indices)),
+                              array('q', map(self.centavos.__getitem__, indices)),
+                              array('I', map(self.categorias.__getitem__, indices)), nombres)
+
+    def compactada(self) -> "TablaGastos":
+        """
+        Crea una tabla nueva que contiene solo las filas vivas.
+        """
+        nueva = TablaGastos()
+        nueva.nombres_categoria = list(self.nombres_categoria)
+        nueva.codigos_categoria = dict(self.codigos_categoria)
+        for indice in self.indices_vivos():
+            if indice in self._fechas_texto:
+                nueva._fechas_texto[len(nueva.ids)] = self._fechas_texto[indice]
+            nueva.ids.append(self.ids[indice])
+            nueva.fechas.append(self.fechas[indice])
+            nueva.centavos.append(self.centavos[indice])
+            nueva.categorias.append(self.categorias[indice])
+            nueva.descripciones.append(self.descripciones[indice])
+        nueva.vivos = bytearray(b'\x01') * len(nueva.ids)
+        nueva.cantidad_vivos = len(nueva.ids)
+        # Quitar filas no altera el orden relativo de las fechas restantes
+        nueva._fechas_desordenadas = self._fechas_desordenadas
+        if self._posicion_por_id is not None:
+            nueva._posicion_por_id = {id_: i for i, id_ in enumerate(nueva.ids)}
+        return nueva
+
+    def memoria(self) -> int:
+        """
+        Estimación en bytes de la memoria que ocupa la tabla: columnas,
+        índices de consulta y descripciones (medidas sobre una muestra).
+        """
+        total = len(self.vivos) + sum(columna.itemsize * len(columna) for columna in
+                                      (self.ids, self.fechas, self.centavos, self.categorias))
+        if self._orden_fecha is not None:
+            total += self._orden_fecha.itemsize * len(self._orden_fecha)
+        if self._posiciones_categoria is not None:
+            total += sum(posiciones.itemsize * len(posiciones)
+                         for posiciones in self._posiciones_categoria)
+        if self._posicion_por_id is not None:
+            # Las claves y los valores son enteros aparte del diccionario
+            total += (sys.getsizeof(self._posicion_por_id)
+                      + 2 * len(self._posicion_por_id) * sys.getsizeof(2 ** 40))
+        cantidad = len(self.descripciones)
+        if cantidad:
+            muestra = self.descripciones[::max(1, cantidad // MUESTRA_MEMORIA)]
+            total += (sys.getsizeof(self.descripciones)
+                      + sum(map(sys.getsizeof, muestra)) * cantidad // len(muestra))
+        return total
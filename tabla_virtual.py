@@ -0,0 +1,306 @@
+"""
+Tabla virtual para Tkinter
+Treeview que solo crea items para la ventana visible de filas y pide al
+backend cada página a medida que se mueve la barra de desplazamiento
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, List, Optional, Sequence, Tuple
+
+
+class TablaVirtual:
+    """
+    Treeview virtualizado sobre una fuente de datos paginada.
+
+    La fuente se define con dos funciones: ``contar()`` con la cantidad
+    total de filas y ``obtener_pagina(inicio, cantidad)`` con las filas de
+    una ventana. Solo se insertan en el Treeview las filas visibles; las de
+    un pequeño margen alrededor se guardan en memoria para que los
+    desplazamientos cortos no vuelvan a consultar la fuente.
+
+    Con un ``EjecutorTk`` las consultas a la fuente corren en segundo
+    plano: mientras llega una página se mantienen las filas dibujadas y
+    los pedidos que quedan viejos por un desplazamiento rápido se combinan.
+    """
+
+    def __init__(self, parent: tk.Widget,
+                 columnas: Sequence[Tuple[str, str, int, str]],
+                 contar: Callable[[], int],
+                 obtener_pagina: Callable[[int, int], list],
+                 formatear: Callable[[object], Tuple[str, tuple]],
+                 margen: int = 50,
+                 ejecutor=None):
+        """
+        Construye la tabla virtual.
+
+        Args:
+            parent: Widget contenedor
+            columnas: Tuplas (clave, título, ancho, alineación) de cada columna
+            contar: Función que retorna la cantidad total de filas
+            obtener_pagina: Función (inicio, cantidad) -> filas de esa ventana
+            formatear: Función fila -> (iid, valores) para el Treeview
+            margen: Filas adicionales que se piden antes y después de la ventana
+            ejecutor: EjecutorTk opcional para consultar la fuente en segundo plano
+        """
+        self._contar = contar
+        self._obtener_pagina = obtener_pagina
+        self._formatear = formatear
+        self._margen = margen
+        self._ejecutor = ejecutor
+
+        self.total = 0
+        self.inicio = 0
+        self._visibles = 20
+        # Página en memoria: posición de su primera fila y las filas
+        self._pagina_inicio = 0
+        self._pagina: List = []
+
+        self.frame = tk.Frame(parent, bg='#ffffff')
+        tree_frame = tk.Frame(self.frame, bg='#ffffff')
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+
+        # La barra vertical representa la posición en el total, no en los items
+        self.scrollbar_y = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self._desplazar)
+        scrollbar_x = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL)
+
+        self.arbol = ttk.Treeview(tree_frame,
+                                  columns=[c[0] for c in columnas],
+                                  show='headings',
+                                  xscrollcommand=scrollbar_x.set,
+                                  selectmode='browse')
+        scrollbar_x.config(command=self.arbol.xview)
+
+        for clave, titulo, ancho, alineacion in columnas:
+            self.arbol.heading(clave, text=titulo)
+            self.arbol.column(clave, width=ancho, anchor=alineacion)
+
+        self.scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
+        self.arbol.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.label_conteo = tk.Label(self.frame, text="", bg='#ffffff',
+                                     font=('Arial', 9), fg='#555555', anchor='e')
+        self.label_conteo.pack(fill=tk.X)
+
+        # Desplazamiento con rueda del ratón (Windows/Mac y Linux) y teclado
+        self.arbol.bind('<MouseWheel>', self._rueda)
+        self.arbol.bind('<Button-4>', lambda e: self._mover(-3))
+        self.arbol.bind('<Button-5>', lambda e: self._mover(3))
+        self.arbol.bind('<Prior>', lambda e: self._mover(-self._visibles))
+        self.arbol.bind('<Next>', lambda e: self._mover(self._visibles))
+        self.arbol.bind('<Up>', self._tecla_arriba)
+        self.arbol.bind('<Down>', self._tecla_abajo)
+        self.arbol.bind('<Configure>', self._redimensionar)
+
+    def _filas_visibles(self) -> int:
+        """
+        Calcula cuántas filas caben en la altura actual del Treeview.
+        """
+        alto_fila = ttk.Style().lookup('Treeview', 'rowheight') or 20
+        alto = self.arbol.winfo_height()
+        if alto <= 1:
+            return self._visibles
+        # Descontar el encabezado (aprox. una fila)
+        return max(1, alto // int(alto_fila) - 1)
+
+    def _filas_de_ventana(self) -> Optional[List]:
+        """
+        Retorna las filas de la ventana visible, pidiendo una página nueva si
+        la ventana sale de la que está en memoria.
+
+        Returns:
+            Las filas, o None si la página se pidió en segundo plano
+        """
+        fin = min(self.inicio + self._visibles, self.total)
+        pagina_fin = self._pagina_inicio + len(self._pagina)
+        if self.inicio < self._pagina_inicio or fin > pagina_fin:
+            pagina_inicio = max(0, self.inicio - self._margen)
+            cantidad = self._visibles + 2 * self._margen
+            if self._ejecutor is not None:
+                self._ejecutor.enviar(
+                    lambda: self._obtener_pagina(pagina_inicio, cantidad),
+                    lambda pagina: self._pagina_recibida(pagina_inicio, pagina),
+                    clave=(id(self), 'pagina'))
+                return None
+            self._pagina_inicio = pagina_inicio
+            self._pagina = self._obtener_pagina(pagina_inicio, cantidad)
+        desde = self.inicio - self._pagina_inicio
+        return self._pagina[desde:desde + self._visibles]
+
+    def _pagina_recibida(self, pagina_inicio: int, pagina: List) -> None:
+        """
+        Guarda una página consultada en segundo plano y redibuja.
+        """
+        self._pagina_inicio = pagina_inicio
+        self._pagina = pagina
+        self._dibujar()
+
+    def _actualizar_posicion(self) -> None:
+        """
+        Actualiza la barra de desplazamiento y el conteo de filas.
+        """
+        fin = min(self.inicio + self._visibles, self.total)
+        if self.total:
+            self.scrollbar_y.set(self.inicio / self.total, fin / self.total)
+            self.label_conteo.config(
+                text=f"Mostrando {self.inicio + 1}–{fin} de {self.total} gastos")
+        else:
+            self.scrollbar_y.set(0, 1)
+            self.label_conteo.config(text="Sin gastos registrados")
+
+    def _dibujar(self) -> None:
+        """
+        Reemplaza los items del Treeview por las filas de la ventana visible.
+        """
+        filas = self._filas_de_ventana()
+        if filas is None:
+            # La página está en camino: se conservan las filas actuales
+            self._actualizar_posicion()
+            return
+        seleccion = self.arbol.selection()
+        self.arbol.delete(*self.arbol.get_children())
+        for fila in filas:
+            iid, valores = self._formatear(fila)
+            self.arbol.insert('', tk.END, iid=iid, values=valores)
+        if seleccion and self.arbol.exists(seleccion[0]):
+            self.arbol.selection_set(seleccion[0])
+        self._actualizar_posicion()
+
+    def _ir_a(self, inicio: int) -> None:
+        """
+        Mueve la ventana visible para que empiece en la posición indicada.
+        """
+        inicio = max(0, min(inicio, self.total - self._visibles))
+        if inicio != self.inicio:
+            self.inicio = inicio
+            self._dibujar()
+
+    def _mover(self, filas: int) -> str:
+        self._ir_a(self.inicio + filas)
+        return 'break'
+
+    def _rueda(self, event) -> str:
+        # En Windows delta es múltiplo de 120; en Mac es pequeño
+        pasos = -event.delta // 120 if abs(event.delta) >= 120 else -event.delta
+        return self._mover(pasos * 3)
+
+    def _desplazar(self, accion: str, cantidad: str, unidad: Optional[str] = None) -> None:
+        """
+        Atiende los comandos de la barra de desplazamiento vertical.
+        """
+        if accion == 'moveto':
+            self._ir_a(int(float(cantidad) * self.total))
+        elif accion == 'scroll':
+            paso = self._visibles if unidad == 'pages' else 1
+            self._mover(int(cantidad) * paso)
+
+    def _tecla_arriba(self, event) -> Optional[str]:
+        hijos = self.arbol.get_children()
+        if hijos and self.arbol.focus() == hijos[0] and self.inicio > 0:
+            self._mover(-1)
+            self._enfocar(self.arbol.get_children()[0])
+            return 'break'
+        return None
+
+    def _tecla_abajo(self, event) -> Optional[str]:
+        hijos = self.arbol.get_children()
+        if hijos and self.arbol.focus() == hijos[-1] and self.inicio + self._visibles < self.total:
+            self._mover(1)
+            self._enfocar(self.arbol.get_children()[-1])
+            return 'break'
+        return None
+
+    def _enfocar(self, iid: str) -> None:
+        self.arbol.focus(iid)
+        self.arbol.selection_set(iid)
+
+    def _redimensionar(self, event=None) -> None:
+        visibles = self._filas_visibles()
+        if visibles != self._visibles:
+            self._visibles = visibles
+            self._ir_a(self.inicio)
+            self._dibujar()
+
+    def fila_agregada(self, fila) -> None:
+        """
+        Incorpora una fila anexada al final sin volver a consultar la fuente.
+
+        Solo se inserta un item si la fila cae dentro de la ventana visible.
+        """
+        posicion = self.total
+        self.total += 1
+        if self._pagina_inicio + len(self._pagina) == posicion:
+            self._pagina.append(fila)
+        if self.inicio <= posicion < self.inicio + self._visibles:
+            iid, valores = self._formatear(fila)
+            self.arbol.insert('', tk.END, iid=iid, values=valores)
+        self._actualizar_posicion()
+
+    def fila_eliminada(self, iid: str) -> None:
+        """
+        Quita una fila sin volver a consultar la fuente.
+
+        Se borra solo su item y, si la página en memoria lo permite, se
+        agrega al final de la ventana la fila que pasa a ser visible.
+        """
+        self.total = max(0, self.total - 1)
+        for desplazamiento, fila in enumerate(self._pagina):
+            if self._formatear(fila)[0] == iid:
+                del self._pagina[desplazamiento]
+                break
+        else:
+            # La fila no estaba en memoria: la página quedó desfasada
+            self._pagina = []
+
+        if self.arbol.exists(iid):
+            self.arbol.delete(iid)
+            siguiente = self.inicio + len(self.arbol.get_children())
+            desde = siguiente - self._pagina_inicio
+            if siguiente < self.total and self._pagina and 0 <= desde < len(self._pagina):
+                nuevo_iid, valores = self._formatear(self._pagina[desde])
+                self.arbol.insert('', tk.END, iid=nuevo_iid, values=valores)
+        if self.inicio and self.inicio + self._visibles > self.total:
+            # Al final del ledger: retroceder para mantener la ventana llena
+            self._ir_a(self.total - self._visibles)
+        self._actualizar_posicion()
+
+    def refrescar(self, ir_al_final: bool = False) -> None:
+        """
+        Vuelve a consultar el total y redibuja la ventana visible.
+
+        Args:
+            ir_al_final: Desplazar la ventana hasta las últimas filas
+        """
+        if self._ejecutor is None:
+            self._cargar(self._contar(), ir_al_final, None)
+            return
+
+        inicio, visibles, margen = self.inicio, self._visibles, self._margen
+
+        def consultar():
+            # Total y primera página en una sola visita al hilo de trabajo
+            total = self._contar()
+            desde = max(0, total - visibles) if ir_al_final else max(0, min(inicio, total - visibles))
+            pagina_inicio = max(0, desde - margen)
+            return total, (pagina_inicio, self._obtener_pagina(pagina_inicio, visibles + 2 * margen))
+
+        self._ejecutor.enviar(consultar, lambda r: self._cargar(r[0], ir_al_final, r[1]),
+                              clave=(id(self), 'refrescar'))
+
+    def _cargar(self, total: int, ir_al_final: bool, pagina: Optional[Tuple[int, List]]) -> None:
+        """
+        Aplica un total recién consultado y redibuja la ventana visible.
+
+        Args:
+            total: Cantidad total de filas
+            ir_al_final: Desplazar la ventana hasta las últimas filas
+            pagina: (inicio, filas) ya consultadas, o None para pedirlas
+        """
+        self.total = total
+        self._pagina_inicio, self._pagina = pagina if pagina is not None else (0, [])
+        if ir_al_final:
+            self.inicio = max(0, self.total - self._visibles)
+        else:
+            self.inicio = max(0, min(self.inicio, self.total - self._visibles))
+        self._dibujar()